@@ -0,0 +1,53 @@
+from harness import bench
+
+# Precio de BTC escalado que oscila unos dólares por lectura alrededor de 65000.
+PRICE = 6500000000000
+STEP = 500000000
+
+
+def _engine(alerts):
+    from Models.AlertEngine import AlertEngine
+
+    engine = AlertEngine(cooldown_ms=0)
+
+    # Niveles repartidos cada 20 dólares alrededor del precio: cada lectura cruza alguno.
+    for i in range(alerts):
+        engine.add_level('BTC', PRICE + (i - alerts // 2) * 2000000000)
+
+    engine.check('BTC', PRICE)
+
+    return engine
+
+
+def _check(alerts):
+    engine = _engine(alerts)
+    state = [0]
+
+    def run():
+        state[0] = (state[0] + 7) % 11
+        engine.check('BTC', PRICE + (state[0] - 5) * STEP)
+
+    return run
+
+
+@bench('alerts.check_10')
+def check_10():
+    return _check(10)
+
+
+@bench('alerts.check_100')
+def check_100():
+    return _check(100)
+
+
+@bench('alerts.check_1000')
+def check_1000():
+    return _check(1000)
+
+
+@bench('alerts.check_other_coin')
+def check_other_coin():
+    engine = _engine(1000)
+
+    # Moneda sin alertas: el coste mínimo de cada refresco.
+    return lambda: engine.check('ETH', 320000000000)
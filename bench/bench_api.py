@@ -0,0 +1,28 @@
+from harness import bench
+
+import fake_urequests
+
+fake_urequests.responses['https://api.binance.com/api/v3/ticker/price'] = (
+    200, b'{"symbol":"ADAEUR","price":"0.41666667"}')
+fake_urequests.responses['http://worldtimeapi.org/'] = (
+    200, b'{"abbreviation":"UTC","client_ip":"1.2.3.4","datetime":"2024-11-11T06:20:25.522376+00:00",'
+         b'"day_of_week":1,"day_of_year":316,"dst":false,"dst_from":null,"dst_offset":0,'
+         b'"dst_until":null,"raw_offset":0,"timezone":"Etc/UTC","unixtime":1731306025,'
+         b'"utc_datetime":"2024-11-11T06:20:25.522376+00:00","utc_offset":"+00:00","week_number":46}')
+
+
+@bench('api.get_binance_price')
+def get_binance_price():
+    from Models.Api import get_binance_price, governor
+
+    # Se mide el parseo: el gobernador aplazaría casi todas las llamadas del bucle.
+    governor.enabled = False
+
+    return lambda: get_binance_price('ADA', 'EUR')
+
+
+@bench('api.get_time_utc')
+def get_time_utc():
+    from Models.Api import get_time_utc
+
+    return get_time_utc
@@ -0,0 +1,79 @@
+from harness import bench
+
+# Catálogos de 10, 500 y 2000 monedas con nombres de 3 a 5 letras.
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _symbols(count):
+    symbols = []
+    i = 0
+
+    while len(symbols) < count:
+        n = i * 7919
+        symbols.append(''.join(LETTERS[(n // 26 ** k) % 26] for k in range(3 + i % 3)))
+        i += 1
+
+    return symbols
+
+
+def _catalog(count):
+    from Models.CoinCatalog import CoinCatalog, build_catalog
+
+    path = '/tmp/bench-coins-%d.bin' % count
+    symbols = _symbols(count)
+    build_catalog(path, symbols, favourites=symbols[:6])
+
+    return CoinCatalog(path), symbols
+
+
+def _open(count):
+    from Models.CoinCatalog import CoinCatalog
+
+    catalog, _ = _catalog(count)
+    catalog.close()
+
+    # Bytes por llamada: lo que ocupa en RAM un catálogo abierto.
+    def run():
+        CoinCatalog(catalog.path).close()
+
+    return run
+
+
+def _symbol(count):
+    catalog, _ = _catalog(count)
+    state = [0]
+
+    # Acceso como al girar el encoder: la entrada siguiente, a veces fuera de la página.
+    def run():
+        state[0] = (state[0] + 1) % catalog.count
+        catalog.symbol(state[0])
+
+    return run
+
+
+def _find(count):
+    catalog, symbols = _catalog(count)
+    state = [0]
+
+    def run():
+        state[0] = (state[0] + 7) % len(symbols)
+        catalog.find(symbols[state[0]])
+
+    return run
+
+
+def _jump(count):
+    catalog, _ = _catalog(count)
+    state = [0]
+
+    def run():
+        state[0] = catalog.jump(state[0], 1) if state[0] < catalog.count - 1 else 0
+
+    return run
+
+
+for _count in (10, 500, 2000):
+    bench('catalog.open_%d' % _count, iterations=200)(lambda count=_count: _open(count))
+    bench('catalog.symbol_%d' % _count)(lambda count=_count: _symbol(count))
+    bench('catalog.find_%d' % _count)(lambda count=_count: _find(count))
+    bench('catalog.jump_%d' % _count)(lambda count=_count: _jump(count))
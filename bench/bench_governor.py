@@ -0,0 +1,31 @@
+from harness import bench
+
+HEADERS = {"Content-Type": "application/json", "x-mbx-used-weight-1m": "1234"}
+
+
+@bench('governor.acquire')
+def acquire():
+    from Models.RateGovernor import RateGovernor, USER
+
+    # Sin límite práctico: se mide el camino de una petición que sale.
+    governor = RateGovernor(weight_per_min=10 ** 8, burst=10 ** 3)
+
+    return lambda: governor.acquire(2, USER)
+
+
+@bench('governor.acquire_deferred')
+def acquire_deferred():
+    from Models.RateGovernor import RateGovernor
+
+    governor = RateGovernor(weight_per_min=1, burst=1)
+
+    return lambda: governor.acquire(2)
+
+
+@bench('governor.observe')
+def observe():
+    from Models.RateGovernor import RateGovernor
+
+    governor = RateGovernor()
+
+    return lambda: governor.observe(200, HEADERS)
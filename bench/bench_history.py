@@ -0,0 +1,58 @@
+from harness import bench
+
+# Ventana llena de una hora con una muestra por minuto y precios de BTC escalados.
+CAPACITY = 60
+START = 1735689600
+
+
+def _series():
+    from Models.PriceHistory import PriceSeries
+
+    series = PriceSeries(capacity=CAPACITY, window_s=CAPACITY * 60, spacing_s=60)
+
+    for i in range(CAPACITY):
+        series.append(6000000000000 + (i * 7919 % 101) * 100000000, START + i * 60)
+
+    return series
+
+
+@bench('history.append')
+def append():
+    series = _series()
+    state = [START + CAPACITY * 60, 0]
+
+    # Ventana llena: cada muestra nueva descarta la más antigua.
+    def run():
+        state[1] = (state[1] + 7919) % 101
+        series.append(6000000000000 + state[1] * 100000000, state[0])
+        state[0] += 60
+
+    return run
+
+
+@bench('history.append_replace')
+def append_replace():
+    series = _series()
+    stamp = START + (CAPACITY - 1) * 60
+    state = [0]
+
+    # Precios más seguidos que la separación: sustituyen a la última muestra.
+    def run():
+        state[0] = (state[0] + 37) % 101
+        series.append(6000000000000 + state[0] * 100000000, stamp)
+
+    return run
+
+
+@bench('history.min_max')
+def min_max():
+    series = _series()
+
+    return lambda: (series.min(), series.max())
+
+
+@bench('history.change_trend')
+def change_trend():
+    series = _series()
+
+    return lambda: (series.change_bp(), series.trend())
@@ -0,0 +1,75 @@
+from harness import bench
+
+# Una semana y un día de velas de una hora de BTC con el formato de /api/v3/klines.
+START = 1735689600
+INTERVAL = 3600
+CANDLES = [[(START + i * INTERVAL) * 1000, '%d.12000000' % (60000 + i % 97), '%d.50000000' % (60100 + i % 97),
+            '%d.01000000' % (59900 + i % 97), '%d.34000000' % (60010 + i % 97), '123.45600000',
+            (START + (i + 1) * INTERVAL) * 1000 - 1, '0', 100, '0', '0', '0']
+           for i in range(192)]
+PATH = '/tmp/bench-klines.bin'
+
+
+def _remove():
+    import os
+
+    try:
+        os.remove(PATH)
+    except OSError:
+        pass
+
+
+def _stand_in(symbol, interval, start_ms, limit):
+    # API local: velas desde ``start_ms`` como las devolvería Binance.
+    first = (start_ms // 1000 - START) // INTERVAL
+
+    return CANDLES[first:first + limit]
+
+
+def _full_store():
+    from Models.KlineStore import KlineStore
+
+    _remove()
+    store = KlineStore('BTC', capacity=192, path=PATH)
+    store.ingest(_stand_in, now_s=START + 192 * INTERVAL, max_requests=10)
+
+    return store
+
+
+@bench('klines.ingest_50', iterations=50)
+def ingest():
+    from Models.KlineStore import KlineStore
+
+    _remove()
+    store = KlineStore('BTC', capacity=192, path=PATH)
+    state = [0]
+
+    # Cada llamada pide y guarda 50 velas (una petición); el anillo da vueltas.
+    def run():
+        store.last_open = START + state[0] * INTERVAL - INTERVAL if state[0] else None
+        store.ingest(lambda symbol, interval, start_ms, limit: CANDLES[state[0]:state[0] + 50],
+                     max_requests=1)
+        state[0] = (state[0] + 50) % 100
+
+    return run
+
+
+@bench('klines.read_24h', iterations=200)
+def read_24h():
+    store = _full_store()
+
+    return lambda: store.read(START + 100 * INTERVAL, START + 124 * INTERVAL)
+
+
+@bench('klines.at', iterations=500)
+def at():
+    store = _full_store()
+
+    return lambda: store.at(START + 150 * INTERVAL + 60)
+
+
+@bench('klines.change_7d', iterations=200)
+def change_7d():
+    store = _full_store()
+
+    return lambda: store.change_bp(7 * 86400)
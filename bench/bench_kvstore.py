@@ -0,0 +1,78 @@
+from harness import bench
+
+PATH = '/tmp/bench-state.kv'
+
+# Claves como las del firmware: ajustes, red y el último precio de unas cuantas monedas.
+KEYS = ['bright', 'coin', 'quote', 'ap'] + ['p:' + symbol for symbol in
+                                           ('BTC', 'ETH', 'ADA', 'BNB', 'SOL', 'DOT', 'XRP', 'DOGE')]
+UPDATES = 10000
+
+
+def _remove():
+    import os
+
+    for path in (PATH, PATH + '.new'):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _store(**kwargs):
+    from Models.KeyValueStore import KeyValueStore
+
+    return KeyValueStore(PATH, **kwargs)
+
+
+def _fill(store, updates):
+    # Precios que cambian en cada escritura, como tras cada petición
+    for i in range(updates):
+        store.put(KEYS[i % len(KEYS)], 6000000000000 + i)
+
+    store.flush()
+
+
+@bench('kvstore.put', iterations=5000)
+def put():
+    _remove()
+    store = _store()
+    state = [0]
+
+    # Con el búfer lleno se escribe en la flash; el fichero crece sin compactar
+    def run():
+        state[0] += 1
+        store.put(KEYS[state[0] % len(KEYS)], state[0])
+
+    return run
+
+
+@bench('kvstore.put_unchanged', iterations=5000)
+def put_unchanged():
+    _remove()
+    store = _store()
+    store.put('coin', 'BTC')
+
+    return lambda: store.put('coin', 'BTC')
+
+
+@bench('kvstore.get', iterations=5000)
+def get():
+    _remove()
+    store = _store()
+    _fill(store, len(KEYS) * 4)
+
+    return lambda: store.get('p:BTC')
+
+
+@bench('kvstore.open_10k', iterations=10)
+def open_10k():
+    # Reconstrucción del índice al arrancar con 10000 registros sin compactar
+    _remove()
+    store = _store(compact_min_bytes=1 << 30)
+    _fill(store, UPDATES)
+    store.close()
+
+    def run():
+        _store().close()
+
+    return run
@@ -0,0 +1,58 @@
+from harness import bench
+
+
+class _Sink:
+    """Salida que descarta lo escrito: mide formatear e imprimir sin depender del puerto serie."""
+
+    def write(self, text):
+        pass
+
+
+def _log():
+    from Models.Log import Log, INFO, ERROR
+
+    log = Log(capacity=128, level=INFO)
+    error = log.event('api', ERROR, 'Error al obtener el precio: %d')
+    debug = log.event('api', 10, 'Respuesta de la API: HTTP %d')
+
+    return log, error, debug
+
+
+@bench('log.print')
+def print_error():
+    # El camino de antes: formatear la excepción y escribirla en el momento.
+    sink = _Sink()
+    error = OSError(110)
+
+    return lambda: print("Error al obtener el precio:", error, file=sink)
+
+
+@bench('log.record')
+def record():
+    from Models.Log import code
+
+    log, event, _ = _log()
+    error = OSError(110)
+
+    return lambda: log.log(event, code(error))
+
+
+@bench('log.filtered')
+def filtered():
+    log, _, event = _log()
+
+    return lambda: log.log(event, 200)
+
+
+@bench('log.drain_128', iterations=20)
+def drain():
+    log, event, _ = _log()
+    sink = _Sink()
+
+    def run():
+        for i in range(128):
+            log.log(event, i)
+
+        log.drain(sink.write)
+
+    return run
@@ -0,0 +1,37 @@
+from harness import bench
+
+
+def _display():
+    from machine import SPI
+    from Models.Max7219 import Max7219
+
+    return Max7219(SPI(1), 9)
+
+
+@bench('max7219.write_to_buffer')
+def write_to_buffer():
+    display = _display()
+
+    return lambda: display.write_to_buffer("SEL-ADA")
+
+
+@bench('max7219.write_to_buffer_with_dots')
+def write_to_buffer_with_dots():
+    display = _display()
+
+    return lambda: display.write_to_buffer_with_dots("BTC6012.34")
+
+
+@bench('max7219.decode_char', iterations=10000)
+def decode_char():
+    display = _display()
+
+    return lambda: display.decode_char('7')
+
+
+@bench('max7219.display')
+def display():
+    display = _display()
+    display.write_to_buffer_with_dots("ETH2981.8")
+
+    return display.display
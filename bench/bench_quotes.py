@@ -0,0 +1,26 @@
+from harness import bench
+
+
+@bench('quotes.parse_scaled')
+def parse_scaled():
+    from Models.QuoteConverter import parse_scaled
+
+    return lambda: parse_scaled('65012.34000000')
+
+
+@bench('quotes.convert')
+def convert():
+    from Models.QuoteConverter import QuoteConverter
+
+    quotes = QuoteConverter(fetch_raw=lambda crypto, base, priority=None: '1.08230000')
+    quotes.update_fx('EUR')
+    price = 6501234000000
+
+    return lambda: quotes.convert(price, 'EUR')
+
+
+@bench('quotes.format_price')
+def format_price():
+    from Models.QuoteConverter import format_price
+
+    return lambda: format_price(0.41666667, 4)
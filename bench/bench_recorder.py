@@ -0,0 +1,47 @@
+from harness import bench
+
+# Respuesta típica de /api/v3/ticker/price con la cabecera de peso que se graba.
+URL = 'https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT'
+BODY = b'{"symbol":"BTCUSDT","price":"60123.45000000"}'
+HEADERS = {"x-mbx-used-weight-1m": "12", "Content-Type": "application/json"}
+
+
+def _recorder(enabled):
+    from Models.Recorder import Recorder
+
+    recorder = Recorder()
+
+    if enabled:
+        # Sin límite práctico: se mide grabar, no parar al llenarse.
+        recorder.start('/tmp/bench-record.bin', max_bytes=1 << 30)
+
+    return recorder
+
+
+@bench('recorder.pin_disabled')
+def pin_disabled():
+    # Coste fijo en la IRQ del encoder con RECORD = False.
+    recorder = _recorder(False)
+
+    return lambda: recorder.pin(14, 1)
+
+
+@bench('recorder.pin')
+def pin():
+    recorder = _recorder(True)
+
+    def run():
+        recorder.pin(14, 1)
+
+        # El bucle vacía el buffer antes de que se llene, como el trabajo periódico del firmware
+        if recorder._written - recorder._read == recorder._capacity:
+            recorder._read = recorder._written
+
+    return run
+
+
+@bench('recorder.http', iterations=200)
+def http():
+    recorder = _recorder(True)
+
+    return lambda: recorder.http(URL, 200, 120000, HEADERS, BODY)
@@ -0,0 +1,51 @@
+from harness import bench
+
+# Dos precios seguidos de BTC en EUR: cambian las últimas cifras, como en cada actualización.
+PRICES = (60123.45, 60131.02)
+
+
+def _renderer(oled, full):
+    from machine import SPI, I2C
+    from Models.Max7219 import Max7219
+    from Models.Ssd1306 import Ssd1306
+    from Models.Render import Renderer, Frame, SegmentOutput, OledOutput, PRICE
+
+    if oled:
+        output = OledOutput(Ssd1306(I2C(0)))
+    else:
+        output = SegmentOutput(Max7219(SPI(1), 9))
+
+    renderer = Renderer([output])
+    frames = [Frame(PRICE, 'BTC', price, quote='EUR', trend=1) for price in PRICES]
+    state = [0]
+
+    def run():
+        state[0] ^= 1
+
+        # Sin seguimiento de cambios: todo se dibuja y se envía en cada fotograma
+        if full:
+            renderer.invalidate()
+
+        renderer.show(frames[state[0]])
+
+    return run
+
+
+@bench('render.max7219_price')
+def max7219_price():
+    return _renderer(False, False)
+
+
+@bench('render.max7219_full')
+def max7219_full():
+    return _renderer(False, True)
+
+
+@bench('render.oled_price', iterations=200)
+def oled_price():
+    return _renderer(True, False)
+
+
+@bench('render.oled_full', iterations=100)
+def oled_full():
+    return _renderer(True, True)
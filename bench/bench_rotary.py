@@ -0,0 +1,55 @@
+from harness import bench
+
+
+def _encoder(range_mode):
+    from Models.Rotary import Rotary
+
+    # Un paso horario completo: (CLK, DT) partiendo de reposo (1, 1).
+    sequence = (2, 0, 1, 3)
+
+    class BenchRotary(Rotary):
+        def __init__(self):
+            super().__init__(0, 5, 1, False, range_mode, False, False)
+            self.edge = 0
+
+        def _hal_get_clk_value(self):
+            return sequence[self.edge] >> 1
+
+        def _hal_get_dt_value(self):
+            return sequence[self.edge] & 1
+
+    encoder = BenchRotary()
+
+    def edge():
+        encoder._process_rotary_pins(None)
+        encoder.edge = (encoder.edge + 1) & 3
+
+    return edge
+
+
+@bench('rotary.process_pins_wrap', iterations=10000)
+def process_pins_wrap():
+    from Models.Rotary import Rotary
+
+    return _encoder(Rotary.RANGE_WRAP)
+
+
+@bench('rotary.process_pins_bounded', iterations=10000)
+def process_pins_bounded():
+    from Models.Rotary import Rotary
+
+    return _encoder(Rotary.RANGE_BOUNDED)
+
+
+@bench('rotary.wrap', iterations=10000)
+def wrap():
+    from Models.Rotary import _wrap
+
+    return lambda: _wrap(5, 1, 0, 5)
+
+
+@bench('rotary.bound', iterations=10000)
+def bound():
+    from Models.Rotary import _bound
+
+    return lambda: _bound(5, 1, 0, 5)
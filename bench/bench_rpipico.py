@@ -0,0 +1,10 @@
+from harness import bench
+
+
+@bench('rpipico.cpu_temperature_read_sensor')
+def cpu_temperature_read_sensor():
+    from Models.RpiPico import RpiPico
+
+    rpi = RpiPico()
+
+    return rpi.cpu_temperature_read_sensor
@@ -0,0 +1,49 @@
+from harness import bench
+
+# Registro típico del firmware: casi todos los campos se repiten entre registros.
+RECORDS = [(1735689600 + i * 60, {"coin": "BTC", "quote": "EUR", "price": '%d.12000000' % (60000 + i % 3),
+                                  "temp": 27.4, "rssi": -55, "mem_kb": 176})
+           for i in range(20)]
+
+
+class _Scheduler:
+    def on_demand (self, callback, name=None):
+        return None
+
+    def reschedule (self, job, delay_ms=0):
+        pass
+
+
+@bench('telemetry.encode_batch_20', iterations=200)
+def encode_batch():
+    from Models.TelemetryQueue import encode_batch
+
+    return lambda: encode_batch(1, 1, 1, RECORDS)
+
+
+@bench('telemetry.add')
+def add():
+    from Models.TelemetryQueue import TelemetryQueue
+
+    queue = TelemetryQueue(_Scheduler(), lambda body: True, 1, path='/tmp/bench-telemetry.bin',
+                           batch_size=1000000)
+    data = RECORDS[0][1]
+
+    def run():
+        queue.add(data, 1735689600)
+
+        if len(queue._pending) > 1000:
+            queue._pending = []
+
+    return run
+
+
+@bench('telemetry.store_batch', iterations=200)
+def store_batch():
+    from Models.TelemetryQueue import TelemetryQueue, encode_batch
+
+    queue = TelemetryQueue(_Scheduler(), lambda body: False, 1, path='/tmp/bench-telemetry.bin')
+    batch = (encode_batch(1, 1, 1, RECORDS), len(RECORDS))
+
+    # El fichero se llena y a partir de ahí cada lote descarta el más antiguo.
+    return lambda: queue._store(batch)
@@ -0,0 +1,70 @@
+from harness import bench
+
+import io
+import json
+
+from bench_catalog import _symbols
+
+# Respuesta de /api/v3/ticker/24hr?type=MINI para 20 pares y para la lista
+# completa de un catálogo de 2000 monedas (unos 600 KB).
+TEMPLATE = ('{"symbol":"%sUSDT","openPrice":"%d.12345678","highPrice":"%d.50000000",'
+            '"lowPrice":"%d.00100000","lastPrice":"%d.87654321","volume":"123456.78000000",'
+            '"quoteVolume":"9876543.21000000","openTime":1735603200000,"closeTime":1735689599999,'
+            '"firstId":123456789,"lastId":123556789,"count":100001}')
+
+
+def _body(count):
+    return ('[' + ','.join(TEMPLATE % (s, i, i + 1, i, i) for i, s in enumerate(_symbols(count))) + ']').encode()
+
+
+def _stream(count):
+    from Models.TickerStats import TickerStats
+
+    body = _body(count)
+    stream = io.BytesIO(body)
+    stats = TickerStats(_symbols(20))
+
+    # Pico de memoria por llamada: trozo, arrastre y valores extraídos, sin la respuesta.
+    def run():
+        stream.seek(0)
+        stats.feed(stream)
+
+    return run
+
+
+def _loads(count):
+    from Models.QuoteConverter import parse_scaled
+
+    body = _body(count)
+    pairs = set(s + 'USDT' for s in _symbols(20))
+
+    # Referencia: cargar la respuesta entera con json, como hacen las demás llamadas.
+    def run():
+        for ticker in json.loads(body):
+            if ticker['symbol'] in pairs:
+                parse_scaled(ticker['lastPrice'])
+                parse_scaled(ticker['openPrice'])
+                parse_scaled(ticker['highPrice'])
+                parse_scaled(ticker['lowPrice'])
+
+    return run
+
+
+@bench('ticker.stream_20', 200)
+def stream_20():
+    return _stream(20)
+
+
+@bench('ticker.loads_20', 200)
+def loads_20():
+    return _loads(20)
+
+
+@bench('ticker.stream_2000', 5)
+def stream_2000():
+    return _stream(2000)
+
+
+@bench('ticker.loads_2000', 5)
+def loads_2000():
+    return _loads(2000)
@@ -0,0 +1,44 @@
+from harness import bench
+
+
+def _trace(enabled):
+    from Models.Trace import Trace
+
+    trace = Trace()
+    span = trace.name('spi')
+
+    if enabled:
+        trace.enable(capacity=256)
+
+    return trace, span
+
+
+@bench('trace.span_disabled')
+def span_disabled():
+    # Coste fijo de dejar la instrumentación en el firmware con TRACE = False.
+    from time import ticks_us
+
+    trace, span = _trace(False)
+
+    return lambda: trace.span(span, ticks_us())
+
+
+@bench('trace.span')
+def span():
+    from time import ticks_us
+
+    trace, span = _trace(True)
+
+    return lambda: trace.span(span, ticks_us())
+
+
+@bench('trace.chrome_256', iterations=20)
+def chrome():
+    from time import ticks_us
+
+    trace, span = _trace(True)
+
+    for i in range(256):
+        trace.span(span, ticks_us(), i % 8)
+
+    return trace.chrome
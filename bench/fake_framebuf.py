@@ -0,0 +1,42 @@
+"""
+``framebuf`` mínimo para los benchmarks en CPython (en MicroPython es nativo).
+
+Solo ``MONO_VLSB``, ``fill_rect`` y ``text``; la fuente es un patrón fijo
+por carácter. En la Pico estas primitivas son C: aquí cuestan bastante más,
+así que el benchmark de la OLED sirve para comparar el código del firmware
+consigo mismo, no con el dispositivo.
+"""
+
+MONO_VLSB = 0
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+
+    def fill_rect(self, x, y, w, h, c):
+        buffer = self.buffer
+        width = self.width
+
+        for yy in range(max(0, y), min(self.height, y + h)):
+            row = (yy >> 3) * width
+            bit = 1 << (yy & 7)
+
+            for xx in range(max(0, x), min(width, x + w)):
+                if c:
+                    buffer[row + xx] |= bit
+                else:
+                    buffer[row + xx] &= ~bit & 0xff
+
+    def text(self, s, x, y, c=1):
+        width = self.width
+        row = (y >> 3) * width
+
+        for n, char in enumerate(s):
+            for i in range(7):
+                column = x + 8 * n + i
+
+                if 0 <= column < width and char != ' ':
+                    self.buffer[row + column] = (ord(char) >> (i % 4)) | 0x01
@@ -0,0 +1,96 @@
+"""
+``machine`` mínimo para los benchmarks (CPython y puerto unix de MicroPython).
+
+No simula tiempos: solo cuenta lo que se escribe para que el coste medido
+sea el del código del firmware.
+"""
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+    IRQ_DISABLE = 0
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = 1 if value is None else value
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+
+        self._value = v
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=0, priority=1, wake=None, hard=False):
+        pass
+
+
+class SPI:
+    def __init__(self, id=0, baudrate=1000000, sck=None, mosi=None, miso=None, **kwargs):
+        self.id = id
+        self.bytes_written = 0
+
+    def write(self, buf):
+        self.bytes_written += len(buf)
+
+
+class I2C:
+    def __init__(self, id=0, scl=None, sda=None, freq=400000):
+        self.id = id
+        self.bytes_written = 0
+
+    def writeto(self, addr, buf, stop=True):
+        self.bytes_written += len(buf)
+
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        for buf in vector:
+            self.bytes_written += len(buf)
+
+
+class ADC:
+    # Lectura del sensor interno equivalente a ~25 ºC.
+    value_u16 = 14089
+
+    def __init__(self, pin):
+        self.pin = pin
+
+    def read_u16(self):
+        return self.value_u16
+
+
+class RTC:
+    def datetime(self, datetimetuple=None):
+        if datetimetuple is None:
+            return (2025, 1, 1, 2, 0, 0, 0, 0)
+
+
+def freq(hz=None):
+    return 125000000 if hz is None else None
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout = timeout
+
+    def feed(self):
+        pass
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def unique_id():
+    return b'\xe6\x61\x64\x08\x43\x1f\x2a\x2e'
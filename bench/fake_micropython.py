@@ -0,0 +1,5 @@
+"""``micropython`` mínimo para importar los modelos desde CPython."""
+
+
+def const(value):
+    return value
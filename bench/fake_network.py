@@ -0,0 +1,25 @@
+"""``network`` mínimo para importar los modelos en los benchmarks."""
+
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self.interface_id = interface_id
+
+    def active(self, is_active=None):
+        return False
+
+    def isconnected(self):
+        return False
+
+    def status(self, param=None):
+        return 0
+
+    def config(self, *args, **kwargs):
+        return None
+
+
+def hostname(name=None):
+    return 'bench'
@@ -0,0 +1,46 @@
+"""
+``time`` con la API de MicroPython para CPython.
+
+Las esperas no duermen: en los benchmarks solo aparecen en la preparación
+(constructores) y no deben alargar la ejecución.
+"""
+
+import time as _time
+
+
+def sleep(seconds):
+    pass
+
+
+def sleep_ms(ms):
+    pass
+
+
+def sleep_us(us):
+    pass
+
+
+def ticks_us():
+    return (_time.perf_counter_ns() // 1000) & 0x3FFFFFFF
+
+
+def ticks_ms():
+    return (_time.perf_counter_ns() // 1000000) & 0x3FFFFFFF
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & 0x3FFFFFFF
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & 0x3FFFFFFF
+
+    return ((diff + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+
+def time():
+    return int(_time.time())
+
+
+def __getattr__(name):
+    return getattr(_time, name)
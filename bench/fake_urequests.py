@@ -0,0 +1,44 @@
+"""
+``urequests`` que devuelve respuestas enlatadas para medir el parseo.
+
+``responses`` asocia un prefijo de URL con ``(status, body)``.
+"""
+
+import json
+
+responses = {}
+
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    @property
+    def text(self):
+        return str(self.content, 'utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None, timeout=None):
+    for prefix in responses:
+        if url.startswith(prefix):
+            status, body = responses[prefix]
+
+            return Response(status, body)
+
+    raise OSError(-2)
+
+
+def get(url, **kw):
+    return request('GET', url, **kw)
+
+
+def post(url, **kw):
+    return request('POST', url, **kw)
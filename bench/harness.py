@@ -0,0 +1,144 @@
+"""
+Utilidades comunes de los benchmarks.
+
+El mismo código corre en CPython y en el puerto unix de MicroPython, por eso
+solo usa lo que existe en ambos (nada de argparse, types ni str.ljust).
+"""
+
+import gc
+import sys
+
+IS_MICROPYTHON = sys.implementation.name == 'micropython'
+
+if IS_MICROPYTHON:
+    from time import ticks_us, ticks_diff
+
+    def _timer():
+        return ticks_us()
+
+    def _elapsed_us(start):
+        return ticks_diff(ticks_us(), start)
+else:
+    import builtins
+    import tracemalloc
+    from time import perf_counter_ns
+
+    def _timer():
+        return perf_counter_ns()
+
+    def _elapsed_us(start):
+        return (perf_counter_ns() - start) / 1000
+
+# Benchmarks registrados: lista de (nombre, preparación, iteraciones).
+BENCHMARKS = []
+
+
+def bench(name, iterations=2000):
+    """
+    Registra una función de preparación que devuelve el callable a medir.
+
+    Args:
+        name (str): Nombre único, se usa como clave en el fichero baseline.
+        iterations (int): Llamadas por medición.
+    """
+    def decorator(setup):
+        BENCHMARKS.append((name, setup, iterations))
+
+        return setup
+
+    return decorator
+
+
+def install_fakes(src_dir):
+    """
+    Registra los periféricos falsos bajo los nombres de MicroPython y añade
+    el firmware al path para poder importar ``Models``.
+    """
+    import fake_machine
+    import fake_network
+    import fake_urequests
+
+    sys.modules['machine'] = fake_machine
+    sys.modules['network'] = fake_network
+    sys.modules['urequests'] = fake_urequests
+
+    if not IS_MICROPYTHON:
+        import json
+        import binascii
+        import fake_framebuf
+        import fake_micropython
+        import fake_time
+
+        sys.modules['framebuf'] = fake_framebuf
+        sys.modules['micropython'] = fake_micropython
+        sys.modules['time'] = fake_time
+        sys.modules['ujson'] = json
+        sys.modules['ubinascii'] = binascii
+        builtins.const = lambda value: value
+
+    if src_dir not in sys.path:
+        sys.path.append(src_dir)
+
+
+def _time_per_call(fn, iterations):
+    start = _timer()
+
+    for _ in range(iterations):
+        fn()
+
+    return _elapsed_us(start) / iterations
+
+
+def _alloc_per_call(fn, iterations):
+    """
+    Bytes de heap por llamada.
+
+    En MicroPython es la memoria reservada con el recolector parado, que es
+    lo que acaba costando colecciones en la Pico. En CPython, que libera por
+    conteo de referencias, es el pico transitorio medido con tracemalloc.
+    """
+    iterations = min(iterations, 200)
+    gc.collect()
+
+    if IS_MICROPYTHON:
+        gc.disable()
+        before = gc.mem_alloc()
+
+        for _ in range(iterations):
+            fn()
+
+        used = gc.mem_alloc() - before
+        gc.enable()
+
+        return used / iterations
+
+    tracemalloc.start()
+    total = 0
+
+    for _ in range(iterations):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - current
+
+    tracemalloc.stop()
+
+    return total / iterations
+
+
+def measure(fn, iterations, repeat=5):
+    """
+    Mide un callable.
+
+    Returns:
+        tuple: (microsegundos por llamada, bytes por llamada). El tiempo es el
+        mejor de ``repeat`` rondas descontando el coste de una llamada vacía.
+    """
+    def noop():
+        pass
+
+    fn()
+    overhead = min(_time_per_call(noop, iterations) for _ in range(repeat))
+    per_call = min(_time_per_call(fn, iterations) for _ in range(repeat))
+
+    return max(0.0, per_call - overhead), _alloc_per_call(fn, iterations)
@@ -0,0 +1,129 @@
+"""
+Microbenchmarks de los caminos críticos del firmware.
+
+Uso:
+    python bench/run.py [filtro] [--save] [--tolerance 25]
+    micropython bench/run.py [filtro] [--save] [--tolerance 25]
+
+Sin ``--save`` compara con ``bench/baseline.json`` (sección del intérprete
+actual) y termina con código 1 si algún benchmark empeora más de la
+tolerancia en porcentaje. Con ``--save`` guarda los resultados como nueva
+referencia.
+"""
+
+import json
+import sys
+
+BENCH_DIR = __file__.rsplit('/', 1)[0] if '/' in __file__ else '.'
+SRC_DIR = BENCH_DIR + '/../src'
+BASELINE = BENCH_DIR + '/baseline.json'
+
+# Módulos con benchmarks, se importan en este orden.
+BENCH_MODULES = (
+    'bench_max7219',
+    'bench_rotary',
+    'bench_api',
+    'bench_rpipico',
+    'bench_quotes',
+    'bench_telemetry',
+    'bench_history',
+    'bench_klines',
+    'bench_alerts',
+    'bench_catalog',
+    'bench_governor',
+    'bench_ticker',
+    'bench_log',
+    'bench_trace',
+    'bench_recorder',
+    'bench_render',
+    'bench_kvstore',
+)
+
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+import harness
+
+
+def load_baseline():
+    try:
+        with open(BASELINE) as f:
+            return json.load(f)
+    except OSError:
+        return {}
+
+
+def save_baseline(baseline):
+    with open(BASELINE, 'w') as f:
+        json.dump(baseline, f)
+
+
+def parse_args(argv):
+    args = {"filter": None, "save": False, "tolerance": 25.0}
+    i = 0
+
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '--save':
+            args["save"] = True
+        elif arg == '--tolerance':
+            i += 1
+            args["tolerance"] = float(argv[i])
+        else:
+            args["filter"] = arg
+
+        i += 1
+
+    return args
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    harness.install_fakes(SRC_DIR)
+
+    for name in BENCH_MODULES:
+        __import__(name)
+
+    impl = sys.implementation.name
+    baseline = load_baseline()
+    reference = baseline.get(impl, {})
+    results = {}
+    regressions = []
+
+    print('%-40s %10s %10s %10s %8s' % ('benchmark', 'us/call', 'B/call', 'base us', 'delta'))
+
+    for name, setup, iterations in harness.BENCHMARKS:
+        if args["filter"] and args["filter"] not in name:
+            continue
+
+        us, alloc = harness.measure(setup(), iterations)
+        results[name] = {"us": round(us, 3), "alloc": round(alloc, 1)}
+
+        base = reference.get(name)
+
+        if base and base["us"]:
+            delta = (us - base["us"]) * 100 / base["us"]
+            base_us = '%10.3f' % base["us"]
+            delta_s = '%+7.1f%%' % delta
+
+            if delta > args["tolerance"]:
+                regressions.append(name)
+                delta_s += ' !'
+        else:
+            base_us = '%10s' % '-'
+            delta_s = '%8s' % '-'
+
+        print('%-40s %10.3f %10.1f %s %s' % (name, us, alloc, base_us, delta_s))
+
+    if args["save"]:
+        reference.update(results)
+        baseline[impl] = reference
+        save_baseline(baseline)
+        print('Baseline guardado para', impl)
+    elif regressions:
+        print('Regresiones (> %.0f%%):' % args["tolerance"], ', '.join(regressions))
+        sys.exit(1)
+
+
+main()
@@ -0,0 +1,17 @@
+"""
+Simulador en CPython del firmware CryptoWatchDog.
+
+Ejemplo:
+
+    from sim import Simulator
+
+    sim = Simulator(seed=1)
+    sim.rotate(3600, 2)
+    sim.press(3601)
+    summary = sim.run(24 * 3600)
+    sim.timeline.to_json('timeline.json')
+"""
+
+from sim.clock import DeviceReset, SimulationEnd, VirtualClock
+from sim.simulator import Simulator
+from sim.timeline import Timeline
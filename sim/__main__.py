@@ -0,0 +1,68 @@
+"""
+Uso: python -m sim [--hours 24] [--seed 0] [--timeline timeline.json]
+
+Simula el firmware con una interacción de ejemplo (cambiar de moneda cada
+pocas horas) e imprime el resumen de rendimiento.
+"""
+
+import argparse
+import json
+import time
+
+from sim import Simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim', description='Simulador del firmware CryptoWatchDog')
+    parser.add_argument('--hours', type=float, default=24, help='Horas virtuales a simular')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    parser.add_argument('--latency', type=int, default=120, help='Latencia HTTP en ms')
+    parser.add_argument('--debug', action='store_true', help='Activa env.DEBUG en el firmware')
+    parser.add_argument('--timeline', help='Guarda la línea temporal en este fichero JSON')
+    parser.add_argument('--spi', action='store_true', help='Guarda también cada trama SPI en la línea temporal')
+    parser.add_argument('--dump', action='store_true', help='Imprime los eventos de display y http')
+    args = parser.parse_args()
+
+    # Las tramas SPI se cuentan siempre, pero guardarlas una a una es costoso.
+    kinds = None if args.spi else ('display', 'http', 'wifi', 'pin', 'rtc', 'led', 'crash', 'reset')
+    sim = Simulator(seed=args.seed, env={"DEBUG": args.debug}, http_latency_ms=args.latency,
+                    timeline_kinds=kinds)
+
+    # Cada 4 horas entra al menú, avanza una moneda y confirma.
+    for t in range(4 * 3600, int(args.hours * 3600), 4 * 3600):
+        sim.press(t)
+        sim.rotate(t + 1, 1)
+        sim.press(t + 2)
+
+    started = time.perf_counter()
+    summary = sim.run(args.hours * 3600)
+    summary["wall_time_s"] = round(time.perf_counter() - started, 2)
+
+    # Despertares y precisión de plazos medidos por el propio planificador del firmware.
+    scheduler = (sim.namespace or {}).get('scheduler')
+
+    if scheduler is not None:
+        stats = dict(scheduler.stats)
+        stats["late_ms_avg"] = round(stats["late_ms_sum"] / stats["runs"], 2) if stats["runs"] else 0
+        stats["wakeups_per_hour"] = round(stats["wakeups"] * 3600 / summary["elapsed_s"], 1)
+        summary["scheduler"] = stats
+
+    prefetcher = (sim.namespace or {}).get('prefetcher')
+
+    if prefetcher is not None:
+        summary["prefetch"] = dict(prefetcher.stats, hit_ratio=round(prefetcher.hit_ratio(), 3))
+
+    if args.dump:
+        sim.timeline.dump(kinds=('display', 'http', 'wifi', 'crash'))
+
+    if args.timeline:
+        sim.timeline.to_json(args.timeline)
+
+    print(json.dumps(summary, indent=2))
+
+    if sim.error is not None:
+        raise SystemExit(f'El firmware terminó con error: {sim.error!r}')
+
+
+if __name__ == '__main__':
+    main()
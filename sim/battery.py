@@ -0,0 +1,209 @@
+"""
+Descarga simulada de la batería con y sin perfiles de consumo.
+
+Uso: python -m sim.battery [--capacity 1000] [--max-hours 120] [--seed 0]
+
+Conecta una batería LiPo simulada al ADC (``BATTERY_PIN = 26``) y la
+descarga con un consumo que depende de lo que hace el firmware en cada
+momento: radio apagada, en ahorro o sin ahorro (desde el ``WLAN``
+simulado), frecuencia de la CPU (``machine.freq``) y brillo de la pantalla
+(desde las tramas del MAX7219). El voltaje sale de la curva de descarga de
+una LiPo con algo de ruido de ADC.
+
+Corre dos veces hasta agotarla: con los perfiles de ``BatteryGovernor`` y
+con un único perfil normal, como antes. Informa de la autonomía ganada, de
+lo que envejece de media el precio en pantalla a cambio y de lo que se
+equivocó la autonomía estimada por el firmware.
+"""
+
+import argparse
+import bisect
+import json
+import random
+
+from sim import Simulator
+
+# Curva de una celda LiPo en reposo: (% de carga, voltios).
+LIPO_CURVE = ((0, 3.30), (5, 3.50), (10, 3.60), (20, 3.67), (30, 3.71), (40, 3.75), (50, 3.79),
+              (60, 3.84), (70, 3.90), (80, 3.98), (90, 4.08), (100, 4.20))
+
+# Consumo aproximado de la Pico W en mA.
+CPU_MA_BASE = 8
+CPU_MA_PER_125MHZ = 18
+RADIO_MA = {0xa11140: 45, 0xa11142: 20, 0x111022: 6}
+DISPLAY_MA_BASE = 4
+DISPLAY_MA_PER_STEP = 3
+DISPLAY_MA_SHUTDOWN = 0.2
+
+# Un único perfil como el firmware sin gobernador.
+BASELINE_PROFILES = ({"name": "normal", "min_pct": 0, "period_factor": 1, "intensity": 15,
+                      "radio_off_min_ms": 30000, "freq": 125000000},)
+
+# Canal del ADC del GPIO26.
+_CHANNEL = 0
+
+
+def voltage(soc):
+    """Voltaje de la celda con ``soc`` por ciento de carga."""
+    soc = max(0.0, min(100.0, soc))
+    i = max(1, bisect.bisect_left([point[0] for point in LIPO_CURVE], soc))
+    (x0, y0), (x1, y1) = LIPO_CURVE[i - 1], LIPO_CURVE[i]
+
+    return y0 + (y1 - y0) * (soc - x0) / (x1 - x0)
+
+
+class BatteryModel:
+    """
+    Batería conectada al ADC que se descarga según el consumo del firmware.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        capacity_mah (float): Capacidad de la celda.
+        step_s (float): Intervalo de integración del consumo.
+        noise_v (float): Ruido máximo de la lectura del ADC.
+        seed (int): Semilla del ruido.
+    """
+
+    def __init__(self, sim, capacity_mah=1000, step_s=1, noise_v=0.01, seed=0):
+        self.sim = sim
+        self.capacity_mah = capacity_mah
+        self.step_s = step_s
+        self.noise_v = noise_v
+        self.random = random.Random(seed)
+        self.used_mah = 0.0
+        self.empty_at = None
+
+        sim.board.set_adc(_CHANNEL, self.read)
+        sim.at(step_s, self._step)
+
+    def soc(self):
+        return 100 * (1 - self.used_mah / self.capacity_mah)
+
+    def current_ma(self):
+        sim = self.sim
+        current = CPU_MA_BASE + CPU_MA_PER_125MHZ * sim.board.cpu_freq / 125000000
+        network = sim.network
+
+        if network.active:
+            current += RADIO_MA.get(network.config['pm'], RADIO_MA[0xa11142])
+
+        display = sim.display
+
+        if display.shutdown:
+            current += DISPLAY_MA_SHUTDOWN
+        else:
+            current += DISPLAY_MA_BASE + DISPLAY_MA_PER_STEP * display.intensity
+
+        return current
+
+    def read(self, t):
+        # Divisor que lleva 4,2 V al fondo de escala, como espera ``read_external_battery``
+        volts = voltage(self.soc()) + self.random.uniform(-self.noise_v, self.noise_v)
+
+        return int(volts / 4.2 * 65535)
+
+    def _step(self):
+        self.used_mah += self.current_ma() * self.step_s / 3600
+
+        if self.soc() <= 0:
+            # Batería agotada: termina la simulación
+            self.empty_at = self.sim.clock.now_us / 1000000
+            self.sim.clock.end_us = self.sim.clock.now_us
+            return
+
+        self.sim.at(self.sim.clock.now_us / 1000000 + self.step_s, self._step)
+
+
+class BatteryRun:
+    """
+    Una descarga completa.
+
+    Args:
+        governed (bool): Con los perfiles de ``BatteryGovernor`` o con uno solo.
+        capacity_mah (float): Capacidad de la celda.
+        max_hours (float): Límite de la simulación si la batería no se agota.
+        seed (int): Semilla de los servicios simulados y del ruido.
+    """
+
+    def __init__(self, governed=True, capacity_mah=1000, max_hours=120, seed=0):
+        env = {"BATTERY_PIN": 26}
+
+        if not governed:
+            env["BATTERY_PROFILES"] = BASELINE_PROFILES
+
+        self.seconds = max_hours * 3600
+        self.sim = Simulator(seed=seed, env=env, timeline_kinds=('http', 'crash', 'reset'))
+        self.battery = BatteryModel(self.sim, capacity_mah=capacity_mah, seed=seed)
+        self.samples = []
+
+        for t in range(3600, int(self.seconds), 3600):
+            self.sim.at(t, self._sample)
+
+    def _sample(self):
+        governor = self.sim.namespace.get('battery_governor')
+
+        if governor is not None:
+            report = governor.report()
+            self.samples.append((self.sim.clock.now_us / 1000000, report["profile"], report["runtime_h"]))
+
+    def _staleness(self, end):
+        # Edad media y máxima del precio de la moneda en pantalla: de respuesta en respuesta.
+        pair = self.sim.namespace['selected_currency'] + 'USDT'
+        seen = [t / 1000000 for t, _, data in self.sim.timeline.filter('http')
+                if data['status'] == 200 and (data['url'].endswith('symbol=' + pair) or '%22' + pair + '%22' in data['url'])]
+
+        if not seen:
+            return None, None
+
+        edges = seen + [end]
+        gaps = [b - a for a, b in zip(edges, edges[1:])]
+
+        return sum(gap * gap / 2 for gap in gaps) / (end - seen[0]), max(gaps)
+
+    def run(self):
+        self.sim.run(self.seconds)
+        end = self.battery.empty_at or self.sim.clock.now_us / 1000000
+        mean_age, max_age = self._staleness(end)
+
+        # Error de la autonomía estimada frente a la real, una vez medida la descarga
+        errors = [abs(runtime - (end - t) / 3600) for t, _, runtime in self.samples
+                  if runtime is not None and self.battery.empty_at]
+        profiles = {}
+
+        for _, profile, _ in self.samples:
+            profiles[profile] = profiles.get(profile, 0) + 1
+
+        return {
+            "runtime_h": round(end / 3600, 2),
+            "empty": self.battery.empty_at is not None,
+            "price_age_s_mean": round(mean_age, 1) if mean_age is not None else None,
+            "price_age_s_max": round(max_age, 1) if max_age is not None else None,
+            "hours_per_profile": profiles,
+            "runtime_estimate_error_h_mean": round(sum(errors) / len(errors), 2) if errors else None,
+            "binance_requests": sum(1 for _, _, data in self.sim.timeline.filter('http') if 'binance' in data['url']),
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.battery', description='Descarga con perfiles de consumo')
+    parser.add_argument('--capacity', type=float, default=1000, help='Capacidad de la batería en mAh')
+    parser.add_argument('--max-hours', type=float, default=120, help='Horas virtuales como mucho')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados y del ruido')
+    args = parser.parse_args()
+
+    governed = BatteryRun(governed=True, capacity_mah=args.capacity, max_hours=args.max_hours, seed=args.seed).run()
+    baseline = BatteryRun(governed=False, capacity_mah=args.capacity, max_hours=args.max_hours, seed=args.seed).run()
+
+    print(json.dumps({
+        "governed": governed,
+        "baseline": baseline,
+        "runtime_gained_h": round(governed["runtime_h"] - baseline["runtime_h"], 2),
+        "runtime_gained_pct": round((governed["runtime_h"] / baseline["runtime_h"] - 1) * 100, 1),
+        "price_age_added_s": round(governed["price_age_s_mean"] - baseline["price_age_s_mean"], 1)
+        if governed["price_age_s_mean"] is not None and baseline["price_age_s_mean"] is not None else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Paquete precompilado del firmware: ``src/Models`` y ``main.py`` a bytecode ``.mpy``.
+
+Uso: python -m sim.build [--out build] [--mpy-cross mpy-cross] [--march ARCH]
+                         [--compare micropython] [--runs 5]
+
+Compila con ``mpy-cross`` (``pip install mpy-cross``, de la misma versión
+que el MicroPython del dispositivo) cada modelo a ``<out>/Models/*.mpy`` y
+``main.py`` a ``<out>/app.mpy``, con un ``main.py`` de una línea que lo
+importa: MicroPython solo ejecuta ``main.py`` como fuente. ``env.py`` se
+copia tal cual para poder editarlo en el dispositivo. Además escribe
+``<out>/manifest.py`` para congelar los modelos en el firmware.
+
+El dispositivo no compila nada al arrancar: carga el bytecode directamente
+y se ahorra el tiempo y el heap del compilador. El coste real se ve en
+``/stats`` (``boot``) arrancando una vez con ``src/`` y otra con el paquete.
+Con ``--compare`` se mide lo mismo en el PC con el puerto unix de
+MicroPython (los periféricos son los falsos de ``bench/``): importa todos
+los modelos desde el fuente y desde los ``.mpy``, ``--runs`` veces en un
+proceso nuevo cada una, y muestra la mediana.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from sim.simulator import SRC_DIR
+
+BENCH_DIR = os.path.join(os.path.dirname(SRC_DIR), 'bench')
+
+# Importa todos los modelos y mide el tiempo y el heap (en MicroPython, con los periféricos falsos)
+_IMPORT_ALL = """
+import gc, sys
+sys.path.insert(0, %r)
+import harness
+harness.install_fakes(%r)
+from time import ticks_us, ticks_diff
+gc.collect()
+start = ticks_us()
+heap = gc.mem_alloc()
+for name in %r:
+    __import__('Models.' + name)
+us = ticks_diff(ticks_us(), start)
+used = gc.mem_alloc() - heap
+gc.collect()
+print(us, used, gc.mem_alloc() - heap)
+"""
+
+
+def models():
+    """Nombres de los modelos de ``src/Models`` sin extensión."""
+    return sorted(name[:-3] for name in os.listdir(os.path.join(SRC_DIR, 'Models'))
+                  if name.endswith('.py') and not name.startswith('_'))
+
+
+def compile_mpy(mpy_cross, source, target, name, march=None):
+    """Compila ``source`` a ``target``; ``name`` es la ruta que aparece en las trazas de error."""
+    command = [mpy_cross, '-o', target, '-s', name]
+
+    if march:
+        command.append('-march=' + march)
+
+    subprocess.run(command + [source], check=True, capture_output=True, text=True)
+
+
+def build(out, mpy_cross='mpy-cross', march=None):
+    """
+    Compila el firmware a ``out``.
+
+    Args:
+        out (str): Directorio del paquete; se vacía antes de compilar.
+        mpy_cross (str): Ejecutable de ``mpy-cross``.
+        march (str): Arquitectura para código nativo (``armv6m`` en la Pico);
+            sin código nativo el bytecode vale para cualquiera.
+
+    Returns:
+        dict: Versión de ``mpy-cross``, bytes del fuente y del bytecode por
+        módulo y en total, y tiempo de compilación en el PC.
+    """
+    if shutil.which(mpy_cross) is None:
+        raise SystemExit('No se encuentra ' + mpy_cross + ': instálalo con "pip install mpy-cross" '
+                         '(misma versión que el MicroPython del dispositivo) o indica --mpy-cross')
+
+    version = subprocess.run([mpy_cross, '--version'], capture_output=True, text=True).stdout.strip()
+
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+
+    os.makedirs(os.path.join(out, 'Models'))
+
+    files = {}
+    started = time.perf_counter()
+
+    for name in models():
+        source = os.path.join(SRC_DIR, 'Models', name + '.py')
+        target = os.path.join(out, 'Models', name + '.mpy')
+        compile_mpy(mpy_cross, source, target, 'Models/' + name + '.py', march)
+        files['Models/' + name] = (os.path.getsize(source), os.path.getsize(target))
+
+    source = os.path.join(SRC_DIR, 'main.py')
+    target = os.path.join(out, 'app.mpy')
+    compile_mpy(mpy_cross, source, target, 'main.py', march)
+    files['main'] = (os.path.getsize(source), os.path.getsize(target))
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    with open(os.path.join(out, 'main.py'), 'w') as f:
+        f.write('import app\n')
+
+    if os.path.exists(os.path.join(SRC_DIR, 'env.py')):
+        shutil.copy(os.path.join(SRC_DIR, 'env.py'), out)
+
+    # Para congelar los modelos en el firmware: make BOARD=RPI_PICO_W FROZEN_MANIFEST=<out>/manifest.py
+    with open(os.path.join(out, 'manifest.py'), 'w') as f:
+        f.write('include("$(PORT_DIR)/boards/RPI_PICO_W/manifest.py")\n')
+        f.write('package("Models", base_path=%r)\n' % SRC_DIR)
+
+    source_bytes = sum(py for py, _ in files.values())
+    mpy_bytes = sum(mpy for _, mpy in files.values())
+
+    return {
+        "mpy_cross": version,
+        "out": out,
+        "modules": len(files),
+        "source_bytes": source_bytes,
+        "mpy_bytes": mpy_bytes,
+        "mpy_pct": round(mpy_bytes * 100 / source_bytes, 1),
+        "compile_ms": round(compile_ms),
+        "files": {name: {"py": py, "mpy": mpy} for name, (py, mpy) in sorted(files.items())},
+    }
+
+
+def measure_imports(micropython, path, runs):
+    """Mediana de tiempo (µs) y heap (bytes, antes y después de liberar) al importar los modelos de ``path``."""
+    script = _IMPORT_ALL % (BENCH_DIR, path, tuple(models()))
+    samples = []
+
+    for _ in range(runs):
+        # Desde otro directorio para no encontrar ``Models`` en el actual
+        result = subprocess.run([micropython, '-c', script], capture_output=True, text=True,
+                                cwd=tempfile.gettempdir(), check=True)
+        samples.append([int(value) for value in result.stdout.split()])
+
+    samples.sort()
+    us, used, kept = samples[len(samples) // 2]
+
+    return {"import_us": us, "import_bytes": used, "import_kept": kept}
+
+
+def compare(micropython, out, runs):
+    """Importación desde el fuente frente al paquete ``.mpy`` en el puerto unix de MicroPython."""
+    if shutil.which(micropython) is None:
+        raise SystemExit('No se encuentra ' + micropython + ': compila el puerto unix de MicroPython '
+                         '(ports/unix) o indica su ruta con --compare')
+
+    source = measure_imports(micropython, SRC_DIR, runs)
+    mpy = measure_imports(micropython, out, runs)
+
+    return {
+        "source": source,
+        "mpy": mpy,
+        "import_time_saved_pct": round(100 - mpy["import_us"] * 100 / source["import_us"], 1),
+        "heap_saved_pct": round(100 - mpy["import_bytes"] * 100 / source["import_bytes"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.build', description='Firmware precompilado a .mpy')
+    parser.add_argument('--out', default='build', help='Directorio del paquete')
+    parser.add_argument('--mpy-cross', default='mpy-cross', help='Ejecutable de mpy-cross')
+    parser.add_argument('--march', default=None, help='Arquitectura para código nativo (armv6m en la Pico)')
+    parser.add_argument('--compare', metavar='MICROPYTHON', default=None,
+                        help='Puerto unix de MicroPython con el que comparar fuente y .mpy')
+    parser.add_argument('--runs', type=int, default=5, help='Importaciones por medición con --compare')
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    report = build(out, args.mpy_cross, args.march)
+
+    if args.compare:
+        report["compare"] = compare(args.compare, out, args.runs)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
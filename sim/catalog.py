@@ -0,0 +1,82 @@
+"""
+Genera en el PC el catálogo de monedas (``coins.bin``) para copiarlo a la flash.
+
+Uso: python -m sim.catalog [-o coins.bin] [--binance | --symbols monedas.txt | --count 500]
+                           [--favourite BTC ...]
+
+Usa el mismo ``build_catalog`` del firmware. Con ``--binance`` toma las monedas
+que cotizan contra USDT en ``/api/v3/exchangeInfo`` (unas cientos); con
+``--symbols``, una moneda por línea; con ``--count``, nombres sintéticos para
+pruebas en el simulador. Después se copia al dispositivo, por ejemplo con
+``mpremote cp coins.bin :coins.bin``.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import string
+import sys
+import types
+import urllib.request
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def _build_catalog():
+    # El modelo usa ``micropython.const``; fuera del simulador basta con un sustituto.
+    if 'micropython' not in sys.modules:
+        module = types.ModuleType('micropython')
+        module.const = lambda value: value
+        sys.modules['micropython'] = module
+
+    if SRC_DIR not in sys.path:
+        sys.path.append(SRC_DIR)
+
+    from Models.CoinCatalog import build_catalog
+
+    return build_catalog
+
+
+def binance_symbols(quote='USDT'):
+    """Monedas que cotizan contra ``quote`` en Binance."""
+    with urllib.request.urlopen('https://api.binance.com/api/v3/exchangeInfo', timeout=30) as response:
+        info = json.load(response)
+
+    return [s['baseAsset'] for s in info['symbols'] if s['quoteAsset'] == quote and s['status'] == 'TRADING']
+
+
+def synthetic_symbols(count, seed=('ADA', 'BTC', 'ETH', 'BNB', 'SOL', 'DOT')):
+    """Monedas de prueba: las habituales y nombres de tres letras hasta ``count``."""
+    names = (''.join(p) for p in itertools.product(string.ascii_uppercase, repeat=3))
+
+    return list(itertools.islice(itertools.chain(seed, (n for n in names if n not in seed)), count))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.catalog', description='Genera el catálogo de monedas')
+    parser.add_argument('-o', '--output', default='coins.bin', help='Fichero de salida')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--binance', action='store_true', help='Monedas contra USDT de Binance')
+    source.add_argument('--symbols', help='Fichero con una moneda por línea')
+    source.add_argument('--count', type=int, help='Monedas sintéticas para pruebas')
+    parser.add_argument('--favourite', action='append', default=[], help='Moneda favorita (se puede repetir)')
+    args = parser.parse_args()
+
+    if args.binance:
+        symbols = binance_symbols()
+    elif args.symbols:
+        with open(args.symbols) as f:
+            symbols = [line.strip() for line in f if line.strip()]
+    else:
+        symbols = synthetic_symbols(args.count)
+
+    favourites = args.favourite or ['ADA', 'BTC', 'ETH', 'BNB', 'SOL', 'DOT']
+    count = _build_catalog()(args.output, symbols, favourites=favourites)
+
+    print(json.dumps({"output": args.output, "symbols": count, "bytes": os.path.getsize(args.output),
+                      "favourites": [f for f in favourites if f.upper() in {s.upper() for s in symbols}]}))
+
+
+if __name__ == '__main__':
+    main()
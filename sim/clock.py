@@ -0,0 +1,257 @@
+import heapq
+import time as _host_time
+
+
+class SimulationEnd(BaseException):
+    """
+    Se lanza cuando el reloj virtual alcanza el final de la simulación.
+
+    Hereda de BaseException para que los ``except Exception`` del firmware
+    (como el bucle principal de main.py) no la capturen.
+    """
+
+
+class DeviceReset(BaseException):
+    """
+    Se lanza desde ``machine.reset()``: el simulador reinicia el firmware
+    desde main.py conservando el reloj virtual y la línea temporal.
+    """
+
+
+class VirtualClock:
+    """
+    Reloj virtual en microsegundos sobre el que corre todo el simulador.
+
+    Dormir no consume tiempo real: ``sleep_us`` salta directamente al
+    siguiente evento programado (interrupciones de pines, timers...) y lo
+    ejecuta antes de seguir avanzando.
+
+    Con ``speed`` el reloj avanza acompasado con el tiempo real (1.0 = a la
+    misma velocidad), en tramos de ``slice_us`` tras los que se comprueba la
+    condición de espera. Sirve para atender sockets reales del anfitrión
+    mientras el firmware duerme.
+
+    Con ``cpu_scale`` el trabajo del firmware también cuenta: el tiempo de
+    CPU del anfitrión desde la última lectura, multiplicado por
+    ``cpu_scale``, se suma al reloj cada vez que el firmware lo lee. Sirve
+    para que las trazas de latencia muestren algo más que las esperas
+    simuladas (SPI, red); los eventos que venzan entretanto se atienden en
+    la siguiente espera, como una IRQ con la CPU ocupada.
+
+    Args:
+        epoch (int): Segundos unix que devuelve ``time()`` en el instante 0.
+        speed (float): Velocidad respecto al tiempo real o None para ir lo más rápido posible.
+        slice_us (int): Tramo de espera real entre comprobaciones con ``speed``.
+        cpu_scale (float): Factor del tiempo de CPU del anfitrión o None para no contarlo.
+    """
+
+    def __init__(self, epoch=1735689600, speed=None, slice_us=2000, cpu_scale=None):
+        self.epoch = epoch
+        self.speed = speed
+        self.slice_us = slice_us
+        self.cpu_scale = cpu_scale
+        self._cpu_mark = None
+        self.now_us = 0
+        self.end_us = None
+        self.wait = None
+        self._real_mark = None
+
+        # Número de veces que el firmware ha dormido (despertares).
+        self.sleep_calls = 0
+        self.slept_us = 0
+
+        self._events = []
+        self._seq = 0
+        self._depth = 0
+
+    def schedule(self, at_us, callback, *args):
+        """
+        Programa un callback para el instante virtual indicado.
+
+        Args:
+            at_us (int): Instante absoluto en microsegundos.
+            callback: Función a ejecutar.
+
+        Returns:
+            list: Entrada del evento, se puede pasar a ``cancel``.
+        """
+        self._seq += 1
+        entry = [int(at_us), self._seq, callback, args]
+        heapq.heappush(self._events, entry)
+
+        return entry
+
+    def schedule_in(self, delay_us, callback, *args):
+        return self.schedule(self.now_us + delay_us, callback, *args)
+
+    def cancel(self, entry):
+        entry[2] = None
+
+    def next_event_us(self):
+        """Devuelve el instante del siguiente evento pendiente o None."""
+        events = self._events
+
+        while events and events[0][2] is None:
+            heapq.heappop(events)
+
+        return events[0][0] if events else None
+
+    def advance_us(self, us, until=None):
+        """
+        Avanza el reloj ejecutando los eventos que venzan por el camino.
+
+        Args:
+            us (int): Microsegundos a avanzar. None avanza sin límite.
+            until: Función opcional; si tras un evento devuelve True se
+                detiene el avance en ese instante.
+
+        Returns:
+            bool: True si se detuvo antes de tiempo por ``until``.
+
+        Raises:
+            SimulationEnd: Si se alcanza el final de la simulación.
+        """
+        self.charge_cpu()
+
+        if us is None:
+            target = self.end_us if self.end_us is not None else self.now_us
+        else:
+            target = self.now_us + max(0, int(us))
+
+        events = self._events
+
+        while events and events[0][0] <= target:
+            if events[0][2] is None:
+                heapq.heappop(events)
+                continue
+
+            if self.speed is not None and self._pace(events[0][0], until):
+                return True
+
+            at_us, _, callback, args = heapq.heappop(events)
+            self._check_end(at_us)
+            self.now_us = max(self.now_us, at_us)
+            self._depth += 1
+
+            try:
+                callback(*args)
+            finally:
+                self._depth -= 1
+
+            if until is not None and until():
+                return True
+
+        if self.speed is not None and self._pace(target, until):
+            return True
+
+        if us is None:
+            # Espera sin límite y sin eventos pendientes: no volverá a pasar nada.
+            raise SimulationEnd()
+
+        self._check_end(target)
+        self.now_us = max(self.now_us, target)
+
+        # Lo que tarda el anfitrión en simular la espera no es trabajo del firmware.
+        if self.cpu_scale is not None:
+            self._cpu_mark = _host_time.perf_counter_ns()
+
+        return False
+
+    def charge_cpu(self):
+        """Con ``cpu_scale``, suma al reloj el tiempo de CPU desde la última lectura."""
+        if self.cpu_scale is None:
+            return
+
+        now = _host_time.perf_counter_ns()
+
+        if self._cpu_mark is not None:
+            self.now_us += int((now - self._cpu_mark) * self.cpu_scale) // 1000
+
+        self._cpu_mark = now
+
+    def _pace(self, target_us, until):
+        # Espera real hasta ``target_us`` (sin pasar del final); True si ``until`` se cumple antes.
+        if self.end_us is not None:
+            target_us = min(target_us, self.end_us)
+
+        while self.now_us < target_us:
+            if until is not None and until():
+                return True
+
+            step = min(target_us - self.now_us, self.slice_us)
+            started = _host_time.perf_counter()
+            (self.wait or _host_time.sleep)(step / 1000000 / self.speed)
+            self._real_mark = _host_time.perf_counter()
+
+            # ``wait`` puede volver antes (un socket listo): avanza solo lo transcurrido.
+            elapsed = int((self._real_mark - started) * 1000000 * self.speed)
+            self.now_us += max(1, min(step, elapsed))
+
+        return False
+
+    def catch_up(self):
+        """
+        Con ``speed``, avanza el reloj lo que haya pasado en tiempo real desde
+        la última espera (el firmware trabajando sin dormir, por ejemplo
+        atendiendo sockets), ejecutando los eventos que venzan por el camino.
+        """
+        if self.speed is None:
+            return
+
+        now = _host_time.perf_counter()
+
+        if self._real_mark is not None:
+            elapsed = int((now - self._real_mark) * 1000000 * self.speed)
+
+            if elapsed > 0:
+                speed, self.speed = self.speed, None
+
+                try:
+                    self.advance_us(elapsed)
+                finally:
+                    self.speed = speed
+
+        self._real_mark = now
+
+    def sleep_us(self, us, until=None):
+        """
+        Duerme el firmware. Con ``until`` la espera termina en cuanto la
+        condición se cumpla tras algún evento (por ejemplo, una IRQ).
+        """
+        self.sleep_calls += 1
+        start = self.now_us
+
+        try:
+            return self.advance_us(us, until)
+        finally:
+            # Lo que se duerme dentro de una IRQ ya está contado en el sleep que interrumpe.
+            if not self._depth:
+                self.slept_us += self.now_us - start
+
+    def sleep_ms(self, ms):
+        self.sleep_us(int(ms * 1000))
+
+    def sleep(self, seconds):
+        self.sleep_us(int(seconds * 1000000))
+
+    def in_callback(self):
+        """Indica si se está ejecutando un evento (equivalente a una IRQ)."""
+        return self._depth > 0
+
+    def time(self):
+        return self.epoch + self.now_us // 1000000
+
+    def ticks_us(self):
+        self.charge_cpu()
+
+        return self.now_us & 0x3FFFFFFF
+
+    def ticks_ms(self):
+        self.charge_cpu()
+
+        return (self.now_us // 1000) & 0x3FFFFFFF
+
+    def _check_end(self, at_us):
+        if self.end_us is not None and at_us > self.end_us:
+            self.now_us = self.end_us
+            raise SimulationEnd()
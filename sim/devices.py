@@ -0,0 +1,217 @@
+"""
+Periféricos simulados conectados a los buses de la placa.
+"""
+
+import importlib
+
+from sim.framebuf import glyph
+
+REG_DIGIT_BASE = 0x01
+REG_INTENSITY = 0x0a
+REG_SHUTDOWN = 0x0c
+
+# Escrituras separadas menos de esto son el mismo refresco: la pantalla solo recibe lo que
+# cambia, así que un refresco no acaba en un registro concreto.
+BURST_US = 5000
+
+
+class Max7219Monitor:
+    """
+    Decodifica las tramas SPI que recibe un MAX7219 y registra en la línea
+    temporal lo que se ve en la pantalla tras cada refresco: los dígitos que
+    llegan seguidos (``BURST_US``) son un solo evento con el texto final.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.digits = bytearray(8)
+        self.intensity = 0
+        self.shutdown = True
+        self.text = ''
+        self._segments = None
+        self._event = None
+        self._last_us = None
+
+    def _segment_map(self):
+        if self._segments is None:
+            char_map = importlib.import_module('Models.Max7219').CHAR_MAP
+            segments = {}
+
+            # Ante segmentos ambiguos ('5'/'S', '1'/'I') gana la primera entrada del mapa.
+            for char, code in char_map.items():
+                if not char.islower():
+                    segments.setdefault(code, char)
+
+            self._segments = segments
+
+        return self._segments
+
+    def decode(self):
+        """Devuelve el texto visible, leyendo del dígito 8 (izquierda) al 1."""
+        segments = self._segment_map()
+        out = []
+
+        for code in reversed(self.digits):
+            out.append(segments.get(code & 0x7f, '?'))
+
+            if code & 0x80:
+                out.append('.')
+
+        return ''.join(out)
+
+    def on_write(self, data):
+        for i in range(0, len(data) - 1, 2):
+            register, value = data[i], data[i + 1]
+
+            if REG_DIGIT_BASE <= register <= REG_DIGIT_BASE + 7:
+                self.digits[register - REG_DIGIT_BASE] = value
+                self.text = self.decode()
+                self._event, self._last_us = _burst(self.sim, self._event, self._last_us, 'display',
+                                                    text=self.text, intensity=self.intensity)
+            elif register == REG_INTENSITY:
+                self.intensity = value
+            elif register == REG_SHUTDOWN:
+                self.shutdown = value == 0
+
+
+def _burst(sim, event, last_us, kind, **data):
+    """
+    Registra un evento o, si sigue al anterior en menos de ``BURST_US``, lo actualiza.
+
+    Returns:
+        tuple: ``(evento, instante)`` para la siguiente llamada.
+    """
+    now = sim.clock.now_us
+
+    if event is not None and now - last_us <= BURST_US:
+        event.update(data)
+    else:
+        event = sim.timeline.record(kind, **data)
+
+    return event, now
+
+
+class Ssd1306Monitor:
+    """
+    GDDRAM de una OLED SSD1306 por I2C.
+
+    Interpreta los comandos (ventana de columnas y páginas, contraste,
+    encendido) y escribe los datos en su copia de la GDDRAM. Tras cada
+    refresco registra en la línea temporal un evento ``oled`` con la línea de
+    estado (leída con la fuente de ``sim.framebuf``) y los dígitos grandes
+    (leídos con los segmentos del MAX7219).
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        width (int): Ancho en píxeles.
+        height (int): Alto en píxeles.
+    """
+
+    # Argumentos de cada comando que los lleva
+    ARGS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0xa8: 1, 0xd3: 1, 0xd5: 1, 0xd9: 1, 0xda: 1, 0xdb: 1, 0x8d: 1}
+
+    def __init__(self, sim, width=128, height=32):
+        self.sim = sim
+        self.width = width
+        self.pages = height // 8
+        self.gddram = bytearray(self.pages * width)
+        self.contrast = 0
+        self.on = False
+        self.data_bytes = 0
+        self.columns = (0, width - 1)
+        self.page_range = (0, self.pages - 1)
+        self._column = 0
+        self._page = 0
+        self._command = []
+        self._event = None
+        self._last_us = None
+        self._font = None
+
+    def on_write(self, data):
+        control = data[0]
+
+        if control == 0x40:
+            for value in data[1:]:
+                self._put(value)
+
+            self.data_bytes += len(data) - 1
+            status, digits = self.decode()
+            self._event, self._last_us = _burst(self.sim, self._event, self._last_us, 'oled',
+                                                status=status, digits=digits)
+        else:
+            # 0x80: un solo byte de comando; 0x00: una secuencia
+            for value in data[1:2] if control == 0x80 else data[1:]:
+                self._command_byte(value)
+
+    def on_read(self, nbytes):
+        return bytes(nbytes)
+
+    def _command_byte(self, value):
+        self._command.append(value)
+        command = self._command[0]
+
+        if len(self._command) <= self.ARGS.get(command, 0):
+            return
+
+        args = self._command[1:]
+        self._command = []
+
+        if command == 0x21:
+            self.columns = (args[0], args[1])
+            self._column = args[0]
+        elif command == 0x22:
+            self.page_range = (args[0], args[1])
+            self._page = args[0]
+        elif command == 0x81:
+            self.contrast = args[0]
+        elif command in (0xae, 0xaf):
+            self.on = command == 0xaf
+
+    def _put(self, value):
+        # Direccionamiento horizontal dentro de la ventana
+        self.gddram[self._page * self.width + self._column] = value
+        self._column += 1
+
+        if self._column > self.columns[1]:
+            self._column = self.columns[0]
+            self._page = self._page + 1 if self._page < self.page_range[1] else self.page_range[0]
+
+    def pixel(self, x, y):
+        return self.gddram[(y >> 3) * self.width + x] >> (y & 7) & 1
+
+    def decode(self):
+        """
+        Lo que muestra la pantalla.
+
+        Returns:
+            tuple: Línea de estado y dígitos grandes como texto ('?' si no se reconoce).
+        """
+        render = importlib.import_module('Models.Render')
+
+        if self._font is None:
+            self._font = {glyph(chr(c)): chr(c) for c in range(32, 127)}
+
+        status = ''.join(self._font.get(bytes(self.gddram[i * 8:i * 8 + 8]), '?')
+                         for i in range(self.width // 8)).rstrip()
+
+        top = 8 + (self.pages * 8 - 8 - render._CELL_HEIGHT) // 2
+        digits = []
+
+        for cell in range(self.width // render._CELL_WIDTH):
+            x = cell * render._CELL_WIDTH
+            code = 0
+
+            # Cada segmento se lee en su centro
+            for bit, dx, dy, w, h in render._SEGMENTS:
+                if self.pixel(x + dx + w // 2, top + dy + h // 2):
+                    code |= bit
+
+            digits.append(self.sim.display._segment_map().get(code & 0x7f, '?'))
+
+            if code & 0x80:
+                digits.append('.')
+
+        return status, ''.join(digits).rstrip()
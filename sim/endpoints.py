@@ -0,0 +1,268 @@
+"""
+Caché de DNS e interruptores por host frente a servidores locales que fallan.
+
+Uso: python -m sim.endpoints [--rounds 30] [--dns-ms 40] [--timeout 1] [--interval 0.25]
+
+A diferencia del resto del simulador, corre en tiempo real con sockets del
+anfitrión: levanta un DNS de pega por UDP que tarda ``--dns-ms`` en
+responder, un servidor HTTP que hace de Binance, uno que acepta la conexión
+y no contesta nunca (``worldtimeapi.org``) y un puerto cerrado que la
+rechaza (la API de telemetría). Los modelos del firmware (``Models.Api``)
+hacen peticiones a los tres con el ``urequests`` de ``sim.hostrequests``.
+
+Cada ronda pide un precio, la hora y envía un lote de telemetría, renueva
+las direcciones caducadas (la tarea 'dns' del firmware) y espera
+``--interval`` segundos. En el tercio central de las rondas el DNS deja de
+responder. Se repite con la caché y los interruptores desactivados, como
+antes, y se compara el tiempo total, la latencia de los precios, las
+consultas de DNS, las conexiones a los hosts caídos y el tiempo perdido en
+ellas. Las esperas de la caché y de los interruptores se escalan para que
+quepan en la prueba (``--ttl`` y ``--cooldown``).
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sim import hostrequests
+from sim.simulator import SRC_DIR
+
+# Hosts del firmware y el servidor que hace de cada uno.
+BINANCE = 'api.binance.com'
+WORLDTIME = 'worldtimeapi.org'
+TELEMETRY = 'telemetry.sim'
+
+
+class StandInDns:
+    """
+    DNS de pega: responde ``"dirección puerto"`` al nombre tras ``delay_ms``.
+
+    Args:
+        names (dict): Host -> puerto local que hace de él.
+        delay_ms (float): Lo que tarda en responder cada consulta.
+    """
+
+    def __init__(self, names, delay_ms=40):
+        self.names = names
+        self.delay_ms = delay_ms
+        self.down = False
+        self.queries = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.address = self.sock.getsockname()
+        self._stop = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop:
+            try:
+                name, peer = self.sock.recvfrom(256)
+            except OSError:
+                return
+
+            self.queries += 1
+
+            # Caído: no responde y el cliente agota su espera
+            if self.down:
+                continue
+
+            port = self.names.get(name.decode())
+            answer = ('127.0.0.1 %d' % port).encode() if port else b''
+            threading.Timer(self.delay_ms / 1000, self.sock.sendto, (answer, peer)).start()
+
+    def close(self):
+        self._stop = True
+        self.sock.close()
+
+
+class _Binance(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"symbol": "BTCUSDT", "price": "97123.45000000"}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _silent_server():
+    """Acepta conexiones en la cola del sistema y nunca contesta: cada petición agota su timeout."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(512)
+
+    return sock
+
+
+def _closed_port():
+    """Puerto sin nadie escuchando: la conexión se rechaza al momento."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    return port
+
+
+def _load_models():
+    """
+    Importa el firmware desde cero (interruptores y caché nuevos) con
+    ``sim.hostrequests`` como ``requests`` y un ``urequests`` que lo
+    reexporta, como el de micropython-lib.
+    """
+    for name in list(sys.modules):
+        if name == 'Models' or name.startswith('Models.'):
+            del sys.modules[name]
+
+    hostrequests.reset()
+    sys.modules['requests'] = hostrequests
+    urequests = types.ModuleType('urequests')
+    exec('from requests import *', urequests.__dict__)
+    sys.modules['urequests'] = urequests
+
+    import Models.Api
+    from Models.Resolver import resolver
+    from Models.CircuitBreaker import breaker
+
+    return Models.Api, resolver, breaker
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(dns, rounds, guarded, timeout, interval, ttl_s, cooldown_s):
+    """
+    Rondas de peticiones a los tres hosts.
+
+    Args:
+        dns (StandInDns): DNS de pega.
+        rounds (int): Rondas.
+        guarded (bool): Con caché de DNS e interruptores; si False, como antes.
+        timeout (float): Timeout HTTP del firmware en segundos.
+        interval (float): Pausa entre rondas en segundos.
+        ttl_s (float): Validez de una dirección guardada.
+        cooldown_s (float): Espera del interruptor hasta la primera prueba.
+
+    Returns:
+        dict: Tiempos, precios, consultas de DNS y lo perdido con los hosts caídos.
+    """
+    api, resolver, breaker = _load_models()
+    api.HTTP_TIMEOUT = timeout
+    api.governor.enabled = False
+
+    resolver.enabled = guarded
+    resolver.ttl_ms = int(ttl_s * 1000)
+    resolver.retry_ms = int(ttl_s * 1000)
+    breaker.enabled = guarded
+    breaker.cooldown_ms = int(cooldown_s * 1000)
+    breaker.max_cooldown_ms = int(cooldown_s * 8000)
+
+    telemetry = api.Api(controller=None, url='https://' + TELEMETRY, path='/api/v1/batch', token='x',
+                        device_id=1)
+    outage = range(rounds // 3, 2 * rounds // 3)
+    prices = []
+    outage_prices = 0
+    dns.queries = 0
+    started = time.perf_counter()
+
+    for i in range(rounds):
+        dns.down = i in outage
+
+        before = time.perf_counter()
+        price = api.get_binance_price_raw('BTC')
+
+        if price is not None:
+            prices.append((time.perf_counter() - before) * 1000)
+            outage_prices += i in outage
+
+        api.get_time_utc()
+        telemetry.send_batch(b'[]')
+
+        # La tarea 'dns' del firmware: renueva fuera de las peticiones
+        resolver.refresh()
+        time.sleep(interval)
+
+    dns.down = False
+    elapsed = time.perf_counter() - started
+    dead = {host: hostrequests.stats.get(host, {}) for host in (WORLDTIME, TELEMETRY)}
+
+    return {
+        "wall_s": round(elapsed - rounds * interval, 2),
+        "prices": len(prices),
+        "prices_during_dns_outage": outage_prices,
+        "price_ms_p50": round(_percentile(prices, 50), 1) if prices else None,
+        "price_ms_p90": round(_percentile(prices, 90), 1) if prices else None,
+        "dns_queries": dns.queries,
+        "dns_s": round(sum(stats["lookup_s"] for stats in hostrequests.stats.values()), 2),
+        "dead_host_connects": {host: stats.get("connects", 0) for host, stats in dead.items()},
+        "dead_host_s": round(sum(stats.get("failed_s", 0) for stats in dead.values()), 2),
+        "resolver": resolver.report(),
+        "breaker": breaker.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.endpoints',
+                                     description='Caché de DNS e interruptores frente a hosts caídos')
+    parser.add_argument('--rounds', type=int, default=30, help='Rondas de peticiones')
+    parser.add_argument('--dns-ms', type=float, default=40, help='Lo que tarda el DNS en responder')
+    parser.add_argument('--timeout', type=float, default=1, help='Timeout HTTP en segundos (3 en el firmware)')
+    parser.add_argument('--interval', type=float, default=0.25, help='Pausa entre rondas en segundos')
+    parser.add_argument('--ttl', type=float, default=2, help='Validez de una dirección (300 s en el firmware)')
+    parser.add_argument('--cooldown', type=float, default=2,
+                        help='Espera del interruptor hasta probar (30 s en el firmware)')
+    args = parser.parse_args()
+
+    # Periféricos falsos de los benchmarks: reloj real, sin simulador
+    bench_dir = os.path.join(os.path.dirname(SRC_DIR), 'bench')
+    sys.path.insert(0, bench_dir)
+    import harness
+
+    harness.install_fakes(SRC_DIR)
+
+    binance = ThreadingHTTPServer(('127.0.0.1', 0), _Binance)
+    threading.Thread(target=binance.serve_forever, daemon=True).start()
+    silent = _silent_server()
+
+    dns = StandInDns({BINANCE: binance.server_address[1], WORLDTIME: silent.getsockname()[1],
+                      TELEMETRY: _closed_port()}, delay_ms=args.dns_ms)
+    hostrequests.dns = dns.address
+    hostrequests.dns_timeout = args.timeout
+
+    try:
+        results = {name: run(dns, args.rounds, guarded, args.timeout, args.interval, args.ttl, args.cooldown)
+                   for name, guarded in (('guarded', True), ('unguarded', False))}
+    finally:
+        binance.shutdown()
+        silent.close()
+        dns.close()
+
+    guarded, unguarded = results["guarded"], results["unguarded"]
+    results["saved"] = {
+        "wall_s": round(unguarded["wall_s"] - guarded["wall_s"], 2),
+        "dns_s": round(unguarded["dns_s"] - guarded["dns_s"], 2),
+        "dead_host_s": round(unguarded["dead_host_s"] - guarded["dead_host_s"], 2),
+        "price_ms_p50": round(unguarded["price_ms_p50"] - guarded["price_ms_p50"], 1)
+        if guarded["price_ms_p50"] is not None and unguarded["price_ms_p50"] is not None else None,
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
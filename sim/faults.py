@@ -0,0 +1,162 @@
+"""
+Inyección de fallos y tiempo de recuperación (MTTR) del firmware.
+
+Uso: python -m sim.faults [--faults display,sensor,wifi,http_hang,spi_hang] [--spacing 600] [--seed 0]
+
+Arranca el firmware y, cada ``--spacing`` segundos, provoca un fallo:
+
+- ``display``: una escritura SPI a la pantalla falla (al cambiar de vista).
+- ``sensor``: una lectura del ADC del sensor de temperatura falla.
+- ``wifi``: el AP desasocia al dispositivo (en cuanto tenga la radio encendida).
+- ``http_hang``: Binance deja de responder durante un minuto (al entrar al menú).
+- ``spi_hang``: una escritura SPI no vuelve nunca (solo la saca el watchdog).
+
+Para cada fallo mide el tiempo desde que el firmware lo encuentra hasta que
+el subsistema vuelve a funcionar: un refresco completo de la pantalla, una
+lectura del ADC, la IP de nuevo, la petición bloqueada que vence su timeout
+o el primer refresco tras un reinicio del watchdog. Las IRQ siguen
+dibujando con el bucle colgado, así que un bloqueo de red solo se da por
+resuelto cuando el firmware vuelve de la petición. Un
+fallo sin recuperar cuenta como ``None``; si el firmware se queda colgado,
+los fallos siguientes no llegan a provocarse.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+
+FAULTS = ('display', 'sensor', 'wifi', 'http_hang', 'spi_hang')
+
+# Eventos que indican que cada subsistema vuelve a funcionar.
+_RECOVERY = {
+    'display': ('display',),
+    'sensor': ('adc',),
+    'wifi': ('wifi',),
+    'http_hang': ('http',),
+    'spi_hang': ('display',),
+}
+
+
+class FaultRun:
+    """
+    Escenario de inyección de fallos.
+
+    Args:
+        faults (tuple): Fallos a provocar, en orden (ver ``FAULTS``).
+        spacing (int): Segundos entre fallos; el primero llega a los dos minutos.
+        stall_s (int): Segundos que Binance deja de responder en ``http_hang``.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, faults=FAULTS, spacing=600, stall_s=60, seed=0):
+        self.faults = tuple(faults)
+        self.spacing = spacing
+        self.stall_s = stall_s
+        self.seconds = 120 + spacing * len(self.faults)
+        self.sim = Simulator(seed=seed, timeline_kinds=('fault', 'display', 'adc', 'wifi', 'http', 'reset', 'crash'))
+
+        for i, fault in enumerate(self.faults):
+            self.sim.at(120 + i * spacing, getattr(self, '_inject_' + fault))
+
+    # Los fallos de pantalla se provocan cambiando de vista, que redibuja sin esperar a una tarea.
+    def _inject_display(self):
+        self.sim.board.inject('spi')
+        self.sim.rotate(self.sim.clock.now_us / 1000000, 1)
+
+    def _inject_sensor(self):
+        self.sim.board.inject('adc')
+
+    # Con la radio apagada entre peticiones no hay asociación que perder: se espera a la siguiente.
+    def _inject_wifi(self):
+        if not self.sim.network.online():
+            self.sim.at(self.sim.clock.now_us / 1000000 + 0.5, self._inject_wifi)
+            return
+
+        self.sim.timeline.record('fault', name='wifi')
+        self.sim.network.disconnect()
+
+    # Entrar al menú precarga la moneda resaltada: la petición llega en plena caída.
+    def _inject_http_hang(self):
+        now = self.sim.clock.now_us / 1000000
+        self.sim.http.stall('api.binance.com', self.stall_s)
+        self.sim.press(now)
+        self.sim.press(now + self.stall_s + 5)
+
+    def _inject_spi_hang(self):
+        self.sim.board.inject('spi_hang')
+        self.sim.rotate(self.sim.clock.now_us / 1000000, 1)
+
+    def _recovery(self, kind, index, events):
+        # La recuperación puede llegar en el mismo instante virtual: cuenta el orden, no la hora.
+        for t, event, data in events[index + 1:]:
+            if event not in _RECOVERY[kind]:
+                continue
+
+            if event == 'wifi' and data['event'] != 'got_ip':
+                continue
+
+            return t
+
+        return None
+
+    def run(self):
+        self.sim.run(self.seconds)
+        events = self.sim.timeline.events
+        hits = [(i, t, data['name']) for i, (t, event, data) in enumerate(events) if event == 'fault']
+        resets = [t for t, event, _ in events if event == 'reset']
+        results = []
+
+        for fault in self.faults:
+            kind = 'spi_hang' if fault == 'spi_hang' else {'display': 'spi', 'sensor': 'adc'}.get(fault, fault)
+            index, at = next(((i, t) for i, t, hit in hits if hit == kind), (None, None))
+
+            if at is None:
+                results.append({"fault": fault, "at_s": None, "mttr_s": None, "reset": False})
+                continue
+
+            recovered = self._recovery(fault, index, events)
+
+            results.append({
+                "fault": fault,
+                "at_s": round(at / 1000000, 1),
+                "mttr_s": round((recovered - at) / 1000000, 3) if recovered is not None else None,
+                "reset": any(at < t <= (recovered or at) for t in resets),
+            })
+
+        mttr = [result["mttr_s"] for result in results if result["mttr_s"] is not None]
+        namespace = self.sim.namespace or {}
+        supervisor = namespace.get('supervisor')
+
+        return {
+            "faults": results,
+            "recovered": len(mttr),
+            "unrecovered": len(results) - len(mttr),
+            "mttr_s_mean": round(sum(mttr) / len(mttr), 3) if mttr else None,
+            "resets": len(resets),
+            "supervisor": supervisor.stats if supervisor is not None else None,
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.faults', description='Inyección de fallos y MTTR')
+    parser.add_argument('--faults', default=','.join(FAULTS), help='Fallos a provocar, separados por comas')
+    parser.add_argument('--spacing', type=int, default=600, help='Segundos entre fallos')
+    parser.add_argument('--stall', type=int, default=60, help='Segundos sin respuesta de Binance en http_hang')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    faults = [fault for fault in args.faults.split(',') if fault]
+
+    for fault in faults:
+        if fault not in FAULTS:
+            parser.error('fallo desconocido: ' + fault)
+
+    scenario = FaultRun(faults=faults, spacing=args.spacing, stall_s=args.stall, seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Sustituto del módulo ``framebuf`` de MicroPython para el simulador.
+
+Solo el formato ``MONO_VLSB`` (el de la GDDRAM del SSD1306) y las
+primitivas que usa el firmware. La fuente de ``text`` no es la de
+MicroPython: cada carácter se dibuja con un patrón de 8x8 propio derivado de
+su código (``glyph``), distinto para cada carácter y vacío para el espacio.
+Basta para que los bytes que cambian en la pantalla sean los mismos que en
+el dispositivo y para leer el texto de vuelta desde la GDDRAM.
+"""
+
+MONO_VLSB = 0
+
+
+def glyph(char):
+    """Las 8 columnas (un byte por columna, bit 0 arriba) de un carácter."""
+    if char == ' ':
+        return bytes(8)
+
+    seed = (ord(char) * 2654435761) & 0xffffffff
+
+    # Columna 7 vacía como separación; la 0 nunca vacía para que ningún carácter lo esté
+    return bytes([((seed >> (4 * i)) & 0x7f) | (0x01 if i == 0 else 0) for i in range(7)] + [0])
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError('Solo MONO_VLSB')
+
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.stride = stride or width
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self.width, self.height, c)
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 0 if c is None else None
+
+        index = (y >> 3) * self.stride + x
+        bit = 1 << (y & 7)
+
+        if c is None:
+            return 1 if self.buffer[index] & bit else 0
+
+        if c:
+            self.buffer[index] |= bit
+        else:
+            self.buffer[index] &= ~bit & 0xff
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self.pixel(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def text(self, s, x, y, c=1):
+        for n, char in enumerate(s):
+            for i, column in enumerate(glyph(char)):
+                for j in range(8):
+                    if column & (1 << j):
+                        self.pixel(x + 8 * n + i, y + j, c)
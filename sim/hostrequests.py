@@ -0,0 +1,174 @@
+"""
+``urequests`` sobre sockets reales del anfitrión, para medir con servidores locales.
+
+Sigue al ``requests`` de micropython-lib, que ``urequests`` reexporta con
+``from requests import *``: cada petición resuelve el host con
+``socket.getaddrinfo`` (el atributo de este módulo, que es lo que sustituye
+``Models.Resolver.install``), conecta, envía la petición HTTP/1.0 y lee
+hasta que el servidor cierra. No hay TLS: ``https`` va en claro al puerto
+que devuelva el DNS.
+
+El ``socket`` por defecto pregunta a un DNS de pega por UDP (``StandInDns``
+en ``sim.endpoints``) en ``dns``: responde la dirección y el puerto del
+servidor local que hace de cada host. Los timeouts se convierten en
+``OSError(110)`` y los nombres sin respuesta en ``OSError(-2)``, como en
+MicroPython.
+"""
+
+import json as _json
+import socket as _socket
+import time as _time
+
+# Dirección del DNS de pega y espera máxima de una consulta (segundos).
+dns = None
+dns_timeout = 2.0
+
+# Por host: conexiones intentadas, fallidas y segundos en las fallidas; consultas de DNS y sus segundos.
+stats = {}
+
+
+def _host_stats(host):
+    return stats.setdefault(host, {"connects": 0, "failed": 0, "failed_s": 0.0, "lookups": 0, "lookup_s": 0.0})
+
+
+class _StandInSocket:
+    """``socket`` con los sockets del anfitrión y ``getaddrinfo`` contra el DNS de pega."""
+
+    AF_INET = _socket.AF_INET
+    SOCK_STREAM = _socket.SOCK_STREAM
+    SOCK_DGRAM = _socket.SOCK_DGRAM
+    socket = _socket.socket
+
+    @staticmethod
+    def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+        started = _time.perf_counter()
+        record = _host_stats(host)
+        record["lookups"] += 1
+        sock = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM)
+        sock.settimeout(dns_timeout)
+
+        try:
+            sock.sendto(host.encode(), dns)
+            answer = sock.recv(64).decode()
+        except _socket.timeout:
+            raise OSError(-2)
+        finally:
+            sock.close()
+            record["lookup_s"] += _time.perf_counter() - started
+
+        if not answer:
+            raise OSError(-2)
+
+        address, port = answer.split()
+
+        return [(_socket.AF_INET, _socket.SOCK_STREAM, 0, '', (address, int(port)))]
+
+
+socket = _StandInSocket
+
+
+def reset():
+    """Vuelve al ``socket`` de pega (``install`` lo sustituye) y borra los contadores."""
+    global socket
+
+    socket = _StandInSocket
+    stats.clear()
+
+
+class Response:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self):
+        return str(self.content, self.encoding)
+
+    @property
+    def raw(self):
+        import io
+
+        return io.BytesIO(self.content)
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+def _read(sock):
+    chunks = []
+
+    while True:
+        chunk = sock.recv(4096)
+
+        if not chunk:
+            return b''.join(chunks)
+
+        chunks.append(chunk)
+
+
+def request(method, url, data=None, json=None, headers=None, stream=None, timeout=None, **kw):
+    proto, _, host, path = url.split('/', 3)
+    port = 443 if proto == 'https:' else 80
+
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+
+    if json is not None:
+        data = _json.dumps(json)
+
+    if isinstance(data, str):
+        data = data.encode()
+
+    ai = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0]
+    record = _host_stats(host)
+    record["connects"] += 1
+    started = _time.perf_counter()
+    sock = socket.socket(ai[0], socket.SOCK_STREAM, ai[2])
+    sock.settimeout(timeout)
+
+    try:
+        sock.connect(ai[-1])
+        head = '%s /%s HTTP/1.0\r\nHost: %s\r\n' % (method, path, host)
+
+        for name, value in (headers or {}).items():
+            head += '%s: %s\r\n' % (name, value)
+
+        if data:
+            head += 'Content-Length: %d\r\n' % len(data)
+
+        sock.sendall(head.encode() + b'\r\n' + (data or b''))
+        raw = _read(sock)
+    except _socket.timeout:
+        record["failed"] += 1
+        record["failed_s"] += _time.perf_counter() - started
+        raise OSError(110)
+    except OSError:
+        record["failed"] += 1
+        record["failed_s"] += _time.perf_counter() - started
+        raise
+    finally:
+        sock.close()
+
+    head, _, body = raw.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    response_headers = {}
+
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        response_headers[name.strip()] = value.strip()
+
+    return Response(int(lines[0].split()[1]), response_headers, body)
+
+
+def get(url, **kw):
+    return request('GET', url, **kw)
+
+
+def post(url, **kw):
+    return request('POST', url, **kw)
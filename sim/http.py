@@ -0,0 +1,123 @@
+import json
+
+from sim.urequests import Response
+
+
+class Request:
+    """
+    Petición HTTP recibida por un servicio simulado.
+
+    Attributes:
+        method (str): Verbo HTTP.
+        url (str): URL completa.
+        host (str): Nombre de host sin puerto.
+        path (str): Ruta sin query string.
+        query (dict): Parámetros de la query string.
+        headers (dict): Cabeceras enviadas.
+        body (bytes): Cuerpo de la petición o None.
+    """
+
+    def __init__(self, method, url, headers, body):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+        rest = url.split('://', 1)[-1]
+        host, _, path = rest.partition('/')
+        path, _, query = ('/' + path).partition('?')
+
+        self.host = host.split(':')[0]
+        self.path = path
+        self.query = dict(pair.partition('=')[::2] for pair in query.split('&') if pair)
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HttpRouter:
+    """
+    Enruta las peticiones de ``urequests`` hacia servicios simulados por host.
+
+    Un servicio es cualquier callable ``f(request) -> (status, body[, headers])``
+    o un ``Response``. Si ``body`` no es bytes/str se serializa como JSON.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        latency_ms (int): Latencia por defecto de ida y vuelta.
+    """
+
+    def __init__(self, sim, latency_ms=120):
+        self.sim = sim
+        self.latency_ms = latency_ms
+        self.routes = {}
+        self.stalls = {}
+
+    def route(self, host, service, latency_ms=None):
+        """
+        Registra un servicio para un host.
+
+        Args:
+            host (str): Nombre de host (sin esquema ni puerto).
+            service: Callable que atiende las peticiones.
+            latency_ms: Latencia específica o None para la del router.
+        """
+        self.routes[host] = (service, latency_ms)
+
+    def stall(self, host, seconds):
+        """
+        El host deja de responder durante ``seconds``: las peticiones de esa
+        ventana esperan hasta su ``timeout`` o, sin él, para siempre.
+        """
+        self.stalls[host] = self.sim.clock.now_us + int(seconds * 1000000)
+
+    def request(self, method, url, headers, body, timeout=None):
+        sim = self.sim
+        req = Request(method, url, headers, body)
+        route = self.routes.get(req.host)
+
+        if not sim.network.online():
+            # EHOSTUNREACH: sin Wi-Fi no hay ruta.
+            self._record(req, None, 0, 'offline')
+            raise OSError(113)
+
+        if route is None:
+            # Igual que getaddrinfo cuando no resuelve el nombre.
+            self._record(req, None, 0, 'dns')
+            raise OSError(-2)
+
+        if self.sim.clock.now_us < self.stalls.get(req.host, 0):
+            self.sim.timeline.record('fault', name='http_hang')
+
+            if timeout is None:
+                # Sin timeout el socket no vuelve nunca: solo lo saca un watchdog.
+                sim.clock.advance_us(None)
+
+            sim.clock.advance_us(int(timeout * 1000000))
+            self._record(req, None, int(timeout * 1000), 'timeout')
+            raise OSError(110)
+
+        service, latency_ms = route
+        latency_ms = self.latency_ms if latency_ms is None else latency_ms
+        result = service(req)
+
+        if isinstance(result, Response):
+            response = result
+        else:
+            status, payload = result[0], result[1]
+            response_headers = result[2] if len(result) > 2 else {}
+
+            if not isinstance(payload, (bytes, bytearray, str)):
+                payload = json.dumps(payload)
+
+            response = Response(status, payload, response_headers)
+
+        sim.clock.advance_us(latency_ms * 1000)
+        self._record(req, response.status_code, latency_ms, None, len(response.content))
+
+        return response
+
+    def _record(self, req, status, latency_ms, error, size=0):
+        self.sim.timeline.record('http', method=req.method, url=req.url,
+                                 status=status, latency_ms=latency_ms,
+                                 bytes=size, error=error)
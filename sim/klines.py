@@ -0,0 +1,120 @@
+"""
+Prueba del almacén de velas frente a reinicios y cortes de conexión.
+
+Uso: python -m sim.klines [--hours 48] [--outage 10:6] [--reset 20] [--seed 0]
+
+Arranca el firmware contra el Binance simulado (que sirve velas de una curva
+determinista, también anteriores al arranque), provoca cortes del enlace y
+reinicios, y al final comprueba que cada moneda tiene las velas seguidas y
+con los precios del servicio. Informa de peticiones y bytes de velas, ocupación
+en la flash y latencia de las consultas por rango en el anfitrión.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from sim import Simulator
+from sim import machine
+from sim.telemetry import _window
+
+
+class KlinesRun:
+    """
+    Escenario de velas con cortes y reinicios programados.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        outages (list): Ventanas ``(inicio, duración)`` en segundos sin enlace.
+        resets (list): Segundos en que se reinicia el dispositivo.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, hours=48, outages=(), resets=(), seed=0):
+        self.seconds = hours * 3600
+        self.sim = Simulator(seed=seed, timeline_kinds=('http', 'crash', 'reset'))
+
+        for start, duration in outages:
+            self.sim.at(start, self.sim.network.set_link, False)
+            self.sim.at(start + duration, self.sim.network.set_link, True)
+
+        for at in resets:
+            self.sim.at(at, machine.reset)
+
+    def _check(self, store):
+        """Velas guardadas, huecos y precios distintos de los del servicio."""
+        candles = store.read(0)
+        binance = self.sim.binance
+        pair = binance.split_symbol(store.symbol + store.base)
+        gaps = sum(1 for a, b in zip(candles, candles[1:]) if b[0] - a[0] != store.interval_s)
+
+        # Lo que se pierde al guardar con menos decimales.
+        tolerance = 10 ** (8 - store.decimals)
+        wrong = 0
+
+        for candle in candles:
+            close = binance.kline(pair, candle[0], store.interval_s)[4]
+            whole, _, fraction = close.partition('.')
+
+            if abs(int(whole + fraction) - candle[4]) > tolerance:
+                wrong += 1
+
+        return len(candles), gaps, wrong
+
+    def _latency_us(self, call, repeat=200):
+        start = time.perf_counter()
+
+        for _ in range(repeat):
+            call()
+
+        return round((time.perf_counter() - start) / repeat * 1000000, 1)
+
+    def run(self):
+        summary = self.sim.run(self.seconds)
+        ingester = self.sim.namespace['klines']
+        requests = [data for _, _, data in self.sim.timeline.filter('http') if '/api/v3/klines' in data['url']]
+        stored = {}
+
+        for symbol, store in ingester.stores.items():
+            count, gaps, wrong = self._check(store)
+            stored[symbol] = {"candles": count, "gaps": gaps, "wrong_prices": wrong, "decimals": store.decimals}
+
+        store = ingester.stores['BTC']
+        last = store.last_open
+        flash = sum(os.path.getsize(os.path.join(self.sim.flash_dir, name))
+                    for name in os.listdir(self.sim.flash_dir) if name.startswith('kl_'))
+
+        return {
+            "hours": round(self.seconds / 3600, 2),
+            "requests": len(requests),
+            "failed_requests": sum(1 for data in requests if data['error'] or data['status'] != 200),
+            "response_bytes": sum(data['bytes'] for data in requests),
+            "stores": stored,
+            "flash_bytes": flash,
+            "flash_bytes_per_coin": flash // len(ingester.stores),
+            "read_24h_us": self._latency_us(lambda: store.read(last - 86400, last)),
+            "change_24h_us": self._latency_us(lambda: store.change_bp(86400)),
+            "change_7d_us": self._latency_us(lambda: store.change_bp(7 * 86400)),
+            "resets": summary["counters"].get("reset", 0),
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.klines', description='Almacén de velas frente a cortes')
+    parser.add_argument('--hours', type=float, default=48, help='Horas virtuales a simular')
+    parser.add_argument('--outage', action='append', type=_window, metavar='HORA:DURACION',
+                        help='Corte del enlace Wi-Fi (se puede repetir)')
+    parser.add_argument('--reset', action='append', type=float, metavar='HORA', help='Reinicio del dispositivo')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = KlinesRun(hours=args.hours, outages=args.outage or [(10 * 3600, 6 * 3600)],
+                         resets=[h * 3600 for h in (args.reset or [20])], seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+Laboratorio del relé de precios: varios dispositivos en un mismo proceso que
+se reparten los precios por UDP multicast real sobre localhost.
+
+Uso: python -m sim.lan [--devices 4] [--hours 6] [--loss 0.1] [--kill-leader 2]
+
+Cada dispositivo tiene su planificador, su caché, su conversor de divisas y
+su ``PriceRelay`` del firmware; comparten el reloj virtual y la API simulada.
+Se ejecuta el mismo escenario con y sin relé para medir la reducción de
+peticiones, la pérdida de tramas y el relevo del líder. Termina con error si
+el relé pide más de lo que pediría un único dispositivo que mostrara lo de
+todos o si el líder cambia tras el arranque sin que se apague ni se pierdan
+sus HELLO.
+"""
+
+import argparse
+import json
+import math
+import random
+import select as _host_select
+import socket as _host_socket
+import sys
+import types
+
+from sim import network
+from sim.simulator import Simulator
+
+# Grupo y puerto propios para no interferir con dispositivos reales de la red.
+LAB_GROUP = '239.255.70.88'
+LAB_PORT = 47007
+
+# Moneda y divisa de cada dispositivo; se repiten para que haya intereses comunes.
+INTERESTS = (('BTC', 'EUR'), ('ETH', 'EUR'), ('BTC', 'USDT'), ('ADA', 'EUR'), ('SOL', 'BTC'))
+
+QUOTES = ('EUR', 'USDT', 'BTC')
+
+
+class LossySocket:
+    """Socket del anfitrión que descarta datagramas recibidos con probabilidad ``loss``."""
+
+    def __init__(self, sock, lab):
+        self._sock = sock
+        self._lab = lab
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def recv(self, size):
+        while True:
+            data = self._sock.recv(size)
+
+            if self._lab.random.random() >= self._lab.loss:
+                return data
+
+            self._lab.dropped += 1
+
+
+def _socket_module(lab):
+    module = types.ModuleType('socket')
+    module.__getattr__ = lambda name: getattr(_host_socket, name)
+    module.socket = lambda *args: LossySocket(_host_socket.socket(*args), lab)
+
+    return module
+
+
+class LabDevice:
+    """
+    Un dispositivo del laboratorio con el flujo de precios de ``main.py``.
+
+    Args:
+        lab (RelayLab): Laboratorio al que pertenece.
+        device_id (int): Id en el relé.
+        coin (str): Moneda que muestra.
+        quote (str): Divisa en la que la muestra.
+    """
+
+    def __init__(self, lab, device_id, coin, quote):
+        from Models.PriceCache import PriceCache
+        from Models.PriceRelay import PriceRelay
+        from Models.QuoteConverter import QuoteConverter
+        from Models.Scheduler import Scheduler
+
+        self.device_id = device_id
+        self.coin = coin
+        self.quote = quote
+        self.alive = True
+        self.max_age_ms = 0
+
+        self.scheduler = Scheduler()
+        self.cache = PriceCache()
+        self.quotes = QuoteConverter(base='USDT', quotes=QUOTES)
+        self.relay = None
+
+        if lab.use_relay:
+            relay = PriceRelay(self.scheduler, self.cache, self.quotes.fetch, self.interest,
+                               on_price=self.on_price, device_id=device_id, group=LAB_GROUP, port=LAB_PORT,
+                               interface='127.0.0.1', period_ms=lab.period_ms,
+                               heartbeat_ms=lab.heartbeat_ms, slow=QUOTES, slow_period_ms=lab.fx_period_ms)
+
+            if relay.open():
+                self.relay = relay
+
+        self.scheduler.every(lab.fx_period_ms, lambda: self.update_fx(lab.period_ms), name='fx')
+        self.scheduler.every(lab.period_ms, self.update_price, name='price')
+
+    def fetch_price(self, symbol):
+        if self.relay is not None:
+            return self.relay.fetch_price(symbol)
+
+        price = self.quotes.fetch(symbol)
+
+        if price:
+            self.cache.put(symbol, price)
+
+        return price
+
+    def update_price(self):
+        if self.cache.get(self.coin, 60000) is None:
+            self.fetch_price(self.coin)
+
+        if self.quote not in self.quotes.fx:
+            self.quotes.update_fx(self.quote)
+
+    def update_fx(self, max_age_ms=300000):
+        if self.relay is not None and not self.relay.is_leader():
+            return
+
+        for quote in QUOTES:
+            if quote not in self.quotes.pegged and self.cache.get(quote, max_age_ms) is None:
+                self.fetch_price(quote)
+
+    def interest(self):
+        if self.quote in self.quotes.pegged:
+            return self.coin,
+
+        return self.coin, self.quote
+
+    def on_price(self, symbol, price):
+        self.quotes.accept(symbol, price)
+
+    def sample(self):
+        """Anota la antigüedad del precio visible."""
+        age = self.cache.age_ms(self.coin)
+
+        if age is not None and age > self.max_age_ms:
+            self.max_age_ms = age
+
+    def kill(self):
+        """Apaga el dispositivo: deja de ejecutar tareas y de anunciarse."""
+        self.alive = False
+
+        if self.relay is not None:
+            self.relay.close()
+
+
+class RelayLab:
+    """
+    Varios dispositivos simulados sobre un mismo reloj virtual.
+
+    Args:
+        devices (int): Número de dispositivos.
+        use_relay (bool): Si False, cada dispositivo consulta por su cuenta.
+        loss (float): Probabilidad de perder cada trama recibida.
+        seed (int): Semilla de la API simulada y de las pérdidas.
+        period_s (int): Periodo de consulta de precios.
+        fx_period_s (int): Periodo de los tipos de cambio.
+        heartbeat_s (int): Periodo de los anuncios del relé.
+        kill_leader_at (float): Segundo virtual en que se apaga el líder o None.
+        sample_s (int): Cada cuánto se mide la antigüedad de los precios visibles.
+    """
+
+    def __init__(self, devices=4, use_relay=True, loss=0.0, seed=0, period_s=300,
+                 fx_period_s=900, heartbeat_s=10, kill_leader_at=None, sample_s=10):
+        self.sim = Simulator(seed=seed, timeline_kinds=('http',))
+        self.random = random.Random(seed)
+        self.use_relay = use_relay
+        self.loss = loss
+        self.dropped = 0
+        self.period_ms = period_s * 1000
+        self.fx_period_ms = fx_period_s * 1000
+        self.heartbeat_ms = heartbeat_s * 1000
+        self.kill_leader_at = kill_leader_at
+        self.sample_us = sample_s * 1000000
+        self.count = devices
+        self.devices = []
+        self.killed_at_us = None
+        self.failover_us = None
+        self.boot_changes = None
+
+    def run(self, seconds):
+        """
+        Ejecuta el escenario.
+
+        Returns:
+            dict: Resumen de peticiones, tramas y relevo del líder.
+        """
+        sim = self.sim
+        clock = sim.clock
+        sim.install()
+        saved = sys.modules['socket']
+        sys.modules['socket'] = _socket_module(self)
+
+        try:
+            sim.network.active = True
+            sim.network.status = network.STAT_GOT_IP
+
+            for i in range(self.count):
+                coin, quote = INTERESTS[i % len(INTERESTS)]
+                self.devices.append(LabDevice(self, 0x1000 + i, coin, quote))
+
+            end_us = clock.now_us + int(seconds * 1000000)
+            next_sample = clock.now_us
+
+            # Cambios de líder mientras los dispositivos se descubren al arrancar (una concesión)
+            boot_us = clock.now_us + (self.devices[0].relay.timeout_ms * 1000 if self.use_relay else 0)
+
+            while clock.now_us < end_us:
+                if self.boot_changes is None and clock.now_us >= boot_us:
+                    self.boot_changes = self.leader_changes()
+
+                if self.kill_leader_at is not None and self.killed_at_us is None \
+                        and clock.now_us >= self.kill_leader_at * 1000000:
+                    max(self.alive(), key=lambda d: d.device_id).kill()
+                    self.killed_at_us = clock.now_us
+
+                self._settle()
+                self._check_failover()
+
+                if clock.now_us >= next_sample:
+                    for device in self.alive():
+                        device.sample()
+
+                    next_sample += self.sample_us
+
+                delays = [d.scheduler.next_delay_ms() for d in self.alive()]
+                delay_us = min([d * 1000 for d in delays if d is not None] + [next_sample - clock.now_us])
+                clock.advance_us(max(1000, min(delay_us, end_us - clock.now_us)))
+        finally:
+            for device in self.devices:
+                device.kill()
+
+            sys.modules['socket'] = saved
+            sim.uninstall()
+
+        return self.summary(seconds)
+
+    def alive(self):
+        return [d for d in self.devices if d.alive]
+
+    def leader_changes(self):
+        return sum(d.relay.stats["leader_changes"] for d in self.devices if d.relay is not None)
+
+    def ideal_requests(self, seconds):
+        """Peticiones de un único dispositivo que mostrara las monedas de todos y sus tipos de cambio."""
+        coins = set(device.coin for device in self.devices)
+        quotes = set(device.quote for device in self.devices
+                     if device.quote not in coins and device.quote not in device.quotes.pegged)
+        ms = int(seconds * 1000)
+
+        return len(coins) * -(-ms // self.period_ms) + len(quotes) * -(-ms // self.fx_period_ms)
+
+    def _settle(self):
+        # Ejecuta tareas y entrega tramas hasta que no quede nada pendiente en este instante.
+        for _ in range(100):
+            busy = 0
+
+            for device in self.alive():
+                if device.relay is not None:
+                    busy += device.relay.poll()
+
+                busy += device.scheduler.run_pending()
+
+            if busy:
+                continue
+
+            # Por loopback un datagrama tarda microsegundos reales en llegar.
+            socks = [d.relay.sock._sock for d in self.alive() if d.relay is not None]
+
+            if not socks or not _host_select.select(socks, [], [], 0.001)[0]:
+                break
+
+    def _check_failover(self):
+        if self.killed_at_us is None or self.failover_us is not None or not self.use_relay:
+            return
+
+        alive = self.alive()
+        leader = max(d.device_id for d in alive)
+
+        if all(d.relay is not None and d.relay.leader == leader for d in alive):
+            self.failover_us = self.sim.clock.now_us - self.killed_at_us
+
+    def summary(self, seconds):
+        stats = {}
+
+        for device in self.devices:
+            if device.relay is not None:
+                for key, value in device.relay.stats.items():
+                    stats[key] = stats.get(key, 0) + value
+
+        return {
+            "mode": 'relay' if self.use_relay else 'direct',
+            "devices": self.count,
+            "hours": round(seconds / 3600, 2),
+            "upstream_requests": self.sim.timeline.count('http'),
+            "ideal_requests": self.ideal_requests(seconds),
+            "requests_per_device_hour": round(self.sim.timeline.count('http') * 3600 / seconds / self.count, 2),
+            "frames": stats,
+            "leader_changes_after_boot": self.leader_changes() - (self.boot_changes or 0),
+            "injected_loss": self.dropped,
+            "failover_s": None if self.failover_us is None else round(self.failover_us / 1000000, 1),
+            "max_price_age_s": round(max(d.max_age_ms for d in self.devices) / 1000, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.lan', description='Laboratorio del relé de precios')
+    parser.add_argument('--devices', type=int, default=4, help='Dispositivos en la red')
+    parser.add_argument('--hours', type=float, default=6, help='Horas virtuales a simular')
+    parser.add_argument('--loss', type=float, default=0.0, help='Probabilidad de perder cada trama')
+    parser.add_argument('--kill-leader', type=float, help='Hora virtual en que se apaga el líder')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de la API y de las pérdidas')
+    args = parser.parse_args()
+
+    kill_at = None if args.kill_leader is None else args.kill_leader * 3600
+    results = []
+
+    for use_relay in (False, True):
+        lab = RelayLab(devices=args.devices, use_relay=use_relay, loss=args.loss,
+                       seed=args.seed, kill_leader_at=kill_at)
+        results.append(lab.run(args.hours * 3600))
+
+    direct, relay = results
+    reduction = 1 - relay["upstream_requests"] / direct["upstream_requests"] if direct["upstream_requests"] else 0
+
+    print(json.dumps({"direct": direct, "relay": relay, "upstream_reduction": round(reduction, 3)}, indent=2))
+
+    # El líder no debe pedir más que un único dispositivo que mostrara todo lo de la red
+    if relay["upstream_requests"] > relay["ideal_requests"] * 1.1:
+        raise SystemExit(f'El relé hace {relay["upstream_requests"]} peticiones; '
+                         f'con un líder estable bastarían {relay["ideal_requests"]}')
+
+    # Tras arrancar, el líder solo cambia si se apaga (un cambio por superviviente) o si un
+    # seguidor pierde todos sus HELLO de una concesión (ida y vuelta: dos cambios); se
+    # admite el doble de lo que cabe esperar por azar
+    beats = args.hours * 3600 * 1000 // lab.heartbeat_ms
+    lease_beats = lab.devices[0].relay.timeout_ms // lab.heartbeat_ms
+    expired = (args.devices - 1) * beats * args.loss ** lease_beats
+    allowed = (args.devices - 1 if kill_at is not None else 0) + math.ceil(4 * expired)
+
+    if relay["leader_changes_after_boot"] > allowed:
+        raise SystemExit(f'{relay["leader_changes_after_boot"]} cambios de líder tras el arranque '
+                         f'(se admiten {allowed})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Generador de carga para el servidor HTTP del firmware.
+
+Uso: python -m sim.loadgen [--clients 4] [--seconds 10] [--path /prices]
+
+Arranca el firmware en el simulador con ``HTTP_SERVER`` activo y el reloj
+acompasado con el tiempo real, y lanza varios clientes keep-alive contra el
+puerto local. Mientras tanto se gira el encoder en el menú para medir si el
+servidor retrasa la interfaz: la latencia es el tiempo virtual desde el
+inicio de cada giro hasta que el display cambia.
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+
+from sim import Simulator
+
+# Segundos virtuales hasta que el firmware termina de arrancar (pausas, Wi-Fi...).
+BOOT_S = 10
+
+
+def _client(port, paths, stop, results):
+    latencies = []
+    errors = 0
+    conn = None
+
+    while not stop.is_set():
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+
+            path = paths[len(latencies) % len(paths)]
+            started = time.perf_counter()
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+
+            if response.status != 200:
+                errors += 1
+
+            latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+
+            # Cerrar la conexión rota para no ocupar un hueco del servidor al reconectar.
+            if conn is not None:
+                conn.close()
+                conn = None
+
+            time.sleep(0.05)
+
+    results.append((latencies, errors))
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _ui_latencies(sim, starts):
+    # Primer cambio de display tras el inicio de cada giro.
+    displays = [t for t, _, _ in sim.timeline.filter('display')]
+    latencies = []
+
+    for start in starts:
+        start_us = int(start * 1000000)
+        after = [t for t in displays if t >= start_us]
+
+        if after:
+            latencies.append((after[0] - start_us) / 1000)
+
+    return latencies
+
+
+def run(clients=4, seconds=10, paths=('/prices',), port=8080, speed=1.0, rotate_every_s=0.5):
+    """
+    Ejecuta una prueba de carga.
+
+    Args:
+        clients (int): Clientes keep-alive concurrentes (0 = sin carga).
+        seconds (float): Duración de la carga en segundos reales.
+        paths (tuple): Rutas que piden los clientes por turnos.
+        port (int): Puerto del servidor simulado.
+        speed (float): Velocidad del reloj virtual durante la carga.
+        rotate_every_s (float): Periodo de los giros del encoder en el menú.
+
+    Returns:
+        dict: Peticiones por segundo, latencias y retraso de la interfaz.
+    """
+    sim = Simulator(env={"HTTP_SERVER": True, "HTTP_PORT": port}, speed=None,
+                    timeline_kinds=('display', 'crash'))
+    load_s = seconds * speed
+
+    # Entra al menú y gira adelante y atrás durante la carga.
+    sim.press(BOOT_S)
+    t = BOOT_S + 1
+    direction = 1
+    starts = []
+
+    while t < BOOT_S + 1 + load_s:
+        sim.rotate(t, direction)
+        starts.append(t)
+        direction = -direction
+        t += rotate_every_s
+
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=_client, args=(port, paths, stop, results)) for _ in range(clients)]
+
+    def start_load():
+        # Arranque a máxima velocidad; la carga, acompasada con el tiempo real.
+        sim.clock.speed = speed
+
+        for thread in threads:
+            thread.start()
+
+    sim.at(BOOT_S + 0.5, start_load)
+    summary = sim.run(BOOT_S + 1.5 + load_s)
+    stop.set()
+
+    # El firmware no termina por sí mismo: se cierran las conexiones y se libera el puerto.
+    server = (sim.namespace or {}).get('http')
+
+    if server is not None:
+        server.close()
+
+    for thread in threads:
+        thread.join()
+
+    # La última petición de cada cliente se corta al cerrar, no cuenta como error.
+    latencies = [latency for result in results for latency in result[0]]
+    errors = max(0, sum(result[1] for result in results) - clients)
+    ui = _ui_latencies(sim, starts)
+
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": round(len(latencies) / seconds, 1),
+        "latency_ms_p50": round(_percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        "latency_ms_p99": round(_percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "server": server.stats if server is not None else None,
+        "ui_latency_ms_avg": round(sum(ui) / len(ui), 1) if ui else None,
+        "ui_latency_ms_max": round(max(ui), 1) if ui else None,
+        "crashed": summary["counters"].get("crash", 0) > 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.loadgen', description='Carga contra el servidor HTTP simulado')
+    parser.add_argument('--clients', type=int, default=4, help='Clientes keep-alive concurrentes')
+    parser.add_argument('--seconds', type=float, default=10, help='Duración de la carga en segundos reales')
+    parser.add_argument('--path', action='append', help='Ruta a pedir (se puede repetir)')
+    parser.add_argument('--port', type=int, default=8080, help='Puerto local del servidor')
+    args = parser.parse_args()
+
+    paths = tuple(args.path or ('/prices', '/stats', '/wireless', '/battery'))
+    idle = run(clients=0, seconds=args.seconds / 2, paths=paths, port=args.port)
+    loaded = run(clients=args.clients, seconds=args.seconds, paths=paths, port=args.port)
+
+    print(json.dumps({"idle": idle, "loaded": loaded}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,493 @@
+"""
+Sustituto del módulo ``machine`` de MicroPython para el simulador.
+
+Los periféricos no hablan con hardware: leen y escriben en el ``Board`` del
+simulador activo, que guarda los niveles de cada GPIO, las fuentes de los
+ADC y los dispositivos conectados a cada bus.
+"""
+
+from sim import runtime
+from sim.clock import DeviceReset
+
+PWRON_RESET = 1
+WDT_RESET = 3
+SOFT_RESET = 5
+
+
+class Board:
+    """
+    Estado eléctrico de la placa simulada.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece la placa.
+    """
+
+    # Lectura en reposo del sensor interno (~25 ºC con las correcciones de RpiPico).
+    TEMP_SENSOR_IDLE = 14089
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.levels = {}
+        self.pins = {}
+        self.adc_sources = {4: lambda t: self.TEMP_SENSOR_IDLE}
+        self.spi_devices = {}
+        self.i2c_devices = {}
+        self.cpu_freq = 125000000
+        # Diferencia del RTC con el reloj virtual; el segundo del RTC empieza al ajustarlo.
+        self.rtc_offset_us = 0
+        self.reset_cause = PWRON_RESET
+        self.faults = {}
+        self._watchdog_ms = None
+        self._watchdog = None
+        self._irq_running = False
+        self._irq_queue = []
+
+    def inject(self, kind, count=1):
+        """
+        Hace fallar los próximos accesos a un periférico.
+
+        Args:
+            kind (str): 'spi' o 'adc' (lanzan OSError) o 'spi_hang' (la
+                escritura no vuelve nunca: solo la saca un watchdog).
+            count (int): Accesos que fallan.
+        """
+        self.faults[kind] = self.faults.get(kind, 0) + count
+
+    def take_fault(self, kind):
+        """Consume un fallo inyectado; True si este acceso debe fallar."""
+        if not self.faults.get(kind):
+            return False
+
+        self.faults[kind] -= 1
+        self.sim.timeline.record('fault', name=kind)
+
+        return True
+
+    def start_watchdog(self, timeout_ms):
+        self._watchdog_ms = timeout_ms
+        self.feed_watchdog()
+
+    def feed_watchdog(self):
+        clock = self.sim.clock
+
+        if self._watchdog is not None:
+            clock.cancel(self._watchdog)
+
+        self._watchdog = clock.schedule_in(self._watchdog_ms * 1000, self._watchdog_expired)
+
+    def stop_watchdog(self):
+        """Tras un reinicio el watchdog queda parado hasta que el firmware lo vuelva a crear."""
+        if self._watchdog is not None:
+            self.sim.clock.cancel(self._watchdog)
+            self._watchdog = None
+
+    def _watchdog_expired(self):
+        self._watchdog = None
+        self.reset_cause = WDT_RESET
+        self.sim.timeline.record('reset', cause='watchdog')
+
+        raise DeviceReset()
+
+    def rtc_us(self):
+        """Hora del RTC en microsegundos unix."""
+        clock = self.sim.clock
+
+        return clock.epoch * 1000000 + clock.now_us + self.rtc_offset_us
+
+    def level(self, pin_id):
+        # Las entradas sin conducir quedan en alto (pull-up / encoder en reposo).
+        return self.levels.get(pin_id, 1)
+
+    def register(self, pin):
+        pins = self.pins.setdefault(pin.id, [])
+
+        if pin not in pins:
+            pins.append(pin)
+
+    def drive(self, pin_id, level):
+        """
+        Cambia el nivel de una línea desde el exterior y dispara sus IRQ.
+
+        Args:
+            pin_id: Número de GPIO.
+            level (int): 0 o 1.
+        """
+        old = self.level(pin_id)
+        self.levels[pin_id] = level
+
+        if old == level:
+            return
+
+        self.sim.timeline.record('pin', pin=pin_id, value=level)
+
+        trigger = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+
+        for pin in self.pins.get(pin_id, ()):
+            if pin._handler and pin._trigger & trigger:
+                self._dispatch(pin)
+
+    def _dispatch(self, pin):
+        # Las IRQ no se anidan: si llega otra mientras se atiende una, espera.
+        if self._irq_running:
+            self._irq_queue.append(pin)
+            return
+
+        self._irq_running = True
+
+        try:
+            pin._handler(pin)
+
+            while self._irq_queue:
+                queued = self._irq_queue.pop(0)
+                queued._handler(queued)
+        finally:
+            self._irq_running = False
+            self._irq_queue.clear()
+
+    def attach_spi(self, bus, device):
+        self.spi_devices.setdefault(bus, []).append(device)
+
+    def attach_i2c(self, bus, address, device):
+        self.i2c_devices[(bus, address)] = device
+
+    def set_adc(self, channel, source):
+        """
+        Asigna la fuente de lecturas de un canal ADC.
+
+        Args:
+            channel (int): Canal (0-3 para GPIO26-29, 4 para el sensor interno).
+            source: Valor u16 fijo o función ``f(t_s) -> u16``.
+        """
+        self.adc_sources[channel] = source if callable(source) else (lambda t: source)
+
+    def read_adc(self, channel):
+        if self.take_fault('adc'):
+            raise OSError(5)
+
+        source = self.adc_sources.get(channel)
+        value = int(source(self.sim.clock.now_us / 1000000)) if source else 0
+        self.sim.timeline.record('adc', channel=channel)
+
+        return max(0, min(65535, value))
+
+
+def _board():
+    return runtime.get().board
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_LOW_LEVEL = 1
+    IRQ_HIGH_LEVEL = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+    IRQ_DISABLE = 0
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._handler = None
+        self._trigger = 0
+
+        board = _board()
+        board.register(self)
+
+        if mode == self.OUT:
+            board.levels.setdefault(id, 0)
+
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        board = _board()
+
+        if v is None:
+            return board.level(self.id)
+
+        v = 1 if v else 0
+
+        if board.level(self.id) != v:
+            board.levels[self.id] = v
+
+            if self.id == "LED":
+                board.sim.timeline.record('led', value=v)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    high = on
+    low = off
+
+    def toggle(self):
+        self.value(not self.value())
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, priority=1,
+            wake=None, hard=False):
+        self._handler = handler
+        self._trigger = trigger if handler else 0
+
+        return self
+
+    def __repr__(self):
+        return f'Pin({self.id})'
+
+
+class Signal:
+    def __init__(self, pin, invert=False):
+        self.pin = pin
+        self.invert = invert
+
+    def value(self, v=None):
+        if v is None:
+            return self.pin.value() ^ self.invert
+
+        self.pin.value(bool(v) ^ self.invert)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        pin_id = pin.id if isinstance(pin, Pin) else pin
+
+        # En la Pico los GPIO26-29 son los canales 0-3.
+        self.channel = pin_id - 26 if isinstance(pin_id, int) and pin_id >= 26 else pin_id
+
+    def read_u16(self):
+        return _board().read_adc(self.channel)
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1000000, polarity=0, phase=0, bits=8,
+                 firstbit=MSB, sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        sim = runtime.get()
+        data = bytes(buf)
+
+        if sim.board.take_fault('spi_hang'):
+            # El bus no responde: nada vuelve salvo un reinicio del watchdog.
+            sim.clock.advance_us(None)
+
+        if sim.board.take_fault('spi'):
+            raise OSError(5)
+
+        sim.timeline.record('spi', bus=self.id, data=data)
+
+        for device in sim.board.spi_devices.get(self.id, ()):
+            device.on_write(data)
+
+        # Tiempo de transferencia en el bus.
+        sim.clock.advance_us(len(data) * 8 * 1000000 // self.baudrate)
+
+    def read(self, nbytes, write=0x00):
+        self.write(bytes([write]) * nbytes)
+
+        return bytes(nbytes)
+
+    def readinto(self, buf, write=0x00):
+        self.write(bytes([write]) * len(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        self.write(write_buf)
+
+
+class I2C:
+    def __init__(self, id, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+
+    def _device(self, addr):
+        device = _board().i2c_devices.get((self.id, addr))
+
+        if device is None:
+            # ENODEV, igual que MicroPython cuando nadie responde.
+            raise OSError(19)
+
+        return device
+
+    def scan(self):
+        return sorted(addr for bus, addr in _board().i2c_devices if bus == self.id)
+
+    def writeto(self, addr, buf, stop=True):
+        sim = runtime.get()
+        data = bytes(buf)
+
+        sim.timeline.record('i2c', bus=self.id, addr=addr, data=data)
+        self._device(addr).on_write(data)
+
+        # Dirección + datos, 9 ciclos de reloj por byte (con ACK).
+        sim.clock.advance_us((len(data) + 1) * 9 * 1000000 // self.freq)
+
+        return len(data)
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b''.join(bytes(b) for b in vector), stop)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return self._device(addr).on_read(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf), stop)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.writeto(addr, bytes([memaddr]) + bytes(buf))
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        self.writeto(addr, bytes([memaddr]))
+
+        return self.readfrom(addr, nbytes)
+
+
+class RTC:
+    def datetime(self, datetimetuple=None):
+        from sim import utime
+
+        sim = runtime.get()
+        board = sim.board
+
+        if datetimetuple is None:
+            t = utime.gmtime(board.rtc_us() // 1000000)
+            year, month, day, hour, minute, second, weekday = t[:7]
+
+            return year, month, day, weekday, hour, minute, second, 0
+
+        year, month, day, weekday, hour, minute, second = datetimetuple[:7]
+        clock = sim.clock
+        board.rtc_offset_us = utime.mktime((year, month, day, hour, minute, second)) * 1000000 \
+            - clock.epoch * 1000000 - clock.now_us
+        sim.timeline.record('rtc', offset_s=round(board.rtc_offset_us / 1000000, 3))
+
+
+class WDT:
+    """Watchdog del RP2040: reinicia la placa si no se alimenta antes de ``timeout`` ms."""
+
+    def __init__(self, id=0, timeout=5000):
+        # El contador del RP2040 no pasa de unos 8,3 s.
+        if not 0 < timeout <= 8388:
+            raise ValueError('timeout')
+
+        _board().start_watchdog(timeout)
+
+    def feed(self):
+        _board().feed_watchdog()
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self._entry = None
+
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+
+        self._mode = mode
+        self._period_us = int(1000000 / freq) if freq > 0 else int(period) * 1000
+        self._callback = callback
+        self._entry = runtime.clock().schedule_in(self._period_us, self._fire)
+
+    def _fire(self):
+        clock = runtime.clock()
+
+        if self._mode == self.PERIODIC:
+            self._entry = clock.schedule_in(self._period_us, self._fire)
+        else:
+            self._entry = None
+
+        self._callback(self)
+
+    def deinit(self):
+        if self._entry is not None:
+            runtime.clock().cancel(self._entry)
+            self._entry = None
+
+
+def freq(hz=None):
+    board = _board()
+
+    if hz is None:
+        return board.cpu_freq
+
+    board.cpu_freq = hz
+    board.sim.timeline.record('freq', hz=hz)
+
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x5a\x2b\x29'
+
+
+def reset():
+    runtime.timeline().record('reset', cause='soft')
+    _board().reset_cause = SOFT_RESET
+
+    raise DeviceReset()
+
+
+def soft_reset():
+    reset()
+
+
+def reset_cause():
+    return _board().reset_cause
+
+
+def idle():
+    clock = runtime.clock()
+    next_us = clock.next_event_us()
+    wait_us = 1000 if next_us is None else max(0, min(1000, next_us - clock.now_us))
+    clock.sleep_us(wait_us)
+
+
+def lightsleep(time_ms=None):
+    runtime.clock().sleep_ms(time_ms or 0)
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,217 @@
+"""
+Sustituto del módulo ``network`` de MicroPython (interfaz CYW43).
+
+El estado de la radio vive en ``NetworkModel`` para que todas las
+instancias de ``WLAN`` de una misma interfaz lo compartan, igual que en la
+Pico W.
+"""
+
+import random
+
+from sim import runtime
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+
+class NetworkModel:
+    """
+    Radio y punto de acceso simulados.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        access_points (list): Tuplas ``(ssid, password, rssi, channel)`` visibles.
+        connect_latency_ms (int): Tiempo desde ``connect`` hasta obtener IP, o una
+            tupla ``(mínimo, máximo)`` para sortearlo en cada asociación.
+        scan_ms (int): Duración bloqueante de ``scan``.
+        seed (int): Semilla del sorteo de latencias.
+    """
+
+    def __init__(self, sim, access_points=(), connect_latency_ms=2500, scan_ms=1500, seed=0):
+        self.sim = sim
+        self.access_points = list(access_points)
+        self.connect_latency_ms = connect_latency_ms
+        self.random = random.Random(seed)
+        self.scan_ms = scan_ms
+        self.active = False
+        self.status = STAT_IDLE
+        self.ssid = None
+        self.link_up = True
+        self.hostname = 'PicoW'
+        self.config = {
+            'mac': b'\x28\xcd\xc1\x00\x00\x01',
+            'txpower': 31,
+            'pm': 0xa11142,
+            'channel': 0,
+        }
+        self._pending = None
+
+    def online(self):
+        """Indica si hay conectividad IP real (asociado y con enlace)."""
+        return self.active and self.status == STAT_GOT_IP and self.link_up
+
+    def set_link(self, up):
+        """Simula una caída (o recuperación) del enlace aguas arriba del AP."""
+        self.link_up = bool(up)
+        self.sim.timeline.record('wifi', event='link_up' if up else 'link_down')
+
+    def find(self, ssid):
+        for ap in self.access_points:
+            if ap[0] == ssid:
+                return ap
+
+        return None
+
+    def connect(self, ssid, password):
+        clock = self.sim.clock
+        ap = self.find(ssid)
+
+        # Repetir connect() hacia la misma red no reinicia la asociación en curso.
+        if ap is not None and ssid == self.ssid and self.status in (STAT_CONNECTING, STAT_GOT_IP):
+            return
+
+        if self._pending is not None:
+            clock.cancel(self._pending)
+            self._pending = None
+
+        if ap is None:
+            self.status = STAT_NO_AP_FOUND
+        elif ap[1] != password:
+            self.status = STAT_WRONG_PASSWORD
+        else:
+            self.status = STAT_CONNECTING
+            self.ssid = ssid
+            self.config['channel'] = ap[3]
+            self._pending = clock.schedule_in(self._latency_ms() * 1000, self._connected)
+
+        self.sim.timeline.record('wifi', event='connect', ssid=ssid, status=self.status)
+
+    def _latency_ms(self):
+        latency = self.connect_latency_ms
+
+        if isinstance(latency, tuple):
+            return self.random.randint(*latency)
+
+        return latency
+
+    def _connected(self):
+        self._pending = None
+
+        if self.active and self.status == STAT_CONNECTING:
+            self.status = STAT_GOT_IP
+            self.sim.timeline.record('wifi', event='got_ip', ssid=self.ssid)
+
+    def disconnect(self):
+        if self._pending is not None:
+            self.sim.clock.cancel(self._pending)
+            self._pending = None
+
+        self.status = STAT_IDLE
+        self.sim.timeline.record('wifi', event='disconnect')
+
+    def set_active(self, active):
+        if self.active != bool(active):
+            self.active = bool(active)
+            self.sim.timeline.record('wifi', event='active', value=self.active)
+
+            if not active:
+                # Al apagarlo, el chip olvida la configuración de ahorro de energía.
+                self.config['pm'] = 0xa11142
+                self.disconnect()
+
+
+def _model():
+    return runtime.get().network
+
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self.interface_id = interface_id
+
+    def active(self, is_active=None):
+        model = _model()
+
+        if is_active is None:
+            return model.active
+
+        model.set_active(is_active)
+
+    def connect(self, ssid=None, key=None, bssid=None):
+        _model().connect(ssid, key)
+
+    def disconnect(self):
+        _model().disconnect()
+
+    def isconnected(self):
+        return _model().status == STAT_GOT_IP
+
+    def status(self, param=None):
+        model = _model()
+
+        if param is None:
+            return model.status
+
+        if param == 'rssi':
+            ap = model.find(model.ssid)
+
+            return ap[2] if ap else 0
+
+        raise ValueError('unknown status param')
+
+    def scan(self):
+        model = _model()
+        model.sim.clock.advance_us(model.scan_ms * 1000)
+        model.sim.timeline.record('wifi', event='scan')
+
+        return [(ssid.encode(), b'\x00' * 6, channel, rssi, 3, False)
+                for ssid, _, rssi, channel in model.access_points]
+
+    def ifconfig(self, config=None):
+        if _model().status == STAT_GOT_IP:
+            return '192.168.1.50', '255.255.255.0', '192.168.1.1', '192.168.1.1'
+
+        return '0.0.0.0', '0.0.0.0', '0.0.0.0', '0.0.0.0'
+
+    def config(self, *args, **kwargs):
+        model = _model()
+
+        if kwargs:
+            for key, value in kwargs.items():
+                if key == 'hostname':
+                    model.hostname = value
+                else:
+                    model.config[key] = value
+
+            if 'pm' in kwargs:
+                model.sim.timeline.record('wifi', event='pm', value=kwargs['pm'])
+
+            return None
+
+        key = args[0]
+
+        if key == 'essid' or key == 'ssid':
+            return model.ssid
+        if key == 'hostname':
+            return model.hostname
+
+        return model.config[key]
+
+
+def hostname(name=None):
+    model = _model()
+
+    if name is None:
+        return model.hostname
+
+    model.hostname = name
+
+
+def country(code=None):
+    return 'XX' if code is None else None
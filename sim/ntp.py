@@ -0,0 +1,105 @@
+"""
+Prueba de la sincronización SNTP frente a retardo, asimetría y deriva.
+
+Uso: python -m sim.ntp [--hours 72] [--skew 40] [--delay 60] [--asymmetry 0.3] [--jitter 20]
+
+Arranca el firmware contra el servidor NTP simulado, con la hora "real"
+derivando ``--skew`` ppm respecto al cristal del dispositivo, y mide cada
+minuto el error del RTC y de la hora corregida (``SntpClock.now_ms``). Se
+comparan la deriva estimada con la inyectada y el número de consultas con
+las de la sincronización fija anterior (cada 6 horas).
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+
+
+class NtpRun:
+    """
+    Escenario de sincronización horaria.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        skew_ppm (float): Deriva de la hora real respecto al reloj virtual.
+        delay_ms (float): Ida y vuelta de la red.
+        asymmetry (float): Parte del retardo que se va en la ida (-1 a 1).
+        jitter_ms (float): Ruido máximo de cada sentido.
+        offset_ms (int): Diferencia inicial entre la hora real y la virtual.
+        loss (float): Probabilidad de perder una respuesta.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, hours=72, skew_ppm=40.0, delay_ms=60, asymmetry=0.0, jitter_ms=0,
+                 offset_ms=3700, loss=0.0, seed=0):
+        self.seconds = hours * 3600
+        self.sim = Simulator(seed=seed, timeline_kinds=('udp', 'rtc', 'crash'))
+        ntp = self.sim.ntp
+        ntp.skew_ppm = skew_ppm
+        ntp.delay_ms = delay_ms
+        ntp.asymmetry = asymmetry
+        ntp.jitter_ms = jitter_ms
+        ntp.offset_ms = offset_ms
+        ntp.loss = loss
+        self.rtc_errors = []
+        self.clock_errors = []
+
+        for t in range(60, int(self.seconds), 60):
+            self.sim.at(t, self._sample)
+
+    def _sample(self):
+        sim = self.sim
+        clock = (sim.namespace or {}).get('ntp')
+
+        if clock is None or not clock.synced() or not clock.stats["rtc_writes"]:
+            return
+
+        true_us = sim.ntp.true_us(sim.clock.now_us)
+        self.rtc_errors.append((sim.board.rtc_us() - true_us) / 1000)
+        self.clock_errors.append(clock.now_ms() - true_us / 1000)
+
+    def run(self):
+        self.sim.run(self.seconds)
+        clock = (self.sim.namespace or {}).get('ntp')
+        rtc = [abs(e) for e in self.rtc_errors]
+        corrected = [abs(e) for e in self.clock_errors]
+
+        return {
+            "hours": round(self.seconds / 3600, 2),
+            "queries": self.sim.timeline.count('udp'),
+            "fixed_6h_queries": int(self.seconds // (6 * 3600)) + 1,
+            "syncs": clock.stats["syncs"] if clock else 0,
+            "failures": clock.stats["failures"] if clock else 0,
+            "rtc_writes": clock.stats["rtc_writes"] if clock else 0,
+            "last_interval_s": clock.interval_s if clock else None,
+            "injected_drift_ppm": -self.sim.ntp.skew_ppm,
+            "estimated_drift_ppm": round(clock.drift_ppm, 2) if clock and clock.drift_ppm is not None else None,
+            "rtc_error_ms_max": round(max(rtc), 1) if rtc else None,
+            "rtc_error_ms_avg": round(sum(rtc) / len(rtc), 1) if rtc else None,
+            "clock_error_ms_max": round(max(corrected), 1) if corrected else None,
+            "clock_error_ms_avg": round(sum(corrected) / len(corrected), 1) if corrected else None,
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.ntp', description='Sincronización SNTP simulada')
+    parser.add_argument('--hours', type=float, default=72, help='Horas virtuales a simular')
+    parser.add_argument('--skew', type=float, default=40, help='Deriva inyectada en ppm')
+    parser.add_argument('--delay', type=float, default=60, help='Ida y vuelta de la red en ms')
+    parser.add_argument('--asymmetry', type=float, default=0.0, help='Parte del retardo en la ida (-1 a 1)')
+    parser.add_argument('--jitter', type=float, default=0, help='Ruido máximo por sentido en ms')
+    parser.add_argument('--offset', type=int, default=3700, help='Desfase inicial de la hora real en ms')
+    parser.add_argument('--loss', type=float, default=0.0, help='Probabilidad de perder una respuesta')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = NtpRun(hours=args.hours, skew_ppm=args.skew, delay_ms=args.delay, asymmetry=args.asymmetry,
+                      jitter_ms=args.jitter, offset_ms=args.offset, loss=args.loss, seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Conversión de divisas de cotización frente a los pares directos de Binance.
+
+Uso: python -m sim.quotes [--rounds 12] [--spacing 300] [--seed 0]
+
+Cada ronda pide con ``QuoteConverter`` las monedas contra USDT y los tipos de
+cambio de las divisas de cotización, convierte cada moneda a cada divisa y lo
+compara con el precio del par directo del Binance simulado (``ADAEUR``,
+``ADABTC``...) en el mismo instante, con los mismos 8 decimales. Cuenta las
+peticiones frente a las de pedir cada par por separado y mide el error de la
+conversión en unidades del último decimal y en relativo.
+
+Termina con error si alguna conversión se aleja del par directo más de lo
+que explican los 8 decimales de sus datos (una unidad por el redondeo de
+cada lado más la media unidad del precio y del tipo de cambio llevada al
+resultado), si las peticiones no son una por moneda más una por tipo de
+cambio o si ``parse_scaled`` no lee bien precios negativos.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+
+COINS = ('ADA', 'BTC', 'ETH', 'BNB', 'SOL', 'DOT')
+QUOTES = ('EUR', 'USDT', 'BTC')
+
+# Texto -> valor escalado esperado; con parte entera cero el signo se perdía.
+PARSE_CASES = (
+    ('0.5', 50000000), ('-0.5', -50000000), ('-0.00000001', -1), ('-12.345', -1234500000),
+    ('+3', 300000000), (' 7.1 ', 710000000), ('65012.340000009', 6501234000000),
+)
+
+
+def check_parse():
+    """Casos de ``parse_scaled`` que no dan lo esperado."""
+    from Models.QuoteConverter import parse_scaled
+
+    return [text for text, expected in PARSE_CASES if parse_scaled(text) != expected]
+
+
+def run(rounds, spacing_s, seed):
+    """
+    Rondas de conversión contra los pares directos.
+
+    Args:
+        rounds (int): Rondas (cada una con los precios de su instante).
+        spacing_s (int): Segundos virtuales entre rondas.
+        seed (int): Semilla del Binance simulado.
+
+    Returns:
+        dict: Peticiones con conversión y directas, error por divisa y casos
+        de ``parse_scaled`` que fallan.
+    """
+    sim = Simulator(seed=seed)
+    sim.install()
+
+    try:
+        from Models.QuoteConverter import QuoteConverter, parse_scaled
+
+        binance = sim.binance
+        requests = [0]
+
+        def fetch_raw(crypto, base, priority=None):
+            requests[0] += 1
+
+            return f"{binance.price(crypto + base):.8f}"
+
+        quotes = QuoteConverter(base='USDT', quotes=QUOTES, fetch_raw=fetch_raw)
+        direct = 0
+        errors = {quote: {"max_units": 0, "max_relative": 0.0, "out_of_bound": 0} for quote in QUOTES}
+
+        for _ in range(rounds):
+            quotes.update_fx()
+            prices = {coin: quotes.fetch(coin) for coin in COINS}
+
+            for coin, price in prices.items():
+                for quote in QUOTES:
+                    if coin == quote:
+                        continue
+
+                    direct += 1
+                    expected = parse_scaled(f"{binance.price(coin + quote):.8f}")
+                    units = abs(quotes.convert(price, quote) - expected)
+                    rate = quotes.fx[quote]
+                    bound = 1 + expected * (1 / price + 1 / rate) / 2
+                    error = errors[quote]
+                    error["out_of_bound"] += units > bound
+                    error["max_units"] = max(error["max_units"], units)
+                    error["max_relative"] = max(error["max_relative"], units / expected)
+
+            sim.clock.advance_us(spacing_s * 1000000)
+
+        parse_failures = check_parse()
+    finally:
+        sim.uninstall()
+
+    # Una por moneda y una por tipo de cambio (BTC se pide como las dos: ``update_fx`` va antes)
+    fx = sum(1 for quote in QUOTES if quote != quotes.base and quote not in quotes.pegged)
+    expected_requests = rounds * (len(COINS) + fx)
+
+    for error in errors.values():
+        error["max_relative"] = float(f'{error["max_relative"]:.2e}')
+
+    return {
+        "rounds": rounds,
+        "requests": requests[0],
+        "requests_expected": expected_requests,
+        "requests_direct": direct,
+        "conversion_error": errors,
+        "parse_failures": parse_failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.quotes',
+                                     description='Conversión de divisas frente a los pares directos')
+    parser.add_argument('--rounds', type=int, default=12, help='Rondas de precios')
+    parser.add_argument('--spacing', type=int, default=300, help='Segundos virtuales entre rondas')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla del Binance simulado')
+    args = parser.parse_args()
+
+    report = run(args.rounds, args.spacing, args.seed)
+    print(json.dumps(report, indent=2))
+
+    wrong = sum(error["out_of_bound"] for error in report["conversion_error"].values())
+
+    if wrong:
+        raise SystemExit(f'{wrong} conversiones se alejan del par directo más que el redondeo')
+
+    if report["requests"] != report["requests_expected"]:
+        raise SystemExit(f'{report["requests"]} peticiones en lugar de {report["requests_expected"]}')
+
+    if report["parse_failures"]:
+        raise SystemExit(f'parse_scaled falla con {report["parse_failures"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Ciclo de trabajo de la radio Wi-Fi entre peticiones.
+
+Uso: python -m sim.radio [--hours 6] [--latency 1500:6000] [--press-every 420] [--always-on] [--seed 0]
+
+Arranca el firmware con una radio cuya reconexión tarda un tiempo sorteado
+en ``--latency`` (milisegundos) y mide, desde los eventos del ``WLAN``
+simulado, cuánto tiempo pasa apagada, en cada modo de ahorro del CYW43 y
+sin ahorro. Informa también de los despertares, de su latencia real frente
+a la estimada por el firmware, de las peticiones a Binance que fallaron y de
+lo que tarda en llegar el precio al cambiar de moneda cada
+``--press-every`` segundos. Con ``--always-on`` la radio queda siempre a
+pleno rendimiento, como antes de gestionarla.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+from sim.ratelimit import _load
+
+# Estado de la radio según el ahorro de energía configurado en el CYW43.
+_PM_NAMES = {0xa11140: 'pm_none', 0xa11142: 'pm_performance', 0x111022: 'pm_powersave'}
+
+
+class RadioRun:
+    """
+    Escenario de ciclo de trabajo de la radio.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        latency (tuple): Latencia mínima y máxima de reconexión en ms.
+        press_every (int): Segundos entre cambios de moneda o 0 para ninguno.
+        always_on (bool): Si True, ``WIFI_POWER_SAVE = False``.
+        seed (int): Semilla de los servicios simulados y de las latencias.
+    """
+
+    def __init__(self, hours=6, latency=(1500, 6000), press_every=420, always_on=False, seed=0):
+        self.seconds = hours * 3600
+        self.sim = Simulator(seed=seed, env={"WIFI_POWER_SAVE": not always_on},
+                             timeline_kinds=('wifi', 'http', 'crash', 'reset'))
+        self.sim.network.connect_latency_ms = (int(latency[0]), int(latency[1]))
+        self.confirms = []
+        self.duty = None
+
+        direction = 1
+
+        for t in range(120, int(self.seconds) - 60, press_every) if press_every else ():
+            self.sim.press(t)
+            self.sim.rotate(t + 1, direction)
+            self.sim.at(t + 1.5, self._hook)
+            self.sim.press(t + 2)
+            direction = -direction
+
+        self.sim.at(self.seconds - 0.001, self._capture)
+
+    def _hook(self):
+        # La moneda cambia cuando el bucle ejecuta 'menu-out', no al pulsar: se anota entonces.
+        # Tras un reinicio el firmware crea otra tarea, así que se engancha antes de cada pulsación.
+        job = self.sim.namespace['menu_out_job']
+
+        if getattr(job.callback, 'radio_hook', False):
+            return
+
+        leave_menu = job.callback
+
+        def confirmed():
+            namespace = self.sim.namespace
+            at = self.sim.clock.now_us
+            coin = namespace['menu'].coin(namespace['highlighted'])
+            leave_menu()
+
+            if coin is not None:
+                self.confirms.append((at, namespace['selected_currency']))
+
+        confirmed.radio_hook = True
+        job.callback = confirmed
+
+    def _capture(self):
+        radio = self.sim.namespace.get('radio')
+        self.duty = radio.duty() if radio is not None else None
+
+    def _states(self):
+        # Tiempo en cada estado a partir de los eventos del WLAN simulado.
+        end = self.sim.clock.now_us
+        times = {'off': 0, 'pm_none': 0, 'pm_performance': 0, 'pm_powersave': 0}
+        state, pm, since = 'off', 'pm_performance', 0
+        latencies = []
+        connecting = None
+
+        for t, _, data in self.sim.timeline.filter('wifi'):
+            event = data['event']
+
+            if event == 'active':
+                new = pm if data['value'] else 'off'
+
+                if not data['value']:
+                    pm = 'pm_performance'
+            elif event == 'pm':
+                pm = _PM_NAMES.get(data['value'], 'pm_performance')
+                new = pm if state != 'off' else 'off'
+            else:
+                if event == 'connect':
+                    connecting = t
+                elif event == 'got_ip' and connecting is not None:
+                    latencies.append((t - connecting) / 1000)
+                    connecting = None
+
+                continue
+
+            times[state] += t - since
+            state, since = new, t
+
+        times[state] += end - since
+
+        return times, latencies
+
+    def _price_latencies(self):
+        # El precio llega de /ticker/price o de las estadísticas de 24 h, que también lo traen.
+        prices = [(at, data['url']) for at, _, data in self.sim.timeline.filter('http')
+                  if '/ticker/' in data['url'] and data['status'] == 200]
+        latencies = []
+
+        for at, coin in self.confirms:
+            pair = coin + 'USDT'
+            seen = next((t for t, url in prices if t >= at - 60000000
+                         and (url.endswith('symbol=' + pair) or '%22' + pair + '%22' in url)), None)
+
+            if seen is not None:
+                latencies.append(max(0, seen - at) / 1000000)
+
+        return sorted(latencies)
+
+    def run(self):
+        self.sim.run(self.seconds)
+        times, wakes = self._states()
+        total = sum(times.values()) or 1
+        binance = [data for _, _, data in self.sim.timeline.filter('http') if 'binance' in data['url']]
+        prices = self._price_latencies()
+
+        return {
+            "hours": round(self.seconds / 3600, 2),
+            "radio_on_pct": round((total - times['off']) * 100 / total, 2),
+            "radio_pct": {state: round(t * 100 / total, 2) for state, t in times.items()},
+            "associations": len(wakes),
+            "association_ms_mean": round(sum(wakes) / len(wakes)) if wakes else None,
+            "association_ms_max": round(max(wakes)) if wakes else None,
+            "firmware": self.duty,
+            "binance_requests": len(binance),
+            "binance_failed": sum(1 for data in binance if data['status'] != 200),
+            "coin_changes": len(self.confirms),
+            "coin_change_latency_s_p50": round(prices[len(prices) // 2], 2) if prices else None,
+            "coin_change_latency_s_max": round(prices[-1], 2) if prices else None,
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.radio', description='Ciclo de trabajo de la radio')
+    parser.add_argument('--hours', type=float, default=6, help='Horas virtuales a simular')
+    parser.add_argument('--latency', type=_load, default=(1500, 6000), metavar='MIN:MAX',
+                        help='Latencia de reconexión en ms')
+    parser.add_argument('--press-every', type=int, default=420, help='Segundos entre cambios de moneda (0 = ninguno)')
+    parser.add_argument('--always-on', action='store_true', help='Radio siempre a pleno rendimiento')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = RadioRun(hours=args.hours, latency=args.latency, press_every=args.press_every,
+                        always_on=args.always_on, seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Prueba del gobernador de peso de Binance con otros dispositivos tras la misma IP.
+
+Uso: python -m sim.ratelimit [--hours 6] [--limit 6000] [--load 0.6:1.05] [--press-every 90] [--no-governor] [--seed 0]
+
+Arranca el firmware contra el Binance simulado, que cuenta el peso por
+minuto de la IP y responde 429 y 418 como el real. Otros dispositivos de la
+misma red gastan cada minuto una fracción aleatoria del límite (a veces por
+encima) y el usuario cambia de moneda cada ``--press-every`` segundos. Informa
+de rechazos, peticiones aplazadas por el gobernador, cambios de moneda cuyo
+precio no llegó a actualizarse y la latencia desde que se confirma la moneda
+hasta que llega su precio (cero si ya estaba precargado).
+"""
+
+import argparse
+import json
+import random
+
+from sim import Simulator
+
+
+def _load(text):
+    low, _, high = text.partition(':')
+
+    return float(low), float(high or low)
+
+
+class RateLimitRun:
+    """
+    Escenario de límite de peso compartido.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        limit (int): Peso por minuto de la IP en el servicio simulado.
+        load (tuple): Fracción mínima y máxima del límite que gastan los demás cada minuto.
+        press_every (int): Segundos entre cambios de moneda del usuario.
+        governor (bool): Si False, el gobernador solo observa (como antes de tenerlo).
+        seed (int): Semilla de los servicios simulados y de la carga.
+    """
+
+    def __init__(self, hours=6, limit=6000, load=(0.6, 1.05), press_every=90, governor=True, seed=0):
+        self.seconds = hours * 3600
+        self.sim = Simulator(seed=seed, timeline_kinds=('http', 'crash'))
+        self.sim.binance.weight_limit = limit
+        self.random = random.Random(seed)
+        self.confirms = []
+
+        # Los demás gastan su parte en los primeros 30 s de cada minuto, a tirones.
+        for minute in range(int(self.seconds // 60)):
+            weight = int(limit * self.random.uniform(*load)) // 30
+
+            for second in range(30):
+                self.sim.at(minute * 60 + second, self.sim.binance.charge, weight)
+
+        # El usuario alterna entre dos favoritas: entra al menú, gira y confirma.
+        direction = 1
+
+        for t in range(120, int(self.seconds) - 60, press_every):
+            self.sim.press(t)
+            self.sim.rotate(t + 1, direction)
+            self.sim.press(t + 2)
+            self.sim.at(t + 2.1, self._confirmed, t + 2)
+            direction = -direction
+
+        if not governor:
+            self.sim.at(1, self._disable_governor)
+
+    def _disable_governor(self):
+        self.sim.namespace['governor'].enabled = False
+
+    def _confirmed(self, pressed_at):
+        self.confirms.append((int(pressed_at * 1000000), self.sim.namespace['selected_currency']))
+
+    def _latencies(self, max_age_s=60):
+        # Precio fresco: una respuesta 200 de la moneda como mucho ``max_age_s`` antes de confirmarla.
+        prices = [(at, data['url']) for at, _, data in self.sim.timeline.filter('http')
+                  if '/ticker/price' in data['url'] and data['status'] == 200]
+        latencies = []
+        dropped = 0
+
+        for i, (at, coin) in enumerate(self.confirms):
+            end = self.confirms[i + 1][0] if i + 1 < len(self.confirms) else None
+            seen = next((t for t, url in prices if t >= at - max_age_s * 1000000 and (end is None or t < end)
+                         and url.endswith('symbol=' + coin + 'USDT')), None)
+
+            if seen is None:
+                dropped += 1
+            else:
+                latencies.append(max(0, seen - at) / 1000000)
+
+        return latencies, dropped
+
+    def run(self):
+        self.sim.run(self.seconds)
+        binance = self.sim.binance
+        requests = [data for _, _, data in self.sim.timeline.filter('http') if 'binance' in data['url']]
+        latencies, dropped = self._latencies()
+        latencies.sort()
+
+        return {
+            "hours": round(self.seconds / 3600, 2),
+            "requests": len(requests),
+            "rejected_429": binance.rejected[429],
+            "rejected_418": binance.rejected[418],
+            "governor": self.sim.namespace['governor'].stats,
+            "coin_changes": len(self.confirms),
+            "coin_changes_without_fresh_price": dropped,
+            "latency_s_p50": round(latencies[len(latencies) // 2], 2) if latencies else None,
+            "latency_s_p95": round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+            "latency_s_max": round(latencies[-1], 2) if latencies else None,
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.ratelimit', description='Gobernador de peso de Binance')
+    parser.add_argument('--hours', type=float, default=6, help='Horas virtuales a simular')
+    parser.add_argument('--limit', type=int, default=6000, help='Peso por minuto de la IP')
+    parser.add_argument('--load', type=_load, default=(0.6, 1.05), metavar='MIN:MAX',
+                        help='Fracción del límite que gastan los demás dispositivos cada minuto')
+    parser.add_argument('--press-every', type=int, default=90, help='Segundos entre cambios de moneda')
+    parser.add_argument('--no-governor', action='store_true', help='Solo observar, sin aplazar peticiones')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = RateLimitRun(hours=args.hours, limit=args.limit, load=args.load, press_every=args.press_every,
+                            governor=not args.no_governor, seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
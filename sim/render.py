@@ -0,0 +1,125 @@
+"""
+Bytes por bus y tiempo de dibujado de cada pantalla.
+
+Uso: python -m sim.render [--hours 6] [--seed 0]
+
+Arranca el firmware con el MAX7219 y la OLED (``OLED = True``), cambia de
+vista cada 10 minutos y de moneda cada 30, y mide por pantalla los
+fotogramas, los bytes que envía por su bus en cada uno y el tiempo de CPU
+del anfitrión en formatearlos y dibujarlos en RAM. Repite la prueba
+enviando cada fotograma entero, como antes de seguir los cambios, y compara.
+"""
+
+import argparse
+import json
+import time
+
+from sim import Simulator
+
+# Instante en que se empieza a medir: el arranque ya ha dibujado su primer fotograma.
+_START_S = 30
+
+
+class RenderRun:
+    """
+    Escenario de las dos pantallas.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        full (bool): Si True, cada fotograma se envía entero.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, hours=6, full=False, seed=0):
+        self.seconds = hours * 3600
+        self.full = full
+        self.sim = Simulator(seed=seed, env={"OLED": True}, timeline_kinds=('display', 'oled', 'crash', 'reset'))
+        self.draw_s = {}
+        self.bus = None
+
+        self.sim.at(_START_S, self._instrument)
+
+        for t in range(300, int(self.seconds) - 60, 600):
+            if t % 1800 == 0:
+                # Cambio de moneda: menú, una posición y confirmar
+                self.sim.press(t)
+                self.sim.rotate(t + 1, 1 if t % 3600 else -1)
+                self.sim.press(t + 2)
+            else:
+                self.sim.rotate(t, 1)
+
+    def _instrument(self):
+        renderer = self.sim.namespace['renderer']
+
+        for stats in renderer.stats.values():
+            for key in stats:
+                stats[key] = 0
+
+        for output in renderer.outputs:
+            self.draw_s[output.name] = 0.0
+            output.draw = self._timed(output.name, output.draw)
+
+        if self.full:
+            show = renderer.show
+
+            def full_show(frame):
+                renderer.invalidate()
+                show(frame)
+
+            renderer.show = full_show
+
+        self.bus = dict(self.sim.timeline.volume)
+
+    def _timed(self, name, draw):
+        def timed(frame):
+            started = time.perf_counter()
+            draw(frame)
+            self.draw_s[name] += time.perf_counter() - started
+
+        return timed
+
+    def run(self):
+        self.sim.run(self.seconds)
+        report = self.sim.namespace['renderer'].report()
+        volume = self.sim.timeline.volume
+        outputs = {}
+
+        for name, bus in (('max7219', 'spi'), ('oled', 'i2c')):
+            stats = report.get(name)
+
+            if stats is None:
+                continue
+
+            frames = stats["frames"] or 1
+            outputs[name] = {
+                "frames": stats["frames"],
+                "bytes_per_frame": stats["bytes_per_frame"],
+                "bus_bytes": volume.get(bus, 0) - self.bus.get(bus, 0),
+                "bus_us_per_frame": stats["us_per_frame"],
+                "draw_us_per_frame": round(self.draw_s[name] * 1000000 / frames, 1),
+            }
+
+        return {
+            "outputs": outputs,
+            "display_updates": self.sim.timeline.count('display'),
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.render', description='Bytes por bus y tiempo de dibujado')
+    parser.add_argument('--hours', type=float, default=6, help='Horas virtuales a simular')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    dirty = RenderRun(hours=args.hours, seed=args.seed).run()
+    full = RenderRun(hours=args.hours, full=True, seed=args.seed).run()
+
+    saved = {name: round(100 - stats["bus_bytes"] * 100 / full["outputs"][name]["bus_bytes"], 1)
+             for name, stats in dirty["outputs"].items() if full["outputs"][name]["bus_bytes"]}
+
+    print(json.dumps({"dirty": dirty, "full": full, "bus_bytes_saved_pct": saved}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Grabación y reproducción de lo que llega de fuera al firmware.
+
+Uso: python -m sim.replay record.bin [--speed 1] [--seconds N] [--timeline timeline.json]
+     python -m sim.replay --make record.bin [--seconds 1800] [--seed 0]
+
+Reproduce una grabación hecha con ``RECORD = True`` (``record.bin`` en la
+flash de la Pico, ver ``Models.Recorder``): las respuestas de Binance y de
+worldtimeapi se sirven en el orden grabado para cada URL y con su latencia,
+los flancos del encoder y de los botones llegan a los pines en el mismo
+microsegundo y el ADC devuelve las lecturas grabadas. La red Wi-Fi y el NTP
+siguen simulados. Sin ``--speed`` corre lo más rápido posible; con
+``--speed 1`` a tiempo real.
+
+Con ``--make`` primero graba una sesión simulada (giros, menú, cambios de
+moneda) con el firmware tal cual, la reproduce y compara lo que mostró la
+pantalla en las dos ejecuciones.
+
+El resumen incluye ``display_digest``, una huella de lo que mostró la
+pantalla y cuándo: dos ejecuciones con la misma huella se comportaron igual.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+from collections import deque
+
+from sim import Simulator
+from sim.urequests import Response
+
+# Formato de ``Models.Recorder``
+MAGIC = b'CWR1'
+PIN = 1
+ADC = 2
+HTTP = 3
+
+_HEADER = struct.Struct('>4sI')
+_RECORD = struct.Struct('>BIH')
+_PIN = struct.Struct('>BB')
+_ADC = struct.Struct('>BH')
+_HTTP = struct.Struct('>hIHHI')
+
+# Hosts cuyas respuestas se graban (``Models.Api``).
+_HOSTS = ('api.binance.com', 'worldtimeapi.org')
+
+
+def read_recording(path):
+    """
+    Lee una grabación.
+
+    Returns:
+        tuple: ``(inicio_us, registros)`` con cada registro como ``(us, tipo, datos)``;
+            ``us`` cuenta desde ``inicio_us``, el ``ticks_us`` al empezar a grabar.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, start = _HEADER.unpack_from(data, 0)
+
+    if magic != MAGIC:
+        raise ValueError(f'{path} no es una grabación del firmware')
+
+    records = []
+    offset = _HEADER.size
+
+    while offset + _RECORD.size <= len(data):
+        kind, ms, us = _RECORD.unpack_from(data, offset)
+        at = ms * 1000 + us
+        offset += _RECORD.size
+
+        if kind == PIN:
+            pin, value = _PIN.unpack_from(data, offset)
+            offset += _PIN.size
+            records.append((at, kind, {"pin": pin, "value": value}))
+        elif kind == ADC:
+            channel, value = _ADC.unpack_from(data, offset)
+            offset += _ADC.size
+            records.append((at, kind, {"channel": channel, "value": value}))
+        elif kind == HTTP:
+            status, latency, url_len, headers_len, body_len = _HTTP.unpack_from(data, offset)
+            offset += _HTTP.size
+            url = data[offset:offset + url_len].decode()
+            offset += url_len
+            headers = dict(line.split(':', 1) for line in data[offset:offset + headers_len].decode().splitlines())
+            offset += headers_len
+            body = data[offset:offset + body_len]
+            offset += body_len
+            records.append((at, kind, {"url": url, "status": status, "latency_us": latency,
+                                       "headers": headers, "body": body}))
+        else:
+            raise ValueError(f'Registro desconocido {kind} en el byte {offset - _RECORD.size}')
+
+    return start, records
+
+
+class ReplayService:
+    """
+    Sirve las respuestas grabadas: cada URL recibe las suyas en el orden grabado.
+
+    Una petición sin respuesta grabada recibe un 503 y cuenta como fallo de
+    la reproducción (el firmware pidió algo distinto de lo que pidió al
+    grabar).
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        records (list): Registros HTTP de ``read_recording``.
+    """
+
+    def __init__(self, sim, records):
+        self.sim = sim
+        self.queues = {}
+        self.served = 0
+        self.misses = []
+
+        for _, _, data in records:
+            self.queues.setdefault(data["url"], deque()).append(data)
+
+    def __call__(self, request):
+        queue = self.queues.get(request.url)
+
+        if not queue:
+            self.misses.append(request.url)
+            return 503, {"code": -1, "msg": "Sin respuesta grabada"}
+
+        data = queue.popleft()
+        self.served += 1
+
+        # La latencia grabada sustituye a la del router
+        self.sim.clock.advance_us(data["latency_us"])
+
+        if data["status"] < 100:
+            raise OSError(-data["status"])
+
+        return Response(data["status"], data["body"], dict(data["headers"]))
+
+    def unused(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+
+class ReplayRun:
+    """
+    Reproduce una grabación en el firmware simulado.
+
+    Args:
+        path (str): Fichero de la grabación.
+        seconds (float): Segundos virtuales a simular (None = hasta el último registro y 10 s más).
+        speed (float): Velocidad respecto al tiempo real o None para ir lo más rápido posible.
+        seed (int): Semilla de la red y los servicios que siguen simulados.
+    """
+
+    def __init__(self, path, seconds=None, speed=None, seed=0):
+        self.start, self.records = read_recording(path)
+        last = max((record[0] for record in self.records), default=0)
+        self.seconds = seconds if seconds is not None else (self.start + last) / 1000000 + 10
+        self.sim = Simulator(seed=seed, speed=speed, timeline_kinds=('display', 'http', 'pin', 'crash', 'reset'))
+
+        http = [record for record in self.records if record[1] == HTTP]
+        self.service = ReplayService(self.sim, http)
+
+        for host in _HOSTS:
+            self.sim.http.route(host, self.service, latency_ms=0)
+
+        self.adc = {}
+        self.adc_reads = 0
+
+        for at, kind, data in self.records:
+            if kind == PIN:
+                self.sim.clock.schedule(self.start + at, self.sim.board.drive, data["pin"], data["value"])
+            elif kind == ADC:
+                self.adc.setdefault(data["channel"], deque()).append(data["value"])
+
+        for channel, values in self.adc.items():
+            # Como ``machine.ADC``: los GPIO26-29 son los canales 0-3
+            self.sim.board.set_adc(channel - 26 if channel >= 26 else channel, self._adc_source(values))
+
+    def _adc_source(self, values):
+        last = [values[0] if values else 0]
+
+        def source(t):
+            self.adc_reads += 1
+
+            if values:
+                last[0] = values.popleft()
+
+            return last[0]
+
+        return source
+
+    def run(self):
+        started = time.perf_counter()
+        summary = self.sim.run(self.seconds)
+        counts = {name: sum(1 for record in self.records if record[1] == kind)
+                  for name, kind in (("http", HTTP), ("pins", PIN), ("adc", ADC))}
+
+        return {
+            "elapsed_s": summary["elapsed_s"],
+            "wall_time_s": round(time.perf_counter() - started, 2),
+            "recorded": counts,
+            "http_served": self.service.served,
+            "http_unused": self.service.unused(),
+            "http_misses": len(self.service.misses),
+            "adc_reads": self.adc_reads,
+            "display_updates": summary["display_updates"],
+            "display_digest": display_digest(self.sim),
+            "crashed": self.sim.error is not None,
+        }
+
+
+class RecordRun:
+    """
+    Graba una sesión simulada con ``RECORD = True``: giros, menú y cambios de moneda.
+
+    Args:
+        seconds (float): Segundos virtuales a grabar.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, seconds=1800, seed=0):
+        self.seconds = seconds
+        self.sim = Simulator(seed=seed, env={"RECORD": True}, timeline_kinds=('display', 'crash', 'reset'))
+        direction = 1
+
+        for t in range(60, int(seconds) - 30, 240):
+            self.sim.rotate(t, 2 * direction)
+            self.sim.press(t + 20)
+            self.sim.rotate(t + 22, direction, step_ms=8)
+            self.sim.press(t + 24)
+            direction = -direction
+
+    def run(self, path):
+        summary = self.sim.run(self.seconds)
+        shutil.copyfile(os.path.join(self.sim.flash_dir, 'record.bin'), path)
+
+        return {
+            "bytes": os.path.getsize(path),
+            "display_updates": summary["display_updates"],
+            "display_digest": display_digest(self.sim),
+            "crashed": self.sim.error is not None,
+        }
+
+
+def display_digest(sim):
+    """Huella de lo que mostró la pantalla y en qué milisegundo."""
+    digest = hashlib.sha1()
+
+    for t, _, data in sim.timeline.filter('display'):
+        digest.update(f'{t // 1000}:{data["text"]}:{data["intensity"]}\n'.encode())
+
+    return digest.hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.replay', description='Reproduce una grabación del firmware')
+    parser.add_argument('path', help='Fichero de la grabación (record.bin)')
+    parser.add_argument('--make', action='store_true', help='Graba antes una sesión simulada en el fichero')
+    parser.add_argument('--seconds', type=float, default=None,
+                        help='Segundos virtuales (al grabar, 1800; al reproducir, hasta el último registro)')
+    parser.add_argument('--speed', type=float, default=None, help='Velocidad respecto al tiempo real (1 = tiempo real)')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de la red y los servicios simulados')
+    parser.add_argument('--timeline', help='Guarda la línea temporal de la reproducción en este fichero JSON')
+    args = parser.parse_args()
+
+    result = {}
+    seconds = args.seconds
+
+    if args.make:
+        seconds = seconds or 1800
+        result["recording"] = RecordRun(seconds=seconds, seed=args.seed).run(args.path)
+
+    scenario = ReplayRun(args.path, seconds=seconds, speed=args.speed, seed=args.seed)
+    result["replay"] = scenario.run()
+
+    if args.make:
+        result["identical"] = result["recording"]["display_digest"] == result["replay"]["display_digest"]
+
+    if args.timeline:
+        scenario.sim.timeline.to_json(args.timeline)
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""
+Estado compartido entre los módulos falsos del simulador.
+
+Solo hay un dispositivo simulado activo por proceso: ``machine``,
+``network``, ``time``... consultan aquí el simulador en curso.
+"""
+
+active = None
+
+
+def get():
+    if active is None:
+        raise RuntimeError('No hay ningún simulador activo')
+
+    return active
+
+
+def clock():
+    return get().clock
+
+
+def timeline():
+    return get().timeline
@@ -0,0 +1,76 @@
+"""
+Sustituto de ``select`` para objetos de tipo stream de MicroPython.
+
+Un objeto está listo si su ``ioctl(MP_STREAM_POLL, eventos)`` devuelve algo
+distinto de cero, igual que en ``select.poll`` de MicroPython. Esperar no
+consume tiempo real: se avanza el reloj virtual hasta el timeout o hasta
+que un evento (una IRQ, un timer...) deje algún objeto listo.
+
+Los sockets reales del anfitrión (sin ``ioctl``) se consultan con el
+``select`` del sistema sin esperar.
+"""
+
+import select as _host_select
+
+from sim import runtime
+
+POLLIN = 0x0001
+POLLOUT = 0x0004
+POLLERR = 0x0008
+POLLHUP = 0x0010
+
+_MP_STREAM_POLL = 3
+
+
+class poll:
+    def __init__(self):
+        self._registered = {}
+
+    def register(self, obj, eventmask=POLLIN | POLLOUT):
+        self._registered[id(obj)] = (obj, eventmask)
+
+    def unregister(self, obj):
+        self._registered.pop(id(obj), None)
+
+    def modify(self, obj, eventmask):
+        self._registered[id(obj)] = (obj, eventmask)
+
+    def _ready(self):
+        ready = []
+
+        for obj, mask in self._registered.values():
+            if hasattr(obj, 'ioctl'):
+                events = obj.ioctl(_MP_STREAM_POLL, mask)
+            else:
+                readable, writable, _ = _host_select.select([obj] if mask & POLLIN else [],
+                                                            [obj] if mask & POLLOUT else [], [], 0)
+                events = (POLLIN if readable else 0) | (POLLOUT if writable else 0)
+
+            if events:
+                ready.append((obj, events))
+
+        return ready
+
+    def poll(self, timeout=-1):
+        clock = runtime.clock()
+        clock.catch_up()
+        ready = self._ready()
+
+        if ready or timeout == 0:
+            return ready
+
+        # Con el reloj acompasado, la espera real termina en cuanto un socket del anfitrión esté listo.
+        host = [obj for obj, _ in self._registered.values() if not hasattr(obj, 'ioctl')]
+
+        if host and clock.speed is not None:
+            clock.wait = lambda seconds: _host_select.select(host, [], [], seconds)
+
+        try:
+            clock.sleep_us(None if timeout < 0 else timeout * 1000, until=lambda: bool(self._ready()))
+        finally:
+            clock.wait = None
+
+        return self._ready()
+
+    def ipoll(self, timeout=-1, flags=0):
+        return iter(self.poll(timeout))
@@ -0,0 +1,428 @@
+"""
+Servicios HTTP simulados: terceros (Binance, worldtimeapi...) y la API propia.
+"""
+
+import json
+import math
+import random
+import time as _host_time
+from urllib.parse import unquote
+
+
+class BinanceStandIn:
+    """
+    Imita la API pública de Binance con precios en paseo aleatorio.
+
+    Los precios se guardan en USD por activo y cada par se calcula como
+    ``usd(base) / usd(quote)``. La evolución depende solo de la semilla y del
+    instante virtual de cada consulta, así que las simulaciones son
+    reproducibles.
+
+    Como Binance, cuenta el peso de las peticiones por minuto de reloj
+    (compartido por todos los dispositivos del simulador, como tras una misma
+    IP) y lo devuelve en ``X-MBX-USED-WEIGHT-1M``. Pasado ``weight_limit``
+    responde 429 con ``Retry-After``; una petición antes de ese plazo bloquea
+    la IP con 418 durante un tiempo que se duplica en cada reincidencia.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        seed (int): Semilla del paseo aleatorio.
+        volatility (float): Desviación típica del cambio por minuto.
+        weight_limit (int): Peso por minuto permitido a la IP.
+    """
+
+    USD_PRICES = {
+        "BTC": 65000.0, "ETH": 3200.0, "BNB": 580.0, "SOL": 150.0,
+        "ADA": 0.45, "DOT": 6.5, "XRP": 0.55, "DOGE": 0.12,
+        "EUR": 1.08, "USDT": 1.0, "USDC": 1.0, "USD": 1.0,
+    }
+
+    STABLE = ("USDT", "USDC", "USD")
+
+    # Segundos de cada intervalo de velas admitido.
+    KLINE_INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+
+    # Peso de cada endpoint (los de un solo símbolo).
+    WEIGHTS = {"/api/v3/klines": 2, "/api/v3/ticker/price": 2}
+
+    # Primer bloqueo por 418, en segundos; cada reincidencia lo duplica.
+    BAN_S = 120
+
+    def __init__(self, sim, seed=0, volatility=0.001, weight_limit=6000):
+        self.sim = sim
+        self.random = random.Random(seed)
+        self.volatility = volatility
+        self.usd = dict(self.USD_PRICES)
+        self.minute = 0
+        self.requests = 0
+
+        self.weight_limit = weight_limit
+        self.used = 0
+        self.rejected = {429: 0, 418: 0}
+        self._window = None
+        self._retry_until = 0
+        self._banned_until = 0
+        self._ban_s = 0
+
+    def _advance(self):
+        minute = self.sim.clock.now_us // 60000000
+
+        while self.minute < minute:
+            self.minute += 1
+
+            for asset in self.usd:
+                if asset not in self.STABLE:
+                    self.usd[asset] *= math.exp(self.random.gauss(0, self.volatility))
+
+    def split_symbol(self, symbol):
+        """Separa un símbolo como 'ADAEUR' en ('ADA', 'EUR') o None."""
+        for quote in ("USDT", "USDC", "EUR", "BTC", "ETH", "BNB", "USD"):
+            if symbol.endswith(quote) and symbol[:-len(quote)] in self.usd:
+                return symbol[:-len(quote)], quote
+
+        return None
+
+    def price(self, symbol):
+        """Precio actual del par o None si no existe."""
+        self._advance()
+        pair = self.split_symbol(symbol)
+
+        if pair is None:
+            return None
+
+        return self.usd[pair[0]] / self.usd[pair[1]]
+
+    def curve(self, asset, t):
+        """
+        Precio histórico en USD de un activo en el instante unix ``t``.
+
+        Las velas no salen del paseo aleatorio (que solo avanza desde el
+        arranque de la simulación) sino de una curva determinista que existe
+        también antes del arranque, para poder pedir días de historial.
+        """
+        if asset in self.STABLE:
+            return 1.0
+
+        phase = sum(map(ord, asset))
+        daily = 0.03 * math.sin(2 * math.pi * t / 86400 + phase)
+        weekly = 0.08 * math.sin(2 * math.pi * t / (5 * 86400) + phase / 7)
+
+        return self.USD_PRICES[asset] * math.exp(daily + weekly)
+
+    def kline(self, pair, open_s, seconds):
+        """Vela de un par con el formato de ``/api/v3/klines``."""
+        base, quote = pair
+        samples = [self.curve(base, open_s + seconds * i / 4) / self.curve(quote, open_s + seconds * i / 4)
+                   for i in range(5)]
+        volume = 1000 + (open_s // seconds * 7919) % 5000
+
+        return [open_s * 1000, f"{samples[0]:.8f}", f"{max(samples):.8f}", f"{min(samples):.8f}",
+                f"{samples[-1]:.8f}", f"{volume:.8f}", (open_s + seconds) * 1000 - 1, "0.00000000",
+                100, "0.00000000", "0.00000000", "0"]
+
+    def pairs(self):
+        """Todos los pares que existen, como la lista completa de Binance."""
+        return [base + quote for quote in ("USDT", "USDC", "EUR", "BTC", "ETH", "BNB")
+                for base in self.USD_PRICES if base != quote and base not in self.STABLE + ("EUR",)]
+
+    def mini_ticker(self, symbol):
+        """Estadísticas de 24 h de un par con el formato de ``type=MINI``."""
+        base, quote = self.split_symbol(symbol)
+        now = self.sim.clock.time()
+        last = self.price(symbol)
+
+        # La apertura sale de la curva de las velas; máximo y mínimo, de muestras por el camino.
+        ratio = [self.curve(base, now - 86400 + 3600 * i) / self.curve(base, now)
+                 * self.curve(quote, now) / self.curve(quote, now - 86400 + 3600 * i) for i in range(25)]
+        prices = [last * r for r in ratio]
+
+        return {"symbol": symbol, "openPrice": f"{prices[0]:.8f}", "highPrice": f"{max(prices):.8f}",
+                "lowPrice": f"{min(prices):.8f}", "lastPrice": f"{last:.8f}", "volume": "12345.67800000",
+                "quoteVolume": f"{12345.678 * last:.8f}", "openTime": (now - 86400) * 1000,
+                "closeTime": now * 1000, "firstId": 1, "lastId": 100000, "count": 100000}
+
+    def ticker_24hr(self, request):
+        if 'symbols' in request.query:
+            symbols = json.loads(unquote(request.query['symbols']))
+        elif 'symbol' in request.query:
+            symbols = None
+        else:
+            symbols = self.pairs()
+
+        if symbols is None:
+            if self.split_symbol(request.query['symbol']) is None:
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+
+            return 200, self.mini_ticker(request.query['symbol'])
+
+        if any(self.split_symbol(symbol) is None for symbol in symbols):
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+
+        # Sin espacios, como la API real.
+        return 200, json.dumps([self.mini_ticker(symbol) for symbol in symbols], separators=(',', ':'))
+
+    def weight(self, request):
+        """Peso de una petición."""
+        if request.path == '/api/v3/ticker/24hr':
+            if 'symbol' in request.query:
+                return 2
+
+            count = len(request.query['symbols'].split('%2C')) if 'symbols' in request.query else 0
+
+            return 80 if not count or count > 100 else 2 if count <= 20 else 40
+
+        return self.WEIGHTS.get(request.path, 1)
+
+    def klines(self, request):
+        pair = self.split_symbol(request.query.get('symbol', ''))
+        seconds = self.KLINE_INTERVALS.get(request.query.get('interval'))
+
+        if pair is None or seconds is None:
+            return 400, {"code": -1121, "msg": "Invalid symbol or interval."}
+
+        limit = min(1000, int(request.query.get('limit', 500)))
+        now = self.sim.clock.time()
+        current = now - now % seconds
+
+        if 'startTime' in request.query:
+            start = int(request.query['startTime']) // 1000
+            start += -start % seconds
+        else:
+            start = current - (limit - 1) * seconds
+
+        # Como Binance, la última vela puede ser la que está en curso.
+        return 200, [self.kline(pair, t, seconds) for t in range(start, min(current, start + (limit - 1) * seconds) + 1, seconds)]
+
+    def charge(self, weight):
+        """
+        Suma peso al minuto en curso; sirve también para simular otros
+        dispositivos tras la misma IP.
+
+        Returns:
+            int: Peso usado en el minuto.
+        """
+        window = self.sim.clock.time() // 60
+
+        if window != self._window:
+            self._window = window
+            self.used = 0
+
+        self.used += weight
+
+        return self.used
+
+    def __call__(self, request):
+        self.requests += 1
+        now = self.sim.clock.time()
+
+        if now < self._banned_until or now < self._retry_until:
+            # Seguir tras un 429 bloquea la IP (y alarga el bloqueo en curso).
+            self._ban_s = self._ban_s * 2 if self._ban_s else self.BAN_S
+            self._banned_until = max(self._banned_until, now + self._ban_s)
+            self._retry_until = 0
+            self.rejected[418] += 1
+
+            return 418, {"code": -1003, "msg": "Way too many requests; IP banned."}, \
+                {"Retry-After": str(self._banned_until - now)}
+
+        used = self.charge(self.weight(request))
+        headers = {"x-mbx-used-weight-1m": str(used), "Content-Type": "application/json"}
+
+        if used > self.weight_limit:
+            self._retry_until = now - now % 60 + 60
+            self.rejected[429] += 1
+            headers["Retry-After"] = str(self._retry_until - now)
+
+            return 429, {"code": -1003, "msg": "Too many requests."}, headers
+
+        return self.respond(request) + (headers,)
+
+    def respond(self, request):
+        if request.path == '/api/v3/klines':
+            return self.klines(request)
+
+        if request.path == '/api/v3/ticker/24hr':
+            return self.ticker_24hr(request)
+
+        if request.path == '/api/v3/ticker/price':
+            symbol = request.query.get('symbol', '')
+            price = self.price(symbol)
+
+            if price is None:
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+
+            return 200, {"symbol": symbol, "price": f"{price:.8f}"}
+
+        return 404, {"code": -1, "msg": "Not found"}
+
+
+class WorldTimeStandIn:
+    """
+    Imita ``worldtimeapi.org/api/timezone/Etc/UTC.json`` con la hora virtual.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def __call__(self, request):
+        clock = self.sim.clock
+        t = _host_time.gmtime(clock.time())
+        micros = clock.now_us % 1000000
+
+        return 200, {
+            "datetime": _host_time.strftime('%Y-%m-%dT%H:%M:%S', t) + f'.{micros:06d}+00:00',
+            "day_of_week": (t.tm_wday + 1) % 7,
+            "day_of_year": t.tm_yday,
+            "week_number": int(_host_time.strftime('%V', t)),
+            "unixtime": clock.time(),
+            "timezone": "Etc/UTC",
+        }
+
+
+def decode_batch(body):
+    """
+    Expande un lote de ``TelemetryQueue`` a registros completos.
+
+    Returns:
+        tuple: ((boot, seq), lista de (timestamp, dict)).
+    """
+    batch = json.loads(body)
+    fields = batch["fields"]
+    records = []
+    current = {}
+
+    for row in batch["rows"]:
+        dt, mask, values = row[0], row[1], iter(row[2:])
+        current = dict(current)
+
+        for bit, key in enumerate(fields):
+            if mask & (1 << bit):
+                current[key] = next(values)
+
+        records.append((batch["t0"] + dt, {k: v for k, v in current.items() if v is not None}))
+
+    return (batch["boot"], batch["seq"]), records
+
+
+class TelemetryReceiverStandIn:
+    """
+    Receptor de lotes de telemetría de la API propia.
+
+    Descomprime cada lote, descarta los repetidos por (arranque, secuencia) y
+    guarda los registros. Con ``down = True`` responde 503, como un servidor
+    caído, para probar los reintentos sin cortar el Wi-Fi.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        token (str): Token Bearer esperado.
+    """
+
+    def __init__(self, sim, token):
+        self.sim = sim
+        self.token = token
+        self.down = False
+        self.records = []
+        self.seqs = set()
+        self.batches = 0
+        self.duplicates = 0
+        self.bytes = 0
+
+    def __call__(self, request):
+        if self.down:
+            return 503, {"error": "unavailable"}
+
+        if request.method != 'POST':
+            return 405, {"error": "method not allowed"}
+
+        if request.headers.get('Authorization') != 'Bearer ' + self.token:
+            return 401, {"error": "unauthorized"}
+
+        key, records = decode_batch(request.body)
+        self.bytes += len(request.body)
+
+        if key in self.seqs:
+            self.duplicates += 1
+        else:
+            self.seqs.add(key)
+            self.batches += 1
+            self.records.extend(records)
+
+        return 201, {"accepted": len(records)}
+
+
+class NtpStandIn:
+    """
+    Servidor SNTP simulado (modo 4) con retardo y desfase inyectables.
+
+    La hora del servidor es la hora "real": la virtual más ``offset_ms`` y un
+    desfase que crece ``skew_ppm`` por millón, que equivale a que el cristal
+    del dispositivo derive en sentido contrario. El retardo de cada sentido es
+    ``delay_ms`` repartido según ``asymmetry`` (0 = simétrico, 1 = todo en la
+    ida) más un ruido uniforme de ``jitter_ms``.
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+        offset_ms (int): Diferencia inicial entre la hora real y la virtual.
+        skew_ppm (float): Deriva de la hora real respecto al reloj virtual.
+        delay_ms (float): Ida y vuelta de la red sin contar el ruido.
+        asymmetry (float): Parte del retardo que se va en la ida, entre -1 y 1.
+        jitter_ms (float): Ruido máximo añadido a cada sentido.
+        loss (float): Probabilidad de que no haya respuesta.
+        seed (int): Semilla del ruido.
+    """
+
+    NTP_DELTA = 2208988800
+
+    def __init__(self, sim, offset_ms=0, skew_ppm=0.0, delay_ms=40, asymmetry=0.0,
+                 jitter_ms=0, loss=0.0, seed=0):
+        self.sim = sim
+        self.offset_ms = offset_ms
+        self.skew_ppm = skew_ppm
+        self.delay_ms = delay_ms
+        self.asymmetry = asymmetry
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def true_us(self, virtual_us):
+        """Hora real (unix en microsegundos) en un instante virtual."""
+        clock = self.sim.clock
+
+        return (clock.epoch * 1000000 + virtual_us + self.offset_ms * 1000
+                + int(virtual_us * self.skew_ppm / 1000000))
+
+    def _leg_us(self, share):
+        jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+
+        return int((self.delay_ms * share + jitter) * 1000)
+
+    def _timestamp(self, unix_us):
+        seconds, micros = divmod(unix_us, 1000000)
+
+        return (seconds + self.NTP_DELTA).to_bytes(4, 'big') + ((micros << 32) // 1000000).to_bytes(4, 'big')
+
+    def __call__(self, data, sent_us):
+        self.requests += 1
+
+        if len(data) < 48 or data[0] & 0x07 != 3 or self.random.random() < self.loss:
+            return None
+
+        received_us = sent_us + self._leg_us((1 + self.asymmetry) / 2)
+        replied_us = received_us + 50
+        arrive_us = replied_us + self._leg_us((1 - self.asymmetry) / 2)
+
+        reply = bytearray(48)
+        reply[0] = (data[0] & 0x38) | 0x04
+        reply[1] = 2
+        reply[2] = data[2]
+        reply[3] = 0xEC
+        reply[12:16] = b'SIM\x00'
+        reply[24:32] = data[40:48]
+        reply[32:40] = self._timestamp(self.true_us(received_us))
+        reply[40:48] = self._timestamp(self.true_us(replied_us))
+
+        return bytes(reply), arrive_us
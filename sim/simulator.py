@@ -0,0 +1,284 @@
+import binascii
+import builtins
+import gc as _host_gc
+import json
+import os
+import sys
+import tempfile
+import types
+
+from sim import runtime
+from sim import framebuf, machine, network, select, urequests, usocket, utime
+from sim.clock import DeviceReset, SimulationEnd, VirtualClock
+from sim.devices import Max7219Monitor, Ssd1306Monitor
+from sim.http import HttpRouter
+from sim.services import BinanceStandIn, NtpStandIn, TelemetryReceiverStandIn, WorldTimeStandIn
+from sim.timeline import Timeline
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Pines del montaje descrito en el README.
+PIN_ENCODER_CLK = 14
+PIN_ENCODER_DT = 15
+PIN_ENCODER_SW = 13
+PIN_BUTTON_DOWN = 16
+PIN_BUTTON_UP = 17
+
+DEFAULT_ENV = {
+    "HOSTNAME": "CryptoWatchDog",
+    "AP_NAME": "SimAP",
+    "AP_PASS": "simpass",
+    "ALTERNATIVES_AP": [],
+    "RELAY": False,
+    "HTTP_SERVER": False,
+    "HTTP_PORT": 8080,
+    "TELEMETRY": False,
+    "API_URL": "http://telemetry.sim",
+    "API_PATH": "/api/v1/telemetry",
+    "API_TOKEN": "sim-token",
+    "DEVICE_ID": 1,
+    "NTP_HOST": "pool.ntp.org",
+    "KLINES": True,
+    "TICKER": True,
+    "ALERTS": {},
+    "BINANCE_WEIGHT": 600,
+    "WATCHDOG": True,
+    "WIFI_POWER_SAVE": True,
+    "TRACE": False,
+    "RECORD": False,
+    "BATTERY_PIN": None,
+    "OLED": False,
+    "DEBUG": False,
+}
+
+
+def _micropython_module(sim):
+    module = types.ModuleType('micropython')
+    module.const = lambda value: value
+    module.native = module.viper = lambda f: f
+    module.alloc_emergency_exception_buf = lambda size: None
+    module.opt_level = lambda level=None: 0
+    module.mem_info = lambda verbose=None: None
+    module.schedule = lambda func, arg: sim.clock.schedule_in(0, func, arg) and None
+
+    return module
+
+
+def _gc_module():
+    module = types.ModuleType('gc')
+    module.__getattr__ = lambda name: getattr(_host_gc, name)
+    module.mem_free = lambda: 180000
+    module.mem_alloc = lambda: 84000
+    module.threshold = lambda amount=None: -1
+
+    return module
+
+
+class Simulator:
+    """
+    Ejecuta el firmware de ``src/`` en CPython sobre un reloj virtual.
+
+    Instala módulos falsos de ``machine``, ``network``, ``urequests``,
+    ``time`` y ``env`` mientras corre el firmware, de modo que ``main.py`` y
+    los modelos se ejecutan sin modificar. Dormir no consume tiempo real, por
+    lo que un día de funcionamiento se simula en segundos.
+
+    Args:
+        src_dir (str): Directorio del firmware. Por defecto ``src/``.
+        seed (int): Semilla de los servicios simulados.
+        env (dict): Valores que sobrescriben el ``env.py`` simulado.
+        http_latency_ms (int): Latencia de ida y vuelta de las peticiones HTTP.
+        timeline_kinds (iterable): Tipos de evento a guardar (None = todos).
+        max_resets (int): Reinicios de ``machine.reset()`` permitidos.
+        speed (float): Velocidad respecto al tiempo real (None = lo más rápido posible).
+        flash_dir (str): Directorio que hace de flash (None = uno temporal). Se
+            conserva entre reinicios del firmware.
+        cpu_scale (float): Si se indica, el tiempo de CPU del anfitrión por este
+            factor también avanza el reloj (ver ``VirtualClock``).
+    """
+
+    def __init__(self, src_dir=SRC_DIR, seed=0, env=None, http_latency_ms=120,
+                 timeline_kinds=None, max_resets=10, speed=None, flash_dir=None, cpu_scale=None):
+        self.src_dir = src_dir
+        self.max_resets = max_resets
+        self.clock = VirtualClock(speed=speed, cpu_scale=cpu_scale)
+        self.timeline = Timeline(self.clock, timeline_kinds)
+        self.board = machine.Board(self)
+
+        self.env = dict(DEFAULT_ENV)
+        self.env.update(env or {})
+
+        access_points = [(self.env["AP_NAME"], self.env["AP_PASS"], -55, 6)]
+        access_points += [(ap["ssid"], ap["password"], -70, 11)
+                          for ap in self.env["ALTERNATIVES_AP"]]
+        self.network = network.NetworkModel(self, access_points, seed=seed)
+
+        self.http = HttpRouter(self, http_latency_ms)
+        self.binance = BinanceStandIn(self, seed)
+        self.http.route('api.binance.com', self.binance)
+        self.http.route('worldtimeapi.org', WorldTimeStandIn(self))
+        self.udp = usocket.UdpRouter(self)
+        self.ntp = NtpStandIn(self, seed=seed)
+        self.udp.route(self.env["NTP_HOST"], self.ntp)
+
+        self.telemetry = TelemetryReceiverStandIn(self, self.env["API_TOKEN"])
+        self.http.route(self.env["API_URL"].split('://', 1)[-1].split('/')[0].split(':')[0], self.telemetry)
+
+        # Los ficheros que abre el firmware van a este directorio, no al del usuario.
+        self._flash = None if flash_dir else tempfile.TemporaryDirectory(prefix='sim-flash-')
+        self.flash_dir = flash_dir or self._flash.name
+
+        self.display = Max7219Monitor(self)
+        self.board.attach_spi(1, self.display)
+        self.oled = Ssd1306Monitor(self)
+        self.board.attach_i2c(0, 0x3c, self.oled)
+
+        self.namespace = None
+        self.error = None
+        self._saved = None
+
+    # Programación de entradas
+
+    def at(self, seconds, callback, *args):
+        """Ejecuta ``callback`` en el segundo virtual indicado."""
+        return self.clock.schedule(int(seconds * 1000000), callback, *args)
+
+    def press(self, seconds, pin=PIN_ENCODER_SW, hold_ms=80):
+        """Programa una pulsación (bajada y subida) de un botón."""
+        self.at(seconds, self.board.drive, pin, 0)
+        self.at(seconds + hold_ms / 1000, self.board.drive, pin, 1)
+
+    def rotate(self, seconds, steps, step_ms=20):
+        """
+        Programa un giro del encoder en cuadratura.
+
+        Args:
+            seconds (float): Instante del primer flanco.
+            steps (int): Pasos a girar, negativos en sentido antihorario.
+            step_ms (int): Duración de cada paso (4 flancos).
+        """
+        # (CLK, DT) recorridos por cada paso completo partiendo de reposo (1, 1).
+        sequence = ((1, 0), (0, 0), (0, 1), (1, 1)) if steps > 0 else ((0, 1), (0, 0), (1, 0), (1, 1))
+        edge_s = step_ms / 4000
+        t = seconds
+
+        for _ in range(abs(steps)):
+            for clk, dt in sequence:
+                self.at(t, self._drive_encoder, clk, dt)
+                t += edge_s
+
+    def _drive_encoder(self, clk, dt):
+        self.board.drive(PIN_ENCODER_CLK, clk)
+        self.board.drive(PIN_ENCODER_DT, dt)
+
+    # Ejecución
+
+    def install(self):
+        """Sustituye los módulos de MicroPython por los del simulador."""
+        env = types.ModuleType('env')
+        env.__dict__.update(self.env)
+
+        fakes = {
+            'machine': machine,
+            'network': network,
+            'urequests': urequests,
+            'requests': urequests,
+            'ujson': json,
+            'ubinascii': binascii,
+            'framebuf': framebuf,
+            # Sockets reales del anfitrión salvo hacia servicios UDP simulados.
+            'socket': usocket,
+            'usocket': usocket,
+            'select': select,
+            'uselect': select,
+            'time': utime,
+            'utime': utime,
+            'gc': _gc_module(),
+            'micropython': _micropython_module(self),
+            'env': env,
+        }
+
+        self._saved = {name: sys.modules.get(name) for name in fakes}
+        self._saved_const = getattr(builtins, 'const', None)
+        self._purge_firmware()
+
+        sys.modules.update(fakes)
+        builtins.const = fakes['micropython'].const
+        sys.path.insert(0, self.src_dir)
+        self._saved_cwd = os.getcwd()
+        os.chdir(self.flash_dir)
+        runtime.active = self
+
+    def uninstall(self):
+        """Restaura los módulos originales del intérprete."""
+        for name, module in self._saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+        if self._saved_const is None:
+            del builtins.const
+        else:
+            builtins.const = self._saved_const
+
+        self._purge_firmware()
+        sys.path.remove(self.src_dir)
+        os.chdir(self._saved_cwd)
+        runtime.active = None
+
+    def _purge_firmware(self):
+        # Cada arranque importa los modelos desde cero, como tras un reset.
+        for name in list(sys.modules):
+            if name == 'Models' or name.startswith('Models.'):
+                del sys.modules[name]
+
+    def run(self, seconds, script='main.py'):
+        """
+        Arranca el firmware y lo deja correr durante ``seconds`` virtuales.
+
+        Args:
+            seconds (float): Duración de la simulación.
+            script (str): Punto de entrada dentro de ``src_dir``.
+
+        Returns:
+            dict: Resumen de la línea temporal.
+        """
+        path = os.path.join(self.src_dir, script)
+
+        with open(path) as f:
+            code = compile(f.read(), path, 'exec')
+
+        self.clock.end_us = self.clock.now_us + int(seconds * 1000000)
+        self.install()
+
+        try:
+            resets = 0
+
+            while True:
+                self.namespace = {'__name__': '__main__', '__file__': path}
+
+                try:
+                    exec(code, self.namespace)
+                    break
+                except DeviceReset:
+                    resets += 1
+
+                    # El reinicio apaga la radio y para el watchdog hasta que el firmware los vuelva a usar.
+                    self.board.stop_watchdog()
+                    self.network.set_active(False)
+
+                    if resets > self.max_resets:
+                        raise
+
+                    self._purge_firmware()
+        except SimulationEnd:
+            pass
+        except Exception as e:
+            # El firmware terminó por un error no capturado: se guarda para analizarlo.
+            self.error = e
+            self.timeline.record('crash', error=repr(e))
+        finally:
+            self.uninstall()
+
+        return self.timeline.summary()
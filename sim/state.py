@@ -0,0 +1,293 @@
+"""
+Estado guardado en la flash: coste de 10000 cambios y lo que vuelve tras un corte.
+
+Uso: python -m sim.state [--updates 10000] [--burst 8] [--outage 120] [--seed 0]
+
+Primero escribe ``--updates`` cambios en el ``KeyValueStore`` del firmware
+sobre el disco del PC, en ráfagas de ``--burst`` precios como las de las
+estadísticas de 24 h, con un ``maintain`` tras cada una como la tarea
+periódica. Compara con escribir cada cambio nada más llegar y con reescribir
+un JSON con todo el estado por cambio (``open().write()``): sincronizaciones,
+bloques borrados y bytes programados en la flash por cambio (estimados como
+LittleFS, ver ``BLOCK_SIZE``), tiempo por cambio en el PC y lo que tarda en
+reconstruir el índice al arrancar, con el fichero compactado y con los 10000
+registros sin compactar.
+
+Después arranca el firmware, cambia de moneda, de divisa y de brillo y
+corta la corriente con Internet caído durante ``--outage`` segundos tras
+el corte. Comprueba qué vuelve tras el reinicio y cuánto tarda en verse un
+precio, con el estado guardado y borrándolo en el corte, como antes.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+from sim import Simulator
+from sim.simulator import PIN_BUTTON_UP
+
+# Claves como las del firmware: monedas seguidas, divisas y ajustes.
+COINS = ('BTC', 'ETH', 'ADA', 'BNB', 'SOL', 'DOT', 'EUR', 'XRP')
+SETTINGS = ('coin', 'quote', 'bright', 'ap')
+
+# Instante del corte de corriente y segundos que sigue la prueba tras volver Internet.
+_CUT_S = 3630
+_AFTER_S = 360
+
+
+def _workload(updates, burst, seed):
+    """Ráfagas de ``burst`` cambios: precios que se mueven y, de vez en cuando, un ajuste."""
+    rnd = random.Random(seed)
+    prices = {coin: 6000000000000 // (i + 1) for i, coin in enumerate(COINS)}
+    bursts = []
+    done = 0
+
+    while done < updates:
+        changes = []
+
+        for coin in COINS[:min(burst, updates - done)]:
+            prices[coin] += rnd.randint(-prices[coin] // 500, prices[coin] // 500) or 1
+            changes.append(('p:' + coin, prices[coin]))
+
+        if rnd.random() < 0.05 and len(changes) < updates - done:
+            changes.append((rnd.choice(SETTINGS), rnd.choice(('BTC', 'EUR', 'SimAP', 3, 5))))
+
+        bursts.append(changes)
+        done += len(changes)
+
+    return bursts
+
+
+class StoreRun:
+    """
+    Cambios sobre el almacén del firmware en el disco del PC.
+
+    Args:
+        path (str): Fichero del almacén.
+        bursts (list): Ráfagas de cambios ``(clave, valor)``.
+        mode (str): 'batched' (una escritura por ráfaga), 'each' (una por
+            cambio) o 'json' (reescribir el estado entero por cambio).
+    """
+
+    def __init__(self, path, bursts, mode='batched'):
+        self.path = path
+        self.bursts = bursts
+        self.mode = mode
+
+    def run(self):
+        from Models.KeyValueStore import KeyValueStore, BLOCK_SIZE, RECORD_SIZE
+
+        for suffix in ('', '.new'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+        updates = sum(len(changes) for changes in self.bursts)
+
+        if self.mode == 'json':
+            return self._json(updates, BLOCK_SIZE, RECORD_SIZE)
+
+        started = time.perf_counter()
+        store = KeyValueStore(self.path)
+
+        for changes in self.bursts:
+            for key, value in changes:
+                store.put(key, value)
+
+                if self.mode == 'each':
+                    store.flush()
+
+            store.maintain()
+
+        elapsed = time.perf_counter() - started
+        store.close()
+        report = store.report()
+
+        started = time.perf_counter()
+        KeyValueStore(self.path).close()
+        rebuild_us = (time.perf_counter() - started) * 1000000
+
+        return {
+            "updates": updates,
+            "syncs_per_update": round(report["flushes"] / updates, 3),
+            "erases_per_update": round(report["erases"] / updates, 3),
+            "flash_bytes_per_update": round(report["flash_bytes"] / updates, 1),
+            "write_amplification": report["write_amplification"],
+            "compactions": report["compactions"],
+            "file_bytes": os.path.getsize(self.path),
+            "host_us_per_update": round(elapsed * 1000000 / updates, 2),
+            "rebuild_us": round(rebuild_us),
+        }
+
+    def _json(self, updates, block_size, record_size):
+        state = {}
+        programmed = 0
+        erases = 0
+        started = time.perf_counter()
+
+        for changes in self.bursts:
+            for key, value in changes:
+                state[key] = value
+                data = json.dumps(state)
+
+                # El fichero se escribe entero en bloques nuevos en cada cambio
+                with open(self.path, 'w') as f:
+                    f.write(data)
+
+                programmed += len(data)
+                erases += (len(data) + block_size - 1) // block_size
+
+        elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+
+        with open(self.path) as f:
+            json.load(f)
+
+        rebuild_us = (time.perf_counter() - started) * 1000000
+
+        return {
+            "updates": updates,
+            "syncs_per_update": 1.0,
+            "erases_per_update": round(erases / updates, 3),
+            "flash_bytes_per_update": round(programmed / updates, 1),
+            "write_amplification": round(programmed / (updates * record_size), 2),
+            "compactions": 0,
+            "file_bytes": os.path.getsize(self.path),
+            "host_us_per_update": round(elapsed * 1000000 / updates, 2),
+            "rebuild_us": round(rebuild_us),
+        }
+
+
+def uncompacted_rebuild(path, updates):
+    """Microsegundos en reconstruir el índice de ``updates`` registros sin compactar (el peor caso)."""
+    from Models.KeyValueStore import KeyValueStore
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    store = KeyValueStore(path, compact_min_bytes=1 << 30)
+
+    for i in range(updates):
+        store.put('p:' + COINS[i % len(COINS)], i)
+
+    store.close()
+    started = time.perf_counter()
+    store = KeyValueStore(path)
+    elapsed = time.perf_counter() - started
+    records = store.report()["records"]
+    store.close()
+
+    return {"records": records, "rebuild_us": round(elapsed * 1000000)}
+
+
+class RebootRun:
+    """
+    El firmware cambia de moneda, de divisa y de brillo, y se corta la corriente.
+
+    Args:
+        keep_state (bool): Si False, el estado se borra en el corte.
+        outage_s (float): Segundos sin Internet tras el corte.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, keep_state=True, outage_s=120, seed=0):
+        self.sim = Simulator(seed=seed, timeline_kinds=('display', 'http', 'reset', 'crash'))
+        self.keep_state = keep_state
+        self.outage_s = outage_s
+        self.before = None
+        self.after = None
+
+        # Menú, dos monedas más allá y confirmar; después la divisa, que va tras las favoritas
+        self.sim.press(600)
+        self.sim.rotate(601, 2)
+        self.sim.press(603)
+        self.sim.press(1200)
+        self.sim.rotate(1201, 6)
+        self.sim.press(1203)
+
+        for t in (1800, 1801, 1802):
+            self.sim.press(t, pin=PIN_BUTTON_UP)
+
+        self.sim.at(_CUT_S, self._cut)
+        self.sim.at(_CUT_S + outage_s, self.sim.network.set_link, True)
+        self.sim.at(_CUT_S + outage_s + _AFTER_S - 1, self._check)
+
+    def _snapshot(self):
+        namespace = self.sim.namespace
+
+        return {
+            "coin": namespace['selected_currency'],
+            "quote": namespace['selected_quote'],
+            "brightness": namespace['current_brightness'],
+            "ap": namespace['rpi'].last_ap,
+        }
+
+    def _cut(self):
+        from sim.clock import DeviceReset
+
+        self.before = self._snapshot()
+        self.before["ap"] = self.sim.network.ssid
+        self.sim.network.set_link(False)
+        self.sim.timeline.record('reset', cause='power')
+
+        if not self.keep_state:
+            os.remove(os.path.join(self.sim.flash_dir, 'state.kv'))
+
+        raise DeviceReset()
+
+    def _check(self):
+        self.after = self._snapshot()
+
+    def run(self):
+        self.sim.run(_CUT_S + self.outage_s + _AFTER_S)
+        cut_us = _CUT_S * 1000000
+        coin = self.after["coin"] if self.after else None
+        display = [(t, data) for t, _, data in self.sim.timeline.filter('display') if t > cut_us]
+        http = [t for t, _, data in self.sim.timeline.filter('http')
+                if t > cut_us and data['status'] == 200 and 'binance' in data['url']]
+        price = next((t for t, data in display if coin and data['text'].startswith(coin)), None)
+
+        return {
+            "before": self.before,
+            "after": self.after,
+            "restored": self.before == self.after,
+            "price_shown_s": round((price - cut_us) / 1000000, 2) if price is not None else None,
+            "first_response_s": round((http[0] - cut_us) / 1000000, 2) if http else None,
+            "state": self.sim.namespace['state'].report() if 'state' in self.sim.namespace else None,
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.state', description='Estado guardado en la flash')
+    parser.add_argument('--updates', type=int, default=10000, help='Cambios que se escriben')
+    parser.add_argument('--burst', type=int, default=8, help='Cambios por ráfaga')
+    parser.add_argument('--outage', type=float, default=120, help='Segundos sin Internet tras el corte')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los cambios y de los servicios simulados')
+    args = parser.parse_args()
+
+    bursts = _workload(args.updates, args.burst, args.seed)
+
+    # El almacén se importa con los módulos de MicroPython del simulador
+    sim = Simulator(seed=args.seed)
+    sim.install()
+
+    try:
+        path = os.path.join(sim.flash_dir, 'state.kv')
+        store = {mode: StoreRun(path, bursts, mode).run() for mode in ('batched', 'each', 'json')}
+        worst = uncompacted_rebuild(path, args.updates)
+    finally:
+        sim.uninstall()
+
+    print(json.dumps({
+        "store": store,
+        "uncompacted": worst,
+        "reboot": RebootRun(outage_s=args.outage, seed=args.seed).run(),
+        "reboot_without_state": RebootRun(keep_state=False, outage_s=args.outage, seed=args.seed).run(),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
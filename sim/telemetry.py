@@ -0,0 +1,142 @@
+"""
+Prueba de la cola de telemetría frente a cortes de conexión.
+
+Uso: python -m sim.telemetry [--hours 12] [--outage 2:1.5] [--receiver-down 6:0.5] [--reset 3]
+
+Arranca el firmware con ``TELEMETRY`` activo contra el receptor simulado de
+la API propia y provoca cortes del enlace Wi-Fi (``--outage``), caídas del
+receptor (``--receiver-down``) y reinicios del dispositivo (``--reset``). Al
+final compara los registros generados con los recibidos y cuenta escrituras
+en la flash y bytes enviados por registro.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+from sim import machine
+
+
+def _window(value):
+    start, _, duration = value.partition(':')
+
+    return float(start) * 3600, float(duration or 1) * 3600
+
+
+class TelemetryRun:
+    """
+    Escenario de telemetría con cortes programados.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        outages (list): Ventanas ``(inicio, duración)`` en segundos sin enlace.
+        receiver_down (list): Ventanas en que el receptor responde 503.
+        resets (list): Segundos en que se reinicia el dispositivo.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, hours=12, outages=(), receiver_down=(), resets=(), seed=0):
+        self.seconds = hours * 3600
+        self.sim = Simulator(seed=seed, env={"TELEMETRY": True}, timeline_kinds=('wifi', 'crash', 'reset'))
+        self.totals = {}
+        self.lost_at_reset = 0
+        self.max_backlog = 0
+
+        for start, duration in outages:
+            self.sim.at(start, self.sim.network.set_link, False)
+            self.sim.at(start + duration, self.sim.network.set_link, True)
+
+        for start, duration in receiver_down:
+            self.sim.at(start, setattr, self.sim.telemetry, 'down', True)
+            self.sim.at(start + duration, setattr, self.sim.telemetry, 'down', False)
+
+        for at in resets:
+            self.sim.at(at, self._reset)
+
+        for t in range(60, int(self.seconds), 60):
+            self.sim.at(t, self._sample)
+
+    def _queue(self):
+        return (self.sim.namespace or {}).get('telemetry')
+
+    def _collect(self, queue):
+        for key, value in queue.stats.items():
+            self.totals[key] = self.totals.get(key, 0) + value
+
+    def _sample(self):
+        queue = self._queue()
+
+        if queue is not None:
+            self.max_backlog = max(self.max_backlog, queue.backlog)
+
+    def _reset(self):
+        # Corte de corriente: lo que estaba en RAM se pierde, la flash se conserva.
+        queue = self._queue()
+
+        if queue is not None:
+            self._collect(queue)
+            self.lost_at_reset += len(queue._pending)
+
+        machine.reset()
+
+    def run(self):
+        summary = self.sim.run(self.seconds)
+        queue = self._queue()
+
+        if queue is not None:
+            self._collect(queue)
+            pending = len(queue._pending) + queue.backlog
+        else:
+            pending = 0
+
+        receiver = self.sim.telemetry
+        records = self.totals.get("records", 0)
+        received = len(receiver.records)
+        stamps = [stamp for stamp, _ in receiver.records]
+
+        # Lo que ocuparía cada registro enviado uno a uno con ``Api.send_to_api``.
+        raw = sum(len(json.dumps({"data": data, "hardware_device_id": 1})) for _, data in receiver.records)
+
+        return {
+            "hours": round(self.seconds / 3600, 2),
+            "records": records,
+            "received": received,
+            "pending_at_end": pending,
+            "lost_in_ram_at_reset": self.lost_at_reset,
+            "dropped_flash_full": self.totals.get("dropped", 0),
+            "missing": records - received - pending - self.lost_at_reset - self.totals.get("dropped", 0),
+            "duplicates": receiver.duplicates,
+            "in_order": stamps == sorted(stamps),
+            "posts": self.totals.get("uploaded", 0) + self.totals.get("replayed", 0),
+            "records_per_post": round(received / receiver.batches, 1) if receiver.batches else None,
+            "bytes_per_record": round(receiver.bytes / received, 1) if received else None,
+            "raw_bytes_per_record": round(raw / received, 1) if received else None,
+            "flash_writes_per_record": round(self.totals.get("flash_writes", 0) / records, 3) if records else None,
+            "flash_bytes_per_record": round(self.totals.get("flash_bytes", 0) / records, 1) if records else None,
+            "max_backlog_records": self.max_backlog,
+            "failures": self.totals.get("failures", 0),
+            "resets": summary["counters"].get("reset", 0),
+            "crashed": self.sim.error is not None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.telemetry', description='Cola de telemetría frente a cortes')
+    parser.add_argument('--hours', type=float, default=12, help='Horas virtuales a simular')
+    parser.add_argument('--outage', action='append', type=_window, metavar='HORA:DURACION',
+                        help='Corte del enlace Wi-Fi (se puede repetir)')
+    parser.add_argument('--receiver-down', action='append', type=_window, metavar='HORA:DURACION',
+                        help='Receptor respondiendo 503 (se puede repetir)')
+    parser.add_argument('--reset', action='append', type=float, metavar='HORA', help='Reinicio del dispositivo')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = TelemetryRun(hours=args.hours, outages=args.outage or [(2 * 3600, 1.5 * 3600)],
+                            receiver_down=args.receiver_down or [(6 * 3600, 0.5 * 3600)],
+                            resets=[h * 3600 for h in (args.reset or [3])], seed=args.seed)
+
+    print(json.dumps(scenario.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import json
+
+
+class Timeline:
+    """
+    Registro cronológico de lo que ocurre en el dispositivo simulado.
+
+    Cada entrada es una tupla ``(t_us, kind, data)`` donde ``kind`` identifica
+    el origen ("spi", "http", "display", "pin"...) y ``data`` es un diccionario
+    con los detalles.
+
+    Args:
+        clock (VirtualClock): Reloj del que se toman las marcas de tiempo.
+        kinds (iterable): Si se indica, solo se guardan esos tipos de evento.
+    """
+
+    def __init__(self, clock, kinds=None):
+        self.clock = clock
+        self.kinds = set(kinds) if kinds else None
+        self.events = []
+        self.counters = {}
+        self.volume = {}
+
+    def record(self, kind, **data):
+        self.counters[kind] = self.counters.get(kind, 0) + 1
+
+        # Bytes transferidos por tipo, aunque el evento no se guarde.
+        payload = data.get('data')
+
+        if payload is not None:
+            self.volume[kind] = self.volume.get(kind, 0) + len(payload)
+
+        if self.kinds is None or kind in self.kinds:
+            self.events.append((self.clock.now_us, kind, data))
+
+        # Quien registra puede completar el evento después (ver ``devices._burst``)
+        return data
+
+    def filter(self, kind):
+        return [event for event in self.events if event[1] == kind]
+
+    def count(self, kind):
+        return self.counters.get(kind, 0)
+
+    def summary(self):
+        """
+        Resume la ejecución para análisis de rendimiento.
+
+        Returns:
+            dict: Contadores por tipo de evento y estadísticas del reloj.
+        """
+        clock = self.clock
+        http = self.filter('http')
+        elapsed_s = clock.now_us / 1000000
+
+        return {
+            "elapsed_s": elapsed_s,
+            "wakeups": clock.sleep_calls,
+            "wakeups_per_hour": round(clock.sleep_calls * 3600 / elapsed_s, 1) if elapsed_s else 0,
+            "slept_pct": round(clock.slept_us * 100 / clock.now_us, 2) if clock.now_us else 0,
+            "http_requests": len(http),
+            "http_time_ms": sum(event[2]["latency_ms"] for event in http),
+            "spi_frames": self.count('spi'),
+            "spi_bytes": self.volume.get('spi', 0),
+            "display_updates": self.count('display'),
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self, path):
+        """Guarda la línea temporal en un fichero JSON."""
+        with open(path, 'w') as f:
+            json.dump({
+                "summary": self.summary(),
+                "events": [
+                    {"t_us": t_us, "kind": kind, **data}
+                    for t_us, kind, data in self.events
+                ],
+            }, f, default=_json_default)
+
+    def dump(self, kinds=None, limit=None):
+        """Imprime la línea temporal en formato legible."""
+        shown = 0
+
+        for t_us, kind, data in self.events:
+            if kinds and kind not in kinds:
+                continue
+
+            details = ' '.join(f'{key}={_json_default(value) if isinstance(value, (bytes, bytearray)) else value}'
+                               for key, value in data.items())
+            print(f'{t_us / 1000000:12.3f}s {kind:<8} {details}')
+
+            shown += 1
+
+            if limit and shown >= limit:
+                break
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+
+    return str(value)
@@ -0,0 +1,135 @@
+"""
+Traza de latencia del firmware exportada al formato de Chrome.
+
+Uso: python -m sim.trace [--seconds 400] [--cpu-scale 1] [--capacity 1024] [--out trace.json]
+
+Arranca el firmware con ``TRACE = True``, gira el encoder para cambiar de
+vista, entra al menú, se mueve por él y confirma una moneda, y deja correr
+la actualización periódica del precio. Al final guarda los tramos en
+``--out`` (se abre en ``chrome://tracing`` o en https://ui.perfetto.dev) y
+resume por tipo de tramo y por flujo: cada giro o pulsación desde su IRQ
+hasta la escritura SPI y cada actualización de precio desde la petición.
+
+El reloj virtual solo avanza con las esperas simuladas (SPI, red). Con
+``--cpu-scale`` el tiempo de CPU del anfitrión, por ese factor, también
+cuenta, para ver el peso del formateo y del código Python frente a ellas.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+
+# Tramos que abren cada tipo de flujo.
+_INPUT_SPANS = ('rotary-isr', 'press-isr')
+
+
+class TraceRun:
+    """
+    Escenario de trazas de latencia.
+
+    Args:
+        seconds (float): Segundos virtuales a simular (pasado el minuto 5 llega un precio periódico).
+        cpu_scale (float): Factor del tiempo de CPU del anfitrión o None para no contarlo.
+        capacity (int): Tramos que caben en el buffer de la traza.
+        seed (int): Semilla de los servicios simulados.
+    """
+
+    def __init__(self, seconds=400, cpu_scale=None, capacity=1024, seed=0):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.sim = Simulator(seed=seed, env={"TRACE": True}, cpu_scale=cpu_scale, timeline_kinds=('crash',))
+        self.chrome = None
+
+        # El buffer se agranda tras el arranque y se vacía para quedarse solo con lo que se prueba.
+        self.sim.at(30, self._reset)
+        self.sim.rotate(60, 2)
+        self.sim.rotate(70, -2)
+        self.sim.press(90)
+        self.sim.rotate(92, 3, step_ms=120)
+        self.sim.press(96)
+        self.sim.at(seconds - 0.001, self._capture)
+
+    def _reset(self):
+        trace = self.sim.namespace['trace']
+        trace.enable(self.capacity)
+        trace.clear()
+
+    def _capture(self):
+        self.chrome = self.sim.namespace['trace'].chrome()
+
+    def summary(self):
+        spans = [event for event in self.chrome["traceEvents"] if event["ph"] == 'X']
+        names = {}
+        flows = {}
+
+        for span in spans:
+            names.setdefault(span["name"], []).append(span["dur"])
+
+            if span["args"]["flow"]:
+                flows.setdefault(span["args"]["flow"], []).append(span)
+
+        kinds = {"input": [], "price": []}
+
+        for flow_spans in flows.values():
+            flow_names = [span["name"] for span in flow_spans]
+
+            if any(name in _INPUT_SPANS for name in flow_names):
+                kind = "input"
+            elif 'request' in flow_names:
+                kind = "price"
+            else:
+                continue
+
+            # De punta a punta: del primer tramo a la última escritura en la pantalla (los flancos
+            # del encoder que siguen al que cambió el valor heredan el flujo, pero ya no dibujan)
+            writes = [span["ts"] + span["dur"] for span in flow_spans if span["name"] == 'spi']
+
+            if writes:
+                kinds[kind].append(max(writes) - min(span["ts"] for span in flow_spans))
+
+        return {
+            "spans": len(spans),
+            "span_us": {name: {"count": len(durations),
+                               "mean": round(sum(durations) / len(durations), 1),
+                               "max": max(durations)}
+                        for name, durations in sorted(names.items())},
+            "flows": {kind: {"count": len(latencies),
+                             "p50_us": sorted(latencies)[len(latencies) // 2] if latencies else None,
+                             "max_us": max(latencies) if latencies else None}
+                      for kind, latencies in kinds.items()},
+        }
+
+    def run(self, out=None):
+        self.sim.run(self.seconds)
+
+        if self.chrome is None:
+            return {"crashed": True}
+
+        if out:
+            with open(out, 'w') as f:
+                json.dump(self.chrome, f)
+
+        result = self.summary()
+        result["crashed"] = self.sim.error is not None
+
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.trace', description='Traza de latencia en formato Chrome')
+    parser.add_argument('--seconds', type=float, default=400, help='Segundos virtuales a simular')
+    parser.add_argument('--cpu-scale', type=float, default=None,
+                        help='Factor del tiempo de CPU del anfitrión (sin él solo cuentan las esperas simuladas)')
+    parser.add_argument('--capacity', type=int, default=1024, help='Tramos que caben en la traza')
+    parser.add_argument('--out', default='trace.json', help='Fichero de la traza de Chrome')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    scenario = TraceRun(seconds=args.seconds, cpu_scale=args.cpu_scale, capacity=args.capacity, seed=args.seed)
+
+    print(json.dumps(scenario.run(args.out), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Sustituto de ``urequests`` que resuelve las peticiones contra los servicios
+registrados en el ``HttpRouter`` del simulador, sin tocar la red real.
+"""
+
+import io as _io
+import json as _json
+
+from sim import runtime
+
+
+class Response:
+    def __init__(self, status_code=200, content=b'', headers=None, reason=b'OK'):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers or {}
+        self._content = content if isinstance(content, (bytes, bytearray)) else str(content).encode()
+        self.encoding = 'utf-8'
+
+        # Como en MicroPython, el cuerpo sin leer para consumirlo por trozos.
+        self.raw = _io.BytesIO(self._content)
+
+    @property
+    def content(self):
+        return self._content
+
+    @property
+    def text(self):
+        return str(self._content, self.encoding)
+
+    def json(self):
+        return _json.loads(self._content)
+
+    def close(self):
+        pass
+
+
+def request(method, url, data=None, json=None, headers=None, stream=None,
+            auth=None, timeout=None, parse_headers=True):
+    if json is not None:
+        data = _json.dumps(json)
+
+    if isinstance(data, str):
+        data = data.encode()
+
+    return runtime.get().http.request(method, url, headers or {}, data, timeout)
+
+
+def head(url, **kw):
+    return request('HEAD', url, **kw)
+
+
+def get(url, **kw):
+    return request('GET', url, **kw)
+
+
+def post(url, **kw):
+    return request('POST', url, **kw)
+
+
+def put(url, **kw):
+    return request('PUT', url, **kw)
+
+
+def patch(url, **kw):
+    return request('PATCH', url, **kw)
+
+
+def delete(url, **kw):
+    return request('DELETE', url, **kw)
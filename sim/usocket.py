@@ -0,0 +1,169 @@
+"""
+Sustituto de ``socket``/``usocket`` de MicroPython.
+
+Los sockets son los reales del anfitrión (relé multicast, servidor HTTP)
+salvo los datagramas dirigidos a servicios UDP simulados, como el servidor
+NTP, que se entregan sobre el reloj virtual con la latencia que decida el
+servicio. Así una espera en ``recv`` avanza el tiempo virtual en lugar de
+bloquear el proceso.
+"""
+
+import errno as _errno
+import select as _host_select
+import socket as _host_socket
+
+from sim import runtime
+
+# Direcciones ficticias que se asignan a los servicios simulados.
+_SIM_NET = '10.99.0.'
+
+POLLIN = 0x0001
+_MP_STREAM_POLL = 3
+
+
+class UdpRouter:
+    """
+    Servicios UDP simulados por nombre de host.
+
+    Un servicio es un callable ``f(data, sent_us) -> (respuesta, llegada_us)``
+    o None si no responde (el datagrama se pierde).
+
+    Args:
+        sim (Simulator): Simulador al que pertenece.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.hosts = {}
+        self.services = {}
+
+    def route(self, host, service):
+        """Registra un servicio y le asigna una dirección ficticia."""
+        address = _SIM_NET + str(len(self.services) + 1)
+        self.hosts[host] = address
+        self.services[address] = service
+
+        return address
+
+    def resolve(self, host):
+        if host in self.services:
+            return host
+
+        return self.hosts.get(host)
+
+    def sendto(self, sock, data, address):
+        sim = self.sim
+        service = self.services[address[0]]
+
+        if not sim.network.online():
+            sim.timeline.record('udp', to=address[0], bytes=len(data), error='offline')
+            return
+
+        result = service(bytes(data), sim.clock.now_us)
+        sim.timeline.record('udp', to=address[0], bytes=len(data), answered=result is not None)
+
+        if result is not None:
+            reply, arrive_us = result
+            sim.clock.schedule(arrive_us, sock._deliver, reply, address)
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    sim = runtime.get()
+    address = sim.udp.resolve(host)
+
+    if address is None:
+        return _host_socket.getaddrinfo(host, port, af, type, proto, flags)
+
+    if not sim.network.online():
+        # Sin red no hay DNS.
+        raise OSError(-2)
+
+    return [(_host_socket.AF_INET, _host_socket.SOCK_DGRAM, 0, '', (address, port))]
+
+
+class DatagramSocket:
+    """
+    Socket UDP del anfitrión que desvía los envíos a servicios simulados.
+
+    Las respuestas simuladas se encolan al llegar en tiempo virtual; ``recv``
+    con timeout avanza el reloj hasta que llegue una o venza el plazo.
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._inbox = []
+        self._waiting = 0
+        self._timeout = None
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def settimeout(self, value):
+        self._timeout = value
+        self._sock.settimeout(value)
+
+    def setblocking(self, flag):
+        self.settimeout(None if flag else 0)
+
+    def sendto(self, data, address):
+        router = runtime.get().udp
+
+        if address[0] in router.services:
+            self._waiting += 1
+            router.sendto(self, data, address)
+
+            return len(data)
+
+        return self._sock.sendto(data, address)
+
+    def _deliver(self, data, address):
+        self._inbox.append((data, address))
+
+    def recvfrom(self, size):
+        if not self._inbox and self._waiting:
+            if self._timeout == 0:
+                raise OSError(_errno.EAGAIN)
+
+            clock = runtime.clock()
+            clock.sleep_us(None if self._timeout is None else int(self._timeout * 1000000),
+                           until=lambda: bool(self._inbox))
+
+            if not self._inbox:
+                # Igual que MicroPython al vencer ``settimeout``; la respuesta ya no se espera.
+                self._waiting -= 1
+                raise OSError(_errno.ETIMEDOUT)
+
+        if self._inbox:
+            self._waiting = max(0, self._waiting - 1)
+            data, address = self._inbox.pop(0)
+
+            return data[:size], address
+
+        return self._sock.recvfrom(size)
+
+    def recv(self, size):
+        return self.recvfrom(size)[0]
+
+    def ioctl(self, request, flags):
+        if request != _MP_STREAM_POLL:
+            return 0
+
+        if self._inbox:
+            return flags & POLLIN
+
+        return flags & POLLIN if _host_select.select([self._sock], [], [], 0)[0] else 0
+
+    def close(self):
+        self._inbox = []
+        self._waiting = 0
+        self._sock.close()
+
+
+def socket(af=_host_socket.AF_INET, type=_host_socket.SOCK_STREAM, proto=0):
+    sock = _host_socket.socket(af, type, proto)
+
+    return DatagramSocket(sock) if type == _host_socket.SOCK_DGRAM else sock
+
+
+def __getattr__(name):
+    return getattr(_host_socket, name)
@@ -0,0 +1,74 @@
+"""
+Sustituto del módulo ``time`` de MicroPython sobre el reloj virtual.
+
+Lo que no existe aquí se delega en el ``time`` real de CPython, para que la
+librería estándar siga funcionando mientras el firmware está cargado.
+"""
+
+import calendar
+import time as _host_time
+
+from sim import runtime
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+
+def sleep(seconds):
+    runtime.clock().sleep(seconds)
+
+
+def sleep_ms(ms):
+    runtime.clock().sleep_ms(ms)
+
+
+def sleep_us(us):
+    runtime.clock().sleep_us(us)
+
+
+def time():
+    # Como en la Pico, ``time()`` lee el RTC.
+    return runtime.get().board.rtc_us() // 1000000
+
+
+def time_ns():
+    return runtime.get().board.rtc_us() * 1000
+
+
+def ticks_ms():
+    return runtime.clock().ticks_ms()
+
+
+def ticks_us():
+    return runtime.clock().ticks_us()
+
+
+def ticks_cpu():
+    return runtime.clock().ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+
+    return ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+
+def gmtime(secs=None):
+    return _host_time.gmtime(time() if secs is None else secs)[:8]
+
+
+def localtime(secs=None):
+    return gmtime(secs)
+
+
+def mktime(t):
+    return calendar.timegm(tuple(t[:6]) + (0, 0, 0))
+
+
+def __getattr__(name):
+    return getattr(_host_time, name)
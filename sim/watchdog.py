@@ -0,0 +1,92 @@
+"""
+Arranque y uso con la latencia real de TLS: el watchdog no debe saltar nunca.
+
+Uso: python -m sim.watchdog [--hours 2] [--latency 800,1500,2500,3000] [--press-every 600] [--seed 0]
+
+El simulador responde por defecto en 120 ms; en la Pico W cada petición
+HTTPS tarda de 1 a 2,5 segundos entre la negociación TLS y la respuesta, y
+hasta ``HTTP_TIMEOUT`` (3 s) con una red lenta. Con esas latencias arranca
+el firmware (incluido el relleno inicial de las velas y las tareas de red
+que vencen a la vez al arrancar), entra al menú cada ``--press-every``
+segundos, avanza una moneda y la confirma, y mide el hueco más largo entre
+dos ``WDT.feed`` frente al timeout del watchdog.
+
+Termina con error si hay algún reinicio del watchdog o si el firmware falla.
+"""
+
+import argparse
+import json
+
+from sim import Simulator
+
+
+def run(hours, latency_ms, press_every, seed):
+    """
+    Escenario con una latencia HTTP fija.
+
+    Args:
+        hours (float): Horas virtuales a simular.
+        latency_ms (int): Latencia de cada petición HTTP.
+        press_every (int): Segundos entre visitas al menú.
+        seed (int): Semilla de los servicios simulados.
+
+    Returns:
+        dict: Peticiones, reinicios del watchdog y hueco más largo entre alimentaciones.
+    """
+    # Sin límite de reinicios: se cuentan todos en lugar de parar la simulación
+    sim = Simulator(seed=seed, http_latency_ms=latency_ms, timeline_kinds=('reset', 'crash'), max_resets=1000)
+    board = sim.board
+    feed = board.feed_watchdog
+    gap = {"last_us": None, "max_us": 0}
+
+    def feed_watchdog():
+        now = sim.clock.now_us
+
+        if gap["last_us"] is not None:
+            gap["max_us"] = max(gap["max_us"], now - gap["last_us"])
+
+        gap["last_us"] = now
+        feed()
+
+    board.feed_watchdog = feed_watchdog
+
+    for t in range(press_every, int(hours * 3600), press_every):
+        sim.press(t)
+        sim.rotate(t + 1, 1)
+        sim.press(t + 2)
+
+    sim.run(hours * 3600)
+    resets = [event[2] for event in sim.timeline.filter('reset')]
+
+    return {
+        "latency_ms": latency_ms,
+        "http_requests": sim.timeline.count('http'),
+        "watchdog_resets": sum(1 for reset in resets if reset.get('cause') == 'watchdog'),
+        "watchdog_timeout_ms": board._watchdog_ms,
+        "max_feed_gap_ms": gap["max_us"] // 1000,
+        "error": None if sim.error is None else repr(sim.error),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m sim.watchdog',
+                                     description='Watchdog con la latencia de TLS de la Pico')
+    parser.add_argument('--hours', type=float, default=2, help='Horas virtuales a simular')
+    parser.add_argument('--latency', default='800,1500,2500,3000', help='Latencias HTTP en ms, separadas por comas')
+    parser.add_argument('--press-every', type=int, default=600, help='Segundos entre visitas al menú')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de los servicios simulados')
+    args = parser.parse_args()
+
+    results = [run(args.hours, int(latency), args.press_every, args.seed)
+               for latency in args.latency.split(',') if latency]
+
+    print(json.dumps(results, indent=2))
+
+    for result in results:
+        if result["watchdog_resets"] or result["error"]:
+            raise SystemExit(f'Con {result["latency_ms"]} ms de latencia: {result["watchdog_resets"]} '
+                             f'reinicios del watchdog, error {result["error"]}')
+
+
+if __name__ == '__main__':
+    main()
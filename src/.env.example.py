@@ -8,5 +8,73 @@ ALTERNATIVES_AP = [
     #{"ssid": "", "password": ""},
 ]
 
+# Reparte los precios entre los dispositivos de la red local (UDP multicast):
+# solo uno consulta la API y el resto recibe sus precios
+RELAY = False
+
+# Servidor HTTP local con precios y estado del dispositivo (/prices, /stats,
+# /battery, /wireless)
+HTTP_SERVER = False
+HTTP_PORT = 80
+
+# API propia que recibe la telemetría del dispositivo
+API_URL = ""
+API_PATH = ""
+API_TOKEN = ""
+DEVICE_ID = 0
+
+# Envía telemetría (precio, temperatura, señal...) por lotes; sin conexión se
+# guarda en la flash y se reenvía al volver
+TELEMETRY = False
+
+# Guarda velas de una hora en la flash para mostrar la variación de 24 h y 7 días
+KLINES = True
+
+# Pide en una sola petición la variación, el máximo y el mínimo de 24 h de las favoritas
+TICKER = True
+
+# Alertas de precio por moneda, en la divisa base (USDT): '70000' al cruzarlo,
+# '>70000' solo subiendo, '<60000' solo bajando y '5%' al moverse ese tanto por
+# ciento desde el mínimo o el máximo de la última hora
+ALERTS = {
+    # "BTC": [">70000", "<60000", "5%"],
+}
+
+# Peso por minuto de la API de Binance que se permite este dispositivo. El límite
+# (6000) es por IP: con varios dispositivos tras el mismo router, repartirlo
+BINANCE_WEIGHT = 600
+
+# Watchdog hardware: reinicia la placa si el firmware se cuelga. Desactivarlo
+# para depurar desde el REPL (con él, parar el programa reinicia la placa)
+WATCHDOG = True
+
+# Apaga la radio entre peticiones (o la deja en ahorro de energía si hay servidor
+# HTTP o relé). False la mantiene siempre encendida a pleno rendimiento
+WIFI_POWER_SAVE = True
+
+# Traza de latencia desde el encoder o la petición de precio hasta la pantalla
+# (unos 3 KB de RAM). Solo para diagnosticar: ver sim.trace en el README
+TRACE = False
+
+# Graba en la flash (record.bin, 256 KB como mucho) las respuestas de Binance, los flancos
+# del encoder y los botones y las lecturas del ADC para reproducirlos en el PC con sim.replay
+RECORD = False
+
+# Segunda pantalla OLED SSD1306 de 128x32 por I2C (SDA en GPIO4, SCL en GPIO5, dirección 0x3c)
+OLED = False
+
+# Pin del ADC (26, 27 o 28) con la batería a través de un divisor que lleve 4,2 V al fondo de
+# escala, o None si se alimenta por USB. Con batería se activan los perfiles de consumo
+BATTERY_PIN = None
+
+# Perfiles de consumo propios (ver PROFILES en Models/BatteryGovernor.py), por ejemplo:
+# BATTERY_PROFILES = (
+#     {"name": "normal", "min_pct": 30, "period_factor": 1, "intensity": 15, "radio_off_min_ms": 30000, "freq": 125000000},
+#     {"name": "critical", "min_pct": 0, "period_factor": 4, "intensity": 1, "radio_off_min_ms": 0, "freq": 64000000},
+# )
+
+# Servidor NTP para la hora del RTC
+NTP_HOST = "pool.ntp.org"
+
 # Indica si está en modo debug la aplicación
 DEBUG = False
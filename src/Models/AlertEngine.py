@@ -0,0 +1,329 @@
+from array import array
+from time import ticks_ms, ticks_diff
+from micropython import const
+from Models.QuoteConverter import parse_scaled, PRICE_SCALE
+from Models.Log import log, INFO
+
+# Dirección de cruce que dispara una alerta.
+ANY = const(0)
+UP = const(1)
+DOWN = const(2)
+
+
+def _bisect (values, x, count, right):
+    """Posición de ``x`` en ``values[:count]`` ordenado (como ``bisect_left``/``bisect_right``)."""
+    low = 0
+    high = count
+
+    while low < high:
+        middle = (low + high) // 2
+
+        if values[middle] < x or (right and values[middle] == x):
+            low = middle + 1
+        else:
+            high = middle
+
+    return low
+
+
+def _declare_events (symbol):
+    """Mensajes del registro de las alertas de una moneda: movimiento al subir, al bajar y nivel."""
+    return (log.event('alert', INFO, 'Alerta: ' + symbol + ' sube %d pb, precio %d.%08d'),
+            log.event('alert', INFO, 'Alerta: ' + symbol + ' baja %d pb, precio %d.%08d'),
+            log.event('alert', INFO, 'Alerta: ' + symbol + ' cruza %d.%08d, precio %d.%08d'))
+
+
+class _Thresholds:
+    """
+    Umbrales ordenados de una moneda con la dirección de cada uno.
+
+    Los valores van en un ``array`` ordenado y las direcciones en un
+    ``bytearray`` paralelo. Encontrar los umbrales cruzados entre dos valores
+    son dos búsquedas binarias, O(log n), más los que se disparan.
+    """
+
+    def __init__ (self, typecode):
+        self.values = array(typecode)
+        self.directions = bytearray()
+
+    def add (self, value, direction) -> None:
+        # Se añade al final y se desplaza a su sitio: solo al configurar.
+        position = _bisect(self.values, value, len(self.values), True)
+        self.values.append(value)
+        self.directions.append(direction)
+
+        for i in range(len(self.values) - 1, position, -1):
+            self.values[i] = self.values[i - 1]
+            self.directions[i] = self.directions[i - 1]
+
+        self.values[position] = value
+        self.directions[position] = direction
+
+    def remove (self, value) -> bool:
+        count = len(self.values)
+        position = _bisect(self.values, value, count, False)
+
+        if position == count or self.values[position] != value:
+            return False
+
+        self.values = self.values[:position] + self.values[position + 1:]
+        self.directions = self.directions[:position] + self.directions[position + 1:]
+
+        return True
+
+    def crossed (self, before, after):
+        """
+        Rango ``(inicio, fin, dirección)`` de los umbrales cruzados al pasar de
+        ``before`` a ``after``: subiendo, los de ``(before, after]``; bajando,
+        los de ``[after, before)``.
+        """
+        count = len(self.values)
+
+        if after > before:
+            return _bisect(self.values, before, count, True), _bisect(self.values, after, count, True), UP
+
+        return _bisect(self.values, after, count, False), _bisect(self.values, before, count, False), DOWN
+
+
+class AlertEngine:
+    """
+    Alertas de precio por moneda evaluadas con cada precio nuevo.
+
+    Hay dos tipos:
+
+    - De nivel: se disparan cuando el precio cruza un valor, en cualquier
+      dirección o solo subiendo o bajando.
+    - De movimiento: se disparan cuando el precio se aleja un tanto por ciento
+      del mínimo (subiendo) o del máximo (bajando) de la ventana del
+      historial de precios.
+
+    Cada moneda guarda sus umbrales ordenados, así que un precio nuevo solo
+    necesita dos búsquedas binarias contra el anterior para encontrar todos
+    los cruzados: cientos de alertas no cuestan nada por refresco. Un umbral
+    que ya se disparó no vuelve a hacerlo hasta pasados ``cooldown_ms``, para
+    que un precio que oscila alrededor no lo repita en cada lectura.
+
+    Args:
+        history (PriceHistory): Historial para las alertas de movimiento o None.
+        on_alert: Función ``f(symbol, direction, value, price, move)`` llamada por
+            cada alerta: ``value`` es el nivel escalado o, si ``move``, los puntos básicos.
+        cooldown_ms (int): Tiempo mínimo entre dos disparos del mismo umbral.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, history=None, on_alert=None, cooldown_ms=900000, debug=False):
+        self.DEBUG = debug
+        self.history = history
+        self.on_alert = on_alert
+        self.cooldown_ms = cooldown_ms
+
+        self._levels = {}
+        self._moves = {}
+        self._last = {}
+        self._last_move = {}
+        self._fired = {}
+
+        # Moneda -> mensajes del registro de sus alertas (ver ``_log_events``)
+        self._log_events = {}
+
+        self.stats = {
+            "checks": 0,
+            "triggered": 0,
+            "suppressed": 0,
+        }
+
+    def add (self, symbol, spec) -> None:
+        """
+        Añade una alerta desde texto: '70000' (cruce en cualquier dirección),
+        '>70000' (subiendo), '<60000' (bajando) o '5%' (movimiento).
+
+        Args:
+            symbol (str): Moneda, por ejemplo 'BTC'.
+            spec (str): Alerta en texto, con el precio en la divisa base.
+        """
+        spec = spec.strip()
+
+        if spec.endswith('%'):
+            self.add_move(symbol, parse_scaled(spec[:-1], 2))
+        elif spec[0] == '>':
+            self.add_level(symbol, parse_scaled(spec[1:]), UP)
+        elif spec[0] == '<':
+            self.add_level(symbol, parse_scaled(spec[1:]), DOWN)
+        else:
+            self.add_level(symbol, parse_scaled(spec), ANY)
+
+    def add_level (self, symbol, price, direction=ANY) -> None:
+        """Alerta al cruzar un precio escalado en la divisa base."""
+        if symbol not in self._levels:
+            self._levels[symbol] = _Thresholds('q')
+
+        self._levels[symbol].add(price, direction)
+
+    def add_move (self, symbol, bp) -> None:
+        """Alerta al moverse ``bp`` puntos básicos desde el extremo de la ventana."""
+        if symbol not in self._moves:
+            self._moves[symbol] = _Thresholds('i')
+
+        self._moves[symbol].add(bp, ANY)
+
+    def remove_level (self, symbol, price) -> bool:
+        thresholds = self._levels.get(symbol)
+
+        return thresholds is not None and thresholds.remove(price)
+
+    def remove_move (self, symbol, bp) -> bool:
+        thresholds = self._moves.get(symbol)
+
+        return thresholds is not None and thresholds.remove(bp)
+
+    def count (self) -> int:
+        """Alertas configuradas en total."""
+        return sum(len(t.values) for t in self._levels.values()) + sum(len(t.values) for t in self._moves.values())
+
+    def restore (self, symbol, price) -> None:
+        """Último precio conocido (de antes de un reinicio): el siguiente se compara con él sin disparar nada."""
+        self._last[symbol] = price
+
+    def check (self, symbol, price) -> int:
+        """
+        Evalúa un precio nuevo de una moneda (no usar desde IRQ).
+
+        Args:
+            symbol (str): Moneda.
+            price (int): Precio escalado en la divisa base.
+
+        Returns:
+            int: Alertas disparadas.
+        """
+        self.stats["checks"] += 1
+        fired = 0
+        before = self._last.get(symbol)
+        self._last[symbol] = price
+
+        levels = self._levels.get(symbol)
+
+        if levels is not None and before is not None and price != before:
+            start, end, direction = levels.crossed(before, price)
+
+            for i in range(start, end):
+                if levels.directions[i] in (ANY, direction):
+                    fired += self._fire(symbol, direction, levels.values[i], price, False)
+
+        moves = self._moves.get(symbol)
+
+        if moves is not None and self.history is not None:
+            fired += self._check_moves(symbol, price, moves)
+
+        return fired
+
+    def _check_moves (self, symbol, price, moves):
+        series = self.history.get(symbol)
+
+        if series is None or not series.count:
+            return 0
+
+        low = series.min()
+        high = series.max()
+        up = (price - low) * 10000 // low if low else 0
+        down = (high - price) * 10000 // high if high else 0
+        before_up, before_down = self._last_move.get(symbol, (up, down))
+        self._last_move[symbol] = (up, down)
+        fired = 0
+
+        for before, now, direction in ((before_up, up, UP), (before_down, down, DOWN)):
+            if now > before:
+                start, end, _ = moves.crossed(before, now)
+
+                for i in range(start, end):
+                    fired += self._fire(symbol, direction, moves.values[i], price, True)
+
+        return fired
+
+    def _fire (self, symbol, direction, value, price, move):
+        key = (symbol, direction, value, move)
+        now = ticks_ms()
+        last = self._fired.get(key)
+
+        if last is not None and ticks_diff(now, last) < self.cooldown_ms:
+            self.stats["suppressed"] += 1
+            return 0
+
+        self._fired[key] = now
+        self.stats["triggered"] += 1
+
+        events = self._log_events.get(symbol)
+
+        if events is None:
+            events = self._log_events[symbol] = _declare_events(symbol)
+
+        # Los precios van en dos enteros: el registro guarda 32 bits y están escalados
+        if move:
+            log.log(events[direction - UP], value, price // PRICE_SCALE, price % PRICE_SCALE)
+        else:
+            log.log(events[2], value // PRICE_SCALE, value % PRICE_SCALE, price // PRICE_SCALE, price % PRICE_SCALE)
+
+        if self.on_alert is not None:
+            self.on_alert(symbol, direction, value, price, move)
+
+        return 1
+
+
+class Blinker:
+    """
+    Parpadeo de una salida (LED, pantalla) con tareas del planificador, sin
+    bloquear el bucle con ``sleep``.
+
+    Args:
+        scheduler (Scheduler): Planificador donde se ejecuta el parpadeo.
+        on: Función que enciende la salida.
+        off: Función que la apaga.
+        period_ms (int): Duración de cada medio ciclo.
+        name (str): Nombre de la tarea.
+    """
+
+    def __init__ (self, scheduler, on, off, period_ms=250, name='blink'):
+        self.scheduler = scheduler
+        self.on = on
+        self.off = off
+        self.period_ms = period_ms
+        self._steps = 0
+        self._done = None
+        self._job = scheduler.on_demand(self._step, name=name)
+
+    def start (self, times=3, done=None) -> None:
+        """
+        Parpadea ``times`` veces empezando por apagar; un parpadeo en curso se alarga.
+
+        Args:
+            times (int): Parpadeos.
+            done: Función a llamar al terminar (con la salida encendida) o None.
+        """
+        self._steps = 2 * times
+        self._done = done
+        self.scheduler.reschedule(self._job, 0)
+
+    def active (self) -> bool:
+        return self._steps > 0
+
+    def stop (self) -> None:
+        """Corta el parpadeo dejando la salida encendida."""
+        if self._steps:
+            self._steps = 0
+            self.scheduler.cancel(self._job)
+            self.on()
+
+    def _step (self):
+        if self._steps <= 0:
+            return
+
+        self._steps -= 1
+
+        if self._steps % 2:
+            self.off()
+        else:
+            self.on()
+
+        if self._steps:
+            self.scheduler.reschedule(self._job, self.period_ms)
+        elif self._done is not None:
+            self._done()
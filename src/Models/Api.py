@@ -1,36 +1,274 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 #
-import urequests
 import ujson
+from errno import ECONNABORTED
+from time import ticks_ms, ticks_us, ticks_diff
+from Models.RateGovernor import governor, BACKGROUND, WEIGHT_PRICE, WEIGHT_KLINES
+from Models.Log import log, code, DEBUG, WARNING, ERROR
+from Models.Trace import trace
+from Models.Recorder import recorder
+from Models.Resolver import resolver
+from Models.CircuitBreaker import breaker
+
+# Segundos máximos de espera de una respuesta de Binance: un servidor que no
+# contesta no debe colgar el bucle principal hasta que salte el watchdog.
+HTTP_TIMEOUT = 3
+
+# Host de la API de Binance: todas sus peticiones comparten interruptor.
+BINANCE_HOST = 'api.binance.com'
+
+# Mensajes del registro (ver ``Models.Log``): el texto se monta al vaciarlo.
+_LOG_PRICE_STATUS = log.event('api', WARNING, 'Precio de Binance: HTTP %d')
+_LOG_PRICE_ERROR = log.event('api', ERROR, 'Error al obtener el precio: %d')
+_LOG_KLINES_STATUS = log.event('api', WARNING, 'Velas de Binance: HTTP %d')
+_LOG_KLINES_ERROR = log.event('api', ERROR, 'Error al obtener las velas: %d')
+_LOG_TICKER_STATUS = log.event('api', WARNING, 'Estadísticas de Binance: HTTP %d')
+_LOG_TICKER_ERROR = log.event('api', ERROR, 'Error al obtener las estadísticas: %d')
+_LOG_TIME_ERROR = log.event('api', ERROR, 'Error al obtener la hora de la API: %d')
+_LOG_API_STATUS = log.event('api', DEBUG, 'Respuesta de la API: HTTP %d')
+_LOG_API_ERROR = log.event('api', WARNING, 'Error en la petición a la API: %d')
+
+# Tramos de la traza (ver ``Models.Trace``): la petición hasta las cabeceras y la lectura de la respuesta.
+_SPAN_REQUEST = trace.name('request')
+_SPAN_PARSE = trace.name('parse')
+
+
+# ``urequests`` una vez importado (ver ``_urequests``).
+_requests = None
+
+
+def _urequests ():
+    """
+    ``urequests`` (y su socket y TLS) se importa con la primera petición, no
+    al arrancar, y resuelve los nombres con la caché de ``Models.Resolver``.
+    """
+    global _requests
 
+    if _requests is None:
+        import urequests
+
+        resolver.install(urequests)
+        _requests = urequests
+
+    return _requests
+
+
+def _host (url: str) -> str:
+    """Host (con puerto, si lo lleva) de una URL, la clave de su interruptor."""
+    return url.split('/', 3)[2]
+
+
+def _get (url: str, **kw):
+    """GET con ``urequests`` que, grabando (ver ``Models.Recorder``), guarda la respuesta o el error."""
+    urequests = _urequests()
+
+    if not recorder.enabled:
+        return urequests.get(url, **kw)
+
+    start = ticks_us()
+
+    try:
+        response = urequests.get(url, **kw)
+    except OSError as e:
+        recorder.http(url, -code(e), ticks_diff(ticks_us(), start))
+        raise
+
+    recorder.response(url, response, start)
+
+    return response
+
+
+def _attempt (method: str, url: str, **kw):
+    """
+    Petición a un host con el interruptor cerrado o en prueba (ver
+    ``Models.CircuitBreaker``): un error de conexión o un 5xx cuentan como
+    fallo del host y cualquier otra respuesta lo da por sano.
+    """
+    host = _host(url)
+    start = ticks_ms()
 
-def get_binance_price (crypto: str, base_currency: str = 'USDT'):
-    """Obtiene el precio actual de una criptomoneda desde la API pública de Binance."""
+    try:
+        response = _get(url, **kw) if method == 'GET' else _urequests().request(method, url, **kw)
+    except OSError:
+        breaker.failed(host, ticks_diff(ticks_ms(), start))
+
+        # Si la dirección guardada ya no acepta conexiones, la siguiente se resuelve de nuevo
+        resolver.invalidate(host.split(':')[0])
+        raise
+
+    if response.status_code >= 500:
+        breaker.failed(host, ticks_diff(ticks_ms(), start))
+    else:
+        breaker.succeeded(host)
+
+    return response
+
+
+def _request (method: str, url: str, **kw):
+    """
+    Petición a un host cualquiera; con su circuito abierto falla al instante
+    con ``ECONNABORTED`` en lugar de esperar otro timeout.
+    """
+    if not breaker.allow(_host(url)):
+        raise OSError(ECONNABORTED)
+
+    return _attempt(method, url, **kw)
+
+
+def _binance_get (url: str, weight: int, priority: int):
+    """
+    Petición GET a Binance a través de su interruptor y del gobernador de peso.
+
+    Returns:
+        Response: Respuesta o None si se aplaza por el límite de peso o
+        porque Binance no responde (circuito abierto).
+    """
+    if not breaker.allow(BINANCE_HOST) or not governor.acquire(weight, priority):
+        return None
+
+    start = ticks_us() if trace.enabled else 0
+    response = _attempt('GET', url, timeout=HTTP_TIMEOUT)
+    trace.span(_SPAN_REQUEST, start)
+    governor.observe(response.status_code, response.headers)
+
+    return response
+
+
+def get_binance_price_raw (crypto: str, base_currency: str = 'USDT', priority: int = BACKGROUND):
+    """
+    Obtiene el precio actual de una criptomoneda desde la API pública de Binance
+    como cadena, tal cual lo devuelve la API, para convertirlo sin pasar por float.
+
+    Devuelve None si falla o si el gobernador la aplaza (ver ``governor.wait_ms``).
+    """
     try:
         # API endpoint de Binance para obtener el precio
         url = f'https://api.binance.com/api/v3/ticker/price?symbol={crypto.upper()}{base_currency}'
 
-        # Realizamos la solicitud GET
-        response = urequests.get(url)
+        # Realizamos la solicitud GET si queda peso en el minuto
+        response = _binance_get(url, WEIGHT_PRICE, priority)
+
+        if response is None:
+            return None
 
         # Verificamos que la respuesta es exitosa
         if response.status_code == 200:
+            start = ticks_us() if trace.enabled else 0
             data = response.json()  # Convertimos la respuesta a formato JSON
-            price = float(data['price'])  # Obtenemos el precio
             response.close()
-            return price
+            trace.span(_SPAN_PARSE, start)
+            return data['price']  # Obtenemos el precio
+        else:
+            log.log(_LOG_PRICE_STATUS, response.status_code)
+            response.close()
+            return None
+    except Exception as e:
+        log.log(_LOG_PRICE_ERROR, code(e))
+        return None
+
+def get_binance_price (crypto: str, base_currency: str = 'USDT'):
+    """Obtiene el precio actual de una criptomoneda desde la API pública de Binance."""
+    price = get_binance_price_raw(crypto, base_currency)
+
+    return float(price) if price is not None else None
+
+def get_binance_klines (symbol: str, interval: str = '1h', start_ms=None, limit: int = 50,
+                        priority: int = BACKGROUND):
+    """
+    Obtiene velas (klines) de un par desde la API pública de Binance.
+
+    Cada vela es una lista ``[apertura_ms, apertura, máximo, mínimo, cierre,
+    volumen, cierre_ms, ...]`` con los precios en texto. La última puede ser
+    la vela en curso.
+
+    Args:
+        symbol (str): Par, por ejemplo 'BTCUSDT'.
+        interval (str): Intervalo de Binance ('1m', '1h', '1d'...).
+        start_ms (int): Apertura mínima en ms o None para las más recientes.
+        limit (int): Velas como mucho (cada una ocupa unos 150 bytes de JSON).
+        priority (int): Prioridad ante el gobernador de peso.
+
+    Returns:
+        list: Velas ordenadas por apertura o None si falla o se aplaza.
+    """
+    try:
+        url = f'https://api.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}'
+
+        if start_ms is not None:
+            url += f'&startTime={start_ms}'
+
+        response = _binance_get(url, WEIGHT_KLINES, priority)
+
+        if response is None:
+            return None
+
+        if response.status_code == 200:
+            start = ticks_us() if trace.enabled else 0
+            data = response.json()
+            response.close()
+            trace.span(_SPAN_PARSE, start)
+            return data
         else:
-            print("Error: No se pudo obtener el precio de Binance.")
+            log.log(_LOG_KLINES_STATUS, response.status_code)
+            response.close()
             return None
     except Exception as e:
-        print("Error al obtener el precio:", e)
+        log.log(_LOG_KLINES_ERROR, code(e))
+        return None
+
+def ticker_weight (count: int) -> int:
+    """Peso de /api/v3/ticker/24hr según los pares pedidos (0 = todos)."""
+    if not count or count > 100:
+        return 80
+
+    return 2 if count <= 20 else 40
+
+def get_binance_ticker_24h (pairs, feed, priority: int = BACKGROUND):
+    """
+    Pide las estadísticas de 24 horas (``type=MINI``) de varios pares en una
+    sola petición y pasa la respuesta sin leer a ``feed``.
+
+    La respuesta no se carga en memoria: ``feed`` la recibe como flujo para
+    extraer solo los campos que necesita (ver ``TickerStats.feed``).
+
+    Args:
+        pairs (list): Pares, por ejemplo ['BTCUSDT', 'ETHUSDT']; vacía para todos.
+        feed: Función ``feed(stream) -> int`` que lee la respuesta.
+        priority (int): Prioridad ante el gobernador de peso.
+
+    Returns:
+        int: Lo que devuelva ``feed`` o None si falla o se aplaza.
+    """
+    try:
+        url = 'https://api.binance.com/api/v3/ticker/24hr?type=MINI'
+
+        if pairs:
+            url += '&symbols=%5B' + '%2C'.join('%22' + pair.upper() + '%22' for pair in pairs) + '%5D'
+
+        response = _binance_get(url, ticker_weight(len(pairs)), priority)
+
+        if response is None:
+            return None
+
+        if response.status_code == 200:
+            start = ticks_us() if trace.enabled else 0
+            updated = feed(response.raw)
+            response.close()
+            trace.span(_SPAN_PARSE, start)
+            return updated
+        else:
+            log.log(_LOG_TICKER_STATUS, response.status_code)
+            response.close()
+            return None
+    except Exception as e:
+        log.log(_LOG_TICKER_ERROR, code(e))
         return None
 
 def get_time_utc ():
     """Obtiene la hora actual en formato UTC desde la API 'worldtimeapi.org'."""
     try:
-        response = urequests.get('http://worldtimeapi.org/api/timezone/Etc/UTC.json')
+        response = _request('GET', 'http://worldtimeapi.org/api/timezone/Etc/UTC.json', timeout=HTTP_TIMEOUT)
         data = response.json()
         response.close()
 
@@ -58,7 +296,7 @@ def get_time_utc ():
         return year, month, day, hour, minute, second, day_of_week, day_of_year, week_number
 
     except Exception as e:
-        print("Error obtaining the time from the API:", e)
+        log.log(_LOG_TIME_ERROR, code(e))
         return None
 
 
@@ -93,20 +331,17 @@ class Api:
 
             url = self.URL + self.URL_PATH
 
-            response = urequests.get(url, headers=headers)
+            response = _request('GET', url, headers=headers, timeout=HTTP_TIMEOUT)
 
             data = ujson.loads(response.text)
 
-            if self.DEBUG:
-                print('Respuesta de la API:', response)
-                print('Respuesta de la API en json:', data)
+            log.log(_LOG_API_STATUS, response.status_code)
 
             if response.status_code == 201:
                 return data
 
         except Exception as e:
-            if self.DEBUG:
-                print("Error al obtener los datos de la api: ", e)
+            log.log(_LOG_API_ERROR, code(e))
             return False
 
     def send_to_api (self, data={}) -> bool:
@@ -132,18 +367,47 @@ class Api:
                 "hardware_device_id": self.DEVICE_ID
             }
 
-            response = urequests.post(url, headers=headers, json=payload)
+            response = _request('POST', url, headers=headers, json=payload, timeout=HTTP_TIMEOUT)
             #data = ujson.loads(response.text)
 
-            if self.DEBUG:
-                print('Respuesta de la API:', response)
+            log.log(_LOG_API_STATUS, response.status_code)
 
             if response.status_code == 201:
                 return True
 
         except Exception as e:
-            if self.DEBUG:
-                print("Error al obtener los datos de la api: ", e)
+            log.log(_LOG_API_ERROR, code(e))
+
+            return False
+
+    def send_batch (self, body) -> bool:
+        """
+        Envía un lote de telemetría ya codificado (ver ``TelemetryQueue``).
+
+        Args:
+            body (bytes): Cuerpo JSON del lote.
+
+        Returns:
+            bool: True si la API lo aceptó.
+        """
+        try:
+            headers = {
+                "Authorization": "Bearer " + self.TOKEN,
+                "Content-Type": "application/json",
+                "Device-Id": str(self.DEVICE_ID)
+            }
+
+            response = _request('POST', self.URL + self.URL_PATH, headers=headers, data=body,
+                                timeout=HTTP_TIMEOUT)
+            status = response.status_code
+            response.close()
+
+            log.log(_LOG_API_STATUS, status)
+
+            return status in (200, 201, 202)
+
+        except Exception as e:
+            log.log(_LOG_API_ERROR, code(e))
 
             return False
 
@@ -0,0 +1,208 @@
+from time import ticks_ms, ticks_diff
+from Models.Log import log, INFO, DEBUG
+
+# Curva de descarga de una celda LiPo en reposo: (voltios, % de carga). Entre 3,7 y 3,9 V
+# está casi plana, así que el porcentaje lineal en voltaje no sirve para medir la descarga.
+LIPO_CURVE = ((3.30, 0), (3.50, 5), (3.60, 10), (3.67, 20), (3.71, 30), (3.75, 40), (3.79, 50),
+              (3.84, 60), (3.90, 70), (3.98, 80), (4.08, 90), (4.20, 100))
+
+# Perfiles de consumo del más al menos exigente: cada uno se usa mientras la batería no baje
+# de ``min_pct``. ``period_factor`` multiplica el periodo de las consultas a la red,
+# ``intensity`` limita el brillo de la pantalla, ``radio_off_min_ms`` es el hueco entre
+# peticiones a partir del cual se apaga la radio (ver ``RadioManager``) y ``freq`` la
+# frecuencia de la CPU.
+PROFILES = (
+    {"name": "normal", "min_pct": 40, "period_factor": 1, "intensity": 15,
+     "radio_off_min_ms": 30000, "freq": 125000000},
+    {"name": "eco", "min_pct": 15, "period_factor": 3, "intensity": 4,
+     "radio_off_min_ms": 10000, "freq": 64000000},
+    {"name": "critical", "min_pct": 0, "period_factor": 6, "intensity": 1,
+     "radio_off_min_ms": 0, "freq": 48000000},
+)
+
+# Mensajes del registro (ver ``Models.Log``)
+_LOG_PROFILE = log.event('battery', INFO, 'Perfil %d con la batería al %d %%')
+_LOG_READING = log.event('battery', DEBUG, 'Batería al %d %% (suavizada %d %%), %d centésimas de %% por hora')
+
+
+def charge_pct (voltage, curve=LIPO_CURVE) -> float:
+    """
+    Porcentaje de carga de la celda interpolando en su curva de descarga.
+
+    Args:
+        voltage (float): Voltaje de la celda.
+        curve (tuple): Pares ``(voltios, %)`` de menor a mayor.
+
+    Returns:
+        float: Carga entre 0 y 100.
+    """
+    if voltage <= curve[0][0]:
+        return float(curve[0][1])
+
+    for (v0, p0), (v1, p1) in zip(curve, curve[1:]):
+        if voltage <= v1:
+            return p0 + (p1 - p0) * (voltage - v0) / (v1 - v0)
+
+    return float(curve[-1][1])
+
+
+class BatteryGovernor:
+    """
+    Ajusta el consumo del dispositivo según lo que queda de batería.
+
+    Cada ``period_ms`` lee el porcentaje de la batería, lo suaviza con una
+    media móvil contra el ruido del ADC y elige el primer perfil de
+    ``profiles`` cuyo ``min_pct`` no supera la lectura. Bajar de perfil es
+    inmediato; volver a uno más exigente exige superar su umbral en
+    ``hysteresis_pct``, para no alternar entre dos perfiles con una lectura
+    en el límite (o al cargar).
+
+    Aplicar el perfil es cosa de ``apply(profile)``, que recibe el
+    diccionario del perfil elegido y ajusta periodos, brillo, radio y CPU.
+
+    El ritmo de descarga se mide entre lecturas separadas al menos
+    ``rate_window_ms`` y da la autonomía estimada (``runtime_h``).
+
+    Args:
+        scheduler (Scheduler): Planificador de la lectura periódica.
+        read: Función sin argumentos que devuelve el porcentaje de batería o None.
+        apply: Función ``apply(profile)`` que aplica un perfil.
+        profiles (tuple): Perfiles del más al menos exigente; el último debería tener ``min_pct`` 0.
+        period_ms (int): Intervalo entre lecturas.
+        hysteresis_pct (float): Margen para volver a un perfil más exigente.
+        rate_window_ms (int): Tiempo mínimo entre las dos lecturas que miden la descarga.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, read, apply, profiles=PROFILES, period_ms=60000, hysteresis_pct=5,
+                  rate_window_ms=900000, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.read = read
+        self.apply = apply
+        self.profiles = profiles
+        self.period_ms = period_ms
+        self.hysteresis_pct = hysteresis_pct
+        self.rate_window_ms = rate_window_ms
+
+        # Porcentaje suavizado y descarga en % por hora (None hasta medirla).
+        self.pct = None
+        self.rate_pct_h = None
+        self.index = None
+
+        self._job = None
+        self._mark = None
+        self._since = ticks_ms()
+        self._times = [0] * len(profiles)
+
+        self.stats = {
+            "readings": 0,
+            "switches": 0,
+        }
+
+    def start (self) -> None:
+        """Lee la batería ya y después cada ``period_ms``."""
+        self._job = self.scheduler.every(self.period_ms, self.update, name='battery')
+
+    def profile (self) -> dict:
+        """Perfil en uso o None antes de la primera lectura."""
+        return self.profiles[self.index] if self.index is not None else None
+
+    def update (self) -> None:
+        """Lee la batería y cambia de perfil si toca."""
+        pct = self.read()
+
+        if pct is None:
+            return
+
+        now = ticks_ms()
+        self.stats["readings"] += 1
+
+        # Media móvil con peso 1/4 contra el ruido del ADC
+        self.pct = pct if self.pct is None else self.pct + (pct - self.pct) / 4
+
+        self._measure(now)
+
+        log.log(_LOG_READING, int(pct), int(self.pct), int((self.rate_pct_h or 0) * 100))
+
+        index = self.choose(self.pct)
+
+        if index != self.index:
+            self._switch(index, now)
+
+    def choose (self, pct) -> int:
+        """
+        Perfil que corresponde a un porcentaje desde el perfil actual.
+
+        Returns:
+            int: Índice en ``profiles``.
+        """
+        last = len(self.profiles) - 1
+        index = next((i for i, profile in enumerate(self.profiles) if pct >= profile["min_pct"]), last)
+
+        # Solo se sube a un perfil más exigente con margen sobre su umbral
+        if self.index is not None:
+            while index < self.index and pct < self.profiles[index]["min_pct"] + self.hysteresis_pct:
+                index += 1
+
+        return index
+
+    def runtime_h (self):
+        """Horas de batería que quedan al ritmo de descarga medido o None si no se descarga."""
+        if self.pct is None or not self.rate_pct_h or self.rate_pct_h <= 0:
+            return None
+
+        return self.pct / self.rate_pct_h
+
+    def report (self) -> dict:
+        """
+        Estado para ``/stats``: perfil, batería, descarga, autonomía y tiempo en cada perfil.
+
+        Returns:
+            dict: ``<perfil>_ms`` por perfil además de lo anterior y ``stats``.
+        """
+        times = list(self._times)
+        runtime = self.runtime_h()
+
+        if self.index is not None:
+            times[self.index] += ticks_diff(ticks_ms(), self._since)
+
+        report = {
+            "profile": self.profiles[self.index]["name"] if self.index is not None else None,
+            "pct": round(self.pct, 1) if self.pct is not None else None,
+            "rate_pct_h": round(self.rate_pct_h, 2) if self.rate_pct_h is not None else None,
+            "runtime_h": round(runtime, 1) if runtime is not None else None,
+        }
+
+        for i, profile in enumerate(self.profiles):
+            report[profile["name"] + '_ms'] = times[i]
+
+        report.update(self.stats)
+
+        return report
+
+    def _measure (self, now):
+        if self._mark is None:
+            self._mark = (now, self.pct)
+            return
+
+        elapsed = ticks_diff(now, self._mark[0])
+
+        if elapsed < self.rate_window_ms:
+            return
+
+        rate = (self._mark[1] - self.pct) * 3600000 / elapsed
+        self.rate_pct_h = rate if self.rate_pct_h is None else self.rate_pct_h + (rate - self.rate_pct_h) / 2
+        self._mark = (now, self.pct)
+
+    def _switch (self, index, now):
+        if self.index is not None:
+            self._times[self.index] += ticks_diff(now, self._since)
+            self.stats["switches"] += 1
+
+        self._since = now
+        self.index = index
+
+        log.log(_LOG_PROFILE, index, int(self.pct))
+
+        self.apply(self.profiles[index])
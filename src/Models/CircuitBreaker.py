@@ -0,0 +1,189 @@
+from time import ticks_ms, ticks_add, ticks_diff
+from micropython import const
+from Models.Log import log, INFO, WARNING
+
+# Estado del circuito de un host
+CLOSED = const(0)       # Las peticiones pasan
+OPEN = const(1)         # Se rechazan al instante hasta que toque probar
+HALF_OPEN = const(2)    # Ha salido una petición de prueba; las demás esperan a su resultado
+
+_STATE_NAMES = ('closed', 'open', 'half-open')
+
+# Campos del circuito de cada host
+_STATE = const(0)
+_FAILURES = const(1)
+_UNTIL = const(2)
+_COOLDOWN = const(3)
+_FAIL_MS = const(4)
+
+# Mensajes del registro (ver ``Models.Log``): el host es su posición en ``report``.
+_LOG_OPEN = log.event('net', WARNING, 'Circuito %d abierto tras %d fallos, se prueba en %d ms')
+_LOG_CLOSED = log.event('net', INFO, 'Circuito %d cerrado tras %d rechazos')
+
+
+class CircuitBreaker:
+    """
+    Interruptor por host para las peticiones salientes.
+
+    Tras ``threshold`` fallos seguidos de un host (sin conexión, timeout o
+    respuesta 5xx) su circuito se abre y ``allow`` rechaza al instante las
+    peticiones a ese host, en lugar de esperar otro timeout completo en cada
+    reintento. Pasado ``cooldown_ms`` deja salir una sola petición de prueba
+    (semiabierto): si va bien el circuito se cierra; si falla se vuelve a
+    abrir con el doble de espera, hasta ``max_cooldown_ms``. Si la prueba no
+    llega a salir (la aplaza el gobernador de Binance), se permite otra al
+    cabo de la misma espera.
+
+    Los fallos sin Wi-Fi (``online``) no cuentan: no son culpa del host y,
+    al volver la red, el circuito tiene que estar cerrado.
+
+    Args:
+        threshold (int): Fallos seguidos que abren el circuito.
+        cooldown_ms (int): Espera hasta la primera prueba.
+        max_cooldown_ms (int): Espera máxima entre pruebas.
+        online: Función que indica si hay conexión o None para suponer que sí.
+        enabled (bool): Si False, todas las peticiones pasan y solo se cuentan los fallos.
+    """
+
+    def __init__ (self, threshold=3, cooldown_ms=30000, max_cooldown_ms=600000, online=None, enabled=True):
+        self.threshold = threshold
+        self.cooldown_ms = cooldown_ms
+        self.max_cooldown_ms = max_cooldown_ms
+        self.online = online
+        self.enabled = enabled
+
+        # Host -> [estado, fallos seguidos, próxima prueba (ticks_ms), espera, ms medios de un fallo]
+        self._circuits = {}
+        self._hosts = []
+        self._rejected = {}
+
+        self.stats = {
+            "opened": 0,
+            "rejected": 0,
+            "probes": 0,
+            "closed": 0,
+            "failures": 0,
+            "avoided_ms": 0,
+        }
+
+    def _circuit (self, host):
+        circuit = self._circuits.get(host)
+
+        if circuit is None:
+            circuit = [CLOSED, 0, 0, self.cooldown_ms, 0]
+            self._circuits[host] = circuit
+            self._hosts.append(host)
+            self._rejected[host] = 0
+
+        return circuit
+
+    def allow (self, host) -> bool:
+        """
+        Indica si una petición a ``host`` puede salir.
+
+        Returns:
+            bool: False si el circuito está abierto y aún no toca probar.
+        """
+        circuit = self._circuits.get(host)
+
+        if circuit is None or circuit[_STATE] == CLOSED or not self.enabled:
+            return True
+
+        now = ticks_ms()
+
+        if ticks_diff(circuit[_UNTIL], now) > 0:
+            # Se ahorra lo que suele tardar en fallar este host
+            self.stats["rejected"] += 1
+            self.stats["avoided_ms"] += circuit[_FAIL_MS]
+            self._rejected[host] += 1
+
+            return False
+
+        circuit[_STATE] = HALF_OPEN
+        circuit[_UNTIL] = ticks_add(now, circuit[_COOLDOWN])
+        self.stats["probes"] += 1
+
+        return True
+
+    def succeeded (self, host) -> None:
+        """Respuesta del host (no 5xx): el circuito se cierra."""
+        circuit = self._circuits.get(host)
+
+        if circuit is None:
+            return
+
+        if circuit[_STATE] != CLOSED:
+            log.log(_LOG_CLOSED, self._hosts.index(host), self._rejected[host])
+            self.stats["closed"] += 1
+            self._rejected[host] = 0
+
+        circuit[_STATE] = CLOSED
+        circuit[_FAILURES] = 0
+        circuit[_COOLDOWN] = self.cooldown_ms
+
+    def failed (self, host, elapsed_ms) -> None:
+        """
+        Fallo de una petición al host.
+
+        Args:
+            host (str): Host de la petición.
+            elapsed_ms (int): Lo que tardó en fallar, para estimar el tiempo ahorrado.
+        """
+        if self.online is not None and not self.online():
+            return
+
+        circuit = self._circuit(host)
+        circuit[_FAILURES] += 1
+        circuit[_FAIL_MS] = elapsed_ms if not circuit[_FAIL_MS] else (circuit[_FAIL_MS] * 3 + elapsed_ms) // 4
+        self.stats["failures"] += 1
+
+        if circuit[_STATE] == HALF_OPEN:
+            # Falla la prueba: se espera el doble hasta la siguiente
+            circuit[_COOLDOWN] = min(self.max_cooldown_ms, circuit[_COOLDOWN] * 2)
+        elif circuit[_STATE] == OPEN or circuit[_FAILURES] < self.threshold:
+            return
+
+        circuit[_STATE] = OPEN
+        circuit[_UNTIL] = ticks_add(ticks_ms(), circuit[_COOLDOWN])
+        self.stats["opened"] += 1
+        log.log(_LOG_OPEN, self._hosts.index(host), circuit[_FAILURES], circuit[_COOLDOWN])
+
+    def state (self, host) -> int:
+        """``CLOSED``, ``OPEN`` o ``HALF_OPEN``."""
+        circuit = self._circuits.get(host)
+
+        return circuit[_STATE] if circuit is not None else CLOSED
+
+    def wait_ms (self, host) -> int:
+        """Milisegundos hasta que se pueda probar ``host`` (0 si el circuito no está abierto)."""
+        circuit = self._circuits.get(host)
+
+        if circuit is None or circuit[_STATE] == CLOSED:
+            return 0
+
+        return max(0, ticks_diff(circuit[_UNTIL], ticks_ms()))
+
+    def report (self) -> dict:
+        """
+        Estado para ``/stats``.
+
+        Returns:
+            dict: Contadores y, por host, estado, fallos seguidos, espera hasta
+            la próxima prueba y lo que tarda de media en fallar.
+        """
+        hosts = {}
+
+        for host in self._hosts:
+            circuit = self._circuits[host]
+            hosts[host] = {
+                "state": _STATE_NAMES[circuit[_STATE]],
+                "failures": circuit[_FAILURES],
+                "wait_ms": self.wait_ms(host),
+                "fail_ms": circuit[_FAIL_MS],
+            }
+
+        return dict(self.stats, hosts=hosts)
+
+
+# Interruptores compartidos por todas las peticiones salientes (ver ``Models.Api``).
+breaker = CircuitBreaker()
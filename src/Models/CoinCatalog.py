@@ -0,0 +1,295 @@
+import struct
+from array import array
+from micropython import const
+
+# Cabecera: magia, versión, ancho de cada entrada, entradas y favoritas.
+_HEADER = '>2sBBHBx'
+_HEADER_SIZE = const(8)
+_MAGIC = b'CC'
+_VERSION = const(1)
+
+# Favoritas como posiciones de entrada (2 bytes cada una) tras la cabecera.
+MAX_FAVOURITES = const(16)
+
+# Índice de prefijos: primera entrada que empieza por cada grupo (0-9, A-Z, resto).
+_GROUPS = const(37)
+
+_TABLE = _HEADER_SIZE + 2 * MAX_FAVOURITES + 2 * _GROUPS
+
+# Entradas que se leen de una vez al recorrer el catálogo.
+_PAGE_ENTRIES = const(16)
+
+
+def _group (first) -> int:
+    """Grupo de prefijo de un byte inicial."""
+    if 48 <= first <= 57:
+        return first - 48
+
+    if 65 <= first <= 90:
+        return first - 55
+
+    return 36
+
+
+def build_catalog (path, symbols, favourites=(), width=8) -> int:
+    """
+    Escribe un catálogo de monedas (en el PC o en el dispositivo).
+
+    Args:
+        path (str): Fichero de destino.
+        symbols (list): Monedas; se ordenan, se pasan a mayúsculas y se descartan
+            las repetidas y las más largas que ``width``.
+        favourites (list): Monedas favoritas (como mucho ``MAX_FAVOURITES``).
+        width (int): Bytes de cada entrada.
+
+    Returns:
+        int: Entradas escritas.
+    """
+    entries = sorted(set(s.upper() for s in symbols if 0 < len(s) <= width))
+    positions = {symbol: i for i, symbol in enumerate(entries)}
+    favourites = [positions[s.upper()] for s in favourites if s.upper() in positions][:MAX_FAVOURITES]
+
+    index = [0xFFFF] * _GROUPS
+
+    for i in range(len(entries) - 1, -1, -1):
+        index[_group(ord(entries[i][0]))] = i
+
+    with open(path, 'wb') as f:
+        f.write(struct.pack(_HEADER, _MAGIC, _VERSION, width, len(entries), len(favourites)))
+        f.write(struct.pack('>' + 'H' * MAX_FAVOURITES, *(favourites + [0] * (MAX_FAVOURITES - len(favourites)))))
+        f.write(struct.pack('>' + 'H' * _GROUPS, *index))
+
+        for symbol in entries:
+            f.write(symbol.encode() + b'\x00' * (width - len(symbol)))
+
+    return len(entries)
+
+
+class CoinCatalog:
+    """
+    Catálogo de monedas en la flash, leído bajo demanda.
+
+    El fichero es una tabla ordenada de entradas de ancho fijo (el símbolo
+    rellenado con ceros), así que la entrada ``i`` está en una posición
+    calculable sin recorrer nada. En RAM solo quedan la cabecera, las
+    favoritas, el índice de prefijos (la primera entrada de cada letra, para
+    saltar de letra en O(1)) y una página de ``_PAGE_ENTRIES`` entradas: unos
+    cientos de bytes tenga el catálogo 10 o 2000 monedas.
+
+    Las favoritas (hasta ``MAX_FAVOURITES``) se guardan como posiciones en la
+    cabecera del mismo fichero y se cambian reescribiendo solo esa zona.
+
+    Args:
+        path (str): Fichero del catálogo (ver ``build_catalog``).
+    """
+
+    def __init__ (self, path='coins.bin'):
+        self.path = path
+        self._file = open(path, 'r+b')
+        magic, version, self.width, self.count, favourites = struct.unpack(_HEADER, self._file.read(_HEADER_SIZE))
+
+        if magic != _MAGIC or version != _VERSION:
+            self._file.close()
+            raise ValueError('Catálogo no válido: ' + path)
+
+        table = self._file.read(_TABLE - _HEADER_SIZE)
+        self._favourites = [struct.unpack_from('>H', table, 2 * i)[0] for i in range(favourites)]
+        self._index = array('H', struct.unpack_from('>' + 'H' * _GROUPS, table, 2 * MAX_FAVOURITES))
+
+        self._page = bytearray(_PAGE_ENTRIES * self.width)
+        self._page_start = -1
+
+    def __len__ (self) -> int:
+        return self.count
+
+    def __getitem__ (self, i) -> str:
+        return self.symbol(i)
+
+    def _load (self, i):
+        start = i - i % _PAGE_ENTRIES
+
+        if start != self._page_start:
+            self._file.seek(_TABLE + start * self.width)
+            self._file.readinto(self._page)
+            self._page_start = start
+
+        return (i - start) * self.width
+
+    def symbol (self, i) -> str:
+        """Moneda de la entrada ``i``."""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+
+        offset = self._load(i)
+        end = offset + self.width
+
+        while end > offset and not self._page[end - 1]:
+            end -= 1
+
+        return self._page[offset:end].decode()
+
+    def find (self, symbol) -> int:
+        """
+        Posición de una moneda por búsqueda binaria, empezando por su grupo de prefijo.
+
+        Returns:
+            int: Entrada o -1 si no está.
+        """
+        symbol = symbol.upper()
+        group = _group(ord(symbol[0]))
+        low = self._index[group]
+
+        if low == 0xFFFF:
+            return -1
+
+        high = self.count
+
+        for g in range(group + 1, _GROUPS):
+            if self._index[g] != 0xFFFF:
+                high = self._index[g]
+                break
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.symbol(middle) < symbol:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low if low < self.count and self.symbol(low) == symbol else -1
+
+    def jump (self, i, direction) -> int:
+        """
+        Primera entrada del grupo de prefijo siguiente (o del actual o el anterior, hacia atrás).
+
+        Args:
+            i (int): Entrada actual.
+            direction (int): 1 hacia delante, -1 hacia atrás.
+
+        Returns:
+            int: Entrada de destino (la misma si no hay otro grupo).
+        """
+        group = _group(ord(self.symbol(i)[0]))
+
+        if direction > 0:
+            for g in range(group + 1, _GROUPS):
+                if self._index[g] != 0xFFFF:
+                    return self._index[g]
+
+            return i
+
+        # Hacia atrás: al principio del grupo actual y, si ya se está, al del anterior.
+        if self._index[group] < i:
+            return self._index[group]
+
+        for g in range(group - 1, -1, -1):
+            if self._index[g] != 0xFFFF:
+                return self._index[g]
+
+        return i
+
+    def favourites (self) -> list:
+        """Monedas favoritas en el orden en que se marcaron."""
+        return [self.symbol(i) for i in self._favourites]
+
+    def is_favourite (self, symbol) -> bool:
+        return self.find(symbol) in self._favourites
+
+    def toggle_favourite (self, symbol) -> bool:
+        """
+        Marca o desmarca una favorita y lo guarda en la flash.
+
+        Returns:
+            bool: True si queda como favorita.
+        """
+        i = self.find(symbol)
+
+        if i < 0:
+            return False
+
+        if i in self._favourites:
+            self._favourites.remove(i)
+        elif len(self._favourites) < MAX_FAVOURITES:
+            self._favourites.append(i)
+        else:
+            return False
+
+        self._file.seek(0)
+        self._file.write(struct.pack(_HEADER, _MAGIC, _VERSION, self.width, self.count, len(self._favourites)))
+        self._file.write(struct.pack('>' + 'H' * len(self._favourites), *self._favourites))
+        self._file.flush()
+
+        return i in self._favourites
+
+    def close (self) -> None:
+        self._file.close()
+
+
+class CoinMenu:
+    """
+    Posiciones del encoder en el menú: favoritas, divisas de cotización y el
+    catálogo completo por orden alfabético.
+
+    Se comporta como una secuencia de monedas (None en las divisas) para que
+    el ``Prefetcher`` precargue las vecinas de cualquier posición.
+
+    Args:
+        catalog (CoinCatalog): Catálogo de monedas.
+        quotes (tuple): Divisas de cotización.
+    """
+
+    def __init__ (self, catalog, quotes):
+        self.catalog = catalog
+        self.quotes = quotes
+        self.favourites = catalog.favourites()
+
+    def __len__ (self) -> int:
+        return len(self.favourites) + len(self.quotes) + self.catalog.count
+
+    def __getitem__ (self, i):
+        return self.coin(i)
+
+    def catalog_start (self) -> int:
+        return len(self.favourites) + len(self.quotes)
+
+    def coin (self, i):
+        """Moneda de una posición o None si es una divisa de cotización."""
+        if i < len(self.favourites):
+            return self.favourites[i]
+
+        if i < self.catalog_start():
+            return None
+
+        return self.catalog.symbol(i - self.catalog_start())
+
+    def quote (self, i):
+        """Divisa de cotización de una posición o None si es una moneda."""
+        i -= len(self.favourites)
+
+        return self.quotes[i] if 0 <= i < len(self.quotes) else None
+
+    def index_of (self, symbol) -> int:
+        """Posición de una moneda: la de favorita si lo es; si no, la del catálogo o 0."""
+        if symbol in self.favourites:
+            return self.favourites.index(symbol)
+
+        i = self.catalog.find(symbol)
+
+        return self.catalog_start() + i if i >= 0 else 0
+
+    def jump (self, i, direction) -> int:
+        """Salto de prefijo dentro del catálogo; fuera de él no se salta."""
+        start = self.catalog_start()
+
+        if i < start:
+            return i
+
+        return start + self.catalog.jump(i - start, direction)
+
+    def toggle_favourite (self, symbol) -> bool:
+        """Marca o desmarca una favorita; las posiciones del menú cambian."""
+        favourite = self.catalog.toggle_favourite(symbol)
+        self.favourites = self.catalog.favourites()
+
+        return favourite
@@ -0,0 +1,325 @@
+import errno
+import select
+import socket
+from time import ticks_ms, ticks_diff
+from micropython import const
+
+# Tamaño máximo de la cabecera de una petición.
+_REQUEST_MAX = const(512)
+
+_STATUS = {
+    200: b'200 OK',
+    400: b'400 Bad Request',
+    404: b'404 Not Found',
+    405: b'405 Method Not Allowed',
+    503: b'503 Service Unavailable',
+}
+
+
+def _response (status, body, content_type=b'application/json', keep_alive=True) -> bytes:
+    """Respuesta HTTP/1.1 completa, lista para enviar (keep-alive es lo implícito en 1.1)."""
+    return (b'HTTP/1.1 ' + _STATUS[status] + b'\r\nContent-Type: ' + content_type +
+            b'\r\nContent-Length: ' + str(len(body)).encode() +
+            (b'\r\n\r\n' if keep_alive else b'\r\nConnection: close\r\n\r\n') + body)
+
+
+class _Client:
+    def __init__ (self, sock, now):
+        self.sock = sock
+        self.inbox = b''
+        self.outbox = None
+        self.sent = 0
+        self.close_after = False
+        self.writing = False
+        self.last = now
+        self.callback = None
+
+
+class _Route:
+    def __init__ (self, render, ttl_ms):
+        self.render = render
+        self.ttl_ms = ttl_ms
+        self.response = None
+        self.rendered = 0
+
+
+class HttpServer:
+    """
+    Servidor HTTP mínimo y no bloqueante para consultar el dispositivo en la red local.
+
+    Los sockets se vigilan desde el planificador (``Scheduler.watch``), así
+    que atender peticiones nunca detiene el bucle: cada despertar lee lo que
+    haya, responde y vuelve. Cada ruta guarda su respuesta ya montada
+    (cabeceras incluidas) durante ``ttl_ms``; servirla no reserva memoria ni
+    vuelve a serializar, solo envía los bytes preparados.
+
+    Admite varios clientes a la vez con keep-alive y peticiones encadenadas.
+    Solo GET y HEAD, sin cuerpo.
+
+    Args:
+        scheduler (Scheduler): Planificador que vigila los sockets.
+        port (int): Puerto TCP.
+        max_clients (int): Conexiones simultáneas; las que sobran reciben 503.
+        idle_ms (int): Tiempo sin actividad tras el que se cierra una conexión.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, port=80, max_clients=4, idle_ms=30000, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.port = port
+        self.max_clients = max_clients
+        self.idle_ms = idle_ms
+        self.sock = None
+        self.clients = []
+        self.routes = {}
+
+        self._not_found = _response(404, b'{"error":"not found"}')
+        self._not_allowed = _response(405, b'{"error":"method not allowed"}', keep_alive=False)
+        self._bad_request = _response(400, b'{"error":"bad request"}', keep_alive=False)
+        self._busy = _response(503, b'{"error":"busy"}', keep_alive=False)
+
+        self.stats = {
+            "connections": 0,
+            "rejected": 0,
+            "requests": 0,
+            "renders": 0,
+            "errors": 0,
+            "bytes_sent": 0,
+        }
+
+    def route (self, path, render, ttl_ms=1000) -> None:
+        """
+        Registra una ruta GET.
+
+        Args:
+            path (str): Ruta exacta, por ejemplo '/prices'.
+            render: Función sin argumentos que devuelve el cuerpo JSON (str o bytes).
+            ttl_ms (int): Tiempo durante el que se reutiliza la respuesta montada.
+        """
+        self.routes[path.encode()] = _Route(render, ttl_ms)
+
+    def invalidate (self, path=None) -> None:
+        """Descarta la respuesta montada de una ruta (o de todas) para que se regenere."""
+        for key, route in self.routes.items():
+            if path is None or key == path.encode():
+                route.response = None
+
+    def open (self) -> bool:
+        """
+        Abre el socket de escucha y lo registra en el planificador.
+
+        Returns:
+            bool: True si el servidor está escuchando.
+        """
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('0.0.0.0', self.port))
+            sock.listen(self.max_clients)
+            sock.setblocking(False)
+        except OSError as e:
+            if self.DEBUG:
+                print('Servidor HTTP desactivado:', e)
+
+            return False
+
+        self.sock = sock
+        self.scheduler.watch(sock, self._accept)
+        self._sweep_job = self.scheduler.on_demand(self._sweep, name='http-idle')
+
+        return True
+
+    def close (self) -> None:
+        """Cierra todas las conexiones y el socket de escucha."""
+        for client in list(self.clients):
+            self._drop(client)
+
+        if self.sock is not None:
+            self.scheduler.unwatch(self.sock)
+            self.sock.close()
+            self.sock = None
+
+    def _accept (self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+
+            sock.setblocking(False)
+
+            if len(self.clients) >= self.max_clients:
+                self.stats["rejected"] += 1
+
+                try:
+                    sock.send(self._busy)
+                except OSError:
+                    pass
+
+                sock.close()
+                continue
+
+            client = _Client(sock, ticks_ms())
+            client.callback = lambda client=client: self._service(client)
+            self.clients.append(client)
+            self.stats["connections"] += 1
+            self.scheduler.watch(sock, client.callback)
+
+            if len(self.clients) == 1:
+                self.scheduler.reschedule(self._sweep_job, self.idle_ms)
+
+    def _service (self, client):
+        client.last = ticks_ms()
+
+        if client.outbox is not None:
+            self._flush(client)
+
+            if client.outbox is not None:
+                return
+
+        try:
+            data = client.sock.recv(_REQUEST_MAX)
+        except OSError as e:
+            if e.args[0] != errno.EAGAIN:
+                self._drop(client)
+                return
+
+            data = None
+
+        if data is not None:
+            if not data:
+                self._drop(client)
+                return
+
+            client.inbox += data
+
+        # Peticiones encadenadas: se responden en orden mientras no haya envío pendiente.
+        while client.outbox is None and client in self.clients:
+            end = client.inbox.find(b'\r\n\r\n')
+
+            if end < 0:
+                if len(client.inbox) > _REQUEST_MAX:
+                    self._reply(client, self._bad_request, True)
+
+                return
+
+            head = client.inbox[:end]
+            client.inbox = client.inbox[end + 4:]
+            self._handle(client, head)
+
+    def _handle (self, client, head):
+        self.stats["requests"] += 1
+        line_end = head.find(b'\r\n')
+        line = head if line_end < 0 else head[:line_end]
+        parts = line.split(b' ')
+
+        if len(parts) != 3:
+            self._reply(client, self._bad_request, True)
+            return
+
+        method, path, version = parts
+        lower = head.lower()
+
+        # Content-Length distinto de cero: no se admiten cuerpos.
+        if b'content-length:' in lower and b'content-length: 0' not in lower:
+            self._reply(client, self._bad_request, True)
+            return
+
+        close = b'connection: close' in lower or (version == b'HTTP/1.0' and b'keep-alive' not in lower)
+
+        if method not in (b'GET', b'HEAD'):
+            self._reply(client, self._not_allowed, True)
+            return
+
+        path = path.split(b'?')[0]
+        route = self.routes.get(path)
+        response = self._not_found if route is None else self._render(route)
+
+        if method == b'HEAD':
+            response = memoryview(response)[:response.find(b'\r\n\r\n') + 4]
+
+        self._reply(client, response, close)
+
+    def _render (self, route):
+        now = ticks_ms()
+
+        if route.response is None or ticks_diff(now, route.rendered) >= route.ttl_ms:
+            try:
+                body = route.render()
+
+                if isinstance(body, str):
+                    body = body.encode()
+
+                route.response = _response(200, body)
+                route.rendered = now
+                self.stats["renders"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+
+                if self.DEBUG:
+                    print('Servidor HTTP: error al generar la respuesta', e)
+
+                if route.response is None:
+                    return self._not_found
+
+        return route.response
+
+    def _reply (self, client, response, close):
+        client.outbox = response
+        client.sent = 0
+        client.close_after = close
+        self._flush(client)
+
+    def _flush (self, client):
+        response = client.outbox
+
+        try:
+            sent = client.sock.send(memoryview(response)[client.sent:])
+        except OSError as e:
+            if e.args[0] != errno.EAGAIN:
+                self._drop(client)
+                return
+
+            sent = 0
+
+        client.sent += sent
+        self.stats["bytes_sent"] += sent
+
+        if client.sent < len(response):
+            # Búfer de envío lleno: se sigue cuando el socket admita más datos.
+            if not client.writing:
+                client.writing = True
+                self.scheduler.watch(client.sock, client.callback, select.POLLIN | select.POLLOUT)
+
+            return
+
+        client.outbox = None
+
+        if client.close_after:
+            self._drop(client)
+        elif client.writing:
+            client.writing = False
+            self.scheduler.watch(client.sock, client.callback)
+
+    def _drop (self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+
+        self.scheduler.unwatch(client.sock)
+
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+
+    def _sweep (self):
+        """Cierra las conexiones inactivas; solo se programa mientras hay clientes."""
+        now = ticks_ms()
+
+        for client in list(self.clients):
+            if ticks_diff(now, client.last) > self.idle_ms:
+                self._drop(client)
+
+        if self.clients:
+            self.scheduler.reschedule(self._sweep_job, self.idle_ms // 2)
@@ -0,0 +1,490 @@
+import os
+import struct
+from binascii import crc32
+from time import ticks_us, ticks_diff
+from micropython import const
+from Models.Log import log, code, INFO, WARNING, ERROR
+
+# Cabecera: magia y versión.
+_HEADER = '>2sBx'
+_HEADER_SIZE = const(4)
+_MAGIC = b'KV'
+_VERSION = const(1)
+
+# Registro: tipo, longitudes de clave y valor, clave, valor y CRC32 de todo lo anterior.
+_RECORD = '>BBB13s44sI'
+RECORD_SIZE = const(64)
+_CRC_OFFSET = const(60)
+KEY_SIZE = const(13)
+VALUE_SIZE = const(44)
+
+# Tipos de registro: el valor de cada escritura o el borrado de la clave.
+_BYTES = const(1)
+_STR = const(2)
+_INT = const(3)
+_DELETE = const(4)
+
+# Bloque de borrado de la flash: LittleFS copia el último bloque de un fichero a medio
+# llenar a uno recién borrado cada vez que se le añaden datos tras un ``flush``.
+BLOCK_SIZE = const(4096)
+
+# Registros que se leen de una vez al reconstruir el índice.
+_SCAN_RECORDS = const(32)
+
+_LOG_OPEN = log.event('kvstore', INFO, 'Estado: %d claves en %d registros, índice en %d us')
+_LOG_DAMAGED = log.event('kvstore', WARNING, 'Estado: registro dañado en %d, se descarta el resto')
+_LOG_COMPACTED = log.event('kvstore', INFO, 'Estado compactado: %d registros a %d')
+_LOG_ERROR = log.event('kvstore', ERROR, 'Estado: error en la flash %d')
+
+
+class KeyValueStore:
+    """
+    Pares clave-valor pequeños (ajustes, últimos precios...) en un fichero
+    de la flash que sobreviven a los reinicios.
+
+    El fichero es un registro de solo añadir con registros fijos de 64
+    bytes: cada cambio se escribe al final y nunca se reescribe uno
+    anterior, así que las escrituras se reparten por la flash en lugar de
+    machacar siempre los mismos bloques. En RAM solo hay un índice de cada
+    clave a la posición de su último registro, que se reconstruye al
+    arrancar leyendo el fichero por bloques de registros: el CRC de cada uno
+    descarta una escritura cortada a medias.
+
+    En LittleFS cada ``flush`` cuesta al menos un bloque borrado, lleve uno
+    o muchos registros, así que los cambios se acumulan en un búfer de
+    ``batch`` registros y llegan a la flash juntos cuando se llena o cuando
+    se llama a ``flush`` (cada minuto desde el planificador). Escribir el
+    mismo valor que ya tiene una clave no añade nada.
+
+    Cuando los registros del fichero superan ``compact_ratio`` veces las
+    claves vivas, ``maintain`` lo compacta en segundo plano: copia
+    ``compact_batch`` registros vivos por llamada a un fichero nuevo y al
+    terminar lo renombra sobre el antiguo; un corte a medias deja el antiguo
+    intacto.
+
+    Claves de hasta 13 bytes y valores ``bytes``, ``str`` (hasta 44 bytes) o ``int``.
+
+    Args:
+        path (str): Fichero en la flash.
+        batch (int): Registros que se acumulan en RAM antes de escribirlos.
+        compact_ratio (int): Registros por clave viva a partir de los que se compacta.
+        compact_min_bytes (int): Tamaño del fichero por debajo del cual no se compacta.
+        compact_batch (int): Registros que copia cada paso de la compactación.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, path='state.kv', batch=16, compact_ratio=4, compact_min_bytes=8192,
+                  compact_batch=32, debug=False):
+        self.DEBUG = debug
+        self.path = path
+        self.batch = batch
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_batch = compact_batch
+
+        # Clave -> (posición del último registro, su CRC); posiciones desde ``_size`` están en el búfer
+        self._index = {}
+        self._file = None
+        self._size = _HEADER_SIZE
+        self._records = 0
+        self._buffer = bytearray(batch * RECORD_SIZE)
+        self._view = memoryview(self._buffer)
+        self._pending = 0
+        self._record = bytearray(RECORD_SIZE)
+
+        # Compactación en curso: fichero nuevo, claves por copiar, índice nuevo y claves cambiadas mientras
+        self._compact = None
+        self._keys = None
+        self._new_index = None
+        self._new_size = 0
+        self._touched = None
+
+        self.stats = {
+            "writes": 0,
+            "unchanged": 0,
+            "flushes": 0,
+            "bytes": 0,
+            "flash_bytes": 0,
+            "erases": 0,
+            "compactions": 0,
+            "scan_us": 0,
+            "errors": 0,
+        }
+
+        self.open()
+
+    def open (self) -> int:
+        """
+        Abre el fichero y reconstruye el índice; lo crea si no existe o no es válido.
+
+        Returns:
+            int: Claves guardadas.
+        """
+        start = ticks_us()
+
+        # Una compactación que no terminó: el fichero antiguo sigue completo
+        try:
+            os.remove(self.path + '.new')
+        except OSError:
+            pass
+
+        try:
+            f = open(self.path, 'r+b')
+            header = f.read(_HEADER_SIZE)
+        except OSError:
+            f = None
+            header = b''
+
+        if f is not None and len(header) == _HEADER_SIZE and header[:2] == _MAGIC and header[2] == _VERSION:
+            self._file = f
+            self._scan()
+        else:
+            if f is not None:
+                f.close()
+
+            try:
+                self._file = open(self.path, 'w+b')
+                self._file.write(struct.pack(_HEADER, _MAGIC, _VERSION))
+                self._file.flush()
+            except OSError as e:
+                self._failed(e)
+
+            self._size = _HEADER_SIZE
+            self._records = 0
+
+        self.stats["scan_us"] = ticks_diff(ticks_us(), start)
+        log.log(_LOG_OPEN, len(self._index), self._records, self.stats["scan_us"])
+
+        return len(self._index)
+
+    def _scan (self):
+        index = self._index
+        chunk = bytearray(_SCAN_RECORDS * RECORD_SIZE)
+        view = memoryview(chunk)
+        offset = _HEADER_SIZE
+        records = 0
+        f = self._file
+        f.seek(offset)
+
+        while True:
+            read = f.readinto(chunk) or 0
+            complete = read // RECORD_SIZE
+
+            for i in range(complete):
+                o = i * RECORD_SIZE
+                crc = struct.unpack_from('>I', chunk, o + _CRC_OFFSET)[0]
+
+                if crc32(view[o:o + _CRC_OFFSET]) != crc or not 0 < chunk[o] <= _DELETE:
+                    return self._damaged(offset, records)
+
+                key = bytes(view[o + 3:o + 3 + chunk[o + 1]]).decode()
+
+                if chunk[o] == _DELETE:
+                    index.pop(key, None)
+                else:
+                    index[key] = (offset, crc)
+
+                offset += RECORD_SIZE
+                records += 1
+
+            if read < len(chunk):
+                if read % RECORD_SIZE:
+                    return self._damaged(offset, records)
+
+                break
+
+        self._size = offset
+        self._records = records
+
+    def _damaged (self, offset, records):
+        # Lo siguiente se escribe encima; el resto del fichero ya no se lee
+        log.log(_LOG_DAMAGED, offset)
+        self._size = offset
+        self._records = records
+
+    def get (self, key, default=None):
+        """
+        Valor de una clave.
+
+        Args:
+            key (str): Clave.
+            default: Lo que se devuelve si no existe.
+
+        Returns:
+            Valor guardado (``bytes``, ``str`` o ``int``) o ``default``.
+        """
+        entry = self._index.get(key)
+
+        if entry is None:
+            return default
+
+        record = self._read(entry[0])
+
+        if record is None:
+            return default
+
+        kind, _, length, _, value, _ = struct.unpack(_RECORD, record)
+        value = value[:length]
+
+        if kind == _INT:
+            return struct.unpack('>q', value)[0]
+
+        if kind == _STR:
+            return value.decode()
+
+        return value
+
+    def _read (self, offset):
+        if offset >= self._size:
+            start = offset - self._size
+
+            return self._view[start:start + RECORD_SIZE]
+
+        if self._file is None:
+            return None
+
+        try:
+            self._file.seek(offset)
+            self._file.readinto(self._record)
+        except OSError as e:
+            self._failed(e)
+            return None
+
+        return self._record
+
+    def put (self, key, value) -> bool:
+        """
+        Guarda el valor de una clave.
+
+        Args:
+            key (str): Clave de hasta 13 bytes.
+            value: ``bytes``, ``str`` (hasta 44 bytes) o ``int`` de 64 bits.
+
+        Returns:
+            bool: False si la clave ya tenía ese valor y no se ha escrito nada.
+        """
+        if isinstance(value, int):
+            return self._append(_INT, key, struct.pack('>q', value))
+
+        if isinstance(value, str):
+            return self._append(_STR, key, value.encode())
+
+        return self._append(_BYTES, key, bytes(value))
+
+    def delete (self, key) -> bool:
+        """Borra una clave. Devuelve False si no existía."""
+        if key not in self._index:
+            return False
+
+        return self._append(_DELETE, key, b'')
+
+    def _append (self, kind, key, value):
+        key_bytes = key.encode()
+
+        if len(key_bytes) > KEY_SIZE or len(value) > VALUE_SIZE:
+            raise ValueError('Clave o valor demasiado largos')
+
+        # Sin flash el búfer no se vacía: lo que no cabe se pierde
+        if self._pending == self.batch and not self.flush():
+            self.stats["errors"] += 1
+            return False
+
+        o = self._pending * RECORD_SIZE
+        struct.pack_into(_RECORD, self._buffer, o, kind, len(key_bytes), len(value), key_bytes, value, 0)
+        crc = crc32(self._view[o:o + _CRC_OFFSET])
+        entry = self._index.get(key)
+
+        # Mismo tipo, clave y valor que el último registro: el mismo CRC
+        if entry is not None and entry[1] == crc:
+            self.stats["unchanged"] += 1
+            return False
+
+        struct.pack_into('>I', self._buffer, o + _CRC_OFFSET, crc)
+
+        if kind == _DELETE:
+            del self._index[key]
+        else:
+            self._index[key] = (self._size + o, crc)
+
+        if self._touched is not None:
+            self._touched.add(key)
+
+        self._pending += 1
+        self._records += 1
+        self.stats["writes"] += 1
+
+        if self._pending == self.batch:
+            self.flush()
+
+        return True
+
+    def keys (self) -> list:
+        return list(self._index)
+
+    def __len__ (self):
+        return len(self._index)
+
+    def flush (self) -> int:
+        """
+        Escribe en la flash los registros pendientes.
+
+        Returns:
+            int: Registros escritos.
+        """
+        pending = self._pending
+
+        if not pending or self._file is None:
+            return 0
+
+        size = pending * RECORD_SIZE
+
+        try:
+            self._file.seek(self._size)
+            self._file.write(self._view[:size])
+            self._file.flush()
+        except OSError as e:
+            self._failed(e)
+            return 0
+
+        self._written(self._size, size)
+        self._size += size
+        self._pending = 0
+        self.stats["flushes"] += 1
+
+        return pending
+
+    def _written (self, position, size):
+        # Lo que programa LittleFS: lo nuevo más la copia del último bloque si estaba a medias,
+        # en bloques recién borrados
+        programmed = position % BLOCK_SIZE + size
+        self.stats["bytes"] += size
+        self.stats["flash_bytes"] += programmed
+        self.stats["erases"] += (programmed + BLOCK_SIZE - 1) // BLOCK_SIZE
+
+    def _failed (self, error):
+        self.stats["errors"] += 1
+        log.log(_LOG_ERROR, code(error))
+
+    def needs_compaction (self) -> bool:
+        """El fichero tiene demasiados registros sin uso."""
+        return self._records * RECORD_SIZE >= self.compact_min_bytes \
+            and self._records >= self.compact_ratio * max(1, len(self._index))
+
+    def maintain (self) -> None:
+        """Escribe lo pendiente y avanza la compactación si toca; para una tarea periódica."""
+        self.flush()
+
+        if self._compact is not None or self.needs_compaction():
+            self.compact_step()
+
+    def compact_step (self) -> bool:
+        """
+        Copia hasta ``compact_batch`` registros vivos al fichero nuevo; el
+        último paso lo renombra sobre el antiguo.
+
+        Returns:
+            bool: True si la compactación ha terminado.
+        """
+        if self._file is None:
+            return True
+
+        try:
+            if self._compact is None:
+                self.flush()
+                self._compact = open(self.path + '.new', 'wb')
+                self._compact.write(struct.pack(_HEADER, _MAGIC, _VERSION))
+                self._keys = list(self._index)
+                self._new_index = {}
+                self._new_size = _HEADER_SIZE
+                self._touched = set()
+
+            for _ in range(self.compact_batch):
+                if not self._keys:
+                    return self._finish_compaction()
+
+                self._copy(self._keys.pop())
+        except OSError as e:
+            self._abort_compaction(e)
+            return True
+
+        return False
+
+    def _copy (self, key):
+        entry = self._index.get(key)
+
+        if entry is None:
+            self._new_index.pop(key, None)
+            return
+
+        self._compact.write(self._read(entry[0]))
+        self._new_index[key] = (self._new_size, entry[1])
+        self._new_size += RECORD_SIZE
+
+    def _finish_compaction (self):
+        # Lo cambiado durante la compactación se copia de nuevo desde el fichero antiguo
+        self.flush()
+
+        for key in self._touched:
+            self._copy(key)
+
+        self._compact.flush()
+        self._compact.close()
+        self._compact = None
+        self._file.close()
+        self._file = None
+
+        before = self._records
+        os.rename(self.path + '.new', self.path)
+        self._file = open(self.path, 'r+b')
+
+        self._written(0, self._new_size)
+        self._index = self._new_index
+        self._size = self._new_size
+        self._records = (self._new_size - _HEADER_SIZE) // RECORD_SIZE
+        self._keys = self._new_index = self._touched = None
+        self.stats["compactions"] += 1
+
+        log.log(_LOG_COMPACTED, before, self._records)
+
+        return True
+
+    def _abort_compaction (self, error):
+        self._failed(error)
+
+        if self._compact is not None:
+            self._compact.close()
+            self._compact = None
+
+        self._keys = self._new_index = self._touched = None
+
+        try:
+            os.remove(self.path + '.new')
+        except OSError:
+            pass
+
+        # Si falló al reabrir tras renombrar, se vuelve a empezar desde el fichero
+        if self._file is None:
+            self._index = {}
+            self.open()
+
+    def close (self) -> None:
+        """Escribe lo pendiente y cierra el fichero."""
+        self.flush()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report (self) -> dict:
+        """
+        Estado para ``/stats``.
+
+        Returns:
+            dict: Claves, registros, tamaño del fichero, contadores (los de
+            la flash, estimados) y amplificación de escritura: bytes
+            programados en la flash por byte de registro cambiado.
+        """
+        changed = self.stats["writes"] * RECORD_SIZE
+
+        return dict(self.stats, keys=len(self._index), records=self._records, size=self._size,
+                    write_amplification=round(self.stats["flash_bytes"] / changed, 2) if changed else None)
@@ -0,0 +1,470 @@
+import struct
+from array import array
+from micropython import const
+from Models.QuoteConverter import PRICE_DECIMALS, parse_scaled
+
+# Cabecera: magia, versión, decimales, registros por página, páginas, intervalo (s), primer registro y registros.
+_HEADER = '>2sBBHHIII'
+_HEADER_SIZE = const(20)
+_MAGIC = b'KC'
+_VERSION = const(1)
+
+# Decimales aún sin decidir (fichero sin velas).
+_NO_DECIMALS = const(255)
+
+# Vela: apertura (s unix), apertura, máximo, mínimo y cierre (a 10 ** decimales) y volumen.
+_RECORD = '>IIIIIf'
+RECORD_SIZE = const(24)
+
+_U32_MAX = const(0xFFFFFFFF)
+
+# Segundos de cada intervalo de Binance admitido.
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400}
+
+
+def price_decimals (price) -> int:
+    """
+    Decimales con los que un precio cabe en 32 bits aunque se multiplique por 16.
+
+    Args:
+        price (int): Precio escalado a ``PRICE_DECIMALS``.
+
+    Returns:
+        int: Decimales a guardar (de 0 a ``PRICE_DECIMALS``).
+    """
+    decimals = PRICE_DECIMALS
+
+    while decimals and price * 16 > _U32_MAX * 10 ** (PRICE_DECIMALS - decimals):
+        decimals -= 1
+
+    return decimals
+
+
+class KlineStore:
+    """
+    Velas de un par en un fichero de registros fijos en la flash.
+
+    El fichero es un anillo de ``capacity`` velas de 24 bytes agrupadas en
+    páginas de ``page_records``. La cabecera guarda, además de la posición
+    del anillo, un índice con la apertura de la primera vela de cada página:
+    se mantiene en RAM, así que una consulta por rango busca la página en el
+    índice y hace ``seek`` directo a ella en lugar de leer el fichero entero.
+    Cuando el anillo se llena se descarta la página más antigua completa.
+
+    Los precios se guardan en 32 bits con los decimales que permite el
+    primer cierre (con margen para que el precio se multiplique por 16) y se
+    devuelven escalados a ``PRICE_DECIMALS`` como el resto del firmware.
+
+    Ocupa ``20 + 4 * páginas + 24 * capacity`` bytes: 4660 para ocho días
+    de velas de una hora.
+
+    Args:
+        symbol (str): Moneda, por ejemplo 'BTC'.
+        base (str): Divisa contra la que se piden las velas.
+        interval (str): Intervalo de Binance (ver ``INTERVALS``).
+        capacity (int): Velas guardadas (se redondea a páginas completas).
+        page_records (int): Velas por página.
+        path (str): Fichero o None para ``kl_<moneda>_<intervalo>.bin``.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, symbol, base='USDT', interval='1h', capacity=192, page_records=24, path=None,
+                  debug=False):
+        self.DEBUG = debug
+        self.symbol = symbol
+        self.base = base
+        self.interval = interval
+        self.interval_s = INTERVALS[interval]
+        self.page_records = page_records
+        self.pages = max(2, (capacity + page_records - 1) // page_records)
+        self.capacity = self.pages * page_records
+        self.path = path or 'kl_' + symbol + '_' + interval + '.bin'
+
+        self.decimals = _NO_DECIMALS
+        self.count = 0
+        self._first = 0
+        self._index = array('I', bytes(4 * self.pages))
+        self._page = bytearray(page_records * RECORD_SIZE)
+        self._file = None
+
+        # Apertura de la última vela guardada o None.
+        self.last_open = None
+
+        self._open()
+
+    def _data_offset (self, slot):
+        return _HEADER_SIZE + 4 * self.pages + slot * RECORD_SIZE
+
+    def _open (self):
+        try:
+            f = open(self.path, 'r+b')
+            header = f.read(_HEADER_SIZE)
+        except OSError:
+            f = None
+            header = b''
+
+        if f is not None and len(header) == _HEADER_SIZE:
+            magic, version, decimals, page_records, pages, interval_s, first, count = struct.unpack(_HEADER, header)
+
+            if magic == _MAGIC and version == _VERSION and page_records == self.page_records \
+                    and pages == self.pages and interval_s == self.interval_s \
+                    and first < self.capacity and count <= self.capacity:
+                index = f.read(4 * self.pages)
+
+                for page in range(self.pages):
+                    self._index[page] = struct.unpack_from('>I', index, 4 * page)[0]
+
+                self._file = f
+                self.decimals = decimals
+                self._first = first
+                self.count = count
+
+                if count:
+                    self.last_open = self._read_slot((first + count - 1) % self.capacity)[0]
+
+                return
+
+        # Fichero ausente, corrupto o con otro formato: se empieza de cero.
+        if f is not None:
+            f.close()
+
+        try:
+            self._file = open(self.path, 'w+b')
+            self._write_header()
+            self._file.write(self._index)
+            self._file.flush()
+        except OSError as e:
+            self._file = None
+
+            if self.DEBUG:
+                print('Velas: sin fichero en la flash', self.path, e)
+
+    def _write_header (self):
+        self._file.seek(0)
+        self._file.write(struct.pack(_HEADER, _MAGIC, _VERSION, self.decimals, self.page_records,
+                                     self.pages, self.interval_s, self._first, self.count))
+
+    def _read_slot (self, slot):
+        self._file.seek(self._data_offset(slot))
+        view = memoryview(self._page)[:RECORD_SIZE]
+        self._file.readinto(view)
+
+        return self._unpack(self._page, 0)
+
+    def _unpack (self, data, offset):
+        open_s, o, h, l, c, volume = struct.unpack_from(_RECORD, data, offset)
+        factor = 10 ** (PRICE_DECIMALS - self.decimals)
+
+        return open_s, o * factor, h * factor, l * factor, c * factor, volume
+
+    def _pack (self, value):
+        return min(_U32_MAX, value // 10 ** (PRICE_DECIMALS - self.decimals))
+
+    def append (self, candles) -> int:
+        """
+        Guarda velas nuevas al final del anillo con una sola escritura de cabecera.
+
+        Args:
+            candles (list): Tuplas ``(apertura_s, apertura, máximo, mínimo, cierre, volumen)``
+                con precios escalados, ordenadas por apertura.
+
+        Returns:
+            int: Velas guardadas (se ignoran las que no son posteriores a la última).
+        """
+        if self._file is None:
+            return 0
+
+        stored = 0
+        pack = self._pack
+
+        for open_s, o, h, l, c, volume in candles:
+            if self.last_open is not None and open_s <= self.last_open:
+                continue
+
+            if self.decimals == _NO_DECIMALS:
+                self.decimals = price_decimals(c)
+
+            if self.count == self.capacity:
+                self._first = (self._first + self.page_records) % self.capacity
+                self.count -= self.page_records
+
+            slot = (self._first + self.count) % self.capacity
+
+            if slot % self.page_records == 0:
+                page = slot // self.page_records
+                self._index[page] = open_s
+                self._file.seek(_HEADER_SIZE + 4 * page)
+                self._file.write(struct.pack('>I', open_s))
+
+            self._file.seek(self._data_offset(slot))
+            self._file.write(struct.pack(_RECORD, open_s, pack(o), pack(h), pack(l), pack(c), volume))
+            self.count += 1
+            self.last_open = open_s
+            stored += 1
+
+        if stored:
+            self._write_header()
+            self._file.flush()
+
+        return stored
+
+    def _find_page (self, t):
+        """Página lógica (0 = la más antigua) donde empezaría una vela abierta en ``t``."""
+        first_page = self._first // self.page_records
+        low = 0
+        high = (self.count + self.page_records - 1) // self.page_records - 1
+
+        while low < high:
+            middle = (low + high + 1) // 2
+
+            if self._index[(first_page + middle) % self.pages] <= t:
+                low = middle
+            else:
+                high = middle - 1
+
+        return low
+
+    def read (self, start_s, end_s=None) -> list:
+        """
+        Velas con apertura entre ``start_s`` y ``end_s`` (incluidos).
+
+        Solo se leen las páginas del rango, página a página en un búfer fijo.
+
+        Args:
+            start_s (int): Apertura mínima en segundos unix.
+            end_s (int): Apertura máxima o None para hasta la última.
+
+        Returns:
+            list: Tuplas ``(apertura_s, apertura, máximo, mínimo, cierre, volumen)``.
+        """
+        candles = []
+
+        if not self.count or self._file is None:
+            return candles
+
+        page_records = self.page_records
+        first_page = self._first // page_records
+        logical = self._find_page(start_s)
+        page_view = memoryview(self._page)
+
+        while logical * page_records < self.count:
+            records = min(page_records, self.count - logical * page_records)
+            physical = (first_page + logical) % self.pages
+            self._file.seek(self._data_offset(physical * page_records))
+            self._file.readinto(page_view[:records * RECORD_SIZE])
+
+            for i in range(records):
+                candle = self._unpack(self._page, i * RECORD_SIZE)
+
+                if end_s is not None and candle[0] > end_s:
+                    return candles
+
+                if candle[0] >= start_s:
+                    candles.append(candle)
+
+            logical += 1
+
+        return candles
+
+    def at (self, t):
+        """Vela que contiene el instante ``t`` o None."""
+        candles = self.read(t - self.interval_s + 1, t)
+
+        return candles[-1] if candles else None
+
+    def last (self):
+        """Última vela guardada o None."""
+        if not self.count or self._file is None:
+            return None
+
+        return self._read_slot((self._first + self.count - 1) % self.capacity)
+
+    def change_bp (self, seconds):
+        """
+        Variación en puntos básicos entre la apertura de hace ``seconds`` y el último cierre.
+
+        Args:
+            seconds (int): Ventana, por ejemplo 86400 para 24 h.
+
+        Returns:
+            int: Variación o None si no hay velas que cubran la ventana.
+        """
+        last = self.last()
+
+        if last is None:
+            return None
+
+        then = self.at(last[0] + self.interval_s - seconds)
+
+        if then is None or not then[1]:
+            return None
+
+        return (last[4] - then[1]) * 10000 // then[1]
+
+    def due (self, now_s=None) -> bool:
+        """
+        Indica si hay velas que pedir: la primera vez o si ha cerrado otra
+        desde la última guardada (sin hora fiable no se sabe, así que sí).
+
+        Args:
+            now_s (int): Hora unix fiable o None.
+        """
+        if self.last_open is None or now_s is None:
+            return True
+
+        return self.last_open + 2 * self.interval_s <= now_s
+
+    def ingest (self, fetch, now_s=None, limit=50, max_requests=4) -> int:
+        """
+        Pide las velas que faltan desde la última guardada y las guarda.
+
+        La primera vez pide la capacidad completa hacia atrás desde ``now_s``
+        (o solo las ``limit`` más recientes si la hora no es fiable). Solo se
+        guardan velas cerradas.
+
+        Args:
+            fetch: Función ``fetch(par, intervalo, start_ms, limit)`` (ver ``get_binance_klines``).
+            now_s (int): Hora unix fiable o None.
+            limit (int): Velas por petición.
+            max_requests (int): Peticiones como mucho en esta llamada.
+
+        Returns:
+            int: Velas guardadas o -1 si alguna petición falló.
+        """
+        stored = 0
+
+        for _ in range(max_requests):
+            if self.last_open is not None:
+                start_s = self.last_open + self.interval_s
+
+                # La siguiente vela aún no ha cerrado: no hay nada que pedir.
+                if now_s is not None and start_s + self.interval_s > now_s:
+                    break
+            elif now_s is not None:
+                start_s = now_s - self.capacity * self.interval_s
+            else:
+                start_s = None
+
+            data = fetch(self.symbol + self.base, self.interval,
+                         None if start_s is None else start_s * 1000, limit)
+
+            if data is None:
+                return -1
+
+            candles = []
+
+            for candle in data:
+                close_s = (candle[6] + 1) // 1000
+
+                # La vela en curso es la última de una respuesta incompleta.
+                if (now_s is not None and close_s > now_s) or (now_s is None and len(data) < limit
+                                                               and candle is data[-1]):
+                    break
+
+                candles.append((candle[0] // 1000, parse_scaled(candle[1]), parse_scaled(candle[2]),
+                                parse_scaled(candle[3]), parse_scaled(candle[4]), float(candle[5])))
+
+            data = None
+            appended = self.append(candles)
+            stored += appended
+
+            if len(candles) < limit or not appended:
+                break
+
+        if self.DEBUG and stored:
+            print('Velas:', self.symbol, stored, 'nuevas,', self.count, 'guardadas')
+
+        return stored
+
+    def close (self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class KlineIngester:
+    """
+    Mantiene al día las velas de varias monedas en la flash.
+
+    Cada ``period_ms`` pide a cada almacén las velas cerradas desde la última
+    guardada, así tras un reinicio solo se piden las que faltan. Cada
+    ejecución de la tarea hace una sola petición y vuelve al planificador:
+    con la latencia de TLS de la Pico, varias seguidas bloquearían el bucle
+    más de lo que aguanta el watchdog (ver ``Supervisor``). Las monedas
+    pendientes se turnan, una petición cada ``catchup_ms``, hasta que no
+    queda atraso (por ejemplo, el relleno inicial o tras días apagado).
+
+    Args:
+        scheduler (Scheduler): Planificador donde se ejecuta la tarea.
+        stores (dict): ``KlineStore`` por moneda.
+        fetch: Función que pide las velas (ver ``KlineStore.ingest``).
+        now: Función que devuelve la hora unix fiable o None.
+        online: Función sin argumentos que indica si hay conexión o None.
+        period_ms (int): Tiempo entre actualizaciones.
+        catchup_ms (int): Espera antes de seguir cuando queda atraso.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, stores, fetch, now=None, online=None, period_ms=900000, catchup_ms=5000,
+                  debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.stores = stores
+        self.fetch = fetch
+        self.now = now
+        self.online = online
+        self.period_ms = period_ms
+        self.catchup_ms = catchup_ms
+        self._pending = []
+        self._job = scheduler.on_demand(self.update, name='klines')
+
+        self.stats = {
+            "runs": 0,
+            "candles": 0,
+            "failures": 0,
+        }
+
+    def start (self, delay_ms=0) -> None:
+        self.scheduler.reschedule(self._job, delay_ms)
+
+    def update (self) -> None:
+        """Hace una petición para la siguiente moneda pendiente y programa la siguiente."""
+        if self.online is not None and not self.online():
+            self._pending = []
+            self.scheduler.reschedule(self._job, self.period_ms)
+            return
+
+        now_s = self.now() if self.now is not None else None
+
+        # Cada periodo empieza una pasada por las monedas con velas que pedir
+        if not self._pending:
+            self.stats["runs"] += 1
+            self._pending = [store for store in self.stores.values() if store.due(now_s)]
+
+        if not self._pending:
+            self.scheduler.reschedule(self._job, self.period_ms)
+            return
+
+        store = self._pending.pop(0)
+        stored = store.ingest(self.fetch, now_s, max_requests=1)
+
+        # Si una falla, las demás también fallarían: se reintenta en el siguiente periodo.
+        if stored < 0:
+            self.stats["failures"] += 1
+            self._pending = []
+            self.scheduler.reschedule(self._job, self.period_ms)
+            return
+
+        self.stats["candles"] += stored
+
+        # Con atraso vuelve al final de la cola, detrás de las demás monedas
+        if stored and now_s is not None and store.due(now_s):
+            self._pending.append(store)
+
+        self.scheduler.reschedule(self._job, self.catchup_ms if self._pending else self.period_ms)
+
+    def change_bp (self, symbol, seconds):
+        """Variación de una moneda en la ventana o None si no hay velas suficientes."""
+        store = self.stores.get(symbol)
+
+        return None if store is None else store.change_bp(seconds)
@@ -0,0 +1,155 @@
+import struct
+from time import ticks_ms
+from micropython import const
+
+# Niveles: un evento se guarda si su nivel llega al de su módulo.
+DEBUG = const(10)
+INFO = const(20)
+WARNING = const(30)
+ERROR = const(40)
+OFF = const(100)
+
+_LEVEL_NAMES = {DEBUG: 'D', INFO: 'I', WARNING: 'W', ERROR: 'E'}
+
+# Registro: instante (ticks_ms), evento y cuatro enteros con signo de 32 bits.
+_RECORD = '>IH2xiiii'
+_RECORD_SIZE = const(24)
+
+# Argumentos como mucho por evento.
+MAX_ARGS = const(4)
+
+
+def code (error) -> int:
+    """Número de un error para guardarlo como argumento (errno de OSError o -1)."""
+    args = getattr(error, 'args', None)
+
+    return args[0] if args and isinstance(args[0], int) else -1
+
+
+class Log:
+    """
+    Registro de eventos binario en un buffer circular reservado al arrancar.
+
+    Cada mensaje se declara una vez con ``event`` (módulo, nivel y formato) y
+    cada aparición guarda solo un registro de 24 bytes: el instante, el número
+    de evento y hasta ``MAX_ARGS`` enteros. Registrar no formatea ni reserva
+    memoria ni escribe por el puerto serie; el texto se monta al vaciar el
+    buffer con ``drain`` (por el puerto serie o por HTTP). Si se llena, los
+    registros más antiguos se sobrescriben y se cuentan en ``dropped``.
+
+    Los niveles son por módulo y se pueden cambiar en marcha con ``set_level``.
+
+    Args:
+        capacity (int): Registros que caben en el buffer.
+        level (int): Nivel de los módulos que no lo tengan fijado.
+    """
+
+    def __init__ (self, capacity=128, level=INFO):
+        self.capacity = capacity
+        self.default_level = level
+        self.dropped = 0
+        self.count = 0
+
+        self._buffer = bytearray(capacity * _RECORD_SIZE)
+        self._head = 0
+        self._modules = []
+        self._levels = []
+        self._events = []
+
+    def event (self, module, level, fmt) -> int:
+        """
+        Declara un mensaje.
+
+        Args:
+            module (str): Módulo al que pertenece, para filtrar por nivel.
+            level (int): ``DEBUG``, ``INFO``, ``WARNING`` o ``ERROR``.
+            fmt (str): Formato con un ``%d`` por argumento entero.
+
+        Returns:
+            int: Número de evento para ``log``.
+        """
+        if module not in self._modules:
+            self._modules.append(module)
+            self._levels.append(self.default_level)
+
+        self._events.append((self._modules.index(module), level, fmt, fmt.count('%') - 2 * fmt.count('%%')))
+
+        return len(self._events) - 1
+
+    def set_level (self, module, level) -> None:
+        """Cambia el nivel de un módulo (o de todos con ``module`` None)."""
+        if module is None:
+            self.default_level = level
+            self._levels = [level] * len(self._modules)
+        elif module in self._modules:
+            self._levels[self._modules.index(module)] = level
+        else:
+            self._modules.append(module)
+            self._levels.append(level)
+
+    def level (self, module) -> int:
+        return self._levels[self._modules.index(module)] if module in self._modules else self.default_level
+
+    def enabled (self, event) -> bool:
+        """Indica si un evento se guardaría, para no calcular argumentos caros en balde."""
+        module, level, _, _ = self._events[event]
+
+        return level >= self._levels[module]
+
+    def log (self, event, a=0, b=0, c=0, d=0) -> None:
+        """Guarda un evento con sus argumentos enteros si su nivel está activo."""
+        module, level, _, _ = self._events[event]
+
+        if level < self._levels[module]:
+            return
+
+        struct.pack_into(_RECORD, self._buffer, self._head * _RECORD_SIZE, ticks_ms(), event, a, b, c, d)
+        self._head += 1
+
+        if self._head == self.capacity:
+            self._head = 0
+
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.dropped += 1
+
+    def format (self, offset) -> str:
+        """Texto del registro en ``offset`` del buffer."""
+        stamp, event, a, b, c, d = struct.unpack_from(_RECORD, self._buffer, offset)
+        module, level, fmt, nargs = self._events[event]
+
+        return '%d %s %s ' % (stamp, _LEVEL_NAMES.get(level, '?'), self._modules[module]) + \
+            (fmt % (a, b, c, d)[:nargs] if nargs else fmt)
+
+    def drain (self, write, limit=None) -> int:
+        """
+        Formatea los registros del más antiguo al más reciente y los vacía.
+
+        Args:
+            write: Función que recibe cada línea (``print`` o la de un socket).
+            limit (int): Registros como mucho en esta llamada o None para todos.
+
+        Returns:
+            int: Registros escritos.
+        """
+        count = self.count if limit is None else min(limit, self.count)
+        start = self._head - self.count
+
+        for i in range(count):
+            write(self.format(((start + i) % self.capacity) * _RECORD_SIZE))
+
+        self.count -= count
+
+        return count
+
+    def lines (self, limit=None) -> list:
+        """Vacía el buffer y devuelve las líneas, para servirlas por HTTP."""
+        lines = []
+        self.drain(lines.append, limit)
+
+        return lines
+
+
+# Registro compartido por todo el firmware.
+log = Log()
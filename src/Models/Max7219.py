@@ -2,6 +2,8 @@
 # Copyright 2017 Paul Dwerryhouse <paul@dwerryhouse.com.au>
 
 from machine import Pin
+from time import ticks_us
+from Models.Trace import trace
 
 CHAR_MAP = {
     '0': 0x7e, '1': 0x30, '2': 0x6d, '3': 0x79,
@@ -20,7 +22,8 @@ CHAR_MAP = {
     'Q': 0x73, 'R': 0x05, 'S': 0x5b, 'T': 0x0f,
     'U': 0x1c, 'V': 0x3e, 'W': 0x2a, 'X': 0x37,
     'Y': 0x3b, 'Z': 0x6d, ' ': 0x00, '-': 0x01,
-    '\xb0': 0x63, '.': 0x80
+    '\xb0': 0x63, '.': 0x80, '^': 0x62,
+    '_': 0x08
 }
 
 REG_NO_OP = 0x00
@@ -31,6 +34,9 @@ REG_SCAN_LIMIT = 0x0b
 REG_SHUTDOWN = 0x0c
 REG_DISPLAY_TEST = 0x0f
 
+# Tramo del refresco (los registros de los dígitos que cambian, por SPI) en la traza (ver Models.Trace)
+_SPAN_SPI = trace.name('spi')
+
 
 class Max7219:
 
@@ -39,9 +45,15 @@ class Max7219:
         self.ss = Pin(ss, Pin.OUT)
         self.buffer = bytearray(8)
         self.intensity = intensity
+
+        # Lo que tiene cada dígito del chip y qué dígitos se conocen (un bit por dígito)
+        self._shown = bytearray(8)
+        self._known = 0
+
         self.reset()
 
     def reset (self):
+        self._known = 0
         self.set_register(REG_DECODE_MODE, 0)
         self.set_register(REG_INTENSITY, self.intensity)
         self.set_register(REG_SCAN_LIMIT, 7)
@@ -89,8 +101,32 @@ class Max7219:
             x += 1
 
     def display (self):
+        # Solo se envían los dígitos que cambian respecto a lo que tiene el chip
+        start = ticks_us() if trace.enabled else 0
+        written = 0
+
         for i in range(0, 8):
-            self.set_register(REG_DIGIT_BASE + i, self.buffer[i])
+            value = self.buffer[i]
+
+            if self._known & (1 << i) and self._shown[i] == value:
+                continue
+
+            self.set_register(REG_DIGIT_BASE + i, value)
+            self._shown[i] = value
+            self._known |= 1 << i
+            written += 1
+
+        trace.span(_SPAN_SPI, start)
+
+        return written
+
+    def invalidate (self):
+        """Olvida lo que tiene el chip: el siguiente ``display`` envía los 8 dígitos."""
+        self._known = 0
+
+    def set_power (self, on):
+        # Apagada conserva los dígitos: encenderla de nuevo no exige reescribirlos
+        self.set_register(REG_SHUTDOWN, 1 if on else 0)
 
     def set_intensity (self, i):
         self.intensity = i
@@ -0,0 +1,174 @@
+class Prefetcher:
+    """
+    Precarga especulativa de precios mientras se navega por el menú.
+
+    Al resaltar una moneda se encola su precio y el de sus vecinas en el
+    encoder. Las peticiones salen de una en una desde el planificador, tras
+    una pausa corta, de modo que si el usuario sigue girando la cola
+    pendiente se descarta y se rehace con la nueva posición.
+
+    Args:
+        scheduler (Scheduler): Planificador donde se ejecutan las peticiones.
+        cache (PriceCache): Caché donde se consultan los precios.
+        fetch: Función ``fetch(symbol) -> int`` que consulta el precio y lo
+            guarda en ``cache``; aquí no se vuelve a guardar, porque cada
+            ``put`` avisa a ``on_put``.
+        symbols (list): Monedas en el orden del encoder (None en las posiciones que no son monedas).
+        budget (int): Peticiones máximas por visita al menú.
+        neighbours (int): Vecinas a cada lado de la moneda resaltada.
+        delay_ms (int): Pausa tras el último giro antes de empezar a pedir.
+        max_age_ms (int): Antigüedad a partir de la que un precio se vuelve a pedir.
+        wait_ms: Función sin argumentos que devuelve los ms hasta que se pueda
+            pedir un precio en segundo plano (0 si ya) o None para no esperar.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, cache, fetch, symbols, budget=6, neighbours=1,
+                  delay_ms=300, max_age_ms=60000, wait_ms=None, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.cache = cache
+        self.fetch = fetch
+        self.symbols = symbols
+        self.budget = budget
+        self.neighbours = neighbours
+        self.delay_ms = delay_ms
+        self.max_age_ms = max_age_ms
+        self.wait_ms = wait_ms
+
+        self.active = False
+        self._queue = []
+        self._index = None
+        self._spent = 0
+        self._prefetched = []
+        self._job = scheduler.on_demand(self._run, name='prefetch')
+
+        self.stats = {
+            "sessions": 0,
+            "requests": 0,
+            "hits": 0,
+            "misses": 0,
+            "wasted": 0,
+            "cancelled": 0,
+            "deferred": 0,
+        }
+
+    def start_session (self) -> None:
+        """Se llama al entrar al menú: reinicia el presupuesto de peticiones."""
+        self.active = True
+        self._spent = 0
+        self._index = None
+        self._prefetched = []
+        self.stats["sessions"] += 1
+
+    def on_highlight (self, index) -> None:
+        """
+        Replanifica la precarga para la moneda resaltada (no usar desde IRQ).
+
+        Args:
+            index (int): Posición de la moneda en ``symbols``.
+        """
+        if not self.active or index == self._index:
+            return
+
+        self._index = index
+        self.stats["cancelled"] += len(self._queue)
+
+        # Primero la resaltada y después las vecinas alternando lados.
+        queue = [self.symbols[index]]
+
+        for offset in range(1, self.neighbours + 1):
+            for i in (index + offset, index - offset):
+                if 0 <= i < len(self.symbols):
+                    queue.append(self.symbols[i])
+
+        self._queue = [symbol for symbol in queue
+                       if symbol is not None and self.cache.get(symbol, self.max_age_ms) is None]
+
+        if self._queue and self._spent < self.budget:
+            self.scheduler.reschedule(self._job, self.delay_ms)
+        else:
+            self.scheduler.cancel(self._job)
+
+    def end_session (self, symbol):
+        """
+        Se llama al confirmar la moneda: anota acierto o fallo de la
+        precarga y devuelve el precio si ya está en la caché.
+
+        Args:
+            symbol (str): Moneda confirmada.
+
+        Returns:
+            int: Precio precargado o None si hay que pedirlo.
+        """
+        if not self.active:
+            return None
+
+        self.active = False
+        self.scheduler.cancel(self._job)
+        self.stats["cancelled"] += len(self._queue)
+        self._queue = []
+
+        price = self.cache.get(symbol, self.max_age_ms)
+
+        # También cuenta como acierto si la cola la omitió por estar ya reciente.
+        if price is not None:
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+
+        self.stats["wasted"] += len(self._prefetched) - (1 if symbol in self._prefetched else 0)
+
+        if self.DEBUG:
+            print('Precarga:', 'acierto' if price is not None else 'fallo', self.stats)
+
+        return price
+
+    def cancel_session (self) -> None:
+        """
+        Se llama al salir del menú sin confirmar moneda (por ejemplo, al
+        cambiar la divisa): lo precargado cuenta como desperdiciado.
+        """
+        if not self.active:
+            return
+
+        self.active = False
+        self.scheduler.cancel(self._job)
+        self.stats["cancelled"] += len(self._queue)
+        self.stats["wasted"] += len(self._prefetched)
+        self._queue = []
+
+    def hit_ratio (self) -> float:
+        """Proporción de confirmaciones servidas desde la precarga."""
+        total = self.stats["hits"] + self.stats["misses"]
+
+        return self.stats["hits"] / total if total else 0.0
+
+    def _run (self):
+        if not self.active or not self._queue or self._spent >= self.budget:
+            return
+
+        symbol = self._queue.pop(0)
+
+        # Puede haberse refrescado mientras esperaba en la cola.
+        if self.cache.get(symbol, self.max_age_ms) is None:
+            wait = self.wait_ms() if self.wait_ms is not None else 0
+
+            # Sin cupo en el gobernador de peso: la moneda vuelve a la cola sin gastar presupuesto
+            if wait:
+                self._queue.insert(0, symbol)
+                self.stats["deferred"] += 1
+                self.scheduler.reschedule(self._job, wait)
+
+                return
+
+            self._spent += 1
+            self.stats["requests"] += 1
+            price = self.fetch(symbol)
+
+            if price and symbol not in self._prefetched:
+                self._prefetched.append(symbol)
+
+        if self._queue and self._spent < self.budget:
+            # Hueco breve entre peticiones para atender el encoder.
+            self.scheduler.reschedule(self._job, 20)
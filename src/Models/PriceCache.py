@@ -0,0 +1,69 @@
+from time import ticks_ms, ticks_diff, ticks_add
+
+
+class PriceCache:
+    """
+    Últimos precios conocidos por moneda con su instante de lectura.
+
+    Permite reutilizar un precio reciente (por ejemplo, uno precargado
+    mientras se navega por el menú) en lugar de repetir la petición.
+
+    Args:
+        on_put: Función ``f(symbol, price)`` llamada con cada precio guardado o None.
+    """
+
+    def __init__ (self, on_put=None):
+        self._prices = {}
+        self.on_put = on_put
+
+    def put (self, symbol, price) -> None:
+        """
+        Guarda el precio de una moneda con el instante actual.
+
+        Args:
+            symbol (str): Moneda, por ejemplo 'BTC'.
+            price (int): Precio leído, escalado en la divisa base.
+        """
+        self._prices[symbol] = (price, ticks_ms())
+
+        if self.on_put is not None:
+            self.on_put(symbol, price)
+
+    def restore (self, symbol, price, age_ms) -> None:
+        """
+        Guarda un precio ya conocido (por ejemplo, de antes de un reinicio)
+        con la antigüedad dada, sin avisar a ``on_put``.
+
+        Args:
+            symbol (str): Moneda.
+            price (int): Precio escalado en la divisa base.
+            age_ms (int): Antigüedad del precio.
+        """
+        self._prices[symbol] = (price, ticks_add(ticks_ms(), -age_ms))
+
+    def get (self, symbol, max_age_ms):
+        """
+        Devuelve el precio si es más reciente que ``max_age_ms``.
+
+        Args:
+            symbol (str): Moneda a consultar.
+            max_age_ms (int): Antigüedad máxima aceptada o None para cualquiera.
+
+        Returns:
+            int: Precio o None si no hay o está caducado.
+        """
+        entry = self._prices.get(symbol)
+
+        if entry is None:
+            return None
+
+        if max_age_ms is not None and ticks_diff(ticks_ms(), entry[1]) > max_age_ms:
+            return None
+
+        return entry[0]
+
+    def age_ms (self, symbol):
+        """Antigüedad del precio guardado en ms o None si no existe."""
+        entry = self._prices.get(symbol)
+
+        return None if entry is None else ticks_diff(ticks_ms(), entry[1])
@@ -0,0 +1,255 @@
+from array import array
+from time import time
+from micropython import const
+
+# Bytes por muestra: marca de tiempo ('i'), último, mínimo y máximo ('q') y un índice en cada cola ('B').
+SAMPLE_BYTES = const(30)
+
+
+class _MonotonicDeque:
+    """
+    Cola de índices de la ventana cuyos valores son monótonos.
+
+    Para el mínimo guarda valores crecientes desde el frente: el frente es
+    siempre el mínimo de la ventana. Cada índice entra y sale una vez, así
+    que añadir y consultar cuesta O(1) amortizado. Es un anillo de tamaño
+    fijo sobre un ``array``, sin reservar memoria al usarlo.
+    """
+
+    def __init__ (self, capacity, values, keep_max):
+        self._slots = array('B', bytes(capacity))
+        self._capacity = capacity
+        self._values = values
+        self._keep_max = keep_max
+        self._head = 0
+        self.length = 0
+
+    def front (self) -> int:
+        return self._slots[self._head]
+
+    def back (self) -> int:
+        return self._slots[(self._head + self.length - 1) % self._capacity]
+
+    def push (self, slot) -> None:
+        """Añade una muestra descartando por detrás las que ya no pueden ser extremo."""
+        values = self._values
+        value = values[slot]
+
+        while self.length:
+            other = values[self.back()]
+
+            if (other > value) if self._keep_max else (other < value):
+                break
+
+            self.length -= 1
+
+        self._slots[(self._head + self.length) % self._capacity] = slot
+        self.length += 1
+
+    def pop_back (self, slot) -> None:
+        """Quita la muestra más reciente si está en la cola (para volver a añadirla)."""
+        if self.length and self.back() == slot:
+            self.length -= 1
+
+    def evict (self, slot) -> None:
+        """La muestra más antigua sale de la ventana; si está en la cola, es el frente."""
+        if self.length and self._slots[self._head] == slot:
+            self._head = (self._head + 1) % self._capacity
+            self.length -= 1
+
+    def clear (self) -> None:
+        self._head = 0
+        self.length = 0
+
+
+class PriceSeries:
+    """
+    Historial de precios de una moneda en una ventana de tiempo deslizante.
+
+    Anillo de tamaño fijo de muestras (marca de tiempo, último precio,
+    mínimo y máximo, escalados) sobre ``array`` con dos colas monótonas para
+    el mínimo y el máximo, de modo que añadir un precio y consultar primero,
+    último, mínimo, máximo o la variación es O(1) y nunca reserva memoria.
+
+    Los precios más próximos que ``spacing_s`` a la última muestra se
+    acumulan en ella (conservando su instante): sustituyen el último precio
+    y solo pueden bajar su mínimo o subir su máximo, lo que mantiene válidas
+    las colas. Así el anillo cubre la ventana aunque los precios lleguen más
+    a menudo. Las muestras más antiguas que ``window_s`` se descartan al
+    añadir o consultar.
+
+    Memoria fija: ``SAMPLE_BYTES`` (30) bytes por muestra más los objetos,
+    unos 1800 bytes de datos con la capacidad por defecto.
+
+    Args:
+        capacity (int): Muestras del anillo (como mucho 255).
+        window_s (int): Antigüedad máxima de una muestra.
+        spacing_s (int): Separación mínima entre muestras.
+    """
+
+    def __init__ (self, capacity=60, window_s=3600, spacing_s=60):
+        self.capacity = capacity
+        self.window_s = window_s
+        self.spacing_s = spacing_s
+        self._stamps = array('i', bytes(4 * capacity))
+        self._prices = array('q', bytes(8 * capacity))
+        self._lows = array('q', bytes(8 * capacity))
+        self._highs = array('q', bytes(8 * capacity))
+        self._start = 0
+        self.count = 0
+        self._min = _MonotonicDeque(capacity, self._lows, False)
+        self._max = _MonotonicDeque(capacity, self._highs, True)
+
+    def append (self, price, stamp=None) -> None:
+        """
+        Añade un precio.
+
+        Args:
+            price (int): Precio escalado.
+            stamp (int): Instante en segundos o None para la hora actual del RTC.
+        """
+        if stamp is None:
+            stamp = time()
+
+        self._expire(stamp)
+
+        if self.count:
+            last = (self._start + self.count - 1) % self.capacity
+
+            if stamp - self._stamps[last] < self.spacing_s:
+                self._prices[last] = price
+
+                if price < self._lows[last]:
+                    self._lows[last] = price
+                    self._min.pop_back(last)
+                    self._min.push(last)
+                elif price > self._highs[last]:
+                    self._highs[last] = price
+                    self._max.pop_back(last)
+                    self._max.push(last)
+
+                return
+
+        if self.count == self.capacity:
+            self._evict()
+
+        slot = (self._start + self.count) % self.capacity
+        self._stamps[slot] = stamp
+        self._prices[slot] = price
+        self._lows[slot] = price
+        self._highs[slot] = price
+        self.count += 1
+        self._min.push(slot)
+        self._max.push(slot)
+
+    def _evict (self):
+        slot = self._start
+        self._min.evict(slot)
+        self._max.evict(slot)
+        self._start = (slot + 1) % self.capacity
+        self.count -= 1
+
+    def _expire (self, now):
+        limit = now - self.window_s
+
+        while self.count and self._stamps[self._start] < limit:
+            self._evict()
+
+    def expire (self, now=None) -> None:
+        """Descarta las muestras que ya no están en la ventana."""
+        self._expire(time() if now is None else now)
+
+    def first (self):
+        """Precio más antiguo de la ventana o None."""
+        return self._prices[self._start] if self.count else None
+
+    def last (self):
+        """Precio más reciente o None."""
+        return self._prices[(self._start + self.count - 1) % self.capacity] if self.count else None
+
+    def min (self):
+        """Precio mínimo de la ventana o None."""
+        return self._lows[self._min.front()] if self.count else None
+
+    def max (self):
+        """Precio máximo de la ventana o None."""
+        return self._highs[self._max.front()] if self.count else None
+
+    def span_s (self) -> int:
+        """Segundos entre la primera y la última muestra."""
+        if not self.count:
+            return 0
+
+        return self._stamps[(self._start + self.count - 1) % self.capacity] - self._stamps[self._start]
+
+    def change_bp (self):
+        """
+        Variación entre la primera y la última muestra en puntos básicos (1/100 de %).
+
+        Returns:
+            int: Variación o None si no hay dos muestras.
+        """
+        if self.count < 2 or not self._prices[self._start]:
+            return None
+
+        first = self._prices[self._start]
+
+        return (self.last() - first) * 10000 // first
+
+    def trend (self, threshold_bp=10) -> int:
+        """
+        Dirección del precio en la ventana.
+
+        Args:
+            threshold_bp (int): Variación mínima para no considerarlo estable.
+
+        Returns:
+            int: 1 si sube, -1 si baja, 0 si se mantiene o no hay datos.
+        """
+        change = self.change_bp()
+
+        if change is None or -threshold_bp < change < threshold_bp:
+            return 0
+
+        return 1 if change > 0 else -1
+
+    def clear (self) -> None:
+        self._start = 0
+        self.count = 0
+        self._min.clear()
+        self._max.clear()
+
+
+class PriceHistory:
+    """
+    Historial de precios por moneda, sin peticiones propias: se alimenta con
+    cada precio que entra en la caché.
+
+    Toda la memoria se reserva al crearlo: ``capacity * SAMPLE_BYTES`` bytes
+    de datos por moneda.
+
+    Args:
+        symbols (list): Monedas con historial; los demás precios se ignoran.
+        capacity (int): Muestras por moneda.
+        window_s (int): Ventana del historial.
+        spacing_s (int): Separación mínima entre muestras.
+    """
+
+    def __init__ (self, symbols, capacity=60, window_s=3600, spacing_s=60):
+        self.series = {symbol: PriceSeries(capacity, window_s, spacing_s) for symbol in symbols}
+
+    def add (self, symbol, price, stamp=None) -> None:
+        """Añade el precio de una moneda (no usar desde IRQ)."""
+        series = self.series.get(symbol)
+
+        if series is not None and price:
+            series.append(price, stamp)
+
+    def get (self, symbol):
+        """Serie de una moneda con las muestras caducadas ya descartadas, o None."""
+        series = self.series.get(symbol)
+
+        if series is not None:
+            series.expire()
+
+        return series
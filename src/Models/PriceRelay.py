@@ -0,0 +1,542 @@
+import socket
+import struct
+from time import ticks_ms, ticks_diff, time
+from machine import unique_id
+from micropython import const
+
+_MAGIC = b'CW'
+_VERSION = const(3)
+
+# Tipos de trama; en un HELLO, ``_LEADER`` indica que quien lo envía es el líder.
+_HELLO = const(1)
+_PRICES = const(2)
+_LEADER = const(0x80)
+
+# HELLO seguidos que se pueden perder sin que caduque un vecino (y con él el líder).
+_LEASE_BEATS = const(4)
+
+# Campos de cada vecino
+_SEEN = const(0)
+_SYMBOLS = const(1)
+_SEQ = const(2)
+_CLAIM = const(3)
+
+# Cabecera: magic, versión, tipo, id del dispositivo, secuencia (10 bytes).
+_HEADER = '>2sBBIH'
+_HEADER_SIZE = const(10)
+
+# Moneda en ASCII rellena con ceros, del ancho de las entradas de ``CoinCatalog`` (8 bytes).
+_SYMBOL = '8s'
+_SYMBOL_SIZE = const(8)
+
+# Precio: moneda, precio escalado, marca de tiempo unix (20 bytes).
+_ENTRY = '>8sqI'
+_ENTRY_SIZE = const(20)
+
+# Entradas por trama, limita el buffer de envío a 491 bytes (se reciben hasta 512).
+_MAX_ENTRIES = const(24)
+
+# Pausa entre dos consultas del líder, para que el bucle siga atendiendo entre una y otra.
+_SERVE_GAP_MS = const(50)
+
+
+def _inet_aton (address: str) -> bytes:
+    """Dirección IPv4 en texto a 4 bytes (el socket de MicroPython no tiene inet_aton)."""
+    return bytes(int(part) for part in address.split('.'))
+
+
+def _unpack_symbol (data, offset) -> str:
+    """Moneda de 8 bytes rellena con ceros a texto; vacía si no es ASCII."""
+    raw = bytes(data[offset:offset + _SYMBOL_SIZE]).rstrip(b'\x00')
+
+    try:
+        return raw.decode('ascii')
+    except UnicodeError:
+        return ''
+
+
+class PriceRelay:
+    """
+    Reparto de precios en la red local por UDP multicast.
+
+    Todos los dispositivos anuncian cada ``heartbeat_ms`` una trama HELLO con
+    las monedas que muestran, y el líder la marca como suya. Cada vecino
+    oído tiene una concesión de ``timeout_ms`` (cuatro HELLO y medio): un
+    líder conserva el puesto mientras no caduque, aunque llegue un
+    dispositivo de id mayor, y con una trama perdida no cambia nada. Si
+    ningún vecino vivo se proclama líder, lo es el de mayor id, sin
+    mensajes de elección; si dos se proclaman a la vez (al unirse dos
+    redes) cede el de menor id. Un dispositivo no se proclama hasta haber
+    escuchado durante una concesión, para seguir al líder que ya hubiera.
+    Solo el líder consulta la API: pide la unión de los intereses de todos
+    cada ``period_ms``, una moneda por ejecución de la tarea para no
+    bloquear el bucle, y difunde cada una en cuanto la tiene junto con las
+    que ya eran recientes. Las monedas
+    de ``slow`` (los tipos de cambio) se renuevan solo cada
+    ``slow_period_ms``. Lo que consulta para sí mismo también se difunde al
+    momento.
+
+    Un seguidor sin precio reciente lo pide al líder con un HELLO inmediato;
+    si no llega en ``fallback_ms`` (líder sin conexión, tramas perdidas) lo
+    consulta directamente.
+
+    Tramas (big endian):
+        Cabecera ``'CW' | versión | tipo (| 0x80 si es el líder) | id (u32) | secuencia (u16)``,
+        un byte con el número de elementos y después los elementos: monedas
+        (8 bytes ASCII rellenos con ceros, como en ``coins.bin``) en HELLO o
+        ``moneda (8 bytes) | precio escalado (i64) | unix (u32)`` en PRICES.
+        La moneda va por nombre y no por posición en una lista, que depende
+        de las favoritas de cada dispositivo: cualquier moneda del catálogo
+        se reparte, sea favorita o no.
+
+    Args:
+        scheduler (Scheduler): Planificador donde corren las tareas del relé.
+        cache (PriceCache): Caché donde se guardan los precios recibidos.
+        fetch: Función ``fetch(symbol) -> int`` que consulta la API.
+        interest: Función sin argumentos que devuelve las monedas que se muestran.
+        on_price: Función ``on_price(symbol, price)`` llamada con cada precio nuevo.
+        device_id (int): Id del dispositivo. Por defecto sale de ``machine.unique_id``.
+        group (str): Grupo multicast.
+        port (int): Puerto UDP.
+        interface (str): IP local por la que se une al grupo.
+        period_ms (int): Periodo de consulta del líder.
+        heartbeat_ms (int): Periodo de los HELLO.
+        slow (tuple): Monedas que el líder renueva cada ``slow_period_ms``.
+        slow_period_ms (int): Periodo de las monedas de ``slow``.
+        stale_ms (int): Antigüedad a partir de la que un precio repartido no vale.
+        fallback_ms (int): Espera a la respuesta del líder antes de pedir directamente.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, cache, fetch, interest, on_price=None,
+                  device_id=None, group='239.255.70.87', port=5007, interface='0.0.0.0',
+                  period_ms=300000, heartbeat_ms=10000, slow=(), slow_period_ms=None, stale_ms=None,
+                  fallback_ms=3000, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.cache = cache
+        self.fetch = fetch
+        self.interest = interest
+        self.on_price = on_price
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.period_ms = period_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.slow = slow
+        self.slow_period_ms = slow_period_ms if slow_period_ms is not None else period_ms
+        self.timeout_ms = _LEASE_BEATS * heartbeat_ms + heartbeat_ms // 2
+        self.stale_ms = stale_ms if stale_ms is not None else period_ms * 3 // 2
+        self.fallback_ms = fallback_ms
+
+        if device_id is None:
+            device_id = int.from_bytes(unique_id()[-4:], 'big')
+
+        self.device_id = device_id
+        self.leader = device_id
+        self.sock = None
+        self._opened = 0
+
+        # id -> [último ticks_ms, monedas de interés, última secuencia, se proclama líder]
+        self.peers = {}
+
+        self._seq = 0
+        self._stamps = {}
+        self._asked = []
+        self._requests = []
+        self._buffer = bytearray(_HEADER_SIZE + 1 + _MAX_ENTRIES * _ENTRY_SIZE)
+
+        self.stats = {
+            "sent": 0,
+            "received": 0,
+            "lost": 0,
+            "bad": 0,
+            "leader_changes": 0,
+            "upstream": 0,
+            "served": 0,
+            "fallbacks": 0,
+        }
+
+    def open (self) -> bool:
+        """
+        Abre el socket multicast y programa las tareas del relé.
+
+        Returns:
+            bool: True si se ha unido al grupo. Si falla, ``fetch`` consulta
+            siempre directamente.
+        """
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+            if hasattr(socket, 'SO_REUSEPORT'):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+            sock.bind(('0.0.0.0', self.port))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                            _inet_aton(self.group) + _inet_aton(self.interface))
+
+            if hasattr(socket, 'IP_MULTICAST_IF'):
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, _inet_aton(self.interface))
+
+            sock.setblocking(False)
+        except OSError as e:
+            if self.DEBUG:
+                print('Relé de precios desactivado:', e)
+
+            return False
+
+        self.sock = sock
+        self._opened = ticks_ms()
+        self.scheduler.watch(sock, self.poll)
+        self.scheduler.every(self.heartbeat_ms, self._heartbeat, name='relay-hello')
+        self.scheduler.every(self.period_ms, self._refresh, name='relay', delay_ms=self.period_ms)
+        self._serve_job = self.scheduler.on_demand(self._serve, name='relay-serve')
+        self._fallback_job = self.scheduler.on_demand(self._fallback, name='relay-fallback')
+
+        return True
+
+    def close (self) -> None:
+        """Cierra el socket; a partir de aquí se consulta directamente."""
+        if self.sock is not None:
+            self.scheduler.unwatch(self.sock)
+            self.sock.close()
+            self.sock = None
+
+    def is_leader (self) -> bool:
+        """Indica si este dispositivo es quien consulta la API."""
+        return self.leader == self.device_id
+
+    def fetch_price (self, symbol):
+        """
+        Precio de una moneda pasando por el relé.
+
+        El líder (o un dispositivo sin relé) consulta la API y difunde el
+        resultado. Un seguidor devuelve el último precio repartido o, si no
+        hay uno reciente, se lo pide al líder y devuelve None: el precio
+        llegará más tarde por ``on_price``.
+
+        Args:
+            symbol (str): Moneda, por ejemplo 'BTC'.
+
+        Returns:
+            int: Precio escalado o None si todavía no se conoce.
+        """
+        self._elect()
+
+        if self.sock is None or self.is_leader() or len(symbol) > _SYMBOL_SIZE:
+            price = self._fetch_direct(symbol)
+
+            if price and self.sock is not None and len(symbol) <= _SYMBOL_SIZE:
+                self._send_prices([symbol])
+
+            return price
+
+        price = self.cache.get(symbol, self.stale_ms)
+
+        if price is not None:
+            self.stats["served"] += 1
+
+            return price
+
+        if symbol not in self._asked:
+            self._asked.append(symbol)
+
+        self._send_hello()
+        self.scheduler.reschedule(self._fallback_job, self.fallback_ms)
+
+        return None
+
+    def poll (self) -> int:
+        """
+        Procesa las tramas pendientes del socket sin bloquear.
+
+        Returns:
+            int: Tramas procesadas.
+        """
+        count = 0
+
+        while self.sock is not None:
+            try:
+                data = self.sock.recv(512)
+            except OSError:
+                break
+
+            count += 1
+            self._handle(data)
+
+        if count:
+            self._elect()
+
+        return count
+
+    def _handle (self, data):
+        size = len(data)
+
+        if size < _HEADER_SIZE + 1:
+            self.stats["bad"] += 1
+            return
+
+        magic, version, kind, sender, seq = struct.unpack_from(_HEADER, data, 0)
+        count = data[_HEADER_SIZE]
+
+        if magic != _MAGIC or version != _VERSION:
+            self.stats["bad"] += 1
+            return
+
+        if sender == self.device_id:
+            return
+
+        self.stats["received"] += 1
+        peer = self.peers.get(sender)
+
+        if peer is None:
+            peer = [0, (), seq, False]
+            self.peers[sender] = peer
+        else:
+            # Huecos en la secuencia (módulo 2^16); duplicadas y desordenadas no cuentan.
+            gap = (seq - peer[_SEQ] - 1) & 0xFFFF
+
+            if gap < 0x8000:
+                self.stats["lost"] += gap
+                peer[_SEQ] = seq
+
+        peer[_SEEN] = ticks_ms()
+        offset = _HEADER_SIZE + 1
+
+        if kind & ~_LEADER == _HELLO:
+            if size < offset + count * _SYMBOL_SIZE:
+                self.stats["bad"] += 1
+                return
+
+            peer[_CLAIM] = bool(kind & _LEADER)
+            symbols = []
+
+            for _ in range(count):
+                symbol = _unpack_symbol(data, offset)
+                offset += _SYMBOL_SIZE
+
+                if symbol:
+                    symbols.append(symbol)
+
+            new = [symbol for symbol in symbols if symbol not in peer[_SYMBOLS]]
+            peer[_SYMBOLS] = tuple(symbols)
+
+            # El líder atiende en el momento las monedas que un vecino acaba de pedir.
+            if new and self.sock is not None:
+                self._elect()
+
+                if self.is_leader():
+                    for symbol in new:
+                        if symbol not in self._requests:
+                            self._requests.append(symbol)
+
+                    self.scheduler.trigger(self._serve_job)
+        elif kind == _PRICES:
+            if size < offset + count * _ENTRY_SIZE:
+                self.stats["bad"] += 1
+                return
+
+            for _ in range(count):
+                symbol = _unpack_symbol(data, offset)
+                price, stamp = struct.unpack_from(_ENTRY, data, offset)[1:]
+                offset += _ENTRY_SIZE
+
+                # Tras un cambio de líder puede llegar un precio más antiguo que el que ya hay.
+                if symbol and stamp >= self._stamps.get(symbol, 0):
+                    self._accept(symbol, price, stamp)
+        else:
+            self.stats["bad"] += 1
+
+    def _claims (self, now) -> bool:
+        # Solo se proclama un líder que ya ha escuchado una concesión completa
+        return self.leader == self.device_id and ticks_diff(now, self._opened) >= self.timeout_ms
+
+    def _elect (self):
+        now = ticks_ms()
+        highest = self.device_id
+        claimant = None
+
+        for peer_id in list(self.peers):
+            peer = self.peers[peer_id]
+
+            if ticks_diff(now, peer[_SEEN]) > self.timeout_ms:
+                del self.peers[peer_id]
+                continue
+
+            if peer_id > highest:
+                highest = peer_id
+
+            if peer[_CLAIM] and (claimant is None or peer_id > claimant):
+                claimant = peer_id
+
+        # El líder sigue mientras no caduque su concesión; entre dos que se proclaman gana el de mayor id
+        if self._claims(now) and (claimant is None or claimant < self.device_id):
+            leader = self.device_id
+        elif claimant is not None:
+            leader = claimant
+        else:
+            leader = highest
+
+        if leader != self.leader:
+            self.leader = leader
+            self.stats["leader_changes"] += 1
+
+            if self.DEBUG:
+                print('Relé: nuevo líder', leader, '(este)' if leader == self.device_id else '')
+
+            # El nuevo líder consulta ya lo que necesitan los demás.
+            if leader == self.device_id and self.sock is not None:
+                for symbol in self._wanted():
+                    if symbol not in self._requests:
+                        self._requests.append(symbol)
+
+                self.scheduler.trigger(self._serve_job)
+
+    def _wanted (self):
+        # Lo que muestra el propio líder ya lo consultan sus tareas y se difunde en fetch_price.
+        wanted = []
+
+        for peer in self.peers.values():
+            for symbol in peer[_SYMBOLS]:
+                if symbol not in wanted:
+                    wanted.append(symbol)
+
+        return wanted
+
+    def _interest (self):
+        symbols = []
+
+        for symbol in self.interest():
+            if len(symbol) <= _SYMBOL_SIZE and symbol not in symbols:
+                symbols.append(symbol)
+
+        for symbol in self._asked:
+            if symbol not in symbols:
+                symbols.append(symbol)
+
+        return symbols
+
+    def _accept (self, symbol, price, stamp, notify=True):
+        self._stamps[symbol] = stamp
+        self.cache.put(symbol, price)
+
+        if symbol in self._asked:
+            self._asked.remove(symbol)
+
+        if notify and self.on_price is not None:
+            self.on_price(symbol, price)
+
+    def _fetch_direct (self, symbol, notify=False):
+        # Quien llama a fetch_price ya recibe el precio, solo se avisa de los que llegan después.
+        self.stats["upstream"] += 1
+        price = self.fetch(symbol)
+
+        if price:
+            self._accept(symbol, price, int(time()), notify)
+
+        return price
+
+    def _refresh (self):
+        """Tarea periódica del líder: consulta y difunde lo que interesa a todos."""
+        self._elect()
+
+        if not self.is_leader():
+            return
+
+        for symbol in self._wanted():
+            if symbol not in self._requests:
+                self._requests.append(symbol)
+
+        self.scheduler.trigger(self._serve_job)
+
+    def _serve (self):
+        requests = self._requests
+
+        if not requests or not self.is_leader():
+            self._requests = []
+            return
+
+        ready = []
+        fetched = False
+
+        while requests:
+            symbol = requests[0]
+            age = self.cache.age_ms(symbol)
+            max_age_ms = self.slow_period_ms if symbol in self.slow else self.period_ms
+
+            # Se pide en la consulta periódica más cercana a ``max_age_ms``; lo consultado
+            # hace poco (por este u otro líder) se reenvía sin pedirlo otra vez.
+            if age is None or age > max_age_ms - self.period_ms // 2:
+                # Una consulta por ejecución; las demás esperan a la siguiente.
+                if fetched:
+                    break
+
+                self._fetch_direct(symbol)
+                fetched = True
+
+            requests.pop(0)
+
+            if self.cache.get(symbol, None) is not None:
+                ready.append(symbol)
+
+        self._send_prices(ready)
+
+        if requests:
+            self.scheduler.reschedule(self._serve_job, _SERVE_GAP_MS)
+
+    def _fallback (self):
+        """El líder no ha respondido a tiempo: se consulta directamente."""
+        for symbol in list(self._asked):
+            if self.cache.get(symbol, self.stale_ms) is None:
+                self.stats["fallbacks"] += 1
+                self._fetch_direct(symbol, notify=True)
+
+        self._asked = []
+
+    def _heartbeat (self):
+        self._elect()
+        self._send_hello()
+
+    def _send_hello (self):
+        symbols = self._interest()[:_MAX_ENTRIES]
+        offset = self._pack_header(_HELLO | _LEADER if self._claims(ticks_ms()) else _HELLO, len(symbols))
+
+        for symbol in symbols:
+            struct.pack_into(_SYMBOL, self._buffer, offset, symbol.encode())
+            offset += _SYMBOL_SIZE
+
+        self._send(offset)
+
+    def _send_prices (self, symbols):
+        buffer = self._buffer
+
+        while symbols:
+            chunk = symbols[:_MAX_ENTRIES]
+            symbols = symbols[_MAX_ENTRIES:]
+            offset = self._pack_header(_PRICES, len(chunk))
+
+            for symbol in chunk:
+                struct.pack_into(_ENTRY, buffer, offset, symbol.encode(), self.cache.get(symbol, None),
+                                 self._stamps.get(symbol, 0))
+                offset += _ENTRY_SIZE
+
+            self._send(offset)
+
+    def _pack_header (self, kind, count):
+        self._seq = (self._seq + 1) & 0xFFFF
+        struct.pack_into(_HEADER, self._buffer, 0, _MAGIC, _VERSION, kind, self.device_id, self._seq)
+        self._buffer[_HEADER_SIZE] = count
+
+        return _HEADER_SIZE + 1
+
+    def _send (self, size):
+        if self.sock is None:
+            return
+
+        try:
+            self.sock.sendto(memoryview(self._buffer)[:size], (self.group, self.port))
+            self.stats["sent"] += 1
+        except OSError as e:
+            if self.DEBUG:
+                print('Relé: error al enviar', e)
@@ -0,0 +1,208 @@
+from micropython import const
+from Models.RateGovernor import BACKGROUND
+
+# Decimales de los precios en punto fijo (los mismos que devuelve Binance).
+PRICE_DECIMALS = const(8)
+PRICE_SCALE = const(100000000)
+
+
+def parse_scaled (value: str, decimals: int = PRICE_DECIMALS) -> int:
+    """
+    Convierte un precio en texto ('0.41666667') a entero en punto fijo.
+
+    Los floats de MicroPython en la Pico son de precisión simple, así que
+    se trabaja con enteros escalados a ``10 ** decimals``.
+
+    Args:
+        value (str): Precio en texto.
+        decimals (int): Decimales del punto fijo.
+
+    Returns:
+        int: Precio escalado.
+    """
+    value = value.strip()
+    negative = value.startswith('-')
+
+    # El signo se aplica al final: int('-0') lo pierde en '-0.5'
+    integer, _, fraction = value.lstrip('+-').partition('.')
+    fraction = (fraction + '0' * decimals)[:decimals]
+    scaled = int(integer or '0') * 10 ** decimals + int(fraction or '0')
+
+    return -scaled if negative else scaled
+
+
+def format_scaled (value: int, decimals: int = PRICE_DECIMALS) -> str:
+    """
+    Convierte un precio en punto fijo a texto con todos sus decimales
+    ('0.41666667'), sin pasar por float.
+
+    Args:
+        value (int): Precio escalado.
+        decimals (int): Decimales del punto fijo.
+
+    Returns:
+        str: Precio en texto.
+    """
+    integer, fraction = divmod(abs(value), 10 ** decimals)
+
+    return ('-' if value < 0 else '') + str(integer) + '.' + ('%0' + str(decimals) + 'd') % fraction
+
+
+def format_price (value: float, width: int) -> str:
+    """
+    Formatea un precio para que ocupe como mucho ``width`` dígitos del display
+    (los puntos no ocupan dígito), con tantos decimales como quepan.
+
+    Los valores demasiado pequeños para mostrarse con decimales se muestran
+    en notación científica ('7E-6').
+
+    Args:
+        value (float): Precio a mostrar.
+        width (int): Dígitos disponibles.
+
+    Returns:
+        str: Precio formateado.
+    """
+    integer_digits = len(str(int(value)))
+    decimals = max(0, width - integer_digits)
+
+    # Sin sitio ni para dos cifras significativas: notación científica
+    if decimals >= 2 and 0 < value < 10 ** (1 - decimals):
+        exponent = 0
+
+        while value < 1:
+            value *= 10
+            exponent += 1
+
+        return ('%.' + str(max(0, width - 4)) + 'f') % value + 'E-' + str(exponent)
+
+    return ('%.' + str(decimals) + 'f') % value
+
+
+class QuoteConverter:
+    """
+    Capa de divisas de cotización: cada moneda se pide una sola vez contra
+    una base común (USDT) y el resto de divisas se calculan localmente con
+    un tipo de cambio por divisa, en aritmética de punto fijo.
+
+    Cambiar de divisa no hace peticiones: solo cambia la conversión.
+
+    Args:
+        base (str): Divisa base contra la que se piden las monedas.
+        quotes (tuple): Divisas de cotización disponibles.
+        pegged (tuple): Divisas que se toman 1:1 con la base (sin petición).
+        fetch_raw: Función ``fetch_raw(crypto, base, priority) -> str`` para pedir
+            precios; por defecto ``Models.Api.get_binance_price_raw``, que se
+            importa con la primera petición.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, base='USDT', quotes=('EUR', 'USDT', 'BTC'), pegged=('USD', 'USDT'),
+                  fetch_raw=None, debug=False):
+        self.DEBUG = debug
+        self.base = base
+        self.quotes = quotes
+        self.pegged = pegged
+        self.fetch_raw = fetch_raw
+
+        # Precio escalado de cada divisa de cotización expresado en la base.
+        self.fx = {}
+
+        for quote in quotes:
+            if quote == base or quote in pegged:
+                self.fx[quote] = PRICE_SCALE
+
+        # Peticiones realizadas (monedas y tipos de cambio).
+        self.requests = 0
+
+    def fetch (self, symbol, priority=BACKGROUND):
+        """
+        Pide el precio de una moneda contra la base.
+
+        Si la moneda es también una divisa de cotización (BTC), su tipo de
+        cambio se actualiza gratis con la misma respuesta.
+
+        Args:
+            symbol (str): Moneda, por ejemplo 'ADA'.
+            priority (int): Prioridad ante el gobernador de peso de Binance.
+
+        Returns:
+            int: Precio escalado en la base o None si falla o se aplaza.
+        """
+        if symbol == self.base or symbol in self.pegged:
+            return PRICE_SCALE
+
+        if self.fetch_raw is None:
+            from Models.Api import get_binance_price_raw
+
+            self.fetch_raw = get_binance_price_raw
+
+        self.requests += 1
+        raw = self.fetch_raw(symbol, self.base, priority)
+
+        if raw is None:
+            return None
+
+        price = parse_scaled(raw)
+        self.accept(symbol, price)
+
+        return price
+
+    def accept (self, symbol, price) -> None:
+        """
+        Registra un precio obtenido por otra vía (por ejemplo, el relé de
+        precios de la red local) para actualizar el tipo de cambio.
+
+        Args:
+            symbol (str): Moneda.
+            price (int): Precio escalado en la base.
+        """
+        if price and symbol in self.quotes and symbol != self.base and symbol not in self.pegged:
+            self.fx[symbol] = price
+
+    def update_fx (self, quote=None, priority=BACKGROUND) -> bool:
+        """
+        Actualiza el tipo de cambio de una divisa o de todas las que lo necesitan.
+
+        Args:
+            quote (str): Divisa concreta o None para todas.
+            priority (int): Prioridad ante el gobernador de peso de Binance.
+
+        Returns:
+            bool: True si todas las actualizaciones han tenido éxito.
+        """
+        ok = True
+
+        for q in (quote,) if quote else self.quotes:
+            if q == self.base or q in self.pegged:
+                continue
+
+            if self.fetch(q, priority) is None:
+                ok = False
+
+        return ok
+
+    def convert (self, base_price, quote):
+        """
+        Convierte un precio escalado en la base a otra divisa, redondeando.
+
+        Args:
+            base_price (int): Precio escalado en la base.
+            quote (str): Divisa de destino.
+
+        Returns:
+            int: Precio escalado en ``quote`` o None si falta el tipo de cambio.
+        """
+        rate = self.fx.get(quote)
+
+        if base_price is None or not rate:
+            return None
+
+        if rate == PRICE_SCALE:
+            return base_price
+
+        return (base_price * PRICE_SCALE + rate // 2) // rate
+
+    def to_float (self, scaled) -> float:
+        """Convierte un precio escalado a float para mostrarlo."""
+        return scaled / PRICE_SCALE
@@ -0,0 +1,256 @@
+from time import ticks_ms, ticks_diff
+from micropython import const
+from Models.Log import log, DEBUG, WARNING
+
+# Modos de la radio
+PERFORMANCE = const(0)
+POWERSAVE = const(1)
+OFF = const(2)
+
+_MODE_NAMES = ('performance', 'powersave', 'off')
+
+# Ahorro de energía del CYW43 en cada modo encendido: ninguno (PM_NONE, el que fija
+# ``wifi_connect``) durante las peticiones y PM_POWERSAVE, que duerme entre balizas del AP
+# sin perder la asociación, entre ellas.
+_PM = (0xa11140, 0x111022)
+
+# Tareas del firmware que usan la red (nombres de ``Scheduler``).
+NETWORK_JOBS = ('price', 'price-retry', 'fx', 'fx-retry', 'ticker', 'klines', 'ntp', 'telemetry', 'prefetch', 'relay')
+
+# Mensajes del registro (ver ``Models.Log``)
+_LOG_MODE = log.event('radio', DEBUG, 'Modo %d, siguiente petición en %d ms')
+_LOG_WAKE = log.event('radio', DEBUG, 'Despertando la radio (adelanto %d ms)')
+_LOG_AWAKE = log.event('radio', DEBUG, 'Conectada en %d ms (media %d, desviación %d)')
+_LOG_WAKE_FAILED = log.event('radio', WARNING, 'Sin conexión %d ms después de despertar')
+
+
+class RadioManager:
+    """
+    Apaga, duerme y despierta la radio Wi-Fi alrededor de las peticiones.
+
+    El firmware solo usa la red en unas pocas tareas del planificador
+    (``jobs``), casi todas una vez por periodo. Tras cada una, si la
+    siguiente queda a más de ``off_min_ms`` (contando lo que tarda la radio
+    en volver) la radio se apaga del todo; si no, se queda asociada en
+    ahorro de energía. Antes de la siguiente petición se vuelve a encender
+    con un adelanto medido en las reconexiones anteriores: media y
+    desviación móviles, como el RTO de TCP, más ``margin_ms``.
+
+    Las tareas de red pasan por ``gate`` (ver ``Scheduler.gate``): con la
+    radio apagada o despertando se aplazan ``poll_ms`` hasta que haya
+    conexión o venza ``wake_timeout_ms``. Una tarea que encuentra la radio
+    apagada la despierta ella misma y cuenta como despertar tardío. Con la
+    radio encendida pero sin conexión se ejecuta como siempre: reconectar es
+    cosa del supervisor.
+
+    Con ``always_on`` (servidor HTTP, relé) la radio nunca se apaga, solo
+    alterna entre rendimiento y ahorro.
+
+    Args:
+        scheduler (Scheduler): Planificador de las tareas de red.
+        wlan: Interfaz ``network.WLAN`` a controlar.
+        connect: Función sin argumentos que enciende la radio y pide asociarse sin esperar.
+        online: Función que indica si hay conexión; por defecto ``wlan.isconnected``.
+        jobs (tuple): Nombres de las tareas que usan la red.
+        always_on (bool): Si True la radio no se apaga nunca.
+        off_min_ms (int): Hueco mínimo hasta la siguiente petición para apagarla.
+        idle_ms (int): Tiempo a pleno rendimiento desde que empieza una petición.
+        poll_ms (int): Intervalo de comprobación mientras despierta.
+        wake_timeout_ms (int): Espera máxima de la conexión al despertar.
+        latency_ms (int): Latencia de reconexión supuesta hasta medir la primera.
+        margin_ms (int): Margen del adelanto sobre la latencia estimada.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, wlan, connect, online=None, jobs=NETWORK_JOBS, always_on=False,
+                  off_min_ms=30000, idle_ms=1000, poll_ms=250, wake_timeout_ms=15000, latency_ms=3000,
+                  margin_ms=500, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.wlan = wlan
+        self.connect = connect
+        self.online = online or wlan.isconnected
+        self.jobs = jobs
+        self.always_on = always_on
+        self.off_min_ms = off_min_ms
+        self.idle_ms = idle_ms
+        self.poll_ms = poll_ms
+        self.wake_timeout_ms = wake_timeout_ms
+        self.margin_ms = margin_ms
+
+        # Latencia de reconexión estimada y su desviación media.
+        self.latency_ms = latency_ms
+        self.deviation_ms = latency_ms // 2
+
+        # La radio sale del arranque conectada y sin ahorro.
+        self.mode = PERFORMANCE
+        self._since = ticks_ms()
+        self._times = [0, 0, 0]
+        self._waking = None
+
+        self._settle_job = None
+        self._wake_job = None
+        self._poll_job = None
+
+        self.stats = {
+            "wakes": 0,
+            "late_wakes": 0,
+            "wake_failures": 0,
+            "wait_ms": 0,
+            "latency_ms_max": 0,
+        }
+
+    def start (self) -> None:
+        """Toma el control de la radio: pasa las tareas de red por ``gate``."""
+        scheduler = self.scheduler
+        scheduler.gate = self.gate
+
+        self._settle_job = scheduler.on_demand(self._settle, name='radio')
+        self._wake_job = scheduler.on_demand(self.wake, name='radio-wake')
+        self._poll_job = scheduler.on_demand(self._poll, name='radio-poll')
+
+        scheduler.reschedule(self._settle_job, self.idle_ms)
+
+    def lead_ms (self) -> int:
+        """Adelanto con el que se enciende la radio antes de la siguiente petición."""
+        return min(self.wake_timeout_ms, self.latency_ms + 2 * self.deviation_ms + self.margin_ms)
+
+    def healthy (self) -> bool:
+        """Sonda del supervisor: apagada a propósito o despertando también está bien."""
+        return self.mode == OFF or self._waking is not None or self.online()
+
+    def gate (self, job) -> bool:
+        """
+        Decide si una tarea se ejecuta ya; las de red esperan a la conexión.
+
+        Returns:
+            bool: False si la tarea se ha aplazado.
+        """
+        if job.name not in self.jobs:
+            return True
+
+        if self.online():
+            if self._waking is not None:
+                self._poll()
+
+            self._set_mode(PERFORMANCE)
+            self.scheduler.reschedule(self._settle_job, self.idle_ms)
+
+            return True
+
+        if self._waking is None:
+            if self.mode != OFF:
+                return True
+
+            self.stats["late_wakes"] += 1
+            self.wake()
+        elif ticks_diff(ticks_ms(), self._waking) >= self.wake_timeout_ms:
+            return True
+
+        self.stats["wait_ms"] += self.poll_ms
+        self.scheduler.reschedule(job, self.poll_ms)
+
+        return False
+
+    def wake (self) -> None:
+        """Enciende la radio si está apagada y mide lo que tarda en conectar."""
+        if self.mode != OFF or self._waking is not None:
+            return
+
+        log.log(_LOG_WAKE, self.lead_ms())
+
+        self.stats["wakes"] += 1
+        self._waking = ticks_ms()
+        self.connect()
+        self._set_mode(PERFORMANCE)
+        self.scheduler.reschedule(self._poll_job, self.poll_ms)
+
+    def wake_soon (self) -> None:
+        """Pide despertar la radio desde el bucle (seguro desde una IRQ), ante una petición probable."""
+        if self._wake_job is not None:
+            self.scheduler.trigger(self._wake_job)
+
+    def duty (self) -> dict:
+        """
+        Tiempo en cada modo desde el arranque y estadísticas de los despertares.
+
+        Returns:
+            dict: ``<modo>_ms`` y ``<modo>_pct`` por modo, la latencia estimada y ``stats``.
+        """
+        times = list(self._times)
+        times[self.mode] += ticks_diff(ticks_ms(), self._since)
+        total = sum(times) or 1
+        report = {"mode": _MODE_NAMES[self.mode], "latency_ms": self.latency_ms, "lead_ms": self.lead_ms()}
+
+        for mode, name in enumerate(_MODE_NAMES):
+            report[name + '_ms'] = times[mode]
+            report[name + '_pct'] = round(times[mode] * 100 / total, 1)
+
+        report.update(self.stats)
+
+        return report
+
+    def _set_mode (self, mode):
+        if mode == self.mode:
+            return
+
+        now = ticks_ms()
+        self._times[self.mode] += ticks_diff(now, self._since)
+        self._since = now
+        self.mode = mode
+
+        if mode == OFF:
+            self.wlan.active(False)
+        else:
+            self.wlan.config(pm=_PM[mode])
+
+    def _measure (self, elapsed):
+        # Media y desviación móviles con pesos 1/4, que se adaptan en pocas reconexiones.
+        self.deviation_ms += (abs(elapsed - self.latency_ms) - self.deviation_ms) // 4
+        self.latency_ms += (elapsed - self.latency_ms) // 4
+
+        if elapsed > self.stats["latency_ms_max"]:
+            self.stats["latency_ms_max"] = elapsed
+
+        log.log(_LOG_AWAKE, elapsed, self.latency_ms, self.deviation_ms)
+
+    def _poll (self):
+        if self._waking is None:
+            return
+
+        elapsed = ticks_diff(ticks_ms(), self._waking)
+
+        if self.online():
+            self._waking = None
+            self._measure(elapsed)
+
+            # Si la petición se ha movido, la radio no se queda despierta esperándola
+            self.scheduler.reschedule(self._settle_job, self.lead_ms() + self.idle_ms)
+            return
+
+        if elapsed >= self.wake_timeout_ms:
+            # Encendida sin conexión: el supervisor reintenta con las demás redes
+            self._waking = None
+            self.stats["wake_failures"] += 1
+            log.log(_LOG_WAKE_FAILED, elapsed)
+            return
+
+        self.scheduler.reschedule(self._poll_job, self.poll_ms)
+
+    def _settle (self):
+        # Despertando manda la medida, que vuelve a programar esta tarea al conectar
+        if self._waking is not None:
+            return
+
+        due = self.scheduler.due_in_ms(self.jobs)
+        lead = self.lead_ms()
+
+        if self.always_on or (due is not None and due - lead < self.off_min_ms):
+            self._set_mode(POWERSAVE)
+        else:
+            self._set_mode(OFF)
+
+            if due is not None:
+                self.scheduler.reschedule(self._wake_job, due - lead)
+
+        log.log(_LOG_MODE, self.mode, -1 if due is None else due)
@@ -0,0 +1,183 @@
+from time import ticks_ms, ticks_add, ticks_diff
+from micropython import const
+from Models.Log import log, WARNING
+
+# Prioridad de una petición: las del usuario pasan antes que las de segundo plano.
+USER = const(0)
+BACKGROUND = const(1)
+
+# Peso de cada endpoint de Binance en su límite por minuto.
+WEIGHT_PRICE = 2
+WEIGHT_KLINES = 2
+
+# Las fichas se guardan multiplicadas por los ms de un minuto para rellenar con enteros.
+_MINUTE_MS = const(60000)
+
+# Mensajes del registro (ver ``Models.Log``)
+_LOG_LIMITED = log.event('governor', WARNING, 'Límite de Binance (HTTP %d), se espera %d s')
+
+
+def _header (headers, name):
+    """Valor de una cabecera sin distinguir mayúsculas o None."""
+    if not headers:
+        return None
+
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+
+    return None
+
+
+class RateGovernor:
+    """
+    Cubo de fichas compartido por todas las peticiones a Binance.
+
+    Cada petición gasta su peso (el que Binance cuenta por endpoint) y las
+    fichas se rellenan a ``rate`` por minuto. Las peticiones en segundo plano
+    dejan ``reserve`` fichas sin tocar para que una del usuario no espere.
+
+    Con cada respuesta se lee ``X-MBX-USED-WEIGHT-1M``, el peso que lleva
+    gastado la IP en el minuto (de todos los dispositivos tras el mismo
+    router): las fichas no pasan del margen que queda hasta ``limit`` y, por
+    encima de ``high_water``, el ritmo se reduce a la mitad; al bajar, se
+    recupera poco a poco. Un 429 o un 418 (IP bloqueada por seguir tras el
+    429) detienen todas las peticiones durante ``Retry-After``.
+
+    Una petición sin cupo no se descarta: ``acquire`` devuelve False y
+    ``wait_ms`` dice cuándo volver a intentarlo.
+
+    Args:
+        weight_per_min (int): Peso por minuto que se permite este dispositivo.
+        burst (int): Peso acumulable para ráfagas (entrar al menú, recuperar velas).
+        reserve (int): Peso que las peticiones en segundo plano dejan a las del usuario.
+        limit (int): Límite de peso por minuto de la IP en Binance.
+        high_water (int): Porcentaje del límite a partir del cual se frena.
+        enabled (bool): Si False, solo se leen las cabeceras y se cuentan los rechazos.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, weight_per_min=600, burst=40, reserve=10, limit=6000, high_water=80,
+                  enabled=True, debug=False):
+        self.DEBUG = debug
+        self.burst = burst
+        self.reserve = reserve
+        self.limit = limit
+        self.high_water = high_water
+        self.enabled = enabled
+
+        self.set_budget(weight_per_min)
+        self.used = None
+
+        self._tokens = burst * _MINUTE_MS
+        self._stamp = ticks_ms()
+        self._blocked_until = None
+
+        self.stats = {
+            "allowed": 0,
+            "deferred": 0,
+            "slowdowns": 0,
+            "limited": 0,
+            "banned": 0,
+        }
+
+    def set_budget (self, weight_per_min) -> None:
+        """Cambia el peso por minuto que se permite el dispositivo."""
+        self.weight_per_min = weight_per_min
+        self.rate = weight_per_min
+        self.min_rate = max(1, weight_per_min // 16)
+
+    def _refill (self):
+        now = ticks_ms()
+        elapsed = ticks_diff(now, self._stamp)
+        self._stamp = now
+
+        if elapsed > 0:
+            self._tokens = min(self.burst * _MINUTE_MS, self._tokens + elapsed * self.rate)
+
+        return now
+
+    def wait_ms (self, weight, priority=BACKGROUND) -> int:
+        """
+        Tiempo hasta que una petición tenga cupo.
+
+        Args:
+            weight (int): Peso de la petición.
+            priority (int): ``USER`` o ``BACKGROUND``.
+
+        Returns:
+            int: Milisegundos de espera, 0 si puede salir ya.
+        """
+        if not self.enabled:
+            return 0
+
+        now = self._refill()
+        wait = 0
+
+        if self._blocked_until is not None:
+            wait = ticks_diff(self._blocked_until, now)
+
+            if wait <= 0:
+                self._blocked_until = None
+                wait = 0
+
+        need = (weight + (self.reserve if priority == BACKGROUND else 0)) * _MINUTE_MS - self._tokens
+
+        if need > 0:
+            wait = max(wait, (need + self.rate - 1) // self.rate)
+
+        return wait
+
+    def acquire (self, weight, priority=BACKGROUND) -> bool:
+        """
+        Gasta el peso de una petición si hay cupo.
+
+        Returns:
+            bool: True si la petición puede salir; False si hay que aplazarla.
+        """
+        if self.wait_ms(weight, priority) > 0:
+            self.stats["deferred"] += 1
+            return False
+
+        self._tokens -= weight * _MINUTE_MS
+        self.stats["allowed"] += 1
+
+        return True
+
+    def observe (self, status, headers) -> None:
+        """
+        Ajusta el ritmo con la respuesta de Binance.
+
+        Args:
+            status (int): Código HTTP.
+            headers (dict): Cabeceras de la respuesta.
+        """
+        used = _header(headers, 'x-mbx-used-weight-1m')
+
+        if used is not None:
+            used = int(used)
+            self.used = used
+            self._tokens = min(self._tokens, max(0, self.limit - used) * _MINUTE_MS)
+
+            if used * 100 >= self.limit * self.high_water:
+                if self.rate > self.min_rate:
+                    self.rate = max(self.min_rate, self.rate // 2)
+                    self.stats["slowdowns"] += 1
+            elif self.rate < self.weight_per_min:
+                self.rate = min(self.weight_per_min, self.rate + self.weight_per_min // 8)
+
+        if status in (418, 429):
+            retry = _header(headers, 'retry-after')
+            seconds = int(retry) if retry else 60
+
+            self.stats["banned" if status == 418 else "limited"] += 1
+            self._blocked_until = ticks_add(ticks_ms(), seconds * 1000)
+            self._tokens = 0
+            self.rate = self.min_rate
+
+            log.log(_LOG_LIMITED, status, seconds)
+
+
+# Gobernador compartido por todas las peticiones a Binance: vive aquí y no en
+# ``Models.Api`` para poder consultarlo sin importar la red.
+governor = RateGovernor()
@@ -0,0 +1,254 @@
+import io
+import os
+import struct
+from time import ticks_us, ticks_diff
+from micropython import const
+from Models.Log import log, INFO, WARNING
+
+# Cabecera del fichero: firma y ``ticks_us`` al empezar a grabar.
+MAGIC = b'CWR1'
+_HEADER = '>4sI'
+
+# Cada registro empieza por su tipo y el instante desde el inicio de la grabación, en
+# milisegundos y microsegundos dentro del milisegundo.
+_RECORD = '>BIH'
+_RECORD_SIZE = const(7)
+
+# Tipos de registro y lo que les sigue.
+PIN = const(1)      # '>BB' pin y nivel
+ADC = const(2)      # '>BH' canal (como se pasó a ``ADC``) y lectura de 16 bits
+HTTP = const(3)     # '>hIHHI' estado (-errno, por debajo de 100, si falla), latencia en µs, y
+                    # longitudes de URL, cabeceras y cuerpo
+
+_PIN = '>BB'
+_ADC = '>BH'
+_HTTP = '>hIHHI'
+
+# Flancos pendientes en RAM: ``ticks_us``, pin y nivel (se apuntan desde las IRQ).
+_EDGE = '>IBB'
+_EDGE_SIZE = const(6)
+
+# Cabeceras de las respuestas que lee el firmware (ver ``RateGovernor.observe``).
+_HEADERS = ('x-mbx-used-weight-1m', 'retry-after')
+
+_LOG_START = log.event('record', INFO, 'Grabando en %d bytes como mucho')
+_LOG_FULL = log.event('record', WARNING, 'Grabación llena: %d bytes')
+
+
+class Recorder:
+    """
+    Graba lo que llega de fuera al firmware para reproducirlo en el PC.
+
+    Guarda en un fichero de la flash las respuestas HTTP de Binance y de
+    worldtimeapi (estado, latencia, cabeceras que se usan y cuerpo), los
+    flancos de los pines del encoder y de los botones y las lecturas del ADC,
+    cada cosa con el instante en microsegundos desde que empezó la grabación.
+    El simulador del PC (``python -m sim.replay``) los devuelve al firmware
+    en el mismo orden y en el mismo instante.
+
+    Los flancos llegan en IRQ: se apuntan con su ``ticks_us`` en un buffer de
+    RAM reservado al empezar y se pasan al fichero desde el bucle con
+    ``flush`` o antes del siguiente registro, para que el fichero quede en
+    orden. ``ticks_us`` da la vuelta cada 18 minutos, así que el bucle lleva
+    la cuenta desde el inicio y ``flush`` tiene que llamarse cada pocos
+    minutos como mucho. Si el buffer se llena, los flancos se cuentan en
+    ``stats["dropped"]``; si el fichero llega a ``max_bytes``, la grabación
+    se para.
+
+    Al empezar, la grabación anterior se conserva como ``<path>.prev``: tras
+    un reinicio del watchdog sigue ahí la que llevó al fallo.
+    """
+
+    def __init__ (self):
+        self.enabled = False
+        self.path = None
+        self.max_bytes = 0
+        self.size = 0
+
+        self._file = None
+        self._edges = None
+        self._capacity = 0
+
+        # Microsegundos desde el inicio en el ``ticks_us`` de ``_mark``
+        self._elapsed = 0
+        self._mark = 0
+
+        # Contadores de flancos apuntados (solo los toca la IRQ) y pasados al fichero (solo el bucle)
+        self._written = 0
+        self._read = 0
+
+        self.stats = {
+            "http": 0,
+            "pins": 0,
+            "adc": 0,
+            "dropped": 0,
+        }
+
+    def start (self, path='record.bin', capacity=64, max_bytes=262144) -> bool:
+        """
+        Abre el fichero y empieza a grabar.
+
+        Args:
+            path (str): Fichero de la grabación en la flash.
+            capacity (int): Flancos que caben en RAM entre dos ``flush``.
+            max_bytes (int): Tamaño máximo del fichero.
+
+        Returns:
+            bool: False si no se puede abrir el fichero.
+        """
+        try:
+            try:
+                os.rename(path, path + '.prev')
+            except OSError:
+                pass
+
+            self._file = open(path, 'wb')
+            self._mark = ticks_us()
+            self._file.write(struct.pack(_HEADER, MAGIC, self._mark))
+        except OSError:
+            self._file = None
+            return False
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = struct.calcsize(_HEADER)
+        self._elapsed = 0
+        self._edges = bytearray(capacity * _EDGE_SIZE)
+        self._capacity = capacity
+        self._written = 0
+        self._read = 0
+        self.enabled = True
+
+        log.log(_LOG_START, max_bytes)
+
+        return True
+
+    def stop (self) -> None:
+        """Pasa lo pendiente al fichero y lo cierra."""
+        if self._file is None:
+            return
+
+        self.flush()
+        self.enabled = False
+        self._file.close()
+        self._file = None
+
+    def pin (self, pin, value) -> None:
+        """Apunta el nivel de un pin tras un flanco. Seguro desde una IRQ: no reserva memoria."""
+        if not self.enabled:
+            return
+
+        if self._written - self._read >= self._capacity:
+            self.stats["dropped"] += 1
+            return
+
+        struct.pack_into(_EDGE, self._edges, (self._written % self._capacity) * _EDGE_SIZE, ticks_us(), pin, value)
+        self._written += 1
+
+    def adc (self, channel, value) -> None:
+        """Graba una lectura del ADC."""
+        if not self.enabled:
+            return
+
+        self.stats["adc"] += 1
+        self._write(ADC, struct.pack(_ADC, channel, value))
+
+    def http (self, url, status, latency_us, headers=None, body=b'') -> None:
+        """
+        Graba una respuesta HTTP.
+
+        Args:
+            url (str): URL pedida.
+            status (int): Código HTTP o -errno si la petición lanzó OSError (ver ``Log.code``).
+            latency_us (int): Lo que tardó la petición.
+            headers (dict): Cabeceras de la respuesta; solo se guardan las que lee el firmware.
+            body (bytes): Cuerpo de la respuesta.
+        """
+        if not self.enabled:
+            return
+
+        url = url.encode()
+        kept = ''
+
+        for key, value in (headers or {}).items():
+            if key.lower() in _HEADERS:
+                kept += '%s:%s\n' % (key.lower(), value)
+
+        kept = kept.encode()
+        self.stats["http"] += 1
+        self._write(HTTP, struct.pack(_HTTP, status, latency_us, len(url), len(kept), len(body)), url, kept, body)
+
+    def response (self, url, response, start) -> None:
+        """
+        Graba una respuesta de ``urequests`` sin dejarla inservible.
+
+        Leer el cuerpo consume ``response.raw``: se sustituye por un flujo en
+        memoria con lo leído, para quien lo procese por trozos.
+
+        Args:
+            url (str): URL pedida.
+            response (Response): Respuesta recién recibida.
+            start (int): ``ticks_us`` al empezar la petición.
+        """
+        if not self.enabled:
+            return
+
+        latency = ticks_diff(ticks_us(), start)
+        body = response.content
+        response.raw = io.BytesIO(body)
+        self.http(url, response.status_code, latency, response.headers, body)
+
+    def flush (self) -> None:
+        """Pasa los flancos pendientes al fichero. Desde el bucle, no desde una IRQ."""
+        if self._file is None:
+            return
+
+        self._now()
+        self._drain()
+        self._file.flush()
+
+    def _now (self):
+        now = ticks_us()
+        self._elapsed += ticks_diff(now, self._mark)
+        self._mark = now
+
+        return self._elapsed
+
+    def _drain (self):
+        while self._read != self._written:
+            stamp, pin, value = struct.unpack_from(_EDGE, self._edges, (self._read % self._capacity) * _EDGE_SIZE)
+            self._read += 1
+            self.stats["pins"] += 1
+
+            # Un flanco posterior a la marca sale con diferencia positiva, uno anterior con negativa
+            self._append(PIN, self._elapsed + ticks_diff(stamp, self._mark), struct.pack(_PIN, pin, value))
+
+    def _write (self, kind, *parts):
+        # Los flancos ya ocurridos van antes en el fichero que lo que se graba ahora
+        at = self._now()
+        self._drain()
+        self._append(kind, at, *parts)
+
+    def _append (self, kind, at, *parts):
+        if not self.enabled:
+            return
+
+        size = _RECORD_SIZE + sum(len(part) for part in parts)
+
+        if self.size + size > self.max_bytes:
+            self.enabled = False
+            log.log(_LOG_FULL, self.size)
+            self._file.flush()
+            return
+
+        ms, us = divmod(at, 1000)
+        self._file.write(struct.pack(_RECORD, kind, ms, us))
+
+        for part in parts:
+            self._file.write(part)
+
+        self.size += size
+
+
+# Grabadora compartida por todo el firmware; parada salvo con RECORD = True en env.py.
+recorder = Recorder()
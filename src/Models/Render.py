@@ -0,0 +1,400 @@
+from time import ticks_us, ticks_diff
+from micropython import const
+from Models.Max7219 import CHAR_MAP
+from Models.QuoteConverter import format_price
+from Models.Trace import trace
+
+# Tipos de fotograma
+TEXT = const(0)     # Mensaje (``label``): arranque, SEL-, CURR-, FAV-...
+MENU = const(1)     # Posición del menú: moneda (``symbol``) o, sin ella, divisa (``quote``)
+PRICE = const(2)    # Precio ``value`` de ``symbol`` en ``quote``
+CHANGE = const(3)   # Variación ``value`` en puntos básicos en la ventana ``label``
+LEVEL = const(4)    # Máximo (``trend`` 1) o mínimo (-1) ``value``: de 24 h o nivel de una alerta
+VIEW = const(5)     # Nombre de la vista (``label``) antes de su valor
+
+# Indicadores de estado (``flags``)
+STALE = const(1)        # El precio no se ha podido renovar a tiempo
+ALERT = const(2)        # Alerta disparada
+FAVOURITE = const(4)    # Moneda favorita (en el menú)
+BATTERY = const(8)      # Perfil de ahorro de batería
+
+# Tramo del formateo y dibujado en RAM de cada salida en la traza (ver Models.Trace)
+_SPAN_FORMAT = trace.name('format')
+
+
+class Frame:
+    """
+    Lo que hay que mostrar, sin formato: cada salida decide cómo cabe en su pantalla.
+
+    Args:
+        kind (int): Tipo de fotograma (``TEXT``, ``MENU``, ``PRICE``...).
+        symbol (str): Moneda.
+        value (float): Precio, nivel o variación en puntos básicos; None si no hay dato.
+        quote (str): Divisa del precio.
+        label (str): Texto del mensaje, nombre de la vista o de la ventana.
+        trend (int): 1 sube, -1 baja, 0 estable.
+        flags (int): Indicadores de estado (``STALE``, ``ALERT``...).
+    """
+
+    def __init__ (self, kind, symbol=None, value=None, quote=None, label=None, trend=0, flags=0):
+        self.kind = kind
+        self.symbol = symbol
+        self.value = value
+        self.quote = quote
+        self.label = label
+        self.trend = trend
+        self.flags = flags
+
+
+class Renderer:
+    """
+    Lleva cada fotograma a todas las salidas (MAX7219, OLED...).
+
+    Cada salida lo formatea para su espacio, lo dibuja en su buffer y envía
+    por su bus solo lo que ha cambiado respecto a lo que ya muestra. Por
+    salida se cuentan los fotogramas, los bytes enviados y el tiempo de
+    dibujado y envío.
+
+    Args:
+        outputs (list): Salidas con ``draw``, ``flush``, ``reset``,
+            ``invalidate``, ``set_intensity`` y ``set_power``.
+    """
+
+    def __init__ (self, outputs):
+        self.outputs = outputs
+        self.frame = None
+        self.stats = {output.name: {"frames": 0, "bytes": 0, "us": 0} for output in outputs}
+
+    def show (self, frame) -> None:
+        """Muestra un fotograma en todas las salidas."""
+        self.frame = frame
+
+        for output in self.outputs:
+            start = ticks_us()
+            output.draw(frame)
+            trace.span(_SPAN_FORMAT, start)
+            sent = output.flush()
+
+            stats = self.stats[output.name]
+            stats["frames"] += 1
+            stats["bytes"] += sent
+            stats["us"] += ticks_diff(ticks_us(), start)
+
+    def invalidate (self) -> None:
+        """El siguiente fotograma se envía entero, por si alguna pantalla perdió su contenido."""
+        for output in self.outputs:
+            output.invalidate()
+
+    def reset (self) -> None:
+        """Reconfigura las pantallas tras un fallo; el siguiente fotograma se envía entero."""
+        for output in self.outputs:
+            output.reset()
+
+    def set_intensity (self, level) -> None:
+        """Brillo de 0 a 15 (la escala del MAX7219)."""
+        for output in self.outputs:
+            output.set_intensity(level)
+
+    def set_power (self, on) -> None:
+        for output in self.outputs:
+            output.set_power(on)
+
+    def report (self) -> dict:
+        """
+        Estado para ``/stats``.
+
+        Returns:
+            dict: Por salida, fotogramas, bytes y microsegundos en total y por fotograma.
+        """
+        report = {}
+
+        for name, stats in self.stats.items():
+            frames = stats["frames"] or 1
+            report[name] = {
+                "frames": stats["frames"],
+                "bytes": stats["bytes"],
+                "bytes_per_frame": round(stats["bytes"] / frames, 1),
+                "us_per_frame": stats["us"] // frames,
+            }
+
+        return report
+
+
+def level_text (symbol, glyph, value, width) -> str:
+    """Texto de un nivel en ``width`` dígitos tras el símbolo; sin sitio para la parte entera se sacrifica ``glyph``."""
+    if len(str(int(value))) > width:
+        glyph = ''
+        width += 1
+
+    return symbol + glyph + format_price(value, width)
+
+
+def percent_text (change, width) -> str:
+    """Variación en puntos básicos como porcentaje sin signo en ``width`` dígitos."""
+    percent = abs(change) / 100
+    digits = len(str(int(percent)))
+
+    if digits > width:
+        return '9' * width
+
+    return ('%.' + str(width - digits) + 'f') % percent
+
+
+class SegmentOutput:
+    """
+    Salida al MAX7219: 8 dígitos de 7 segmentos, el símbolo delante del valor.
+
+    Args:
+        display (Max7219): Pantalla.
+    """
+
+    name = 'max7219'
+
+    def __init__ (self, display):
+        self.display = display
+
+    def text (self, frame) -> str:
+        """Texto de 8 dígitos (los puntos no ocupan dígito) de un fotograma."""
+        kind = frame.kind
+        symbol = frame.symbol
+
+        if kind == TEXT:
+            return frame.label
+
+        if kind == MENU:
+            if symbol is None:
+                return 'Q- ' + frame.quote
+
+            if len(symbol) <= 3:
+                label = 'SEL- ' + symbol
+            elif len(symbol) == 4:
+                label = 'SEL-' + symbol
+            else:
+                label = symbol
+
+            # Las favoritas llevan un punto al final
+            return label + '.' if frame.flags & FAVOURITE else label
+
+        if kind == VIEW:
+            return symbol + ' ' * (8 - len(symbol) - len(frame.label)) + frame.label
+
+        width = 7 - len(symbol)
+        value = frame.value
+
+        if value is None:
+            return symbol + ' ' + '-' * width
+
+        if kind == PRICE:
+            if value < 100:
+                return symbol + ' ' + format_price(value, width)
+
+            return symbol + format_price(value, width + 1)
+
+        if kind == LEVEL:
+            return level_text(symbol, '^' if frame.trend > 0 else '_', value, width)
+
+        # Variación: '^' sube, '-' baja, ' ' estable; en una alerta la bajada es '_'
+        if frame.trend > 0:
+            sign = '^'
+        elif frame.trend < 0:
+            sign = '_' if frame.flags & ALERT else '-'
+        else:
+            sign = ' '
+
+        return symbol + sign + percent_text(value, width)
+
+    def draw (self, frame) -> None:
+        self.display.write_to_buffer_with_dots(self.text(frame))
+
+    def flush (self) -> int:
+        # Dos bytes (registro y valor) por dígito que cambia
+        return 2 * self.display.display()
+
+    def invalidate (self) -> None:
+        self.display.invalidate()
+
+    def reset (self) -> None:
+        self.display.reset()
+
+    def set_intensity (self, level) -> None:
+        self.display.set_intensity(level)
+
+    def set_power (self, on) -> None:
+        self.display.set_power(on)
+
+
+# Dígitos grandes de la OLED: celdas de 14x20 píxeles con los segmentos del MAX7219 de 3 píxeles
+# de grosor, como (bit, x, y, ancho, alto) dentro de la celda
+_CELL_WIDTH = const(14)
+_CELL_HEIGHT = const(20)
+_SEGMENTS = (
+    (0x40, 0, 0, 10, 3),     # A
+    (0x20, 7, 0, 3, 10),     # B
+    (0x10, 7, 10, 3, 10),    # C
+    (0x08, 0, 17, 10, 3),    # D
+    (0x04, 0, 10, 3, 10),    # E
+    (0x02, 0, 0, 3, 10),     # F
+    (0x01, 0, 9, 10, 3),     # G
+    (0x80, 11, 17, 2, 3),    # Punto
+)
+
+
+class OledOutput:
+    """
+    Salida a una OLED SSD1306: una línea de estado arriba con la fuente de 8x8
+    (moneda y divisa, vista, tendencia e indicadores) y el valor debajo en
+    dígitos grandes de 7 segmentos, con el mismo mapa de caracteres que el
+    MAX7219.
+
+    Solo se redibujan los caracteres de la línea de estado y las celdas de
+    dígitos que cambian; la pantalla envía solo las columnas que tocan.
+
+    Args:
+        oled (Ssd1306): Pantalla.
+    """
+
+    name = 'oled'
+
+    def __init__ (self, oled):
+        self.oled = oled
+        self.columns = oled.width // 8
+        self.cells = oled.width // _CELL_WIDTH
+        self.top = 8 + (oled.height - 8 - _CELL_HEIGHT) // 2
+
+        self._codes = bytearray(self.cells)
+        self._next = bytearray(self.cells)
+        self._status = None
+
+    def status (self, frame) -> str:
+        """Línea de estado: título a la izquierda e indicadores a la derecha."""
+        kind = frame.kind
+        symbol = frame.symbol
+
+        if kind == TEXT:
+            title = ''
+        elif kind == MENU:
+            title = 'MENU'
+        elif kind == VIEW:
+            title = symbol
+        elif kind == CHANGE:
+            title = symbol + ' ' + (frame.label or '') + ' %'
+        else:
+            title = symbol + ('/' + frame.quote if frame.quote else '')
+
+            if kind == LEVEL:
+                title += ' MAX' if frame.trend > 0 else ' MIN'
+
+        flags = frame.flags
+        right = ''
+
+        if flags & FAVOURITE:
+            right += '*'
+
+        if flags & STALE:
+            right += '?'
+
+        if flags & BATTERY:
+            right += 'B'
+
+        if flags & ALERT:
+            right += '!'
+
+        if kind in (PRICE, CHANGE) and frame.trend:
+            right += '^' if frame.trend > 0 else 'v'
+
+        width = self.columns - len(right)
+
+        return (title[:width] + ' ' * (width - len(title)) + right)[:self.columns]
+
+    def digits (self, frame) -> str:
+        """Texto de los dígitos grandes (los puntos no ocupan celda)."""
+        kind = frame.kind
+        value = frame.value
+
+        if kind == TEXT or kind == VIEW:
+            return frame.label
+
+        if kind == MENU:
+            return frame.symbol if frame.symbol is not None else frame.quote
+
+        if value is None:
+            return '----'
+
+        if kind == CHANGE:
+            # Tantas cifras como en el MAX7219 con una moneda de 3 letras
+            return ('-' if value < 0 or frame.trend < 0 else '') + percent_text(value, 4)
+
+        return format_price(value, self.cells)
+
+    def draw (self, frame) -> None:
+        oled = self.oled
+        status = self.status(frame)
+        codes = self._next
+        _encode(self.digits(frame), codes)
+
+        if self._status is None:
+            oled.fill_rect(0, 0, oled.width, oled.height, 0)
+
+        for i in range(self.columns):
+            char = status[i]
+
+            if self._status is None or self._status[i] != char:
+                oled.fill_rect(8 * i, 0, 8, 8, 0)
+                oled.text(char, 8 * i, 0)
+
+        for i in range(self.cells):
+            if self._status is None or self._codes[i] != codes[i]:
+                self._glyph(i, codes[i])
+                self._codes[i] = codes[i]
+
+        self._status = status
+
+    def _glyph (self, cell, code):
+        oled = self.oled
+        x = cell * _CELL_WIDTH
+        y = self.top
+        oled.fill_rect(x, y, _CELL_WIDTH, _CELL_HEIGHT, 0)
+
+        for bit, dx, dy, w, h in _SEGMENTS:
+            if code & bit:
+                oled.fill_rect(x + dx, y + dy, w, h, 1)
+
+    def flush (self) -> int:
+        return self.oled.show()
+
+    def invalidate (self) -> None:
+        # Se redibuja todo en el buffer, así que se envía todo
+        self._status = None
+
+    def reset (self) -> None:
+        self.oled.reset()
+        self._status = None
+
+    def set_intensity (self, level) -> None:
+        self.oled.set_contrast(min(255, level * 17))
+
+    def set_power (self, on) -> None:
+        self.oled.set_power(on)
+
+
+def _encode (text, codes):
+    # Como ``Max7219.write_to_buffer_with_dots`` pero de izquierda a derecha
+    n = len(codes)
+    length = len(text)
+    x = 0
+    i = 0
+
+    while i < length and x < n:
+        code = CHAR_MAP.get(text[i], 0)
+
+        if i < length - 1 and text[i + 1] == '.':
+            code |= 0x80
+            i += 1
+
+        codes[x] = code
+        x += 1
+        i += 1
+
+    while x < n:
+        codes[x] = 0
+        x += 1
@@ -0,0 +1,219 @@
+import sys
+from time import ticks_ms, ticks_add, ticks_diff
+from micropython import const
+from Models.Log import log, code, WARNING
+
+# Campos de cada dirección guardada
+_INFO = const(0)
+_RESOLVED = const(1)
+_ARGS = const(2)
+_RETRY = const(3)
+
+# Mensajes del registro (ver ``Models.Log``)
+_LOG_REFRESH_ERROR = log.event('net', WARNING, 'No se pudo renovar una dirección, se sigue con la guardada: %d')
+_LOG_NOT_INSTALLED = log.event('net', WARNING, 'urequests no tiene socket que sustituir: sin caché de DNS')
+
+# Nombre del módulo de sockets en ``urequests``: ``socket`` en el actual, ``usocket`` en el antiguo.
+_SOCKET_NAMES = ('socket', 'usocket')
+
+
+class _Socket:
+    """Socket para ``urequests``: el del sistema con ``getaddrinfo`` cambiado por el de la caché."""
+
+    def __init__ (self, module, getaddrinfo):
+        for name in dir(module):
+            if not name.startswith('__'):
+                setattr(self, name, getattr(module, name))
+
+        self.getaddrinfo = getaddrinfo
+
+
+class Resolver:
+    """
+    Caché de ``getaddrinfo`` por host y puerto.
+
+    Cada petición de ``urequests`` vuelve a resolver el nombre; con la caché
+    una dirección se reutiliza durante ``ttl_ms`` (MicroPython no da el TTL
+    del DNS, así que es fijo). Pasado ese tiempo, y hasta ``stale_ms``, la
+    petición sigue con la dirección vieja sin esperar al DNS y el host queda
+    pendiente de renovar en ``refresh``, que se llama desde una tarea aparte
+    (``on_stale`` la avisa). Si la renovación falla, por ejemplo con el DNS
+    caído, la dirección vieja sigue sirviendo hasta ``stale_ms`` y no se
+    vuelve a intentar hasta pasados ``retry_ms``; más allá de ``stale_ms`` se
+    resuelve dentro de la petición, como sin caché.
+
+    ``install`` pone la caché delante del socket que usa ``urequests``: el
+    módulo ``socket`` es de C y sus atributos no se pueden cambiar, así que
+    se sustituye la referencia que guarda ``urequests``. El de micropython-lib
+    actual es ``from requests import *`` y sus peticiones usan el ``socket``
+    del módulo ``requests``; el antiguo, su propio ``usocket``.
+
+    Args:
+        ttl_ms (int): Tiempo que una dirección se usa sin renovarla.
+        stale_ms (int): Tiempo máximo que se usa una dirección sin renovar.
+        retry_ms (int): Espera tras una renovación fallida antes de intentar otra.
+        capacity (int): Hosts guardados como mucho; al pasarse se olvida el más antiguo.
+        on_stale: Función sin argumentos que se llama al quedar un host pendiente.
+        enabled (bool): Si False, cada petición resuelve (solo se cuentan las consultas).
+    """
+
+    def __init__ (self, ttl_ms=300000, stale_ms=86400000, retry_ms=60000, capacity=8, on_stale=None,
+                  enabled=True):
+        self.ttl_ms = ttl_ms
+        self.stale_ms = stale_ms
+        self.retry_ms = retry_ms
+        self.capacity = capacity
+        self.on_stale = on_stale
+        self.enabled = enabled
+
+        # (host, puerto) -> [resultado de getaddrinfo, instante en que se resolvió (ticks_ms),
+        # resto de argumentos de la consulta para renovarla, próxima renovación permitida]
+        self._entries = {}
+        self._pending = []
+        self._getaddrinfo = None
+
+        self.stats = {
+            "hits": 0,
+            "stale": 0,
+            "lookups": 0,
+            "refreshes": 0,
+            "errors": 0,
+            "lookup_ms": 0,
+        }
+
+    def install (self, module) -> bool:
+        """
+        Pone la caché delante del ``getaddrinfo`` que usa ``module``
+        (``urequests``) y, si lo ha cargado, ``requests``, una sola vez.
+
+        Args:
+            module: El módulo ``urequests`` importado.
+
+        Returns:
+            bool: Si las peticiones resuelven con la caché; si no, queda en el registro.
+        """
+        installed = False
+        modules = [module]
+        requests = sys.modules.get('requests')
+
+        if requests is not None and requests is not module:
+            modules.append(requests)
+
+        for target in modules:
+            for name in _SOCKET_NAMES:
+                sock = getattr(target, name, None)
+
+                if sock is None or not hasattr(sock, 'getaddrinfo'):
+                    continue
+
+                if not isinstance(sock, _Socket):
+                    if self._getaddrinfo is None:
+                        self._getaddrinfo = sock.getaddrinfo
+
+                    setattr(target, name, _Socket(sock, self.getaddrinfo))
+
+                installed = True
+
+        if not installed:
+            log.log(_LOG_NOT_INSTALLED)
+
+        return installed
+
+    def _lookup (self, host, port, args):
+        start = ticks_ms()
+        self.stats["lookups"] += 1
+
+        try:
+            info = self._getaddrinfo(host, port, *args)
+        except OSError:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["lookup_ms"] += ticks_diff(ticks_ms(), start)
+
+        self._store((host, port), info, args)
+
+        return info
+
+    def _store (self, key, info, args):
+        if key not in self._entries and len(self._entries) >= self.capacity:
+            oldest = None
+
+            for other, entry in self._entries.items():
+                if oldest is None or ticks_diff(entry[_RESOLVED], self._entries[oldest][_RESOLVED]) < 0:
+                    oldest = other
+
+            del self._entries[oldest]
+
+        now = ticks_ms()
+        self._entries[key] = [info, now, args, now]
+
+    def getaddrinfo (self, host, port, *args):
+        """Como ``socket.getaddrinfo``, con la dirección guardada si la hay."""
+        if not self.enabled:
+            self.stats["lookups"] += 1
+
+            return self._getaddrinfo(host, port, *args)
+
+        key = (host, port)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            # Una edad negativa es una entrada tan vieja que ``ticks_ms`` ha dado la vuelta
+            age = ticks_diff(ticks_ms(), entry[_RESOLVED])
+
+            if 0 <= age < self.ttl_ms:
+                self.stats["hits"] += 1
+
+                return entry[_INFO]
+
+            if 0 <= age < self.stale_ms:
+                self.stats["stale"] += 1
+
+                if key not in self._pending and ticks_diff(ticks_ms(), entry[_RETRY]) >= 0:
+                    self._pending.append(key)
+
+                    if self.on_stale is not None:
+                        self.on_stale()
+
+                return entry[_INFO]
+
+        return self._lookup(host, port, args)
+
+    def refresh (self) -> None:
+        """Renueva las direcciones pendientes; las que fallan siguen con la guardada."""
+        while self._pending:
+            key = self._pending.pop()
+            entry = self._entries.get(key)
+
+            if entry is None:
+                continue
+
+            try:
+                self._lookup(key[0], key[1], entry[_ARGS])
+                self.stats["refreshes"] += 1
+            except OSError as e:
+                entry[_RETRY] = ticks_add(ticks_ms(), self.retry_ms)
+                log.log(_LOG_REFRESH_ERROR, code(e))
+
+    def invalidate (self, host) -> None:
+        """Olvida las direcciones de ``host``, por ejemplo si dejan de aceptar conexiones."""
+        for key in [key for key in self._entries if key[0] == host]:
+            del self._entries[key]
+
+    def report (self) -> dict:
+        """
+        Estado para ``/stats``.
+
+        Returns:
+            dict: Contadores, hosts guardados y milisegundos de DNS ahorrados
+            (usos de la caché por lo que tarda de media una consulta).
+        """
+        lookups = self.stats["lookups"] or 1
+
+        return dict(self.stats, hosts=len(self._entries),
+                    saved_ms=(self.stats["hits"] + self.stats["stale"]) * self.stats["lookup_ms"] // lookups)
+
+
+# Caché compartida por todas las peticiones salientes (ver ``Models.Api``).
+resolver = Resolver()
@@ -10,10 +10,16 @@
 #   https://github.com/MikeTeachman/micropython-rotary
 
 from machine import Pin
+from time import ticks_us
 from Models.Rotary import Rotary
+from Models.Trace import trace, IRQ
+from Models.Recorder import recorder
 
 IRQ_RISING_FALLING = Pin.IRQ_RISING | Pin.IRQ_FALLING
 
+# Tramo de cada flanco en la traza (ver Models.Trace)
+_SPAN_ISR = trace.name('rotary-isr', IRQ)
+
 
 class RotaryIRQ(Rotary):
     def __init__(
@@ -31,6 +37,9 @@ class RotaryIRQ(Rotary):
     ):
         super().__init__(min_val, max_val, incr, reverse, range_mode, half_step, invert)
 
+        self._pin_num_clk = pin_num_clk
+        self._pin_num_dt = pin_num_dt
+
         if pull_up:
             self._pin_clk = Pin(pin_num_clk, Pin.IN, Pin.PULL_UP)
             self._pin_dt = Pin(pin_num_dt, Pin.IN, Pin.PULL_UP)
@@ -40,6 +49,16 @@ class RotaryIRQ(Rotary):
 
         self._hal_enable_irq()
 
+    def _process_rotary_pins(self, pin):
+        start = ticks_us() if trace.enabled else 0
+
+        if recorder.enabled:
+            recorder.pin(self._pin_num_clk, self._pin_clk.value())
+            recorder.pin(self._pin_num_dt, self._pin_dt.value())
+
+        Rotary._process_rotary_pins(self, pin)
+        trace.span(_SPAN_ISR, start)
+
     def _enable_clk_irq(self):
         self._pin_clk.irq(self._process_rotary_pins, IRQ_RISING_FALLING)
 
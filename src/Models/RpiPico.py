@@ -1,13 +1,40 @@
-from machine import ADC, Pin, SPI, I2C, RTC
+from machine import ADC, Pin, SPI, I2C, RTC, freq
 import network
-from time import sleep_ms
-from Models.Api import get_time_utc
+from time import sleep_ms, ticks_ms, ticks_diff
+from Models.Log import log, code, DEBUG, INFO, WARNING, ERROR
+from Models.Recorder import recorder
 
 # Constants
 WIFI_DISCONNECTED = 0
 WIFI_CONNECTING = 1
 WIFI_CONNECTED = 3
 
+# Mensajes del registro (ver ``Models.Log``)
+_LOG_WIFI_START = log.event('wifi', DEBUG, 'Iniciando la conexión inalámbrica')
+_LOG_WIFI_IP = log.event('wifi', DEBUG, 'Conectado, IP %d.%d.%d.%d')
+_LOG_WIFI_LINK = log.event('wifi', DEBUG, 'Estado %d, canal %d, RSSI %d, potencia %d')
+_LOG_I2C_ERROR = log.event('rpi', ERROR, 'Error en set_i2c: %d')
+_LOG_SPI_ERROR = log.event('rpi', ERROR, 'Error en set_spi: %d')
+_LOG_RTC_SET = log.event('rpi', INFO, 'RTC ajustado a %d (rtt %d ms)')
+_LOG_RTC_FAILED = log.event('rpi', WARNING, 'No se pudo ajustar el RTC: sin respuesta NTP')
+
+
+def _read_u16 (adc, channel) -> int:
+    """Lee un ADC y, si se está grabando (ver ``Models.Recorder``), guarda la lectura."""
+    value = adc.read_u16()
+    recorder.adc(channel, value)
+
+    return value
+
+
+def _recorded (pin_number, callback):
+    """Envuelve el callback de una IRQ de pin para grabar cada flanco antes de atenderlo."""
+    def handler (pin):
+        recorder.pin(pin_number, pin.value())
+        callback(pin)
+
+    return handler
+
 
 class RpiPico:
     # Corrección de temperatura interna para ajustar lecturas.
@@ -51,8 +78,10 @@ class RpiPico:
     # Configuración de Buses SPI.
     spi0 = None
     spi0_cs = None
+    spi0_baudrate = None
     spi1 = None
     spi1_cs = None
+    spi1_baudrate = None
 
     # Lista con todos los callbacks asociados.
     callbacks = []
@@ -61,7 +90,7 @@ class RpiPico:
     external_battery = None
 
     def __init__ (self, ssid=None, password=None, debug=False, country="ES",
-                  alternatives_ap=None, hostname="Rpi-Pico-W"):
+                  alternatives_ap=None, hostname="Rpi-Pico-W", wifi_timeout_ms=None, last_ap=None):
         """
         Constructor de la clase para Raspberry Pi Pico W.
 
@@ -72,6 +101,10 @@ class RpiPico:
             country (str): Código del país. Por defecto 'ES'.
             alternatives_ap (tuple): Puedes pasar una tupla con redes adicionales.
             hostname (str): Nombre del dispositivo en la red.
+            wifi_timeout_ms (int): Tiempo máximo para conectar al arrancar o None
+                para insistir hasta conseguirlo.
+            last_ap (str): Red de la última conexión (guardada antes de reiniciar):
+                se prueba antes que las demás.
         """
         self.locked = True
         self.DEBUG = debug
@@ -79,7 +112,10 @@ class RpiPico:
         self.PASSWORD = password
         self.COUNTRY = country
         self.hostname = hostname
-        self.alternatives_ap = alternatives_ap
+        self.alternatives_ap = alternatives_ap or []
+        self.last_ap = last_ap
+        self._reconnect_index = 0
+        self._network = (ssid, password)
 
         # Sensor interno de Raspberry Pi Pico para temperatura de CPU.
         self.TEMP_SENSOR = ADC(4)
@@ -92,10 +128,9 @@ class RpiPico:
 
         # Si se proporcionan credenciales del AP intenta la conexión
         if ssid and password:
-            if self.DEBUG:
-                print('Iniciando la conexión inalámbrica')
+            log.log(_LOG_WIFI_START)
 
-            self.wifi_connect(ssid, password)
+            self.wifi_connect(ssid, password, timeout_ms=wifi_timeout_ms)
 
         sleep_ms(100)
 
@@ -109,7 +144,8 @@ class RpiPico:
         Args:
             pin_number: Número del pin que representa GPIO.
             callback: Función a ejecutar cuando se detecte el evento.
-            event: Estado del pin que activará el callback ("HIGH" o "LOW").
+            event: Estado del pin que activará el callback ("HIGH", "LOW" o "BOTH"
+                para los dos flancos, por ejemplo para medir pulsaciones largas).
 
         Raises:
             ValueError: Si ya existe un callback configurado para el pin.
@@ -126,8 +162,11 @@ class RpiPico:
 
         # Configura el pin como entrada con pull-up
         pin = Pin(pin_number, Pin.IN, Pin.PULL_UP)
-        trigger = Pin.IRQ_RISING if event == "HIGH" else Pin.IRQ_FALLING
-        pin.irq(trigger=trigger, handler=callback)
+        if event == "BOTH":
+            trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING
+        else:
+            trigger = Pin.IRQ_RISING if event == "HIGH" else Pin.IRQ_FALLING
+        pin.irq(trigger=trigger, handler=_recorded(pin_number, callback) if recorder.enabled else callback)
 
         # Agrega el callback a la lista
         self.callbacks.append({
@@ -180,8 +219,7 @@ class RpiPico:
             elif bus == 1:
                 self.i2c1 = i2c
         except Exception as e:
-            if self.DEBUG:
-                print('Error en set_i2c:', e)
+            log.log(_LOG_I2C_ERROR, code(e))
 
             self.locked = False
 
@@ -224,12 +262,13 @@ class RpiPico:
             if bus == 0:
                 self.spi0 = spi
                 self.spi0_cs = spi_cs
+                self.spi0_baudrate = baudrate
             elif bus == 1:
                 self.spi1 = spi
                 self.spi1_cs = spi_cs
+                self.spi1_baudrate = baudrate
         except Exception as e:
-            if self.DEBUG:
-                print('Error en set_spi:', e)
+            log.log(_LOG_SPI_ERROR, code(e))
 
             self.locked = False
 
@@ -252,6 +291,27 @@ class RpiPico:
 
         return None
 
+    def set_cpu_frequency (self, hz) -> None:
+        """
+        Cambia la frecuencia de la CPU y vuelve a configurar los buses SPI.
+
+        En la RP2040 el reloj de los periféricos sigue al del sistema: sin
+        volver a inicializarlos, los buses quedarían a otra velocidad.
+
+        Args:
+            hz (int): Frecuencia en Hz que admita el PLL (por ejemplo 64, 100 o 125 MHz).
+        """
+        if freq() == hz:
+            return
+
+        freq(hz)
+
+        if self.spi0 is not None:
+            self.spi0.init(baudrate=self.spi0_baudrate)
+
+        if self.spi1 is not None:
+            self.spi1.init(baudrate=self.spi1_baudrate)
+
     def cpu_temperature_reset_stats (self, temp=0.0) -> None:
         """
         Reinicia las estadísticas de temperatura.
@@ -281,7 +341,12 @@ class RpiPico:
 
         self.locked = True
 
-        reading = (self.TEMP_SENSOR.read_u16() * self.adc_conversion_factor) - self.adc_voltage_correction
+        try:
+            reading = (_read_u16(self.TEMP_SENSOR, 4) * self.adc_conversion_factor) - self.adc_voltage_correction
+        except Exception:
+            # Una lectura que falla no deja el sensor bloqueado para siempre
+            self.locked = False
+            raise
         value = self.INTEGRATED_TEMP_CORRECTION - reading / 0.001721
 
         cpu_temp = round(float(value), 1)
@@ -303,6 +368,18 @@ class RpiPico:
 
         return cpu_temp
 
+    def cpu_temperature_reset_sensor (self) -> float:
+        """
+        Vuelve a crear el ADC del sensor tras un fallo y lo lee.
+
+        Returns:
+            float: Temperatura leída.
+        """
+        self.TEMP_SENSOR = ADC(4)
+        self.locked = False
+
+        return self.cpu_temperature_read_sensor()
+
     def get_cpu_temperature (self) -> float:
         """
         Obtiene la temperatura actual.
@@ -409,25 +486,27 @@ class RpiPico:
 
     def wifi_debug (self) -> None:
         """
-        Muestra información de debug de la conexión Wi-Fi.
+        Registra la IP, el estado, el canal, el RSSI y la potencia de la
+        conexión Wi-Fi. Las consultas al chip solo se hacen si el módulo
+        'wifi' del registro está en DEBUG; el resto está en ``wireless_info``.
         """
-        print('Conectado a wifi:', self.wifi_is_connected())
-        print('Estado del wi-fi:', self.wifi_status())
-        print('Hostname:', self.get_wireless_hostname())
-        print('Dirección MAC: ', self.get_wireless_mac())
-        print('Dirección IP Wi-fi:', self.get_wireless_ip())
-        print('Potencia de transmisión (TXPOWER):', self.get_wireless_txpower())
-        print('SSID: ', self.get_wireless_ssid())
-        print('Canal de Wi-fi: ', self.get_wireless_channel())
-        print('RSSI: ', self.get_wireless_rssi())
+        if not log.enabled(_LOG_WIFI_IP):
+            return
+
+        a, b, c, d = [int(part) for part in self.get_wireless_ip().split('.')]
+        log.log(_LOG_WIFI_IP, a, b, c, d)
+        log.log(_LOG_WIFI_LINK, self.wifi_status(), self.get_wireless_channel(), self.get_wireless_rssi(),
+                self.get_wireless_txpower())
 
-    def wifi_connect (self, ssid=None, password=None) -> bool:
+    def wifi_connect (self, ssid=None, password=None, timeout_ms=None) -> bool:
         """
         Intenta conectar a Wi-Fi con las credenciales dadas.
 
         Args:
             ssid (str): ID de red para la conexión Wi-Fi.
             password (str): Contraseña para la conexión Wi-Fi.
+            timeout_ms (int): Tiempo máximo de intento o None para insistir
+                hasta conseguirlo. Con el watchdog en marcha debe ser acotado.
 
         Retorno:
             bool: True si se logra conectarse, False en caso contrario.
@@ -444,30 +523,77 @@ class RpiPico:
         # Desactivo el ahorro de energía
         self.wifi.config(pm=0xa11140)
 
+        start = ticks_ms()
+
         while not self.wifi_is_connected():
+            if timeout_ms is not None and ticks_diff(ticks_ms(), start) >= timeout_ms:
+                break
+
             # Escaneo las redes disponibles
             available_ssids = self.wifi.scan()
             available_ssids = [ap[0].decode('utf-8') for ap in available_ssids]
 
-            # Si la red principal se encuentra disponible, intenta conectar a ella
-            if self.SSID in available_ssids:
-                self.wifi.connect(self.SSID, self.PASSWORD)
-            else:
-                # Si no esta la red principal, intenta conectar a las redes secundarias disponibles
-                for ap in self.alternatives_ap:
-                    if ap['ssid'] in available_ssids:
-                        self.wifi.connect(ap['ssid'], ap['password'])
+            # Intenta conectar a la primera red conocida que esté disponible
+            for ap_ssid, ap_password in self.known_networks():
+                if ap_ssid in available_ssids:
+                    self._network = (ap_ssid, ap_password)
+                    self.wifi.connect(ap_ssid, ap_password)
+                    break
 
             sleep_ms(1000)
 
             if self.wifi_is_connected():
-                if self.DEBUG:
-                    self.wifi_debug()
+                self.wifi_debug()
 
                 return True
 
         return False
 
+    def known_networks (self) -> list:
+        """
+        Redes conocidas en el orden en que se prueban: la última usada
+        (``last_ap``), la principal y después las alternativas.
+
+        Returns:
+            list: Tuplas ``(ssid, password)``.
+        """
+        networks = [(self.SSID, self.PASSWORD)] + [(ap['ssid'], ap['password']) for ap in self.alternatives_ap]
+
+        for i, (ssid, _) in enumerate(networks):
+            if ssid == self.last_ap:
+                networks.insert(0, networks.pop(i))
+                break
+
+        return networks
+
+    def wifi_reconnect (self) -> None:
+        """
+        Pide volver a asociarse sin esperar al resultado ni escanear, para no
+        bloquear el bucle principal. Cada llamada prueba la siguiente red
+        de ``known_networks``; ``wifi_is_connected`` dirá si lo ha conseguido.
+        """
+        if self.wifi is None:
+            self.wifi = network.WLAN(network.STA_IF)
+
+        self.wifi.active(True)
+
+        networks = self.known_networks()
+        self._network = networks[self._reconnect_index % len(networks)]
+        self._reconnect_index += 1
+
+        self.wifi.connect(*self._network)
+
+    def wifi_wake (self) -> None:
+        """
+        Enciende la radio tras apagarla y pide asociarse a la última red
+        usada, sin esperar al resultado (ver ``Models.RadioManager``).
+        """
+        if self.wifi is None:
+            self.wifi = network.WLAN(network.STA_IF)
+
+        self.wifi.active(True)
+        self.wifi.connect(*self._network)
+
     def wireless_info (self):
         info_client = [
             {
@@ -527,7 +653,7 @@ class RpiPico:
         Returns:
             float: Lectura analógica.
         """
-        reading = ADC(pin).read_u16()
+        reading = _read_u16(ADC(pin), pin)
 
         return self.voltage_working - ((reading / 65535) * self.voltage_working)
 
@@ -535,7 +661,7 @@ class RpiPico:
         min_voltage = self.external_battery["threshold_voltage_min"]
         max_voltage = self.external_battery["threshold_voltage_max"]
         adc = self.external_battery["adc"]
-        adc_value = adc.read_u16()
+        adc_value = _read_u16(adc, self.external_battery["pin"])
 
         # Convierto la lectura a voltaje
         voltage = adc_value * (max_voltage / 65535)
@@ -573,31 +699,35 @@ class RpiPico:
 
         self.read_external_battery()
 
-    def sync_rtc_time(self):
-        """Configures the Raspberry Pi Pico's RTC with the current time obtained from the API."""
+    def sync_rtc_time(self, host='pool.ntp.org'):
+        """
+        Configures the Raspberry Pi Pico's RTC with the time from an NTP server.
+
+        One SNTP exchange compensated for network latency; the RTC is written
+        at the start of a second so it is not off by the discarded fraction.
+        For periodic syncs with drift compensation use ``SntpClock``.
+        """
 
         if not self.wifi_is_connected():
             return None
 
-        time_data = get_time_utc()  # Get the time from the API
-
-        if time_data:
-            year, month, day, hour, minute, second, day_of_week, day_of_year, week_number = time_data
+        from Models.Sntp import query as sntp_query, write_rtc
 
-            if self.DEBUG:
-                print(
-                    f"Time obtained from the API: {year}-{month}-{day} {hour}:{minute}:{second}")
+        result = sntp_query(host)
 
-            rtc = RTC()
+        if result:
+            unix_ms, ticks, rtt_ms = result
+            unix_ms += ticks_diff(ticks_ms(), ticks)
 
-            # Set the RTC (year, month, day, weekday, hour, minute, second, microseconds)
-            rtc.datetime((year, month, day, day_of_week, hour, minute, second, 0))
+            # Espera al siguiente segundo para escribirlo justo al empezar
+            sleep_ms(1000 - unix_ms % 1000)
+            write_rtc(unix_ms // 1000 + 1)
 
-            print(f"RTC configured to: {year}-{month}-{day} {hour}:{minute}:{second}")
+            log.log(_LOG_RTC_SET, unix_ms // 1000 + 1, rtt_ms)
 
             return True
         else:
-            print("Failed to sync RTC. No time data available.")
+            log.log(_LOG_RTC_FAILED)
             return False
 
     def get_rtc_utc_time(self):
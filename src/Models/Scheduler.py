@@ -0,0 +1,482 @@
+import io
+import select
+from time import ticks_ms, ticks_us, ticks_diff, ticks_add
+from micropython import const
+from Models.Trace import trace
+from Models.Log import log, DEBUG
+
+_MP_STREAM_POLL = const(3)
+_MP_STREAM_POLL_RD = const(1)
+
+# Tramo de la espera entre el disparo de una tarea y su ejecución.
+_SPAN_QUEUE = trace.name('queue')
+
+# Retraso a partir del cual se registra la ejecución de una tarea.
+_LATE_MS = const(100)
+
+
+class WakeFlag(io.IOBase):
+    """
+    Bandera que se puede activar desde una IRQ y esperar con ``select.poll``.
+
+    Es el mismo mecanismo que ``asyncio.ThreadSafeFlag``: el poll duerme hasta
+    el timeout o hasta que la bandera se activa, sin sondeos intermedios.
+    """
+
+    def __init__ (self):
+        self._flag = 0
+
+    def ioctl (self, req, flags):
+        if req == _MP_STREAM_POLL:
+            return self._flag * flags
+
+        return None
+
+    def set (self):
+        self._flag = 1
+
+    def clear (self):
+        self._flag = 0
+
+
+class Job:
+    """
+    Tarea del planificador.
+
+    Args:
+        callback: Función sin argumentos a ejecutar.
+        deadline (int): Instante en ticks_ms de la próxima ejecución.
+        period_ms (int): Periodo en ms o 0 para tareas de una sola vez.
+        name (str): Nombre para depuración y estadísticas.
+    """
+
+    # Subsistema dueño de la tarea (ver ``Supervisor.assign``).
+    subsystem = None
+
+    # Traza (ver ``Models.Trace``): flujo e instante del disparo y tramo de la tarea.
+    flow = 0
+    queued = 0
+    span = -1
+
+    # Mensaje del registro de sus retrasos (ver ``Models.Log``), se declara con el primero.
+    late_event = -1
+
+    def __init__ (self, callback, deadline, period_ms=0, name=None):
+        self.callback = callback
+        self.deadline = deadline
+        self.period_ms = period_ms
+        self.name = name
+        self.seq = 0
+        self.triggered = False
+        self.cancelled = False
+        self.runs = 0
+
+
+class Scheduler:
+    """
+    Planificador por plazos sobre un min-heap ordenado con ``ticks_diff``.
+
+    El bucle duerme exactamente hasta el siguiente vencimiento o hasta que una
+    IRQ lo despierta con ``trigger``/``wake``, en lugar de despertar cada pocos
+    milisegundos a comprobar si hay algo pendiente.
+
+    Con ``on_error`` una excepción en una tarea no sale del bucle: se pasa a
+    ``on_error(job, error)`` y el resto de tareas sigue a su hora.
+
+    Con ``gate`` cada tarea pasa antes por ``gate(job)``: si devuelve False
+    no se ejecuta (la función se encarga de reprogramarla si hace falta).
+
+    Con ``after`` se llama a ``after(job)`` al volver de cada tarea, también
+    entre las que vencen en la misma vuelta (ver ``Supervisor.feed``).
+
+    Args:
+        debug (bool): Indica si se muestran los mensajes de debug.
+        on_error: Función ``on_error(job, error)`` o None para dejar salir las excepciones.
+        gate: Función ``gate(job)`` que puede aplazar tareas o None.
+        after: Función ``after(job)`` o None.
+    """
+
+    def __init__ (self, debug=False, on_error=None, gate=None, after=None):
+        self.DEBUG = debug
+        self.on_error = on_error
+        self.gate = gate
+        self.after = after
+        self._heap = []
+        self._seq = 0
+        self._triggered = []
+        self._watched = {}
+        self._flag = WakeFlag()
+        self._poller = select.poll()
+        self._poller.register(self._flag, select.POLLIN)
+
+        # Estadísticas para medir despertares y precisión de los plazos.
+        self.stats = {
+            "wakeups": 0,
+            "irq_wakeups": 0,
+            "io_wakeups": 0,
+            "runs": 0,
+            "late_ms_max": 0,
+            "late_ms_sum": 0,
+            "errors": 0,
+        }
+
+    def every (self, period_ms, callback, name=None, delay_ms=0) -> Job:
+        """
+        Programa una tarea periódica.
+
+        Args:
+            period_ms (int): Periodo entre ejecuciones.
+            callback: Función a ejecutar.
+            name (str): Nombre de la tarea.
+            delay_ms (int): Retraso de la primera ejecución. Por defecto inmediata.
+
+        Returns:
+            Job: La tarea creada.
+        """
+        job = Job(callback, ticks_add(ticks_ms(), delay_ms), period_ms, name)
+        self._push(job)
+
+        return job
+
+    def once (self, delay_ms, callback, name=None) -> Job:
+        """
+        Programa una tarea de una sola ejecución.
+
+        Args:
+            delay_ms (int): Retraso hasta la ejecución.
+            callback: Función a ejecutar.
+            name (str): Nombre de la tarea.
+
+        Returns:
+            Job: La tarea creada.
+        """
+        job = Job(callback, ticks_add(ticks_ms(), delay_ms), 0, name)
+        self._push(job)
+
+        return job
+
+    def on_demand (self, callback, name=None) -> Job:
+        """
+        Crea una tarea sin plazo que solo se ejecuta al dispararla con ``trigger``.
+
+        Args:
+            callback: Función a ejecutar.
+            name (str): Nombre de la tarea.
+
+        Returns:
+            Job: La tarea creada.
+        """
+        return Job(callback, ticks_ms(), 0, name)
+
+    def cancel (self, job) -> None:
+        """Cancela una tarea; se descarta cuando llega a la cima del heap."""
+        job.cancelled = True
+
+    def reschedule (self, job, delay_ms=0) -> None:
+        """
+        Mueve el siguiente vencimiento de una tarea (no usar desde IRQ).
+
+        Args:
+            job (Job): Tarea a mover.
+            delay_ms (int): Nuevo retraso desde ahora.
+        """
+        heap = self._heap
+
+        if job in heap:
+            i = heap.index(job)
+            last = heap.pop()
+
+            if i < len(heap):
+                heap[i] = last
+                self._sift_down(i)
+                self._sift_up(i)
+
+        job.cancelled = False
+        job.deadline = ticks_add(ticks_ms(), delay_ms)
+        self._push(job)
+
+    def trigger (self, job) -> None:
+        """
+        Pide ejecutar una tarea cuanto antes. Seguro desde una IRQ: no toca
+        el heap, solo marca la tarea y despierta el bucle.
+        """
+        if not job.triggered:
+            job.triggered = True
+            self._triggered.append(job)
+
+            # La tarea hereda el flujo de la IRQ que la dispara y se mide su espera
+            if trace.enabled:
+                job.flow = trace.flow
+                job.queued = ticks_us()
+
+        self._flag.set()
+
+    def watch (self, stream, callback, eventmask=select.POLLIN) -> None:
+        """
+        Despierta el bucle cuando ``stream`` (un socket, por ejemplo) tiene
+        datos y llama a ``callback`` sin argumentos. Volver a llamarlo con el
+        mismo stream cambia el callback o los eventos vigilados.
+
+        Args:
+            stream: Objeto compatible con ``select.poll``.
+            callback: Función a llamar cuando el stream está listo.
+            eventmask (int): Eventos a vigilar, por defecto solo lectura.
+        """
+        self._watched[id(stream)] = callback
+        self._poller.register(stream, eventmask)
+
+    def unwatch (self, stream) -> None:
+        """Deja de vigilar un stream registrado con ``watch``."""
+        self._watched.pop(id(stream), None)
+        self._poller.unregister(stream)
+
+    def wake (self) -> None:
+        """Despierta el bucle sin ejecutar nada (seguro desde una IRQ)."""
+        self._flag.set()
+
+    def next_delay_ms (self):
+        """Milisegundos hasta el siguiente vencimiento o None si no hay tareas."""
+        heap = self._heap
+
+        while heap and heap[0].cancelled:
+            self._pop()
+
+        if not heap:
+            return None
+
+        return max(0, ticks_diff(heap[0].deadline, ticks_ms()))
+
+    def due_in_ms (self, names):
+        """
+        Milisegundos hasta la siguiente tarea con alguno de los nombres dados.
+
+        Args:
+            names (tuple): Nombres de las tareas a tener en cuenta.
+
+        Returns:
+            int: 0 si alguna está disparada o vencida, None si no hay ninguna pendiente.
+        """
+        for job in self._triggered:
+            if job.name in names and not job.cancelled:
+                return 0
+
+        now = ticks_ms()
+        due = None
+
+        for job in self._heap:
+            if job.name in names and not job.cancelled:
+                delay = max(0, ticks_diff(job.deadline, now))
+
+                if due is None or delay < due:
+                    due = delay
+
+        return due
+
+    def run_pending (self) -> int:
+        """
+        Ejecuta las tareas disparadas desde IRQ y las que han vencido.
+
+        Returns:
+            int: Número de tareas ejecutadas.
+        """
+        count = 0
+
+        while self._triggered:
+            job = self._triggered.pop(0)
+            job.triggered = False
+
+            if not job.cancelled:
+                self._run(job, 0)
+                count += 1
+
+                if self.after is not None:
+                    self.after(job)
+
+        heap = self._heap
+
+        while heap:
+            job = heap[0]
+
+            if job.cancelled:
+                self._pop()
+                continue
+
+            late = ticks_diff(ticks_ms(), job.deadline)
+
+            if late < 0:
+                break
+
+            self._pop()
+
+            # Se reprograma antes de ejecutar para que un fallo no pierda la tarea.
+            if job.period_ms:
+                # Sin deriva: el siguiente plazo cuenta desde el anterior, salvo que vaya muy atrasado.
+                job.deadline = ticks_add(job.deadline, job.period_ms)
+
+                if ticks_diff(job.deadline, ticks_ms()) <= 0:
+                    job.deadline = ticks_add(ticks_ms(), job.period_ms)
+
+                self._push(job)
+
+            self._run(job, late)
+            count += 1
+
+            if self.after is not None:
+                self.after(job)
+
+        return count
+
+    def run_once (self, timeout_ms=None) -> None:
+        """
+        Una vuelta del bucle: ejecuta lo pendiente, duerme hasta el siguiente
+        plazo (o ``timeout_ms`` si es menor) y atiende los streams listos.
+
+        Args:
+            timeout_ms (int): Espera máxima o None para esperar al siguiente plazo.
+        """
+        self._flag.clear()
+        self.run_pending()
+
+        if self._triggered:
+            return
+
+        delay = self.next_delay_ms()
+
+        if delay is None:
+            delay = -1
+
+        if timeout_ms is not None and (delay < 0 or timeout_ms < delay):
+            delay = timeout_ms
+
+        if not delay and not self._watched:
+            return
+
+        events = self._poller.poll(delay)
+
+        if delay:
+            self.stats["wakeups"] += 1
+
+            if self._triggered:
+                self.stats["irq_wakeups"] += 1
+
+        for event in events:
+            callback = self._watched.get(id(event[0]))
+
+            if callback is not None:
+                self.stats["io_wakeups"] += 1
+                callback()
+
+    def run_forever (self) -> None:
+        """Bucle principal: ejecuta lo pendiente y duerme hasta lo siguiente."""
+        while True:
+            self.run_once()
+
+    def _run (self, job, late):
+        if self.gate is not None and not self.gate(job):
+            return
+
+        stats = self.stats
+        stats["runs"] += 1
+        stats["late_ms_sum"] += late
+
+        if late > stats["late_ms_max"]:
+            stats["late_ms_max"] = late
+
+        job.runs += 1
+
+        if late > _LATE_MS:
+            if job.late_event < 0:
+                job.late_event = log.event('sched', DEBUG, 'Tarea ' + (job.name or 'sin nombre') +
+                                           ' ejecutada con %d ms de retraso')
+
+            log.log(job.late_event, late)
+
+        if trace.enabled:
+            self._run_traced(job)
+            return
+
+        if self.on_error is None:
+            job.callback()
+            return
+
+        try:
+            job.callback()
+        except Exception as e:
+            stats["errors"] += 1
+            self.on_error(job, e)
+
+    def _run_traced (self, job):
+        if job.span < 0:
+            job.span = trace.name(job.name or 'job')
+
+        # Las disparadas desde una IRQ siguen su flujo; las de plazo empiezan sin ninguno
+        if job.flow:
+            trace.span(_SPAN_QUEUE, job.queued, job.flow)
+
+        trace.flow = job.flow
+        job.flow = 0
+        start = ticks_us()
+
+        try:
+            job.callback()
+        except Exception as e:
+            if self.on_error is None:
+                raise
+
+            self.stats["errors"] += 1
+            self.on_error(job, e)
+        finally:
+            trace.span(job.span, start)
+
+    def _before (self, a, b):
+        diff = ticks_diff(a.deadline, b.deadline)
+
+        return diff < 0 or (diff == 0 and a.seq < b.seq)
+
+    def _push (self, job):
+        self._seq += 1
+        job.seq = self._seq
+        self._heap.append(job)
+        self._sift_up(len(self._heap) - 1)
+
+    def _pop (self):
+        heap = self._heap
+        top = heap[0]
+        last = heap.pop()
+
+        if heap:
+            heap[0] = last
+            self._sift_down(0)
+
+        return top
+
+    def _sift_up (self, i):
+        heap = self._heap
+
+        while i > 0:
+            parent = (i - 1) >> 1
+
+            if not self._before(heap[i], heap[parent]):
+                break
+
+            heap[i], heap[parent] = heap[parent], heap[i]
+            i = parent
+
+    def _sift_down (self, i):
+        heap = self._heap
+        size = len(heap)
+
+        while True:
+            smallest = i
+            left = 2 * i + 1
+            right = left + 1
+
+            if left < size and self._before(heap[left], heap[smallest]):
+                smallest = left
+            if right < size and self._before(heap[right], heap[smallest]):
+                smallest = right
+            if smallest == i:
+                break
+
+            heap[i], heap[smallest] = heap[smallest], heap[i]
+            i = smallest
@@ -0,0 +1,259 @@
+import socket
+import struct
+from machine import RTC
+from time import ticks_ms, ticks_us, ticks_diff, gmtime
+from micropython import const
+
+# Segundos entre 1900 (época NTP) y 1970 (época unix).
+_NTP_DELTA = const(2208988800)
+_PACKET_SIZE = const(48)
+
+# Versión 4, modo cliente.
+_CLIENT = const(0x23)
+
+
+def _unix_us (data, offset) -> int:
+    """Marca de tiempo NTP (32.32 bits) a microsegundos unix."""
+    seconds, fraction = struct.unpack_from('>II', data, offset)
+
+    return (seconds - _NTP_DELTA) * 1000000 + ((fraction * 1000000) >> 32)
+
+
+def query (host='pool.ntp.org', port=123, timeout_ms=1000):
+    """
+    Hace un intercambio SNTP (un datagrama de 48 bytes en cada sentido).
+
+    La hora se corrige con la mitad del tiempo de red medido: ida y vuelta
+    con ``ticks_us`` menos lo que el servidor tardó en responder.
+
+    Args:
+        host (str): Servidor NTP.
+        port (int): Puerto UDP.
+        timeout_ms (int): Espera máxima de la respuesta.
+
+    Returns:
+        tuple: (milisegundos unix, ``ticks_ms`` del mismo instante, ida y vuelta en ms) o None.
+    """
+    packet = bytearray(_PACKET_SIZE)
+    packet[0] = _CLIENT
+
+    # Marca propia en el campo de envío: el servidor la devuelve como origen.
+    struct.pack_into('>II', packet, 40, ticks_us(), ticks_ms())
+
+    sock = None
+
+    try:
+        address = socket.getaddrinfo(host, port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(timeout_ms / 1000)
+
+        sent = ticks_us()
+        sock.sendto(packet, address)
+        data = sock.recv(_PACKET_SIZE)
+        received = ticks_us()
+        received_ms = ticks_ms()
+    except OSError:
+        return None
+    finally:
+        if sock is not None:
+            sock.close()
+
+    # Respuesta de servidor (modo 4), sincronizado (LI != 3, estrato 1-15) y a esta petición.
+    if len(data) < _PACKET_SIZE or data[0] & 0x07 != 4 or data[0] >> 6 == 3 \
+            or not 0 < data[1] < 16 or data[24:32] != packet[40:48]:
+        return None
+
+    server_rx = _unix_us(data, 32)
+    server_tx = _unix_us(data, 40)
+    rtt_us = ticks_diff(received, sent) - (server_tx - server_rx)
+
+    if rtt_us < 0:
+        return None
+
+    return (server_tx + rtt_us // 2 + 500) // 1000, received_ms, rtt_us // 1000
+
+
+def write_rtc (seconds) -> None:
+    """Ajusta el RTC a unos segundos unix (el RTC empieza el segundo al escribirlo)."""
+    t = gmtime(seconds)
+    RTC().datetime((t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0))
+
+
+class SntpClock:
+    """
+    Hora por SNTP con estimación de la deriva del cristal.
+
+    Cada sincronización ancla la hora unix a ``ticks_ms``. Entre dos
+    sincronizaciones se compara lo que avanzó el reloj local con lo que
+    avanzó la hora del servidor para estimar la deriva (ppm), que se
+    descuenta en ``now_ms``. Lo que todavía se desvía la hora corregida al
+    llegar la siguiente sincronización (el residuo) decide cuándo hace falta
+    otra: el intervalo es el que tarda ese residuo en llegar a
+    ``max_error_ms``, entre ``min_interval_s`` y ``max_interval_s``.
+
+    El RTC (de segundos, movido por el mismo cristal) se escribe justo al
+    empezar cada segundo y, entre sincronizaciones, se vuelve a ajustar desde
+    la hora corregida antes de que la deriva lo separe ``max_error_ms / 2``,
+    sin usar la red.
+
+    Args:
+        scheduler (Scheduler): Planificador donde se ejecutan las tareas.
+        host (str): Servidor NTP.
+        port (int): Puerto UDP.
+        timeout_ms (int): Espera máxima de cada respuesta.
+        max_error_ms (int): Error máximo admitido del reloj.
+        min_interval_s (int): Intervalo mínimo entre sincronizaciones.
+        max_interval_s (int): Intervalo máximo (``ticks_ms`` no admite más de unos días).
+        retry_s (int): Primer reintento tras un fallo; se dobla hasta ``min_interval_s``.
+        online: Función sin argumentos que indica si hay conexión o None.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, host='pool.ntp.org', port=123, timeout_ms=1000, max_error_ms=250,
+                  min_interval_s=900, max_interval_s=172800, retry_s=30, online=None, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self.timeout_ms = timeout_ms
+        self.max_error_ms = max_error_ms
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.retry_s = retry_s
+        self.online = online
+
+        # Deriva del cristal (positiva si adelanta) y error que queda tras corregirla.
+        self.drift_ppm = None
+        self.residual_ppm = None
+        self.offset_ms = None
+        self.rtt_ms = None
+        self.interval_s = min_interval_s
+
+        self._anchor_ms = None
+        self._anchor_ticks = None
+        self._retry = 0
+        self._sync_job = scheduler.on_demand(self.sync, name='ntp')
+        self._trim_job = scheduler.on_demand(self._trim, name='rtc-trim')
+
+        self.stats = {
+            "syncs": 0,
+            "failures": 0,
+            "rtc_writes": 0,
+        }
+
+    def start (self) -> None:
+        """Programa la primera sincronización."""
+        self.scheduler.reschedule(self._sync_job, 0)
+
+    def synced (self) -> bool:
+        return self._anchor_ms is not None
+
+    def now_ms (self):
+        """Hora unix en milisegundos corregida con la deriva o None si no hay sincronización."""
+        if self._anchor_ms is None:
+            return None
+
+        return self._at(ticks_ms())
+
+    def _at (self, ticks):
+        elapsed = ticks_diff(ticks, self._anchor_ticks)
+
+        if self.drift_ppm is None:
+            return self._anchor_ms + elapsed
+
+        return self._anchor_ms + elapsed - int(elapsed * self.drift_ppm / 1000000)
+
+    def sync (self) -> bool:
+        """
+        Consulta el servidor, actualiza la deriva y el RTC y programa la siguiente.
+
+        Returns:
+            bool: True si la consulta fue válida.
+        """
+        result = None
+
+        if self.online is None or self.online():
+            result = query(self.host, self.port, self.timeout_ms)
+
+        if result is None:
+            self.stats["failures"] += 1
+            self._retry = min(self.min_interval_s, self._retry * 2 if self._retry else self.retry_s)
+            self.scheduler.reschedule(self._sync_job, self._retry * 1000)
+
+            if self.DEBUG:
+                print('SNTP: sin respuesta, reintento en', self._retry, 's')
+
+            return False
+
+        unix_ms, ticks, self.rtt_ms = result
+        self._retry = 0
+        self.stats["syncs"] += 1
+
+        if self._anchor_ms is not None:
+            self._estimate(unix_ms, ticks)
+
+        self._anchor_ms = unix_ms
+        self._anchor_ticks = ticks
+        self._schedule_rtc()
+
+        self.interval_s = self._interval()
+        self.scheduler.reschedule(self._sync_job, self.interval_s * 1000)
+        self._schedule_trim()
+
+        if self.DEBUG:
+            print('SNTP: rtt', self.rtt_ms, 'ms, corrección', self.offset_ms, 'ms, deriva',
+                  self.drift_ppm, 'ppm, siguiente en', self.interval_s, 's')
+
+        return True
+
+    def _estimate (self, unix_ms, ticks):
+        local = ticks_diff(ticks, self._anchor_ticks)
+
+        # Con poco tiempo entre medidas el ruido de red domina a la deriva.
+        if local < self.min_interval_s * 500:
+            return
+
+        self.offset_ms = self._at(ticks) - unix_ms
+        measured = (local - (unix_ms - self._anchor_ms)) * 1000000 / local
+
+        if self.drift_ppm is None:
+            self.drift_ppm = measured
+            self.residual_ppm = abs(measured)
+        else:
+            # Media móvil: la deriva cambia despacio con la temperatura.
+            self.drift_ppm += (measured - self.drift_ppm) / 2
+            self.residual_ppm = abs(self.offset_ms) * 1000000 / local
+
+    def _interval (self):
+        if self.residual_ppm is None:
+            return self.min_interval_s
+
+        # Suelo de 0,1 ppm: nunca se confía del todo en la estimación.
+        interval = int(self.max_error_ms * 1000 / max(self.residual_ppm, 0.1))
+
+        return max(self.min_interval_s, min(self.max_interval_s, interval))
+
+    def _schedule_rtc (self):
+        # El RTC solo guarda segundos: se escribe al empezar el siguiente.
+        self.scheduler.once(1000 - self.now_ms() % 1000, self._write_rtc, name='rtc-write')
+
+    def _write_rtc (self):
+        write_rtc((self.now_ms() + 500) // 1000)
+        self.stats["rtc_writes"] += 1
+
+    def _schedule_trim (self):
+        if not self.drift_ppm:
+            self.scheduler.cancel(self._trim_job)
+            return
+
+        trim_ms = int(self.max_error_ms * 500000 / abs(self.drift_ppm))
+
+        if trim_ms < self.interval_s * 1000:
+            self.scheduler.reschedule(self._trim_job, trim_ms)
+        else:
+            self.scheduler.cancel(self._trim_job)
+
+    def _trim (self):
+        """Reajusta el RTC desde la hora corregida, sin red."""
+        self._schedule_rtc()
+        self._schedule_trim()
@@ -0,0 +1,167 @@
+import framebuf
+from time import ticks_us
+from micropython import const
+from Models.Trace import trace
+
+# Primer byte de cada escritura I2C: lo que sigue son comandos o datos de la GDDRAM
+_CONTROL_COMMANDS = const(0x00)
+_CONTROL_DATA = const(0x40)
+
+_SET_CONTRAST = const(0x81)
+_SET_DISPLAY = const(0xae)
+_SET_COLUMN_ADDRESS = const(0x21)
+_SET_PAGE_ADDRESS = const(0x22)
+
+# Tramo de cada envío de regiones a la pantalla en la traza (ver Models.Trace)
+_SPAN_I2C = trace.name('i2c')
+
+
+class Ssd1306:
+    """
+    Pantalla OLED monocroma SSD1306 (o compatible) por I2C.
+
+    Se dibuja en un ``framebuf`` en RAM con el mismo formato que la GDDRAM
+    del controlador: ``height / 8`` páginas de ``width`` bytes, cada byte una
+    columna de 8 píxeles. Cada dibujo marca las columnas que toca de cada
+    página y ``show`` solo envía esas, con una ventana de direcciones por
+    página: cambiar un dígito no reenvía la pantalla entera.
+
+    Args:
+        i2c (I2C): Bus donde está la pantalla.
+        address (int): Dirección I2C (0x3c o 0x3d).
+        width (int): Ancho en píxeles.
+        height (int): Alto en píxeles (32 o 64).
+        contrast (int): Contraste inicial (0-255).
+    """
+
+    def __init__ (self, i2c, address=0x3c, width=128, height=32, contrast=127):
+        self.i2c = i2c
+        self.address = address
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.contrast = contrast
+
+        self.buffer = bytearray(self.pages * width)
+        self.framebuf = framebuf.FrameBuffer(self.buffer, width, height, framebuf.MONO_VLSB)
+
+        # Columnas por enviar de cada página: de ``_low`` a ``_high``, vacía si ``_low > _high``
+        self._low = bytearray(self.pages)
+        self._high = bytearray(self.pages)
+
+        self._window = bytearray(7)
+        self._window[0] = _CONTROL_COMMANDS
+        self._window[1] = _SET_COLUMN_ADDRESS
+        self._window[4] = _SET_PAGE_ADDRESS
+        self._command = bytearray(2)
+        self._data = [bytes([_CONTROL_DATA]), None]
+        self._view = memoryview(self.buffer)
+
+        self.reset()
+
+    def reset (self) -> None:
+        """Configura el controlador y marca toda la pantalla para enviarla en el siguiente ``show``."""
+        for command in (
+            _SET_DISPLAY,                        # Apagada mientras se configura
+            0x20, 0x00,                          # Direccionamiento horizontal
+            0x40,                                # Primera línea 0
+            0xa1,                                # Columna 127 en SEG0
+            0xa8, self.height - 1,               # Multiplexado
+            0xc8,                                # Barrido de COM invertido
+            0xd3, 0x00,                          # Sin desplazamiento vertical
+            0xda, 0x02 if self.height == 32 else 0x12,
+            0xd5, 0x80,                          # Reloj
+            0xd9, 0xf1,                          # Precarga
+            0xdb, 0x30,                          # VCOMH
+            _SET_CONTRAST, self.contrast,
+            0xa4,                                # Muestra la GDDRAM
+            0xa6,                                # Sin invertir
+            0x8d, 0x14,                          # Bomba de carga
+            _SET_DISPLAY | 1,
+        ):
+            self.write_command(command)
+
+        self.invalidate()
+
+    def write_command (self, command) -> None:
+        self._command[0] = 0x80
+        self._command[1] = command
+        self.i2c.writeto(self.address, self._command)
+
+    def invalidate (self) -> None:
+        """Marca toda la pantalla: el siguiente ``show`` la envía entera."""
+        for page in range(self.pages):
+            self._low[page] = 0
+            self._high[page] = self.width - 1
+
+    def mark (self, x, y, w, h) -> None:
+        """Marca un rectángulo para enviarlo en el siguiente ``show``."""
+        x0 = max(0, x)
+        x1 = min(self.width, x + w) - 1
+
+        if x1 < x0 or h <= 0:
+            return
+
+        for page in range(max(0, y) // 8, min(self.pages - 1, (y + h - 1) // 8) + 1):
+            if self._low[page] > self._high[page]:
+                self._low[page] = x0
+                self._high[page] = x1
+            else:
+                self._low[page] = min(self._low[page], x0)
+                self._high[page] = max(self._high[page], x1)
+
+    def fill_rect (self, x, y, w, h, color) -> None:
+        self.framebuf.fill_rect(x, y, w, h, color)
+        self.mark(x, y, w, h)
+
+    def text (self, s, x, y, color=1) -> None:
+        """Texto con la fuente de 8x8 de ``framebuf``."""
+        self.framebuf.text(s, x, y, color)
+        self.mark(x, y, 8 * len(s), 8)
+
+    def show (self) -> int:
+        """
+        Envía las columnas marcadas de cada página.
+
+        Returns:
+            int: Bytes de la GDDRAM enviados.
+        """
+        start = ticks_us() if trace.enabled else 0
+        sent = 0
+        window = self._window
+
+        for page in range(self.pages):
+            low = self._low[page]
+            high = self._high[page]
+
+            if low > high:
+                continue
+
+            window[2] = low
+            window[3] = high
+            window[5] = page
+            window[6] = page
+            self.i2c.writeto(self.address, window)
+
+            offset = page * self.width
+            self._data[1] = self._view[offset + low:offset + high + 1]
+            self.i2c.writevto(self.address, self._data)
+
+            # Enviada: queda limpia
+            self._low[page] = 1
+            self._high[page] = 0
+            sent += high - low + 1
+
+        self._data[1] = None
+        trace.span(_SPAN_I2C, start)
+
+        return sent
+
+    def set_power (self, on) -> None:
+        # Apagada conserva la GDDRAM, como el MAX7219
+        self.write_command(_SET_DISPLAY | (1 if on else 0))
+
+    def set_contrast (self, contrast) -> None:
+        self.contrast = contrast
+        self.write_command(_SET_CONTRAST)
+        self.write_command(contrast)
@@ -0,0 +1,228 @@
+from machine import WDT, reset
+from time import ticks_ms, ticks_diff
+from micropython import const
+from Models.Log import log, code, WARNING, ERROR
+
+# Espera máxima entre reinicios por latido de un subsistema que no se recupera.
+_MAX_BACKOFF_MS = const(60000)
+
+# Mensajes del registro (ver ``Models.Log``); los de cada subsistema y tarea llevan su nombre
+_LOG_ESCALATE = log.event('supervisor', ERROR, 'Demasiados fallos (%d en la ventana): reinicio completo')
+
+
+class Subsystem:
+    """
+    Parte del firmware que se puede reiniciar por separado.
+
+    Args:
+        name (str): Nombre del subsistema.
+        restart: Función sin argumentos que lo reinicia.
+        heartbeat_ms (int): Tiempo máximo sin latido o None si no late.
+        probe: Función sin argumentos que cuenta como latido si devuelve True.
+    """
+
+    def __init__ (self, name, restart, heartbeat_ms=None, probe=None):
+        self.name = name
+        self.restart = restart
+        self.heartbeat_ms = heartbeat_ms
+        self.probe = probe
+        self.last_beat = ticks_ms()
+        self.backoff_ms = heartbeat_ms
+        self.failures = 0
+        self.restarts = 0
+
+        # Mensajes del registro del subsistema (ver ``Models.Log``)
+        self.log_restart = log.event('supervisor', WARNING, 'Reiniciando ' + name + ' (%d reinicios)')
+        self.log_restart_error = log.event('supervisor', ERROR, 'Fallo al reiniciar ' + name + ': %d')
+
+
+class Supervisor:
+    """
+    Vigila los subsistemas y el watchdog hardware del RP2040.
+
+    Un fallo se repara donde ocurre: una excepción en una tarea del
+    planificador (ver ``Scheduler(on_error=...)``) reinicia al momento solo el
+    subsistema dueño de la tarea, y un subsistema que deja de latir (o cuya
+    sonda falla) se reinicia en la siguiente comprobación, con esperas que se
+    duplican mientras no se recupere.
+
+    El watchdog (``machine.WDT``) se alimenta desde la comprobación periódica,
+    que corre en el bucle del planificador, y con ``feed`` al volver de cada
+    tarea (``Scheduler.after``): varias tareas de red que vencen juntas no
+    suman sus esperas, pero si el bucle se cuelga en una (un socket o un bus
+    que no vuelven) la placa se reinicia sola. También se
+    deja de alimentar a propósito cuando las excepciones se repiten más de
+    ``max_restarts`` veces en ``window_ms``: reiniciar subsistemas no está
+    sirviendo y el reinicio completo es el último recurso.
+
+    Args:
+        scheduler (Scheduler): Planificador donde corre la comprobación.
+        timeout_ms (int): Timeout del watchdog (como mucho 8388 en el RP2040).
+        check_ms (int): Tiempo entre comprobaciones y alimentaciones. Con ``feed`` tras
+            cada tarea, una sola tarea no puede bloquear más de ``timeout_ms`` (ver ``HTTP_TIMEOUT``).
+        max_restarts (int): Reinicios por excepción admitidos en la ventana.
+        window_ms (int): Ventana en la que se cuentan los reinicios.
+        watchdog (bool): Si False no se arranca el watchdog (al depurar por REPL).
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, timeout_ms=8000, check_ms=4000, max_restarts=5, window_ms=600000,
+                  watchdog=True, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.timeout_ms = timeout_ms
+        self.check_ms = check_ms
+        self.max_restarts = max_restarts
+        self.window_ms = window_ms
+        self.watchdog = watchdog
+        self.subsystems = {}
+        self.escalated = False
+
+        self._wdt = None
+        self._job = None
+        self._window_start = ticks_ms()
+        self._window_restarts = 0
+
+        # Nombre de tarea -> mensaje del registro de sus fallos, se declara con el primero
+        self._failure_events = {}
+
+        self.stats = {
+            "failures": 0,
+            "restarts": 0,
+            "heartbeat_restarts": 0,
+            "escalations": 0,
+        }
+
+    def add (self, name, restart, heartbeat_ms=None, probe=None) -> Subsystem:
+        """
+        Registra un subsistema.
+
+        Args:
+            name (str): Nombre del subsistema.
+            restart: Función sin argumentos que lo reinicia.
+            heartbeat_ms (int): Tiempo máximo sin latido (``beat``) o None.
+            probe: Función que se llama en cada comprobación; True cuenta como latido.
+
+        Returns:
+            Subsystem: El subsistema registrado.
+        """
+        subsystem = Subsystem(name, restart, heartbeat_ms, probe)
+        self.subsystems[name] = subsystem
+
+        return subsystem
+
+    def assign (self, name, *jobs) -> None:
+        """Marca las tareas de un subsistema: sus excepciones lo reinician."""
+        for job in jobs:
+            job.subsystem = name
+
+    def beat (self, name) -> None:
+        """Latido de un subsistema: sigue funcionando."""
+        subsystem = self.subsystems[name]
+        subsystem.last_beat = ticks_ms()
+        subsystem.backoff_ms = subsystem.heartbeat_ms
+        subsystem.failures = 0
+
+    def start (self) -> None:
+        """Arranca el watchdog y la comprobación periódica (tras el arranque, que puede tardar)."""
+        if self.watchdog and self._wdt is None:
+            self._wdt = WDT(timeout=self.timeout_ms)
+
+        if self._job is None:
+            self._job = self.scheduler.every(self.check_ms, self._check, name='supervisor')
+
+    def failed (self, job, error) -> None:
+        """
+        Excepción en una tarea (o en el bucle principal con ``job`` None).
+
+        Reinicia el subsistema de la tarea al momento y, si los reinicios se
+        repiten demasiado, escala a un reinicio completo.
+        """
+        self.stats["failures"] += 1
+        name = getattr(job, 'subsystem', None)
+
+        log.log(self._failure_event(job), code(error))
+
+        if not self._count_restart():
+            return
+
+        if name is not None:
+            self._restart(self.subsystems[name])
+
+    def _failure_event (self, job):
+        name = 'bucle principal' if job is None else job.name or 'tarea sin nombre'
+        event = self._failure_events.get(name)
+
+        if event is None:
+            event = self._failure_events[name] = log.event('supervisor', ERROR, 'Fallo en ' + name + ': %d')
+
+        return event
+
+    def _count_restart (self):
+        now = ticks_ms()
+
+        if ticks_diff(now, self._window_start) > self.window_ms:
+            self._window_start = now
+            self._window_restarts = 0
+
+        self._window_restarts += 1
+
+        if self._window_restarts > self.max_restarts:
+            self._escalate()
+            return False
+
+        return True
+
+    def _restart (self, subsystem):
+        subsystem.restarts += 1
+        subsystem.failures += 1
+        subsystem.last_beat = ticks_ms()
+        self.stats["restarts"] += 1
+
+        log.log(subsystem.log_restart, subsystem.restarts)
+
+        try:
+            subsystem.restart()
+        except Exception as e:
+            # Un reinicio que falla cuenta como otro fallo del subsistema.
+            self.stats["failures"] += 1
+
+            log.log(subsystem.log_restart_error, code(e))
+
+            self._count_restart()
+
+    def _escalate (self):
+        if self.escalated:
+            return
+
+        self.escalated = True
+        self.stats["escalations"] += 1
+
+        log.log(_LOG_ESCALATE, self._window_restarts)
+
+        # Con watchdog basta con dejar de alimentarlo; sin él se reinicia directamente.
+        if self._wdt is None:
+            reset()
+
+    def feed (self, job=None) -> None:
+        """Alimenta el watchdog si está en marcha y no se ha escalado a un reinicio completo."""
+        if self._wdt is not None and not self.escalated:
+            self._wdt.feed()
+
+    def _check (self):
+        now = ticks_ms()
+
+        for subsystem in self.subsystems.values():
+            if subsystem.probe is not None and subsystem.probe():
+                self.beat(subsystem.name)
+                continue
+
+            if subsystem.heartbeat_ms is None or ticks_diff(now, subsystem.last_beat) < subsystem.backoff_ms:
+                continue
+
+            # Sin latido: se reinicia y la siguiente espera se duplica mientras no vuelva.
+            self.stats["heartbeat_restarts"] += 1
+            self._restart(subsystem)
+            subsystem.backoff_ms = min(_MAX_BACKOFF_MS, subsystem.backoff_ms * 2)
+
+        self.feed()
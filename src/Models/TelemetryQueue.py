@@ -0,0 +1,392 @@
+import struct
+import ujson
+from time import time
+from micropython import const
+
+# Cabecera del fichero: magia, versión, head, tail, tramas, registros y arranques.
+_HEADER = '>2sBxIIHHH'
+_HEADER_SIZE = const(18)
+_MAGIC = b'TQ'
+_VERSION = const(1)
+
+# Cada trama: longitud del cuerpo y registros que contiene. Longitud 0 = vuelta al inicio.
+_FRAME = '>HH'
+_FRAME_SIZE = const(4)
+
+
+def encode_batch (device_id, boot, seq, records) -> bytes:
+    """
+    Cuerpo JSON de un lote con los campos repetidos comprimidos.
+
+    Los nombres de campo van una sola vez en ``fields`` y cada fila es
+    ``[dt, mask, valores...]``: segundos desde ``t0``, máscara de bits de los
+    campos que cambian respecto a la fila anterior y solo esos valores, en el
+    orden de ``fields``. La primera fila lleva todos los campos presentes.
+
+    Args:
+        device_id: Identificador del dispositivo.
+        boot (int): Número de arranque del dispositivo.
+        seq (int): Número de lote dentro del arranque; con ``boot`` identifica el
+            lote para descartar duplicados al reenviar.
+        records (list): Tuplas ``(timestamp, dict)``.
+
+    Returns:
+        bytes: Cuerpo listo para el POST.
+    """
+    fields = []
+
+    for _, data in records:
+        for key in data:
+            if key not in fields:
+                fields.append(key)
+
+    t0 = records[0][0]
+    rows = []
+    previous = {}
+
+    for stamp, data in records:
+        row = [stamp - t0, 0]
+        mask = 0
+
+        for bit, key in enumerate(fields):
+            value = data.get(key)
+
+            if not rows or value != previous.get(key):
+                if value is not None or key in previous:
+                    mask |= 1 << bit
+                    row.append(value)
+
+        row[1] = mask
+        rows.append(row)
+        previous = data
+
+    return ujson.dumps({
+        "hardware_device_id": device_id,
+        "boot": boot,
+        "seq": seq,
+        "t0": t0,
+        "fields": fields,
+        "rows": rows,
+    }).encode()
+
+
+class TelemetryQueue:
+    """
+    Cola de telemetría que agrupa registros en lotes y sobrevive a cortes de red.
+
+    Los registros se acumulan en RAM y salen en un único POST cuando hay
+    ``batch_size`` o cuando el más antiguo lleva ``batch_ms`` esperando. Si el
+    envío falla (o no hay Wi-Fi) el lote ya codificado se añade a un fichero
+    circular en la flash y se reenvía, del más antiguo al más nuevo, en cuanto
+    la conexión vuelve. Con conexión la flash no se toca; sin ella se escriben
+    la trama y la cabecera una vez por lote, no por registro.
+
+    El fichero nunca pasa de ``max_bytes``: si no cabe un lote nuevo se
+    descartan los más antiguos y se cuentan en ``stats["dropped"]``. La entrega
+    es al menos una vez: cada lote lleva el número de arranque (guardado en la
+    cabecera) y su número de secuencia para que el receptor descarte
+    repeticiones tras un corte de corriente.
+
+    Cada ejecución de la tarea hace como mucho un POST (con un servidor lento
+    cada uno puede tardar un timeout entero): el resto del atraso sigue tras
+    ``catchup_ms``, del más antiguo al más nuevo.
+
+    Args:
+        scheduler (Scheduler): Planificador donde se ejecutan los envíos.
+        send: Función ``send(body) -> bool`` que hace el POST.
+        device_id: Identificador del dispositivo que se incluye en cada lote.
+        online: Función sin argumentos que indica si hay conexión o None.
+        path (str): Fichero de la cola en la flash.
+        max_bytes (int): Tamaño máximo del fichero.
+        batch_size (int): Registros por lote.
+        batch_ms (int): Espera máxima del primer registro antes de enviar.
+        retry_ms (int): Primer reintento tras un fallo; se dobla hasta ``max_retry_ms``.
+        max_retry_ms (int): Espera máxima entre reintentos.
+        catchup_ms (int): Espera antes del siguiente POST cuando queda atraso.
+        debug (bool): Indica si se muestran los mensajes de debug.
+    """
+
+    def __init__ (self, scheduler, send, device_id, online=None, path='telemetry.bin',
+                  max_bytes=16384, batch_size=20, batch_ms=900000, retry_ms=15000,
+                  max_retry_ms=300000, catchup_ms=5000, debug=False):
+        self.DEBUG = debug
+        self.scheduler = scheduler
+        self.send = send
+        self.device_id = device_id
+        self.online = online
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.retry_ms = retry_ms
+        self.max_retry_ms = max_retry_ms
+        self.catchup_ms = catchup_ms
+
+        self._pending = []
+        self._file = None
+        self._head = _HEADER_SIZE
+        self._tail = _HEADER_SIZE
+        self._frames = 0
+        self._backlog = 0
+        self._boot = 0
+        self._seq = 0
+        self._armed = False
+        self._backoff = 0
+        self._job = scheduler.on_demand(self._run, name='telemetry')
+
+        self.stats = {
+            "records": 0,
+            "batches": 0,
+            "uploaded": 0,
+            "replayed": 0,
+            "failures": 0,
+            "dropped": 0,
+            "flash_writes": 0,
+            "flash_bytes": 0,
+            "bytes_sent": 0,
+        }
+
+        self._open()
+
+    @property
+    def backlog (self) -> int:
+        """Registros guardados en la flash pendientes de reenviar."""
+        return self._backlog
+
+    def add (self, data, timestamp=None) -> None:
+        """
+        Encola un registro (no usar desde IRQ).
+
+        Args:
+            data (dict): Campos del registro; los que se repiten entre registros se comprimen.
+            timestamp (int): Instante en segundos o None para la hora actual del RTC.
+        """
+        self._pending.append((int(time()) if timestamp is None else timestamp, data))
+        self.stats["records"] += 1
+
+        if len(self._pending) >= self.batch_size:
+            self._arm(0)
+        elif len(self._pending) == 1 and not self._armed:
+            self._arm(self.batch_ms)
+
+    def flush (self) -> None:
+        """Envía ya lo pendiente (por ejemplo, al recuperar la conexión)."""
+        self._backoff = 0
+        self._arm(0)
+
+    def close (self) -> None:
+        """Guarda en la flash los registros pendientes y cierra el fichero."""
+        if self._pending:
+            self._store(self._cut())
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _arm (self, delay_ms):
+        self._armed = True
+        self.scheduler.reschedule(self._job, delay_ms)
+
+    def _run (self):
+        self._armed = False
+        online = self.online is None or self.online()
+
+        replayed = False
+
+        # Primero lo atrasado, para que el receptor reciba los lotes en orden.
+        if online and self._frames:
+            replayed = self._replay()
+            online = replayed
+
+        if not online or replayed:
+            # Los lotes completos pasan a la flash detrás del atraso; los parciales esperan en RAM.
+            if len(self._pending) >= self.batch_size:
+                self._store(self._cut())
+
+            if online:
+                # Un POST por turno: lo que queda sigue tras ``catchup_ms`` sin bloquear el bucle.
+                self._backoff = 0
+
+                if self._pending or self._frames:
+                    self._arm(self.catchup_ms)
+            elif self._pending or self._frames:
+                self._failed()
+
+            return
+
+        self._backoff = 0
+
+        if not self._pending:
+            return
+
+        batch = self._cut()
+
+        if self._post(batch[0]):
+            self.stats["uploaded"] += 1
+        else:
+            self._store(batch)
+            self._failed()
+
+    def _failed (self):
+        self.stats["failures"] += 1
+        self._backoff = min(self.max_retry_ms, self._backoff * 2 if self._backoff else self.retry_ms)
+
+        if self.DEBUG:
+            print('Telemetría: sin envío, reintento en', self._backoff, 'ms; atrasados:', self._backlog)
+
+        self._arm(self._backoff)
+
+    def _cut (self):
+        """Codifica los registros pendientes como un lote y vacía la cola en RAM."""
+        records = self._pending
+        self._pending = []
+        self._seq += 1
+        self.stats["batches"] += 1
+
+        return encode_batch(self.device_id, self._boot, self._seq, records), len(records)
+
+    def _post (self, body):
+        try:
+            ok = self.send(body)
+        except Exception as e:
+            if self.DEBUG:
+                print('Telemetría: error al enviar el lote', e)
+
+            ok = False
+
+        if ok:
+            self.stats["bytes_sent"] += len(body)
+
+        return ok
+
+    # Fichero circular en la flash
+
+    def _open (self):
+        try:
+            f = open(self.path, 'r+b')
+            header = f.read(_HEADER_SIZE)
+        except OSError:
+            f = None
+            header = b''
+
+        if f is not None and len(header) == _HEADER_SIZE:
+            magic, version, head, tail, frames, backlog, boot = struct.unpack(_HEADER, header)
+
+            if magic == _MAGIC and version == _VERSION and \
+                    _HEADER_SIZE <= head <= self.max_bytes and _HEADER_SIZE <= tail <= self.max_bytes:
+                self._file = f
+                self._head, self._tail = head, tail
+                self._frames, self._backlog = frames, backlog
+                self._boot = (boot + 1) & 0xFFFF
+                self._write_header()
+
+                if frames:
+                    # Hay atraso de antes del reinicio: se intenta enviar ya.
+                    self._arm(0)
+
+                return
+
+        # Fichero ausente, corrupto o de otro tamaño: se empieza de cero.
+        if f is not None:
+            f.close()
+
+        try:
+            self._file = open(self.path, 'w+b')
+            self._boot = 1
+            self._write_header()
+        except OSError as e:
+            self._file = None
+
+            if self.DEBUG:
+                print('Telemetría: sin cola en la flash', e)
+
+    def _write (self, offset, data):
+        self._file.seek(offset)
+        self._file.write(data)
+        self.stats["flash_writes"] += 1
+        self.stats["flash_bytes"] += len(data)
+
+    def _write_header (self):
+        self._write(0, struct.pack(_HEADER, _MAGIC, _VERSION, self._head, self._tail,
+                                   self._frames, self._backlog, self._boot))
+        self._file.flush()
+
+    def _skip_wrap (self):
+        """Lleva tail al principio si apunta al final de los datos. Devuelve True si lo movió."""
+        if self._tail + _FRAME_SIZE <= self.max_bytes:
+            self._file.seek(self._tail)
+
+            if struct.unpack(_FRAME, self._file.read(_FRAME_SIZE))[0]:
+                return False
+
+        self._tail = _HEADER_SIZE
+
+        return True
+
+    def _read_frame (self):
+        """Lee la cabecera de la trama más antigua y deja el fichero al inicio de su cuerpo."""
+        self._skip_wrap()
+        self._file.seek(self._tail)
+
+        return struct.unpack(_FRAME, self._file.read(_FRAME_SIZE))
+
+    def _consume (self, length, count):
+        self._tail += _FRAME_SIZE + length
+        self._frames -= 1
+        self._backlog -= count
+
+        if not self._frames:
+            self._head = self._tail = _HEADER_SIZE
+
+    def _store (self, batch):
+        """Añade un lote a la cola de la flash, descartando los más antiguos si no cabe."""
+        body, count = batch
+        size = _FRAME_SIZE + len(body)
+
+        if self._file is None or size > self.max_bytes - _HEADER_SIZE:
+            self.stats["dropped"] += count
+            return
+
+        if not self._frames:
+            self._head = self._tail = _HEADER_SIZE
+
+        while True:
+            if self._frames and self._head <= self._tail:
+                # Entre head y tail (head == tail con tramas es lleno).
+                if self._head + size <= self._tail:
+                    break
+
+                if self._skip_wrap():
+                    continue
+
+                length, dropped = self._read_frame()
+                self._consume(length, dropped)
+                self.stats["dropped"] += dropped
+            elif self._head + size <= self.max_bytes:
+                break
+            else:
+                # No cabe hasta el final: marca de vuelta y se sigue desde el principio.
+                if self._head + _FRAME_SIZE <= self.max_bytes:
+                    self._write(self._head, struct.pack(_FRAME, 0, 0))
+
+                self._head = _HEADER_SIZE
+
+        self._write(self._head, struct.pack(_FRAME, len(body), count) + body)
+        self._head += size
+        self._frames += 1
+        self._backlog += count
+        self._write_header()
+
+    def _replay (self):
+        """Reenvía el lote más antiguo de la flash; lo libera solo si el POST va bien."""
+        length, count = self._read_frame()
+        body = self._file.read(length)
+
+        if not self._post(body):
+            return False
+
+        self._consume(length, count)
+        self._write_header()
+        self.stats["replayed"] += 1
+
+        return True
@@ -0,0 +1,197 @@
+import struct
+from time import ticks_ms, ticks_diff
+from micropython import const
+from Models.QuoteConverter import parse_scaled
+
+# Campos de cada moneda en su registro, todos escalados en la divisa base.
+LAST = const(0)
+OPEN = const(1)
+HIGH = const(2)
+LOW = const(3)
+
+# Registro: los cuatro campos y el instante (ticks_ms) en que se leyeron.
+_RECORD_SIZE = const(36)
+_STAMP = const(32)
+
+# Claves de /api/v3/ticker/24hr (type=MINI) que se guardan, en el orden del registro.
+_FIELDS = (b'lastPrice', b'openPrice', b'highPrice', b'lowPrice')
+
+# Bytes leídos de la respuesta en cada vuelta.
+_CHUNK = const(512)
+
+
+class TickerStats:
+    """
+    Estadísticas de 24 horas (último, apertura, máximo y mínimo) de varias
+    monedas con una sola petición a ``/api/v3/ticker/24hr``.
+
+    La respuesta no se carga entera: ``feed`` la lee del socket en trozos de
+    ``_CHUNK`` bytes y busca solo las claves de ``_FIELDS`` de los pares
+    seguidos, que guarda en un registro fijo de 36 bytes por moneda. La
+    memoria usada es la misma con 20 pares que con la lista completa de
+    Binance, y cambiar entre vistas (variación, máximo, mínimo) no hace
+    peticiones.
+
+    Args:
+        symbols (list): Monedas a seguir (como mucho ``capacity``).
+        base (str): Divisa base de los pares.
+        capacity (int): Monedas como máximo. Hasta 20 la petición pesa 2.
+    """
+
+    def __init__ (self, symbols=(), base='USDT', capacity=20):
+        self.base = base
+        self.capacity = capacity
+        self.symbols = []
+        self._slots = {}
+        self._data = bytearray(capacity * _RECORD_SIZE)
+        self._chunk = bytearray(_CHUNK)
+
+        self.track(symbols)
+
+    def track (self, symbols) -> None:
+        """
+        Cambia las monedas seguidas; las que siguen conservan sus datos y las
+        que no caben en ``capacity`` se descartan.
+        """
+        symbols = [s for i, s in enumerate(symbols) if s != self.base and s not in symbols[:i]][:self.capacity]
+
+        if symbols == self.symbols:
+            return
+
+        old = bytes(self._data)
+        slots = self._slots
+        self._data = bytearray(self.capacity * _RECORD_SIZE)
+        self._slots = {}
+
+        for i, symbol in enumerate(symbols):
+            pair = (symbol + self.base).encode()
+            j = slots.get(pair)
+
+            if j is not None:
+                self._data[i * _RECORD_SIZE:(i + 1) * _RECORD_SIZE] = old[j * _RECORD_SIZE:(j + 1) * _RECORD_SIZE]
+
+            self._slots[pair] = i
+
+        self.symbols = symbols
+
+    def pairs (self) -> list:
+        """Pares a pedir, por ejemplo ['BTCUSDT', 'ETHUSDT']."""
+        return [symbol + self.base for symbol in self.symbols]
+
+    def feed (self, stream) -> int:
+        """
+        Lee una respuesta de ``/api/v3/ticker/24hr`` y guarda los pares seguidos.
+
+        Los precios de Binance van entre comillas, así que un valor sin ellas
+        (horas, contadores) se salta sin leerlo. Un token cortado entre dos
+        trozos se arrastra al siguiente.
+
+        Args:
+            stream: Objeto con ``readinto`` (el socket de la respuesta).
+
+        Returns:
+            int: Pares actualizados.
+        """
+        chunk = self._chunk
+        data = self._data
+        carry = b''
+        slot = -1
+        updated = 0
+
+        while True:
+            n = stream.readinto(chunk)
+
+            if not n:
+                break
+
+            buf = carry + chunk[:n]
+            end = len(buf)
+            pos = 0
+
+            while True:
+                i = buf.find(b'"', pos)
+
+                if i < 0:
+                    pos = end
+                    break
+
+                j = buf.find(b'"', i + 1)
+                v = j + 2
+
+                if 0 <= v < end and buf[v] == 32:
+                    v += 1
+
+                if j < 0 or v >= end:
+                    pos = i
+                    break
+
+                # Valor que no es texto: se salta hasta la siguiente clave
+                if buf[v] != 34:
+                    pos = v
+                    continue
+
+                k = buf.find(b'"', v + 1)
+
+                if k < 0:
+                    pos = i
+                    break
+
+                key = buf[i + 1:j]
+
+                if key == b'symbol':
+                    slot = self._slots.get(buf[v + 1:k], -1)
+
+                    if slot >= 0:
+                        struct.pack_into('>I', data, slot * _RECORD_SIZE + _STAMP, ticks_ms())
+                        updated += 1
+                elif slot >= 0 and key in _FIELDS:
+                    struct.pack_into('>q', data, slot * _RECORD_SIZE + 8 * _FIELDS.index(key),
+                                     parse_scaled(buf[v + 1:k].decode()))
+
+                pos = k + 1
+
+            carry = buf[pos:]
+
+        return updated
+
+    def _slot (self, symbol, max_age_ms):
+        slot = self._slots.get((symbol + self.base).encode())
+
+        if slot is None:
+            return None
+
+        stamp = struct.unpack_from('>I', self._data, slot * _RECORD_SIZE + _STAMP)[0]
+
+        if not stamp or (max_age_ms is not None and ticks_diff(ticks_ms(), stamp) > max_age_ms):
+            return None
+
+        return slot
+
+    def get (self, symbol, field, max_age_ms=None):
+        """
+        Campo de una moneda.
+
+        Args:
+            symbol (str): Moneda.
+            field (int): ``LAST``, ``OPEN``, ``HIGH`` o ``LOW``.
+            max_age_ms (int): Antigüedad máxima o None para cualquiera.
+
+        Returns:
+            int: Precio escalado en la base o None si no hay o está caducado.
+        """
+        slot = self._slot(symbol, max_age_ms)
+
+        if slot is None:
+            return None
+
+        return struct.unpack_from('>q', self._data, slot * _RECORD_SIZE + 8 * field)[0]
+
+    def change_bp (self, symbol, max_age_ms=None):
+        """Variación en 24 h en puntos básicos o None."""
+        last = self.get(symbol, LAST, max_age_ms)
+        open_price = self.get(symbol, OPEN, max_age_ms)
+
+        if last is None or not open_price:
+            return None
+
+        return (last - open_price) * 10000 // open_price
@@ -0,0 +1,187 @@
+import struct
+from time import ticks_us, ticks_diff
+from micropython import const
+
+# Registro: inicio (ticks_us), duración en µs, tramo y flujo.
+_RECORD = '>IiHH'
+_RECORD_SIZE = const(12)
+
+# Pistas de la exportación: bucle principal e interrupciones.
+MAIN = const(0)
+IRQ = const(1)
+
+_TRACKS = ('main', 'irq')
+
+# Último número de flujo antes de volver a empezar (caben en 16 bits).
+_MAX_FLOW = const(65535)
+
+
+class Trace:
+    """
+    Trazas de latencia: tramos con inicio y duración en ``ticks_us``.
+
+    Cada tramo se declara una vez con ``name`` y cada aparición guarda un
+    registro de 12 bytes en un buffer circular que se reserva al activar la
+    traza con ``enable``: registrar no reserva memoria, así que también se
+    puede hacer desde una IRQ. Desactivada, ``span`` vuelve al momento.
+
+    Los tramos llevan el flujo en curso (``flow``), que agrupa todo lo que
+    provoca un mismo evento de entrada o una misma actualización de precio:
+    el giro del encoder abre un flujo con ``start_flow`` en su IRQ, el
+    planificador lo pasa a la tarea que dispara (con el tramo ``queue`` de
+    la espera) y el dibujado y la escritura SPI lo heredan.
+
+    ``chrome`` exporta el buffer en el formato de trazas de Chrome
+    (``chrome://tracing`` o Perfetto), pensado para el simulador del PC.
+    """
+
+    def __init__ (self):
+        self.enabled = False
+        self.capacity = 0
+        self.count = 0
+        self.dropped = 0
+        self.flow = 0
+
+        self._buffer = None
+        self._head = 0
+        self._flows = 0
+        self._names = []
+        self._tracks = []
+
+    def enable (self, capacity=256) -> None:
+        """Reserva el buffer de ``capacity`` tramos y empieza a registrar."""
+        if self._buffer is None or capacity != self.capacity:
+            self._buffer = bytearray(capacity * _RECORD_SIZE)
+            self.capacity = capacity
+            self.clear()
+
+        self.enabled = True
+
+    def disable (self) -> None:
+        """Deja de registrar; lo guardado se conserva hasta ``clear``."""
+        self.enabled = False
+
+    def clear (self) -> None:
+        self._head = 0
+        self.count = 0
+        self.dropped = 0
+
+    def name (self, name, track=MAIN) -> int:
+        """
+        Declara un tramo (o devuelve el número de uno ya declarado).
+
+        Args:
+            name (str): Nombre del tramo.
+            track (int): ``MAIN`` o ``IRQ``, la pista en la que se muestra.
+
+        Returns:
+            int: Número de tramo para ``span``.
+        """
+        if name in self._names:
+            return self._names.index(name)
+
+        self._names.append(name)
+        self._tracks.append(track)
+
+        return len(self._names) - 1
+
+    def start_flow (self) -> int:
+        """Abre un flujo nuevo para lo que venga a continuación (seguro desde IRQ)."""
+        self._flows = self._flows % _MAX_FLOW + 1
+        self.flow = self._flows
+
+        return self.flow
+
+    def span (self, name, start, flow=-1) -> None:
+        """
+        Guarda un tramo que empezó en ``start`` y termina ahora.
+
+        Args:
+            name (int): Número de tramo de ``name``.
+            start (int): Inicio en ``ticks_us``.
+            flow (int): Flujo del tramo o -1 para el flujo en curso.
+        """
+        if not self.enabled:
+            return
+
+        struct.pack_into(_RECORD, self._buffer, self._head * _RECORD_SIZE, start,
+                         ticks_diff(ticks_us(), start), name, self.flow if flow < 0 else flow)
+        self._head += 1
+
+        if self._head == self.capacity:
+            self._head = 0
+
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.dropped += 1
+
+    def spans (self) -> list:
+        """
+        Tramos guardados, del que terminó antes al último.
+
+        Returns:
+            list: Tuplas ``(inicio_us, duración_us, nombre, flujo)`` con los
+                inicios desenrollados: siguen creciendo aunque ``ticks_us`` dé la vuelta.
+        """
+        spans = []
+        start = self._head - self.count
+        last = None
+        end = 0
+
+        for i in range(self.count):
+            offset = ((start + i) % self.capacity) * _RECORD_SIZE
+            begin, duration, name, flow = struct.unpack_from(_RECORD, self._buffer, offset)
+            stop = begin + duration
+
+            # Se guardan al terminar: cada fin va después del anterior
+            end = stop if last is None else end + ticks_diff(stop & 0x3FFFFFFF, last)
+            last = stop & 0x3FFFFFFF
+            spans.append((end - duration, duration, self._names[name], flow))
+
+        return spans
+
+    def chrome (self, pid=1) -> dict:
+        """
+        Exporta los tramos en el formato de trazas de Chrome.
+
+        Cada tramo es un evento completo (``ph`` 'X') en la pista de su
+        tipo, con el flujo en ``args``; los tramos de un mismo flujo se unen
+        con flechas (eventos 's', 't' y 'f').
+
+        Returns:
+            dict: Objeto JSON con ``traceEvents``.
+        """
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": track}}
+                  for tid, track in enumerate(_TRACKS)]
+        flows = {}
+
+        for start, duration, name, flow in self.spans():
+            tid = self._tracks[self._names.index(name)]
+            events.append({"name": name, "cat": "span", "ph": "X", "ts": start, "dur": duration,
+                           "pid": pid, "tid": tid, "args": {"flow": flow}})
+
+            if flow:
+                flows.setdefault(flow, []).append((start, tid))
+
+        for flow, steps in flows.items():
+            steps.sort()
+
+            if len(steps) < 2:
+                continue
+
+            for i, (start, tid) in enumerate(steps):
+                phase = 's' if i == 0 else 'f' if i == len(steps) - 1 else 't'
+                event = {"name": "flow", "cat": "flow", "ph": phase, "id": flow, "ts": start,
+                         "pid": pid, "tid": tid}
+
+                if phase == 'f':
+                    event["bp"] = "e"
+
+                events.append(event)
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# Traza compartida por todo el firmware; desactivada salvo con TRACE = True en env.py.
+trace = Trace()
@@ -1,29 +1,257 @@
 import gc
-from time import sleep_ms, time
-#from Models.Api import Api
-from Models.Api import get_binance_price
+import sys
+from time import sleep_ms, time, ticks_ms, ticks_us, ticks_diff
+
+# Coste de importar los modelos al arrancar (ver /stats): compilados desde el fuente en el
+# dispositivo o precompilados a .mpy (python -m sim.build). Los que usan la red o un
+# periférico opcional se importan más abajo, solo si están activados
+gc.collect()
+boot_import_start = ticks_us()
+boot_import_heap = gc.mem_alloc()
+
+import ujson
 from Models.RpiPico import RpiPico
 from Models.Max7219 import Max7219
+from Models.Render import Renderer, Frame, SegmentOutput, OledOutput, TEXT, MENU, PRICE, CHANGE, LEVEL, VIEW, \
+    STALE, ALERT, FAVOURITE, BATTERY
 from Models.Rotary_irq_rp2 import RotaryIRQ
+from Models.Scheduler import Scheduler
+from Models.Supervisor import Supervisor
+from Models.PriceCache import PriceCache
+from Models.KeyValueStore import KeyValueStore, KEY_SIZE
+from Models.PriceHistory import PriceHistory
+from Models.TickerStats import TickerStats, LAST, HIGH, LOW
+from Models.AlertEngine import AlertEngine, Blinker, UP
+from Models.CoinCatalog import CoinCatalog, CoinMenu, build_catalog
+from Models.Prefetcher import Prefetcher
+from Models.QuoteConverter import QuoteConverter, format_scaled
+from Models.Sntp import SntpClock
+from Models.RateGovernor import governor, USER, BACKGROUND, WEIGHT_PRICE
+from Models.Resolver import resolver
+from Models.CircuitBreaker import breaker
+from Models.Log import log, code, DEBUG as LOG_DEBUG, INFO, ERROR
+from Models.Trace import trace, IRQ
+from Models.Recorder import recorder
 
 # Importo variables de entorno
 import env
 
+boot_import_us = ticks_diff(ticks_us(), boot_import_start)
+boot_import_bytes = gc.mem_alloc() - boot_import_heap
+gc.collect()
+boot_import_kept = gc.mem_alloc() - boot_import_heap
+
 # Habilito recolector de basura
 gc.enable()
 
 DEBUG = env.DEBUG
 
+# Registro de eventos: en debug se guardan todos los niveles y se vuelcan por el puerto serie
+# cada ``time_to_drain_log`` segundos; siempre se puede leer por HTTP en /log
+log.set_level(None, LOG_DEBUG if DEBUG else INFO)
+time_to_drain_log = 2
+
+_LOG_BRIGHTNESS = log.event('main', LOG_DEBUG, 'Brillo %d')
+_LOG_PRESS = log.event('main', LOG_DEBUG, 'Pulsación del encoder (%d ms)')
+_LOG_MENU_IN = log.event('main', LOG_DEBUG, 'Entrando al menú de selección de moneda')
+_LOG_MENU_OUT = log.event('main', LOG_DEBUG, 'Saliendo del menú')
+_LOG_HIGHLIGHT = log.event('main', LOG_DEBUG, 'Posición resaltada %d')
+_LOG_START = log.event('main', INFO, 'Inicia el bucle principal')
+_LOG_ERROR = log.event('main', ERROR, 'Error en el bucle principal: %d')
+_LOG_MEMORY = log.event('main', LOG_DEBUG, 'Memoria libre %d antes de liberar, %d después')
+_LOG_OLED_ERROR = log.event('main', ERROR, 'Sin pantalla OLED: %d')
+_LOG_BOOT = log.event('main', INFO, 'Modelos importados en %d us con %d bytes de heap (%d tras liberar)')
+
+# Traza de latencia (TRACE = True en env.py): cada giro o pulsación del encoder y cada
+# actualización de precio se sigue hasta la escritura SPI (ver Models.Trace)
+if getattr(env, 'TRACE', False):
+    trace.enable(capacity=256)
+
+
+# Los modelos de ``src/Models`` se cargan como fuente (.py), precompilados (.mpy) o
+# congelados en el firmware; se mira en uno de ellos
+def models_format ():
+    path = getattr(sys.modules.get('Models.Scheduler'), '__file__', '')
+
+    if path.endswith('.mpy'):
+        return 'mpy'
+
+    if not path or path.startswith('.frozen'):
+        return 'frozen'
+
+    return 'py'
+
+
+boot_format = models_format()
+log.log(_LOG_BOOT, boot_import_us, boot_import_bytes, boot_import_kept)
+
+_SPAN_PRESS = trace.name('press-isr', IRQ)
+
+# Grabación (RECORD = True en env.py) de las respuestas HTTP, los flancos de los pines y las
+# lecturas del ADC en la flash, para reproducirlas en el PC (ver Models.Recorder)
+record_path = 'record.bin'
+record_max_bytes = 262144
+time_to_flush_record = 5
+
+if getattr(env, 'RECORD', False):
+    recorder.start(record_path, max_bytes=record_max_bytes)
+
 # Tiempo entre actualizaciones del valor de la moneda
 time_to_read_currency = 300
 
+# Tiempo entre actualizaciones de los tipos de cambio de las divisas de cotización
+time_to_read_fx = 900
+
+# Antigüedad máxima de un precio en caché para mostrarlo sin volver a pedirlo
+price_max_age = 60
+
+# Ventana del historial de precios con el que se muestra la variación
+price_history_window = 3600
+
+# Muestras del historial por moneda (una por minuto como mucho)
+price_history_samples = 60
+
+# Velas guardadas en la flash para la variación de 24 h y 7 d (KLINES = False en env.py lo desactiva).
+# Ocho días: al llenarse se descarta un día entero y sigue cubriendo la semana
+klines_enabled = getattr(env, 'KLINES', True)
+klines_interval = '1h'
+klines_capacity = 192
+
+# Tiempo entre comprobaciones de velas nuevas
+time_to_read_klines = 900
+
+# Estadísticas de 24 h (variación, máximo y mínimo) de todas las favoritas en una
+# sola petición (TICKER = False en env.py lo desactiva)
+ticker_enabled = getattr(env, 'TICKER', True)
+
+# Tiempo entre peticiones de estadísticas y antigüedad máxima para mostrarlas
+time_to_read_ticker = 300
+ticker_max_age = 900
+
+# Variación mínima en puntos básicos para mostrar que sube o baja
+trend_threshold_bp = 10
+
+# Tiempo que se muestra el nombre de la vista al cambiarla
+time_to_show_view = 800
+
+# Alertas de precio por moneda (ALERTS en env.py), por ejemplo {"BTC": [">70000", "<60000", "5%"]}
+alerts_config = getattr(env, 'ALERTS', {})
+
+# Parpadeos del LED y de la pantalla al dispararse una alerta
+alert_blinks = 5
+alert_blink_ms = 250
+
+# Peso por minuto de Binance que se permite este dispositivo (BINANCE_WEIGHT en env.py);
+# el límite es por IP y lo comparten todos los dispositivos tras el mismo router
+governor.set_budget(getattr(env, 'BINANCE_WEIGHT', 600))
+governor.DEBUG = DEBUG
+
+# Caché de DNS: una dirección se reutiliza ``time_to_resolve`` segundos; después se sigue
+# usando mientras se renueva en segundo plano y, si el DNS no responde, hasta ``dns_max_stale``
+time_to_resolve = 300
+dns_max_stale = 86400
+resolver.ttl_ms = time_to_resolve * 1000
+resolver.stale_ms = dns_max_stale * 1000
+
+# Interruptor por host: tras ``breaker_failures`` fallos seguidos (sin conexión, timeout o 5xx)
+# sus peticiones se rechazan sin esperar y se prueba una cada ``breaker_cooldown`` segundos,
+# el doble tras cada prueba fallida hasta ``breaker_max_cooldown``
+breaker_failures = 3
+breaker_cooldown = 30
+breaker_max_cooldown = 600
+breaker.threshold = breaker_failures
+breaker.cooldown_ms = breaker_cooldown * 1000
+breaker.max_cooldown_ms = breaker_max_cooldown * 1000
+
+# Peticiones de precarga permitidas por cada visita al menú de selección
+prefetch_budget = 6
+
+# Monedas vecinas a cada lado de la resaltada que se precargan
+prefetch_neighbours = 1
+
+# Reparto de precios entre dispositivos de la red local (RELAY = True en env.py)
+relay_enabled = getattr(env, 'RELAY', False)
+
+# Tiempo entre anuncios de cada dispositivo en la red local
+relay_heartbeat = 10
+
+# Servidor HTTP local con precios y estado (HTTP_SERVER = True en env.py)
+http_enabled = getattr(env, 'HTTP_SERVER', False)
+http_port = getattr(env, 'HTTP_PORT', 80)
+
+# Telemetría por lotes hacia la API propia (TELEMETRY = True en env.py)
+telemetry_enabled = getattr(env, 'TELEMETRY', False)
+
+# Tiempo entre registros de telemetría
+time_to_record_telemetry = 60
+
+# Tiempo entre lecturas del sensor de temperatura interno
+time_to_read_sensor = 60
+
+# Error máximo admitido del reloj: marca cada cuánto se sincroniza por NTP
+time_max_error_ms = 250
+
+# Servidor NTP (NTP_HOST en env.py)
+ntp_host = getattr(env, 'NTP_HOST', 'pool.ntp.org')
+
+# Watchdog hardware: reinicia la placa si el bucle principal se cuelga (WATCHDOG = False
+# en env.py lo desactiva, por ejemplo para depurar desde el REPL)
+watchdog_enabled = getattr(env, 'WATCHDOG', True)
+watchdog_timeout = 8000
+
+# Tiempo máximo para conectar al arrancar; después reconecta el supervisor sin bloquear
+wifi_timeout = 20000
+
+# Tiempo sin conexión antes de pedir al Wi-Fi que vuelva a asociarse
+wifi_heartbeat = 4000
+
+# Segunda pantalla OLED SSD1306 por I2C (OLED = True en env.py): muestra lo mismo que el MAX7219
+# con la divisa, la tendencia y los indicadores de estado
+oled_enabled = getattr(env, 'OLED', False)
+oled_sda = 4
+oled_scl = 5
+oled_address = 0x3c
+oled_width = 128
+oled_height = 32
+
+# Tiempo entre refrescos completos de las pantallas: normalmente solo se envía lo que cambia
+time_to_refresh_display = 600
+
+# Batería externa por un divisor hacia un pin del ADC (BATTERY_PIN en env.py, None si se
+# alimenta por USB): con ella los perfiles de consumo alargan los periodos y bajan el brillo,
+# la radio y la CPU según se descarga (BATTERY_PROFILES en env.py los sustituye)
+battery_pin = getattr(env, 'BATTERY_PIN', None)
+battery_voltage_min = 3.3
+battery_voltage_max = 4.2
+time_to_read_battery = 60
+
+# Radio apagada o en ahorro entre peticiones (WIFI_POWER_SAVE = False en env.py la deja
+# siempre a pleno rendimiento)
+radio_enabled = getattr(env, 'WIFI_POWER_SAVE', True)
+
+# Estado que sobrevive a los reinicios (moneda y divisa seleccionadas, brillo, última red y
+# últimos precios) en un registro de la flash; los cambios se escriben juntos cada
+# ``time_to_save_state`` segundos
+state_path = 'state.kv'
+time_to_save_state = 60
+
+# Antigüedad con la que vuelven los precios guardados: se muestran como desactualizados
+restored_price_age = 86400
+
+# Clave de los precios guardados, seguida de la moneda
+price_key = 'p:'
+
+# Estado guardado: se lee antes de conectar para probar primero la última red
+state = KeyValueStore(state_path, debug=DEBUG)
+
 # Rpi Pico Model Instance
-rpi = RpiPico(ssid=env.AP_NAME, password=env.AP_PASS, debug=DEBUG, alternatives_ap=env.ALTERNATIVES_AP, hostname=env.HOSTNAME)
+rpi = RpiPico(ssid=env.AP_NAME, password=env.AP_PASS, debug=DEBUG, alternatives_ap=env.ALTERNATIVES_AP,
+              hostname=env.HOSTNAME, wifi_timeout_ms=wifi_timeout, last_ap=state.get('ap'))
 
-rpi.led_on()
+# Sin Wi-Fi los fallos no son de los hosts: no abren sus circuitos
+breaker.online = rpi.wifi_is_connected
 
-# Preparo la instancia para la comunicación con la API
-#api = Api(controller=rpi, url=env.API_URL, path=env.API_PATH, token=env.API_TOKEN, device_id=env.DEVICE_ID, debug=env.DEBUG)
+rpi.led_on()
 
 sleep_ms(100)
 
@@ -31,13 +259,35 @@ sleep_ms(100)
 spi = rpi.set_spi(10, 11, None, 9, bus=1, baudrate=1000000)
 display = Max7219(spi, 9)
 
-# Inicializa el display
-current_brightness = 1
-display.reset()  # Resetear la pantalla
-display.set_intensity(current_brightness)
-display.write_to_buffer_with_dots("Inicio..")
-display.display()
-need_api_update = True
+# Las pantallas muestran fotogramas (ver Models.Render): cada una los formatea a su tamaño
+outputs = [SegmentOutput(display)]
+
+i2c = rpi.set_i2c(oled_sda, oled_scl, bus=0) if oled_enabled else None
+
+if i2c is not None:
+    from Models.Ssd1306 import Ssd1306
+
+    try:
+        outputs.append(OledOutput(Ssd1306(i2c, address=oled_address, width=oled_width, height=oled_height)))
+    except OSError as e:
+        # Sin pantalla en el bus se sigue solo con el MAX7219
+        log.log(_LOG_OLED_ERROR, code(e))
+
+renderer = Renderer(outputs)
+
+# Inicializa el display con el brillo guardado
+brightness_max = 15
+current_brightness = max(1, min(brightness_max, state.get('bright', 1)))
+renderer.reset()  # Resetear las pantallas
+renderer.set_intensity(current_brightness)
+renderer.show(Frame(TEXT, label="Inicio.."))
+
+# Planificador de tareas por plazos; sus excepciones las atiende el supervisor, que alimenta
+# el watchdog al volver de cada tarea
+scheduler = Scheduler(debug=DEBUG)
+supervisor = Supervisor(scheduler, timeout_ms=watchdog_timeout, watchdog=watchdog_enabled, debug=DEBUG)
+scheduler.on_error = supervisor.failed
+scheduler.after = supervisor.feed
 
 # Pausa preventiva al desarrollar
 sleep_ms(3000)
@@ -48,159 +298,882 @@ sleep_ms(3000)
 def bright_up():
     global current_brightness
 
-    if current_brightness < 15:
+    if current_brightness < brightness_max:
         current_brightness += 1
-        display.set_intensity(current_brightness)
-        display.display()
+        renderer.set_intensity(current_brightness)
+        state.put('bright', current_brightness)
 
-        if env.DEBUG:
-            print(current_brightness)
+        log.log(_LOG_BRIGHTNESS, current_brightness)
 
 def bright_down():
     global current_brightness
 
     if current_brightness > 1:
-        current_brightness += 1
-        display.set_intensity(current_brightness)
-        display.display()
+        current_brightness -= 1
+        renderer.set_intensity(current_brightness)
+        state.put('bright', current_brightness)
 
-        if env.DEBUG:
-            print(current_brightness)
+        log.log(_LOG_BRIGHTNESS, current_brightness)
 
-# Botones
-btn1 = rpi.set_callback_to_pin(16, bright_down)
-btn2 = rpi.set_callback_to_pin(17, bright_up)
+# Botones: la IRQ solo avisa al planificador, el brillo se cambia y se guarda desde el bucle
+bright_down_job = scheduler.on_demand(bright_down, name='bright-down')
+bright_up_job = scheduler.on_demand(bright_up, name='bright-up')
+btn1 = rpi.set_callback_to_pin(16, lambda pin: scheduler.trigger(bright_down_job))
+btn2 = rpi.set_callback_to_pin(17, lambda pin: scheduler.trigger(bright_up_job))
 
 
 
-# Diccionario de monedas
+# Diccionario de monedas: forman el catálogo y las favoritas si aún no hay catálogo en la flash
 currency_map = { "ADA": "ada", "BTC": "btc", "ETH": "eth", "BNB": "bnb",
                  "SOL": "sol", "DOT": "dot", }
 
+# Catálogo de monedas en la flash (puede tener cientos, ver build_catalog)
+catalog_path = 'coins.bin'
+
+try:
+    catalog = CoinCatalog(catalog_path)
+except (OSError, ValueError):
+    build_catalog(catalog_path, currency_map.keys(), favourites=currency_map.keys())
+    catalog = CoinCatalog(catalog_path)
+
+# Divisas de cotización, aparecen en el menú detrás de las favoritas
+quote_currencies = ('EUR', 'USDT', 'BTC')
+
+# Posiciones del encoder: favoritas, divisas de cotización y catálogo completo
+menu = CoinMenu(catalog, quote_currencies)
+
+# Monedas con historial, velas y relé: las favoritas al arrancar
+currency_list = list(menu.favourites)
+
+# Pulsación larga en el menú para marcar o desmarcar una favorita
+favourite_hold_ms = 1000
+
+# Pulsaciones más cortas son rebotes del botón
+press_debounce_ms = 30
+
+# Giro rápido en el catálogo: salta a la siguiente letra
+fast_turn_ms = 50
+
 # Inicialización del encoder
 r = RotaryIRQ(pin_num_dt=15,
               pin_num_clk=14,
               min_val=0,
-              max_val=len(currency_map) - 1,
+              max_val=len(menu) - 1,
               reverse=False,
               range_mode=RotaryIRQ.RANGE_BOUNDED)
 
+# Menú abierto según las pulsaciones (lo cambia la IRQ) y según el bucle (lo cambian
+# ``enter_menu`` y ``leave_menu``, que se ejecutan después)
+menu_open = False
 in_selection = False
 val_old = r.value()  # Valor inicial del encoder
+last_turn = ticks_ms()
+press_start = None
+
+# Moneda seleccionada inicialmente: la de antes de reiniciar si sigue en el catálogo
+selected_currency = state.get('coin')
+
+if selected_currency is None or catalog.find(selected_currency) < 0:
+    selected_currency = currency_list[0] if currency_list else catalog.symbol(0)
+
+# Divisa de cotización seleccionada inicialmente
+selected_quote = state.get('quote', "EUR")
+
+if selected_quote not in quote_currencies:
+    selected_quote = "EUR"
 
-# Moneda seleccionada inicialmente
-selected_currency = "ADA"
+# Posición resaltada en el menú, se aplica al confirmar
+highlighted = 0
 
+# Prioridad de la próxima consulta del precio: del usuario al confirmar una moneda
+price_priority = BACKGROUND
 
-# Función que maneja la pulsación del botón del encoder
+# Vista fuera del menú: 0 es el precio y las demás la variación en una ventana
+view = 0
+
+# Ventanas de variación de cada vista (segundos) y su nombre en la pantalla
+view_windows = (None, price_history_window, 86400, 604800, None, None)
+view_labels = ('', '1H', '24H', '7d', 'HI', 'LO')
+
+# Campo de las estadísticas de 24 h que muestran las vistas de máximo y mínimo
+view_fields = (None, None, None, None, HIGH, LOW)
+
+
+# Función que maneja la pulsación del botón del encoder, se ejecuta en la IRQ: solo
+# cambia el estado del menú y avisa al planificador, la pantalla se actualiza desde el bucle
 def encoder_press (pin):
-    global in_selection, val_old, selected_currency, need_api_update
+    global menu_open, press_start
 
-    if env.DEBUG:
-        print('Se ha pulsado el encoder')
+    # Se actúa al soltar, cuando ya se sabe si la pulsación fue larga
+    if pin.value() == 0:
+        press_start = ticks_ms()
+        return
 
-    # Si no estamos en selección, entramos al menú
-    if not in_selection:
-        if env.DEBUG:
-            print("Entrando al menú de selección de moneda...")
+    # Un rebote (o una subida sin bajada) no es una pulsación
+    if press_start is None:
+        return
 
-        in_selection = True
-        display.write_to_buffer(f"SEL-{selected_currency}")
-        display.display()
+    held = ticks_diff(ticks_ms(), press_start)
+    press_start = None
+
+    if held < press_debounce_ms:
+        return
+
+    trace.start_flow()
+    start = ticks_us() if trace.enabled else 0
+
+    log.log(_LOG_PRESS, held)
+
+    # Pulsación larga en el menú: la favorita se marca desde el bucle
+    if menu_open and held >= favourite_hold_ms:
+        scheduler.trigger(favourite_job)
     else:
-        if env.DEBUG:
-            print("Saliendo del menú...")
+        menu_open = not menu_open
+        scheduler.trigger(menu_in_job if menu_open else menu_out_job)
+
+    trace.span(_SPAN_PRESS, start)
 
-        # Si estamos en selección, salimos del menú
-        in_selection = False
-        display.write_to_buffer(f"CURR-{selected_currency}")
-        display.display()
-        need_api_update = True
 
-    # Esperamos a que se suelte el botón para evitar múltiples presiones
-    while pin.value() == 0:
-        sleep_ms(150)
+# Entra al menú: muestra la moneda actual y empieza a precargar
+def enter_menu ():
+    global in_selection, val_old, highlighted
+
+    log.log(_LOG_MENU_IN)
+    in_selection = True
+    alert_flash.stop()
+    renderer.show(Frame(TEXT, label=f"SEL-{selected_currency}"))
+
+    # El menú empieza en la moneda actual
+    highlighted = menu.index_of(selected_currency)
+    r.set(value=highlighted)
+    val_old = highlighted
+
+    # Empieza a precargar la moneda resaltada y sus vecinas, con la radio ya despertando
+    prefetcher.start_session()
+    scheduler.trigger(selection_job)
+
+    if radio is not None:
+        radio.wake_soon()
+
+
+# Sale del menú confirmando la moneda o la divisa resaltada
+def leave_menu ():
+    global in_selection, selected_currency, selected_quote, price_priority
+
+    log.log(_LOG_MENU_OUT)
+    in_selection = False
+
+    if menu.coin(highlighted) is not None:
+        selected_currency = menu.coin(highlighted)
+        renderer.show(Frame(TEXT, label=f"CURR-{selected_currency}"))
+
+        # Pide el precio de la nueva moneda sin esperar al siguiente periodo y antes que el resto
+        price_priority = USER
+        scheduler.trigger(price_job)
+
+        # Una moneda que no se seguía entra en las estadísticas de 24 h
+        if ticker is not None and selected_currency not in ticker.symbols:
+            scheduler.trigger(ticker_job)
+    else:
+        # Cambiar de divisa solo convierte el último precio, sin peticiones
+        selected_quote = menu.quote(highlighted)
+        prefetcher.cancel_session()
+        render_price()
+
+    save_selection()
+
+
+# Guarda la moneda y la divisa confirmadas en el menú
+def save_selection ():
+    state.put('coin', selected_currency)
+    state.put('quote', selected_quote)
+
+
+# Fotograma de una posición del menú: una moneda (marcada si es favorita) o una divisa
+def menu_frame (i):
+    coin = menu.coin(i)
+
+    if coin is None:
+        return Frame(MENU, quote=menu.quote(i))
+
+    return Frame(MENU, symbol=coin, flags=FAVOURITE if coin in menu.favourites else 0)
 
 
 # Función para actualizar la moneda seleccionada en el menú
 def update_currency_selection ():
-    global val_old, selected_currency
+    global val_old, highlighted, last_turn
     val_new = r.value()
 
     # Solo actualizamos si el valor del encoder ha cambiado
     if val_new != val_old:
+        now = ticks_ms()
+
+        # Girando rápido por el catálogo se salta de letra en letra
+        if abs(val_new - val_old) > 1 or ticks_diff(now, last_turn) < fast_turn_ms:
+            target = menu.jump(val_old, 1 if val_new > val_old else -1)
+
+            if target != val_old:
+                val_new = target
+                r.set(value=val_new)
+
+        last_turn = now
         val_old = val_new
+        highlighted = val_new
+
+        log.log(_LOG_HIGHLIGHT, val_new)
+
+        renderer.show(menu_frame(val_new))
+
+    if menu.coin(val_new) is not None:
+        prefetcher.on_highlight(val_new)
+
+
+# Marca o desmarca como favorita la moneda resaltada; sigue en su posición del catálogo
+def toggle_favourite ():
+    global val_old, highlighted
+
+    coin = menu.coin(highlighted)
+
+    if coin is None:
+        return
+
+    favourite = menu.toggle_favourite(coin)
+    highlighted = menu.catalog_start() + catalog.find(coin)
+    val_old = highlighted
+    r.set(value=highlighted, max_val=len(menu) - 1)
+
+    renderer.show(Frame(TEXT, label=("FAV-" if favourite else "DEL-") + coin))
+
+
+# Función que consulta el precio de una moneda contra la divisa base
+def fetch_price (symbol, priority=BACKGROUND):
+    # Con el relé, el precio puede llegar más tarde desde el líder (on_relay_price)
+    if relay is not None:
+        return relay.fetch_price(symbol)
+
+    price = quotes.fetch(symbol, priority)
+
+    if price:
+        price_cache.put(symbol, price)
+
+    return price
+
+
+# Función que actualiza los tipos de cambio que no se hayan consultado en el último periodo
+def update_fx ():
+    # Los seguidores del relé los reciben del líder
+    if relay is not None and not relay.is_leader():
+        return
+
+    for quote in quote_currencies:
+        if quote != quotes.base and quote not in quotes.pegged \
+                and price_cache.get(quote, time_to_read_currency * 1000) is None:
+            # Si una falla, las demás también fallarían: cada tarea espera como mucho un timeout
+            if fetch_price(quote) is None:
+                # Aplazada por el límite de peso o el interruptor: se reintenta en cuanto se pueda, no al siguiente periodo
+                wait = background_wait_ms()
+
+                if wait:
+                    scheduler.reschedule(fx_retry_job, wait)
+
+                break
+
+
+# Milisegundos hasta poder pedir un precio a Binance: cupo en el gobernador de peso y, con el
+# interruptor abierto, su próxima prueba (0 con el relé: los seguidores no piden, el precio llega del líder)
+def binance_wait_ms (priority):
+    if relay is not None:
+        return 0
+
+    from Models.Api import BINANCE_HOST
+
+    return max(governor.wait_ms(WEIGHT_PRICE, priority), breaker.wait_ms(BINANCE_HOST))
+
+
+# Lo mismo para las peticiones en segundo plano (tipos de cambio y precarga)
+def background_wait_ms ():
+    return binance_wait_ms(BACKGROUND)
+
+
+# Monedas que muestra este dispositivo, se anuncian al líder del relé (la base y las
+# divisas ligadas a ella no se piden a la API, no hace falta repartirlas)
+def relay_interest ():
+    if selected_quote == quotes.base or selected_quote in quotes.pegged:
+        return selected_currency,
+
+    return selected_currency, selected_quote
+
+
+# Precio recibido por el relé (o consultado por él): se muestra si es el visible
+def on_relay_price (symbol, price):
+    quotes.accept(symbol, price)
+
+    if not in_selection and symbol in (selected_currency, selected_quote):
+        scheduler.trigger(render_job)
+
+
+# Función que muestra el último precio de la moneda en la divisa seleccionada
+def render_price ():
+    if view_fields[view] is not None:
+        render_level(view_fields[view])
+        return
+
+    if view:
+        render_change()
+        return
+
+    price = quotes.convert(price_cache.get(selected_currency, None), selected_quote)
+
+    if price is None:
+        return
+
+    renderer.show(Frame(PRICE, selected_currency, quotes.to_float(price), quote=selected_quote,
+                        trend=trend(change_bp(price_history_window)), flags=status_flags()))
+
+
+# Indicadores de estado de los fotogramas del precio y sus vistas
+def status_flags ():
+    flags = 0
+
+    # El precio se ha saltado al menos una actualización
+    age = price_cache.age_ms(selected_currency)
+
+    if age is None or age > 2 * price_job.period_ms:
+        flags |= STALE
+
+    if battery_governor is not None and battery_governor.index:
+        flags |= BATTERY
 
-        # Verificamos que el valor del encoder está dentro del rango válido de índices
-        if 0 <= val_new < len(currency_map):
-            # Usamos el valor del encoder para seleccionar la moneda correspondiente
-            selected_currency = list(currency_map.keys())[val_new]
+    return flags
 
-            if env.DEBUG:
-                print(f"Moneda seleccionada: {selected_currency}")
 
-            display.write_to_buffer(f"SEL- {selected_currency}")
-            display.display()
-        else:
+# Tendencia de una variación en puntos básicos: 1 sube, -1 baja y 0 estable
+def trend (change):
+    if change is None or -trend_threshold_bp < change < trend_threshold_bp:
+        return 0
 
-            if env.DEBUG:
-                print("Valor de encoder fuera de rango: ", val_new)
+    return 1 if change > 0 else -1
 
-    sleep_ms(50)
 
+# Variación de la moneda seleccionada en una ventana, en puntos básicos y en la divisa base
+def change_bp (window):
+    # La última hora sale del historial en RAM; las ventanas largas, de las velas de la flash
+    if window == price_history_window:
+        series = price_history.get(selected_currency)
+
+        return series.change_bp() if series is not None else None
+
+    # Las 24 h, de las estadísticas si son recientes (son más precisas que las velas)
+    if window == 86400 and ticker is not None:
+        change = ticker.change_bp(selected_currency, ticker_max_age * 1000)
+
+        if change is not None:
+            return change
+
+    if klines is not None:
+        return klines.change_bp(selected_currency, window)
+
+    return None
+
+
+# Función que muestra la variación de la moneda en la ventana de la vista actual
+def render_change ():
+    change = change_bp(view_windows[view])
+
+    renderer.show(Frame(CHANGE, selected_currency, change, label=view_labels[view],
+                        trend=trend(change), flags=status_flags()))
+
+
+# Función que muestra el máximo o el mínimo de 24 h en la divisa seleccionada
+def render_level (field):
+    value = None
+
+    if ticker is not None:
+        value = quotes.convert(ticker.get(selected_currency, field, ticker_max_age * 1000), selected_quote)
+
+    renderer.show(Frame(LEVEL, selected_currency, quotes.to_float(value) if value is not None else None,
+                        quote=selected_quote, trend=1 if field == HIGH else -1, flags=status_flags()))
+
+
+# Vistas que tienen de dónde sacar sus datos
+def view_available (i):
+    if view_fields[i] is not None:
+        return ticker is not None
+
+    if view_windows[i] == 86400:
+        return klines is not None or ticker is not None
+
+    if view_windows[i] == 604800:
+        return klines is not None
+
+    return True
+
+
+# Cambia la vista fuera del menú: muestra su nombre y después el valor
+def next_view ():
+    global view
+
+    if in_selection:
+        return
+
+    view = (view + 1) % len(view_labels)
+
+    while not view_available(view):
+        view = (view + 1) % len(view_labels)
+
+    if view:
+        renderer.show(Frame(VIEW, selected_currency, label=view_labels[view]))
+        scheduler.once(time_to_show_view, render_price, name='view-label')
+    else:
+        render_price()
+
+
+# Cada precio nuevo entra en el historial y se compara con las alertas; el de las monedas
+# seguidas y las divisas se guarda para mostrarlo tras un reinicio
+def on_price (symbol, price):
+    price_history.add(symbol, price)
+    alerts.check(symbol, price)
+
+    if (symbol in currency_list or symbol == selected_currency or symbol in quote_currencies) \
+            and len(price_key) + len(symbol) <= KEY_SIZE:
+        state.put(price_key + symbol, price)
+
+
+# Alerta disparada: parpadea el LED y, fuera del menú, la pantalla con la alerta
+def on_alert (symbol, direction, value, price, move):
+    alert_led.start(alert_blinks)
+
+    if in_selection:
+        return
+
+    # Los movimientos en puntos básicos; los niveles, en la divisa base
+    if move:
+        frame = Frame(CHANGE, symbol, value, trend=1 if direction == UP else -1, flags=ALERT)
+    else:
+        frame = Frame(LEVEL, symbol, quotes.to_float(value), quote=quotes.base,
+                      trend=1 if direction == UP else -1, flags=ALERT)
+
+    renderer.show(frame)
+    alert_flash.start(alert_blinks, done=end_alert)
+
+
+# Al terminar el parpadeo de una alerta vuelve la vista actual
+def end_alert ():
+    if not in_selection:
+        render_price()
+
+
+# Función que consulta el precio de la moneda seleccionada y lo muestra
+def update_price ():
+    global price_priority
+
+    # En el menú no se pisa la etiqueta, al salir se vuelve a pedir el precio
+    if in_selection:
+        return
+
+    # Una actualización de precio es un flujo: petición, lectura, formato y SPI, salvo
+    # si llega disparada por una pulsación, que sigue el flujo de la IRQ
+    if not trace.flow:
+        trace.start_flow()
+
+    # Al confirmar una moneda, el precio suele estar ya precargado
+    if prefetcher.active:
+        price = prefetcher.end_session(selected_currency)
+    else:
+        price = price_cache.get(selected_currency, price_max_age * 1000)
+
+    if price is None:
+        price = fetch_price(selected_currency, price_priority)
+
+    # Si el tipo de cambio falló en su tarea, se reintenta aquí (no si el precio también ha fallado)
+    if price is not None and selected_quote not in quotes.fx:
+        quotes.update_fx(selected_quote, price_priority)
+
+    # Aplazada por el límite de peso o con el interruptor de Binance abierto: se reintenta en
+    # cuanto haya cupo o toque la prueba, no al siguiente periodo
+    wait = binance_wait_ms(price_priority) if price is None else 0
+
+    if wait:
+        scheduler.reschedule(price_retry_job, wait)
+    else:
+        price_priority = BACKGROUND
+
+    render_price()
+
+
+# Estadísticas de 24 h de las favoritas y la moneda seleccionada; el último precio va a la caché
+def update_ticker ():
+    symbols = currency_list if selected_currency in currency_list else currency_list + [selected_currency]
+    ticker.track(symbols)
+
+    # La red (``Models.Api`` y ``urequests``) se importa con la primera petición, no al arrancar
+    from Models.Api import get_binance_ticker_24h
+
+    if get_binance_ticker_24h(ticker.pairs(), ticker.feed) is None:
+        return
+
+    for symbol in ticker.symbols:
+        price = ticker.get(symbol, LAST)
+
+        if price is not None:
+            quotes.accept(symbol, price)
+            price_cache.put(symbol, price)
+
+    if not in_selection and view:
+        render_price()
+
+
+# Velas de Binance para el almacén de velas; como el ticker, importa la red con la primera petición
+def fetch_klines (symbol, interval, start_ms, limit):
+    from Models.Api import get_binance_klines
+
+    return get_binance_klines(symbol, interval, start_ms, limit)
+
+
+# Reinicio de la pantalla tras un fallo: se vuelve a configurar y a dibujar lo que toca
+def restart_display ():
+    renderer.reset()
+    renderer.set_intensity(current_brightness)
+
+    if in_selection:
+        renderer.show(menu_frame(highlighted))
+    else:
+        render_price()
+
+
+# Lectura del sensor de temperatura: cada lectura correcta es un latido
+def read_sensor ():
+    rpi.cpu_temperature_read_sensor()
+    supervisor.beat('sensor')
+
+
+# Callback del giro del encoder, se ejecuta en la IRQ: solo avisa al planificador
+def encoder_rotate ():
+    # Cada paso del encoder es un flujo nuevo en la traza, hasta su refresco de pantalla
+    trace.start_flow()
+
+    if menu_open:
+        scheduler.trigger(selection_job)
+    else:
+        scheduler.trigger(view_job)
+
+
+# Conversión entre divisas: cada moneda se pide una vez en USDT
+quotes = QuoteConverter(base='USDT', quotes=quote_currencies, debug=DEBUG)
+
+# Respuestas del servidor HTTP local, se montan como mucho una vez por segundo
+def http_prices ():
+    prices = {}
+
+    for symbol in currency_list:
+        price = price_cache.get(symbol, None)
+
+        if price is not None:
+            prices[symbol] = {"price": format_scaled(price), "age_s": price_cache.age_ms(symbol) // 1000}
+
+    return ujson.dumps({
+        "base": quotes.base,
+        "selected": selected_currency,
+        "quote": selected_quote,
+        "prices": prices,
+        "fx": {quote: format_scaled(rate) for quote, rate in quotes.fx.items()},
+    })
+
+
+def http_stats ():
+    return ujson.dumps({
+        "cpu_temperature": rpi.get_cpu_temperature_stats(),
+        "mem_free": gc.mem_free(),
+        "scheduler": scheduler.stats,
+        "telemetry": telemetry.stats if telemetry is not None else None,
+        "klines": klines.stats if klines is not None else None,
+        "alerts": alerts.stats,
+        "governor": governor.stats,
+        "supervisor": supervisor.stats,
+        "radio": radio.duty() if radio is not None else None,
+        "record": dict(recorder.stats, bytes=recorder.size) if recorder.enabled else None,
+        "battery": battery_governor.report() if battery_governor is not None else None,
+        "display": renderer.report(),
+        "state": state.report(),
+        "dns": resolver.report(),
+        "breaker": breaker.report(),
+        "boot": {"import_us": boot_import_us, "import_bytes": boot_import_bytes,
+                 "import_kept": boot_import_kept, "format": boot_format},
+    })
+
+
+def http_battery ():
+    if getattr(rpi, 'external_battery', None) is None:
+        return '{"battery":null}'
+
+    battery = rpi.read_external_battery()
+
+    return ujson.dumps({"battery": {key: value for key, value in battery.items() if key not in ('adc', 'pin')}})
+
+
+def http_log ():
+    return ujson.dumps({"dropped": log.dropped, "lines": log.lines()})
+
+
+def http_wireless ():
+    info_client, info_ap = rpi.wireless_info()
+
+    return ujson.dumps({"client": info_client, "ap": info_ap})
+
+
+# Registro de telemetría: los campos que no cambian apenas ocupan en el lote
+def record_telemetry ():
+    price = price_cache.get(selected_currency, None)
+
+    telemetry.add({
+        "coin": selected_currency,
+        "quote": selected_quote,
+        "price": format_scaled(price) if price is not None else None,
+        "temp": rpi.get_cpu_temperature_stats()["current"],
+        "rssi": rpi.get_wireless_rssi() if rpi.wifi_is_connected() else None,
+        "mem_kb": gc.mem_free() // 1024,
+    })
+
+
+# Carga de la batería según la curva de la LiPo, no el porcentaje lineal en voltaje
+def read_battery ():
+    return charge_pct(rpi.read_external_battery()["voltage_current"])
+
+
+# Guarda la red actual y escribe en la flash los cambios pendientes del estado
+def save_state ():
+    if rpi.wifi_is_connected():
+        state.put('ap', rpi.get_wireless_ssid())
+
+    state.maintain()
+
+
+# Perfil de consumo según la batería (ver Models.BatteryGovernor)
+def apply_power_profile (profile):
+    global current_brightness, brightness_max
+
+    # Las consultas a la red se espacian; el cambio cuenta a partir de la siguiente de cada una
+    factor = profile["period_factor"]
+    price_job.period_ms = time_to_read_currency * 1000 * factor
+    fx_job.period_ms = time_to_read_fx * 1000 * factor
+
+    if ticker is not None:
+        ticker_job.period_ms = time_to_read_ticker * 1000 * factor
+
+    if klines is not None:
+        klines.period_ms = time_to_read_klines * 1000 * factor
+
+    brightness_max = profile["intensity"]
+
+    if current_brightness > brightness_max:
+        current_brightness = brightness_max
+        renderer.set_intensity(current_brightness)
+
+    if radio is not None:
+        radio.off_min_ms = profile["radio_off_min_ms"]
+
+    rpi.set_cpu_frequency(profile["freq"])
+
+
+# Tareas del planificador
+fx_job = scheduler.every(time_to_read_fx * 1000, update_fx, name='fx')
+fx_retry_job = scheduler.on_demand(update_fx, name='fx-retry')
+price_job = scheduler.every(time_to_read_currency * 1000, update_price, name='price')
+sensor_job = scheduler.every(time_to_read_sensor * 1000, read_sensor,
+                             name='sensor', delay_ms=time_to_read_sensor * 1000)
+refresh_job = scheduler.every(time_to_refresh_display * 1000, renderer.invalidate,
+                              name='display-refresh', delay_ms=time_to_refresh_display * 1000)
+state_job = scheduler.every(time_to_save_state * 1000, save_state,
+                            name='state', delay_ms=time_to_save_state * 1000)
+
+# Las direcciones caducadas se renuevan aquí, no dentro de la petición que las usa
+dns_job = scheduler.on_demand(resolver.refresh, name='dns')
+resolver.on_stale = lambda: scheduler.trigger(dns_job)
+
+# Hora por SNTP: se resincroniza según la deriva medida del cristal
+ntp = SntpClock(scheduler, host=ntp_host, max_error_ms=time_max_error_ms,
+                online=rpi.wifi_is_connected, debug=DEBUG)
+ntp.start()
+
+# Historial de precios por moneda: se alimenta de la caché, sin peticiones propias
+price_history = PriceHistory(currency_list, capacity=price_history_samples,
+                             window_s=price_history_window,
+                             spacing_s=price_history_window // price_history_samples)
+
+# Velas por moneda en la flash: tras un reinicio solo se piden las que faltan
+klines = None
+
+if klines_enabled:
+    from Models.KlineStore import KlineStore, KlineIngester
+
+    klines = KlineIngester(scheduler, {symbol: KlineStore(symbol, base=quotes.base, interval=klines_interval,
+                                                          capacity=klines_capacity, debug=DEBUG)
+                                       for symbol in currency_list},
+                           fetch_klines, now=lambda: time() if ntp.synced() else None,
+                           online=rpi.wifi_is_connected, period_ms=time_to_read_klines * 1000, debug=DEBUG)
+    klines.start(delay_ms=5000)
+
+# Estadísticas de 24 h: una petición para todas las monedas seguidas
+ticker = None
+
+if ticker_enabled:
+    ticker = TickerStats(currency_list, base=quotes.base)
+    ticker_job = scheduler.every(time_to_read_ticker * 1000, update_ticker, name='ticker', delay_ms=2000)
+
+# Alertas de precio: umbrales ordenados por moneda, se evalúan con cada precio
+alerts = AlertEngine(history=price_history, on_alert=on_alert, debug=DEBUG)
+
+for symbol, specs in alerts_config.items():
+    for spec in specs:
+        alerts.add(symbol, spec)
+
+alert_led = Blinker(scheduler, rpi.led_on, rpi.led_off, period_ms=alert_blink_ms, name='alert-led')
+alert_flash = Blinker(scheduler, lambda: renderer.set_power(True), lambda: renderer.set_power(False),
+                      period_ms=alert_blink_ms, name='alert-display')
+
+# Caché de precios y precarga mientras se navega por el menú
+price_cache = PriceCache(on_put=on_price)
+
+# Últimos precios de antes de reiniciar: se muestran (desactualizados) hasta el primero nuevo
+# y las alertas comparan con ellos lo que se movió mientras tanto
+for key in state.keys():
+    if key.startswith(price_key):
+        symbol = key[len(price_key):]
+        price = state.get(key)
+        price_cache.restore(symbol, price, restored_price_age * 1000)
+        quotes.accept(symbol, price)
+        alerts.restore(symbol, price)
+prefetcher = Prefetcher(scheduler, price_cache, fetch_price, menu,
+                        budget=prefetch_budget, neighbours=prefetch_neighbours,
+                        max_age_ms=price_max_age * 1000, wait_ms=background_wait_ms, debug=DEBUG)
+
+# La selección solo se procesa cuando el encoder gira, nunca por sondeo
+selection_job = scheduler.on_demand(update_currency_selection, name='selection')
+favourite_job = scheduler.on_demand(toggle_favourite, name='favourite')
+render_job = scheduler.on_demand(render_price, name='render')
+price_retry_job = scheduler.on_demand(update_price, name='price-retry')
+view_job = scheduler.on_demand(next_view, name='view')
+menu_in_job = scheduler.on_demand(enter_menu, name='menu-in')
+menu_out_job = scheduler.on_demand(leave_menu, name='menu-out')
+r.add_listener(encoder_rotate)
+
+# Relé de precios: solo el líder de la red local consulta la API
+relay = None
+
+if relay_enabled:
+    from Models.PriceRelay import PriceRelay
+
+    relay = PriceRelay(scheduler, price_cache, quotes.fetch, relay_interest,
+                       on_price=on_relay_price, period_ms=time_to_read_currency * 1000,
+                       heartbeat_ms=relay_heartbeat * 1000, slow=quote_currencies,
+                       slow_period_ms=time_to_read_fx * 1000, debug=DEBUG)
+
+    # Sin multicast (o sin red al arrancar) cada dispositivo consulta por su cuenta
+    if not relay.open():
+        relay = None
+
+# Servidor HTTP local: consulta el dispositivo sin pasar por la nube
+http = None
+
+if http_enabled:
+    from Models.HttpServer import HttpServer
+
+    http = HttpServer(scheduler, port=http_port, debug=DEBUG)
+    http.route('/prices', http_prices)
+    http.route('/stats', http_stats)
+    http.route('/battery', http_battery, ttl_ms=5000)
+    http.route('/wireless', http_wireless, ttl_ms=5000)
+
+    # Vaciar el registro no se cachea: cada petición se lleva lo nuevo
+    http.route('/log', http_log, ttl_ms=0)
+
+    if not http.open():
+        http = None
+
+# Telemetría: se agrupa en lotes y, sin conexión, espera en la flash
+telemetry = None
+
+if telemetry_enabled:
+    from Models.Api import Api
+    from Models.TelemetryQueue import TelemetryQueue
+
+    api = Api(controller=rpi, url=env.API_URL, path=env.API_PATH, token=env.API_TOKEN,
+              device_id=env.DEVICE_ID, debug=DEBUG)
+    telemetry = TelemetryQueue(scheduler, api.send_batch, env.DEVICE_ID,
+                               online=rpi.wifi_is_connected, debug=DEBUG)
+    telemetry_job = scheduler.every(time_to_record_telemetry * 1000, record_telemetry,
+                                    name='telemetry-record', delay_ms=time_to_record_telemetry * 1000)
+
+# Radio: se apaga entre peticiones y se enciende antes de la siguiente; con el servidor HTTP o
+# el relé tiene que seguir escuchando, así que solo pasa a ahorro de energía
+radio = None
+
+if radio_enabled and rpi.wifi is not None:
+    from Models.RadioManager import RadioManager
+
+    radio = RadioManager(scheduler, rpi.wifi, rpi.wifi_wake, online=rpi.wifi_is_connected,
+                         always_on=relay is not None or http is not None, debug=DEBUG)
+    radio.start()
+
+# Perfiles de consumo con batería
+battery_governor = None
+
+if battery_pin is not None:
+    from Models.BatteryGovernor import BatteryGovernor, PROFILES as POWER_PROFILES, charge_pct
+
+    rpi.set_external_battery(battery_pin, battery_voltage_min, battery_voltage_max)
+    battery_governor = BatteryGovernor(scheduler, read_battery, apply_power_profile,
+                                       profiles=getattr(env, 'BATTERY_PROFILES', POWER_PROFILES),
+                                       period_ms=time_to_read_battery * 1000, debug=DEBUG)
+    battery_governor.start()
 
 # Callback para la interrupción del botón del encoder (para manejar las pulsaciones)
-SW = rpi.set_callback_to_pin(13, encoder_press)
+SW = rpi.set_callback_to_pin(13, encoder_press, event="BOTH")
+
+# Los flancos grabados pasan de la RAM a la flash
+if recorder.enabled:
+    record_job = scheduler.every(time_to_flush_record * 1000, recorder.flush, name='record')
 
-# Tiempo en el que se llamó a la función
-last_called_time = time()
+# Volcado del registro por el puerto serie, en debug
+if DEBUG:
+    log_job = scheduler.every(time_to_drain_log * 1000, lambda: log.drain(print), name='log')
+
+# Subsistemas que se reinician por separado: un fallo en uno no para a los demás
+supervisor.add('ui', restart_display)
+supervisor.assign('ui', price_job, price_retry_job, render_job, view_job, selection_job, favourite_job,
+                  menu_in_job, menu_out_job, bright_down_job, bright_up_job)
+supervisor.add('sensor', rpi.cpu_temperature_reset_sensor, heartbeat_ms=3 * time_to_read_sensor * 1000)
+supervisor.assign('sensor', sensor_job)
+supervisor.add('network', rpi.wifi_reconnect, heartbeat_ms=wifi_heartbeat,
+               probe=radio.healthy if radio is not None else rpi.wifi_is_connected)
+supervisor.assign('network', dns_job)
+
+# El watchdog arranca tras la configuración, que puede tardar más que su timeout
+supervisor.start()
 
 def thread0 ():
     """
     Primer hilo, flujo principal de la aplicación.
     En este hilo colocamos toda la lógica principal de funcionamiento.
-    """
-
-    global need_api_update, selected_currency, last_called_time
-
-    if env.DEBUG:
-        print('')
-        print('Inicia hilo principal (thread0)')
 
-    # Bucle principal que maneja la selección del encoder
-    while True:
-        if in_selection:
-            # Si estamos en el menú, actualizamos la moneda seleccionada con el encoder
-            update_currency_selection()
-        else:
-            if need_api_update or time() - last_called_time > time_to_read_currency:
-                price = get_binance_price(selected_currency, 'EUR')
-                need_api_update = False
-
-                if price:
-
-                    if price < 100:
-                        display.write_to_buffer_with_dots(f"{selected_currency} {price:.2f}")
-                    else:
-                        display.write_to_buffer_with_dots(f"{selected_currency}{price:.2f}")
-                    display.display()
+    El planificador duerme hasta el siguiente plazo (precio, sensor, RTC) o
+    hasta que una IRQ del encoder lo despierta.
+    """
 
-        sleep_ms(50)
+    log.log(_LOG_START)
+    scheduler.run_forever()
 
 
 while True:
     try:
         thread0()
     except Exception as e:
-        if env.DEBUG:
-            print('Error: ', e)
+        log.log(_LOG_ERROR, code(e))
 
-        if env.DEBUG:
-            print('Memoria antes de liberar: ', gc.mem_free())
+        # Lo que escapa del planificador (IRQ, sockets vigilados) se sigue sin esperas;
+        # si se repite, el supervisor escala a un reinicio completo
+        supervisor.failed(None, e)
 
+        mem_free = gc.mem_free()
         gc.collect()
-
-        if env.DEBUG:
-            print("Memoria después de liberar:", gc.mem_free())
-    finally:
-        sleep_ms(5000)
+        log.log(_LOG_MEMORY, mem_free, gc.mem_free())